@@ -0,0 +1,171 @@
+"""Hash aggregation with mergeable partial aggregates.
+
+Every aggregate keeps a small running state per group instead of the group's rows, so
+an input is aggregated in one pass whatever its size. States of the same group built
+from different parts of the input can be merged, which lets separately aggregated
+partitions be combined into one result.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from infrastructure.parsers.sql_ast import Aggregate
+
+Row = Dict[str, Any]
+# Group key (the GROUP BY values, in order) -> one accumulator per aggregate
+Groups = Dict[Tuple, List['Accumulator']]
+
+
+class Accumulator:
+    __slots__ = ()
+
+    def add(self, value):
+        raise NotImplementedError
+
+    def merge(self, other: 'Accumulator'):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+
+class Count(Accumulator):
+    __slots__ = ('count',)
+
+    def __init__(self):
+        self.count = 0
+
+    def add(self, value):
+        if value is not None:
+            self.count += 1
+
+    def merge(self, other: 'Count'):
+        self.count += other.count
+
+    def result(self):
+        return self.count
+
+
+class CountRows(Count):
+    """COUNT(*): every row counts, NULL or not."""
+    __slots__ = ()
+
+    def add(self, value):
+        self.count += 1
+
+
+class Sum(Accumulator):
+    __slots__ = ('total', 'count')
+
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+
+    def add(self, value):
+        if value is not None:
+            self.total += value
+            self.count += 1
+
+    def merge(self, other: 'Sum'):
+        self.total += other.total
+        self.count += other.count
+
+    def result(self):
+        # The SUM of no values is NULL, not 0
+        return self.total if self.count else None
+
+
+class Avg(Sum):
+    __slots__ = ()
+
+    def result(self):
+        return self.total / self.count if self.count else None
+
+
+class Min(Accumulator):
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = None
+
+    def add(self, value):
+        if value is not None and (self.value is None or value < self.value):
+            self.value = value
+
+    def merge(self, other: 'Min'):
+        self.add(other.value)
+
+    def result(self):
+        return self.value
+
+
+class Max(Min):
+    __slots__ = ()
+
+    def add(self, value):
+        if value is not None and (self.value is None or value > self.value):
+            self.value = value
+
+
+ACCUMULATORS = {'COUNT': Count, 'SUM': Sum, 'AVG': Avg, 'MIN': Min, 'MAX': Max}
+# Functions that only make sense over numbers
+NUMERIC_FUNCTIONS = ('SUM', 'AVG')
+
+
+def aggregate_name(aggregate: Aggregate) -> str:
+    """The output column of an aggregate: its alias, or e.g. 'COUNT(*)' or 'SUM(amount)'."""
+    if aggregate.alias:
+        return aggregate.alias
+    return f"{aggregate.function}({aggregate.column or '*'})"
+
+
+def accumulator_type(aggregate: Aggregate):
+    if aggregate.column is None:
+        return CountRows
+    return ACCUMULATORS[aggregate.function]
+
+
+def partial_aggregate(rows: Iterable[Row], group_by: List[str], aggregates: List[Aggregate],
+                      groups: Optional[Groups] = None) -> Groups:
+    """Fold rows into per-group accumulators, adding to `groups` if given."""
+    if groups is None:
+        groups = {}
+    types = [accumulator_type(a) for a in aggregates]
+    # COUNT(*) has no column; its accumulator ignores the value it is given
+    columns = [a.column for a in aggregates]
+    get = groups.get
+    for row in rows:
+        key = tuple([row.get(c) for c in group_by])
+        states = get(key)
+        if states is None:
+            states = groups[key] = [t() for t in types]
+        for state, column in zip(states, columns):
+            state.add(row.get(column))
+    return groups
+
+
+def merge_partials(target: Groups, other: Groups) -> Groups:
+    """Merge the partial aggregates of another part of the input into `target`."""
+    for key, states in other.items():
+        existing = target.get(key)
+        if existing is None:
+            target[key] = states
+            continue
+        for mine, theirs in zip(existing, states):
+            mine.merge(theirs)
+    return target
+
+
+def finalize(groups: Groups, group_by: List[str], aggregates: List[Aggregate]) -> List[Row]:
+    """One output row per group. Without GROUP BY there is always exactly one row."""
+    if not group_by and not groups:
+        groups = {(): [accumulator_type(a)() for a in aggregates]}
+    names = [aggregate_name(a) for a in aggregates]
+    rows = []
+    for key, states in groups.items():
+        row = dict(zip(group_by, key))
+        for name, state in zip(names, states):
+            row[name] = state.result()
+        rows.append(row)
+    return rows
+
+
+def hash_aggregate(rows: Iterable[Row], group_by: List[str], aggregates: List[Aggregate]) -> List[Row]:
+    return finalize(partial_aggregate(rows, group_by, aggregates), group_by, aggregates)
@@ -0,0 +1,273 @@
+"""Batch (vectorized) execution of single-table scans, filters and projections.
+
+Rows flow through the scan -> filter -> project pipeline as column batches of
+`batch_size` slots instead of one dict at a time. For columnar tables with NumPy
+installed, each batch is a set of typed arrays read straight out of the column vectors,
+WHERE predicates become boolean masks and projections are take operations on the
+surviving positions; only the matching rows are turned into dicts. Without NumPy, or
+for row-store tables, the same operators run over plain Python lists.
+
+Filters take a normalized WHERE expression (see predicates.normalize) or a plain
+{column: value} equality dict.
+"""
+from typing import Any, Dict, Iterator, List, Optional
+from domain.entities.table import Table
+from domain.value_objects.data_type import DataType
+from domain.value_objects.storage_engine import StorageEngine
+from application.execution.predicates import columns_of, from_equalities, value_test
+from infrastructure.parsers.sql_ast import Comparison, In, IsNull, And, Or
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+Row = Dict[str, Any]
+
+ROW_MODE = "row"
+BATCH_MODE = "batch"
+AUTO_MODE = "auto"
+
+DEFAULT_BATCH_SIZE = 4096
+
+_NUMPY_DTYPES = {'q': 'int64', 'd': 'float64'}
+
+_NUMPY_COMPARISONS = {'=': '__eq__', '!=': '__ne__', '<': '__lt__', '<=': '__le__', '>': '__gt__', '>=': '__ge__'}
+
+
+class BatchColumn:
+    """One column of a batch.
+
+    `values` is a NumPy array or a Python list. `nulls` is a boolean mask, or None when
+    NULLs are carried inline as None. For dictionary-encoded strings `values` holds codes,
+    `dictionary` maps codes back to strings and `lookup` maps strings to codes.
+    """
+    __slots__ = ('values', 'nulls', 'dictionary', 'lookup')
+
+    def __init__(self, values, nulls=None, dictionary: Optional[List[str]] = None,
+                 lookup: Optional[Dict[str, int]] = None):
+        self.values = values
+        self.nulls = nulls
+        self.dictionary = dictionary
+        self.lookup = lookup
+
+
+class ColumnBatch:
+    __slots__ = ('columns', 'live', 'length')
+
+    def __init__(self, columns: Dict[str, BatchColumn], live, length: int):
+        self.columns = columns
+        # Mask of slots holding a live row, or None when every position is live
+        self.live = live
+        self.length = length
+
+
+def should_use_batch(table: Table, where: Optional[Dict[str, Any]], mode: str = AUTO_MODE) -> bool:
+    if mode == ROW_MODE:
+        return False
+    if mode == BATCH_MODE:
+        return True
+    # Index lookups already beat any scan, and row-store batches only pay off with NumPy typed data.
+    if where and any(table.is_indexed(col) for col in where):
+        return False
+    return np is not None and table.store.engine == StorageEngine.COLUMNAR
+
+
+def select(table: Table, where, columns: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> List[Row]:
+    """SELECT columns FROM table WHERE where, evaluated batch by batch."""
+    return list(iter_select(table, where, columns, batch_size))
+
+
+def iter_select(table: Table, where, columns: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Row]:
+    """Like select(), but yields the rows, holding one batch in memory at a time."""
+    where = _expression(where)
+    names = [col.name for col in table.columns] if columns == ['*'] else \
+        [c for c in columns if c in table.column_map]
+    needed = list(dict.fromkeys(names + [c for c in columns_of(where) if c in table.column_map]))
+    # Per-leaf results over string dictionaries, shared by every batch of the scan
+    cache: Dict[int, Any] = {}
+    for batch in scan_batches(table, needed, batch_size):
+        mask = filter_batch(batch, where, cache)
+        yield from project_batch(batch, mask, names)
+
+
+def scan_batches(table: Table, names: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[ColumnBatch]:
+    if np is not None and table.store.engine == StorageEngine.COLUMNAR:
+        return _numpy_batches(table.store, names, batch_size)
+    return _python_batches(table, names, batch_size)
+
+
+def filter_batch(batch: ColumnBatch, where, cache: Optional[Dict[int, Any]] = None):
+    """Boolean mask of the batch positions that are live and satisfy `where`."""
+    where = _expression(where)
+    if np is not None and _is_numpy(batch):
+        mask = batch.live.copy()
+        if where is not None:
+            mask &= _numpy_mask(batch, where, {} if cache is None else cache)
+        return mask
+    mask = [True] * batch.length if batch.live is None else list(batch.live)
+    if where is None:
+        return mask
+    return [m and keep for m, keep in zip(mask, _python_mask(batch, where))]
+
+
+def project_batch(batch: ColumnBatch, mask, names: List[str]) -> List[Row]:
+    if np is not None and _is_numpy(batch):
+        positions = np.flatnonzero(mask)
+        if not len(positions):
+            return []
+        values = [_numpy_take(batch.columns[name], positions) for name in names]
+    else:
+        positions = [i for i, keep in enumerate(mask) if keep]
+        values = [[batch.columns[name].values[i] for i in positions] for name in names]
+    rows = [{} for _ in positions]
+    # Column at a time: about twice as fast as dict(zip(names, row)) per row
+    for name, column in zip(names, values):
+        for row, value in zip(rows, column):
+            row[name] = value
+    return rows
+
+
+def _python_batches(table: Table, names: List[str], batch_size: int) -> Iterator[ColumnBatch]:
+    store = table.store
+    if store.engine == StorageEngine.COLUMNAR:
+        # Slice the decoded column vectors rather than materialising every row as a dict.
+        values = {name: store.vectors[name].values() for name in names}
+        live = [store.live.get(i) for i in range(store.slot_count)]
+        for start in range(0, store.slot_count, batch_size):
+            stop = min(start + batch_size, store.slot_count)
+            columns = {name: BatchColumn(column[start:stop]) for name, column in values.items()}
+            yield ColumnBatch(columns, live[start:stop], stop - start)
+        return
+    chunk: List[Row] = []
+    for row in store:
+        chunk.append(row)
+        if len(chunk) == batch_size:
+            yield _transpose(chunk, names)
+            chunk = []
+    if chunk:
+        yield _transpose(chunk, names)
+
+
+def _transpose(rows: List[Row], names: List[str]) -> ColumnBatch:
+    columns = {name: BatchColumn([row.get(name) for row in rows]) for name in names}
+    return ColumnBatch(columns, None, len(rows))
+
+
+def _numpy_batches(store, names: List[str], batch_size: int) -> Iterator[ColumnBatch]:
+    # Batches start on byte boundaries so bitmaps can be unpacked a byte range at a time.
+    batch_size = max(8, batch_size - batch_size % 8)
+    total = store.slot_count
+    for start in range(0, total, batch_size):
+        stop = min(start + batch_size, total)
+        columns = {}
+        for name in names:
+            vector = store.vectors[name]
+            nulls = _unpack_bits(vector.nulls.bits, start, stop)
+            column = vector.column
+            if column.data_type == DataType.BOOLEAN:
+                columns[name] = BatchColumn(_unpack_bits(vector.data.bits, start, stop), nulls)
+            elif column.data_type == DataType.VARCHAR:
+                columns[name] = BatchColumn(_copy_slice(vector.codes, 'uint32', start, stop), nulls,
+                                            vector.dictionary, vector.lookup)
+            else:
+                columns[name] = BatchColumn(_copy_slice(vector.data, _NUMPY_DTYPES[vector.typecode], start, stop), nulls)
+        yield ColumnBatch(columns, _unpack_bits(store.live.bits, start, stop), stop - start)
+
+
+def _copy_slice(data, dtype: str, start: int, stop: int):
+    # Copy out of the array buffer so no NumPy view keeps it pinned (arrays cannot grow while exported).
+    return np.frombuffer(data, dtype=dtype, count=stop - start, offset=start * data.itemsize).copy()
+
+
+def _unpack_bits(bits: bytearray, start: int, stop: int):
+    raw = np.frombuffer(bytes(bits[start >> 3:(stop + 7) >> 3]), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder='little')[:stop - start].astype(bool)
+
+
+def _is_numpy(batch: ColumnBatch) -> bool:
+    return batch.live is not None and not isinstance(batch.live, list)
+
+
+def _expression(where):
+    return from_equalities(where) if isinstance(where, dict) else where
+
+
+def _python_mask(batch: ColumnBatch, expr) -> List[bool]:
+    if isinstance(expr, (And, Or)):
+        masks = [_python_mask(batch, term) for term in expr.terms]
+        combine = all if isinstance(expr, And) else any
+        return [combine(keeps) for keeps in zip(*masks)]
+    column = batch.columns.get(expr.column)
+    test = value_test(expr)
+    if column is None:
+        return [test(None)] * batch.length
+    return [test(v) for v in column.values]
+
+
+def _numpy_mask(batch: ColumnBatch, expr, cache: Dict[int, Any]):
+    if isinstance(expr, (And, Or)):
+        masks = [_numpy_mask(batch, term, cache) for term in expr.terms]
+        return (np.logical_and if isinstance(expr, And) else np.logical_or).reduce(masks)
+    column = batch.columns.get(expr.column)
+    if column is None:
+        return np.full(batch.length, value_test(expr)(None))
+    if isinstance(expr, IsNull):
+        return ~column.nulls if expr.negated else column.nulls.copy()
+    if column.dictionary is not None:
+        allowed = _dictionary_mask(column, expr, cache)
+        if not len(allowed):
+            return np.zeros(batch.length, dtype=bool)
+        return allowed[column.values] & ~column.nulls
+    values = column.values
+    if isinstance(expr, Comparison):
+        if isinstance(expr.value, (int, float)):
+            matched = getattr(values, _NUMPY_COMPARISONS[expr.op])(expr.value)
+        else:
+            # Numbers never equal, and cannot be ordered against, anything else
+            matched = np.full(batch.length, expr.op == '!=')
+    elif isinstance(expr, In):
+        numbers = [v for v in expr.values if isinstance(v, (int, float))]
+        if not expr.negated:
+            matched = np.isin(values, numbers)
+        elif None in expr.values:
+            return np.zeros(batch.length, dtype=bool)
+        else:
+            matched = ~np.isin(values, numbers)
+    else:
+        return np.zeros(batch.length, dtype=bool)
+    return matched & ~column.nulls
+
+
+def _dictionary_mask(column: BatchColumn, leaf, cache: Dict[int, Any]):
+    # Which dictionary codes satisfy the leaf: the leaf is evaluated once per distinct
+    # string, and a string comparison becomes a lookup by integer code.
+    dictionary = column.dictionary
+    allowed = cache.get(id(leaf))
+    if allowed is not None and len(allowed) >= len(dictionary):
+        return allowed
+    if isinstance(leaf, (Comparison, In)) and (leaf.op == '=' if isinstance(leaf, Comparison) else not leaf.negated):
+        allowed = np.zeros(len(dictionary), dtype=bool)
+        for value in ([leaf.value] if isinstance(leaf, Comparison) else leaf.values):
+            code = column.lookup.get(value) if isinstance(value, str) else None
+            if code is not None:
+                allowed[code] = True
+    else:
+        test = value_test(leaf)
+        allowed = np.fromiter((test(s) for s in dictionary), dtype=bool, count=len(dictionary))
+    cache[id(leaf)] = allowed
+    return allowed
+
+
+def _numpy_take(column: BatchColumn, positions) -> List[Any]:
+    values = column.values[positions]
+    if column.dictionary is not None:
+        dictionary = column.dictionary
+        values = [dictionary[c] for c in values.tolist()]
+    else:
+        values = values.tolist()
+    nulls = column.nulls[positions]
+    if nulls.any():
+        for i in np.flatnonzero(nulls).tolist():
+            values[i] = None
+    return values
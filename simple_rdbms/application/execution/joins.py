@@ -0,0 +1,248 @@
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from domain.entities.table import Table
+
+Row = Dict[str, Any]
+
+HASH_JOIN = "hash"
+SORT_MERGE_JOIN = "sort_merge"
+INDEX_NESTED_LOOP_JOIN = "index_nested_loop"
+
+
+def merge_rows(left: Row, right: Row, right_table: str) -> Row:
+    # Merge rows carefully to preserve both tables' fields.
+    merged = dict(left)
+    for k, v in right.items():
+        if k in merged:
+            # avoid clobbering keys from the left table
+            merged[f"{right_table}_{k}"] = v
+        else:
+            merged[k] = v
+    return merged
+
+
+def matches(row: Row, where) -> bool:
+    """Whether a row passes a {column: value} equality filter or a row predicate."""
+    if not where:
+        return True
+    if callable(where):
+        return where(row)
+    return all(row.get(k) == v for k, v in where.items())
+
+
+def primary_key_name(table: Table) -> Optional[str]:
+    return next((col.name for col in table.columns if col.primary_key), None)
+
+
+def is_sorted_on(rows: List[Row], key: str) -> bool:
+    # NULL keys or mixed types cannot take part in a merge, so treat them as unsorted.
+    prev = None
+    try:
+        for row in rows:
+            value = row.get(key)
+            if value is None:
+                return False
+            if prev is not None and value < prev:
+                return False
+            prev = value
+    except TypeError:
+        return False
+    return True
+
+
+def hash_join(left_rows: List[Row], right_rows: List[Row], left_key: str, right_key: str,
+              right_table: str, build: Optional[str] = None) -> List[Row]:
+    # Build on `build` ('left' or 'right'), by default the smaller input
+    if build is None:
+        build = 'right' if len(right_rows) <= len(left_rows) else 'left'
+    return list(iter_hash_join(left_rows, right_rows, left_key, right_key, right_table, build))
+
+
+def iter_hash_join(left_rows: Iterable[Row], right_rows: Iterable[Row], left_key: str, right_key: str,
+                   right_table: str, build: str = 'right') -> Iterator[Row]:
+    """Load the `build` input into a hash table and stream the other one past it. NULL keys never match."""
+    if build == 'right':
+        buckets = _build(right_rows, right_key)
+        for l in left_rows:
+            key = l.get(left_key)
+            if key is None:
+                continue
+            for r in buckets.get(key, ()):
+                yield merge_rows(l, r, right_table)
+    else:
+        buckets = _build(left_rows, left_key)
+        for r in right_rows:
+            key = r.get(right_key)
+            if key is None:
+                continue
+            for l in buckets.get(key, ()):
+                yield merge_rows(l, r, right_table)
+
+
+def sort_merge_join(left_rows: List[Row], right_rows: List[Row], left_key: str, right_key: str,
+                    right_table: str) -> List[Row]:
+    return list(iter_sort_merge_join(left_rows, right_rows, left_key, right_key, right_table))
+
+
+def iter_sort_merge_join(left_rows: Iterable[Row], right_rows: Iterable[Row], left_key: str, right_key: str,
+                         right_table: str) -> Iterator[Row]:
+    # Both inputs are collected (and sorted unless they already are); the output is streamed.
+    left = [r for r in left_rows if r.get(left_key) is not None]
+    right = [r for r in right_rows if r.get(right_key) is not None]
+    if not is_sorted_on(left, left_key):
+        left.sort(key=lambda r: r[left_key])
+    if not is_sorted_on(right, right_key):
+        right.sort(key=lambda r: r[right_key])
+
+    i, j = 0, 0
+    n_left, n_right = len(left), len(right)
+    while i < n_left and j < n_right:
+        lk = left[i][left_key]
+        rk = right[j][right_key]
+        if lk < rk:
+            i += 1
+        elif lk > rk:
+            j += 1
+        else:
+            # Emit the cross product of the two runs sharing this key.
+            run_end = j
+            while run_end < n_right and right[run_end][right_key] == lk:
+                run_end += 1
+            while i < n_left and left[i][left_key] == lk:
+                for r in right[j:run_end]:
+                    yield merge_rows(left[i], r, right_table)
+                i += 1
+            j = run_end
+
+
+def index_nested_loop_join(outer_rows: List[Row], outer_key: str, inner: Table, inner_key: str,
+                           inner_where, outer_is_left: bool,
+                           right_table: str) -> List[Row]:
+    return list(iter_index_nested_loop_join(outer_rows, outer_key, inner, inner_key, inner_where, outer_is_left,
+                                            right_table))
+
+
+def iter_index_nested_loop_join(outer_rows: Iterable[Row], outer_key: str, inner: Table, inner_key: str,
+                                inner_where, outer_is_left: bool, right_table: str) -> Iterator[Row]:
+    # The inner side is probed through an index on its join key, one lookup per outer row.
+    probe = _index_probe(inner, inner_key)
+    for o in outer_rows:
+        key = o.get(outer_key)
+        if key is None:
+            continue
+        for match in probe(key):
+            if not matches(match, inner_where):
+                continue
+            if outer_is_left:
+                yield merge_rows(o, match, right_table)
+            else:
+                yield merge_rows(match, o, right_table)
+
+
+def choose_join_strategy(left: Table, right: Table, left_rows: List[Row], right_rows: List[Row],
+                         left_key: str, right_key: str) -> Tuple[str, Optional[str]]:
+    """Pick the join algorithm. Returns (strategy, indexed side) where the side is 'left' or 'right'."""
+    candidates = []
+    if right.is_indexed(right_key):
+        candidates.append((len(left_rows), 'right'))
+    if left.is_indexed(left_key):
+        candidates.append((len(right_rows), 'left'))
+    if candidates:
+        return INDEX_NESTED_LOOP_JOIN, min(candidates)[1]
+    if is_sorted_on(left_rows, left_key) and is_sorted_on(right_rows, right_key):
+        return SORT_MERGE_JOIN, None
+    return HASH_JOIN, None
+
+
+def join_tables(left: Table, right: Table, left_key: str, right_key: str,
+                left_where: Optional[Dict[str, Any]] = None,
+                right_where: Optional[Dict[str, Any]] = None,
+                strategy: Optional[str] = None) -> List[Row]:
+    left_rows = left.select_rows(left_where)
+    right_rows = right.select_rows(right_where)
+    indexed_side = None
+    if strategy is None:
+        strategy, indexed_side = choose_join_strategy(left, right, left_rows, right_rows, left_key, right_key)
+    elif strategy == INDEX_NESTED_LOOP_JOIN:
+        indexed_side = 'right' if right.is_indexed(right_key) else 'left'
+
+    if strategy == INDEX_NESTED_LOOP_JOIN:
+        if indexed_side == 'right':
+            return index_nested_loop_join(left_rows, left_key, right, right_key, right_where, True, right.name)
+        return index_nested_loop_join(right_rows, right_key, left, left_key, left_where, False, right.name)
+    if strategy == SORT_MERGE_JOIN:
+        return sort_merge_join(left_rows, right_rows, left_key, right_key, right.name)
+
+    # A unique index on either key lets us drop probe rows that cannot match before building.
+    if right_key in right.unique_indexes:
+        values = right.unique_indexes[right_key]
+        left_rows = [r for r in left_rows if r.get(left_key) in values]
+    if left_key in left.unique_indexes:
+        values = left.unique_indexes[left_key]
+        right_rows = [r for r in right_rows if r.get(right_key) in values]
+    return hash_join(left_rows, right_rows, left_key, right_key, right.name)
+
+
+def resolve_join_keys(left: Table, right: Table, left_col: str, right_col: str) -> Tuple[str, str]:
+    """Strip table prefixes from the ON columns, accepting them in either order."""
+    if '.' in left_col and left_col.split('.', 1)[0] == right.name:
+        left_col, right_col = right_col, left_col
+    left_key = left_col.split('.', 1)[1] if '.' in left_col else left_col
+    right_key = right_col.split('.', 1)[1] if '.' in right_col else right_col
+    return left_key, right_key
+
+
+def split_where(where: Optional[Dict[str, Any]], left: Table, right: Table):
+    """Split a post-join WHERE into predicates that only touch one input.
+
+    Returns (left_where, right_where, residual). Keys are resolved the same way merge_rows
+    names the joined columns, so pushing them below the join does not change the result.
+    """
+    left_where, right_where, residual = {}, {}, {}
+    for key, value in (where or {}).items():
+        side, col = resolve_column(key, left, right)
+        if side == 'left':
+            left_where[col] = value
+        elif side == 'right':
+            right_where[col] = value
+        else:
+            residual[key] = value
+    return left_where or None, right_where or None, residual or None
+
+
+def resolve_column(key: str, left: Table, right: Table) -> Tuple[Optional[str], str]:
+    """The join input ('left', 'right' or None) a column of the joined rows comes from, and its name there."""
+    if '.' in key:
+        table_name, col = key.split('.', 1)
+        if table_name == left.name and col in left.column_map:
+            return 'left', col
+        if table_name == right.name and col in right.column_map:
+            return 'right', col
+        return None, key
+    if key in left.column_map:
+        return 'left', key
+    if key in right.column_map:
+        return 'right', key
+    prefix = f"{right.name}_"
+    if key.startswith(prefix):
+        col = key[len(prefix):]
+        if col in right.column_map and col in left.column_map:
+            return 'right', col
+    return None, key
+
+
+def _index_probe(table: Table, column: str):
+    if primary_key_name(table) == column:
+        def probe(value):
+            row = table.get_row_by_pk(value)
+            return () if row is None else (row,)
+        return probe
+    return lambda value: table.select_rows({column: value})
+
+
+def _build(rows: Iterable[Row], key: str) -> Dict[Any, List[Row]]:
+    buckets: Dict[Any, List[Row]] = {}
+    for row in rows:
+        value = row.get(key)
+        if value is not None:
+            buckets.setdefault(value, []).append(row)
+    return buckets
@@ -0,0 +1,1003 @@
+"""Cost-based planning of SELECT statements.
+
+A query is first turned into a logical plan: the tables it reads, each with the WHERE
+predicates pushed down onto it and the columns it has to produce (projection pruning),
+the join between them and whatever predicates are left over. The planner then picks a
+physical operator for every step by estimated cost: an index scan or a full scan for
+each table, and for a join the algorithm and which input drives it.
+
+WHERE predicates are normalized and compiled once per plan (see predicates.py). Equality,
+IN and IS NULL conjuncts can be answered by any index on their column, and ranges
+(<, <=, >, >=, BETWEEN) by a BTREE index.
+
+Above the scans and the join come, in order, hash aggregation (GROUP BY and aggregates),
+ORDER BY, LIMIT/OFFSET and the final projection. ORDER BY with a LIMIT keeps only the
+first OFFSET + LIMIT rows in a bounded heap, and a full sort that outgrows its memory
+budget spills to an external merge sort. COUNT(*) of a whole table is read from its
+row count without a scan.
+
+Estimates come from live row counts plus the per-column statistics ANALYZE stores on
+each table (distinct counts, most common values, histograms). Tables that were never
+analyzed fall back to fixed default selectivities.
+
+Plans are pulled, not pushed: every operator yields its rows as its parent asks for them,
+so a scan, filter, join probe or projection holds one row at a time and a LIMIT stops
+the scan under it early. Only hash join build sides, merge join inputs, aggregation
+and sorting have to see all of their input before producing output.
+
+Costs are in units of one row read by a sequential scan.
+"""
+import itertools
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from domain.entities.row_store import RowStore
+from domain.entities.table import Table
+from domain.value_objects.storage_engine import StorageEngine
+from application.execution import batch
+from application.execution.joins import (
+    iter_hash_join, iter_sort_merge_join, iter_index_nested_loop_join, resolve_column,
+)
+from application.execution.aggregation import Groups, NUMERIC_FUNCTIONS, aggregate_name, finalize, hash_aggregate
+from application.execution.sorting import DEFAULT_SORT_MEMORY, SortKeys, SortStats, sort_rows, top_k
+from application.execution.predicates import (
+    normalize, compile_predicate, value_test, conjuncts, conjunction, columns_of, rename_columns, expression_text,
+)
+from domain.value_objects.data_type import DataType
+from infrastructure.parsers.sql_ast import Aggregate, Comparison, In, Like, IsNull, And, Or
+
+Row = Dict[str, Any]
+
+SEQ_ROW_COST = 1.0
+# NumPy batch scans of columnar tables
+VECTOR_ROW_COST = 0.1
+INDEX_PROBE_COST = 3.0
+INDEX_ROW_COST = 2.0
+HASH_BUILD_ROW_COST = 1.5
+HASH_PROBE_ROW_COST = 1.0
+SORT_ROW_COST = 0.2
+MERGE_ROW_COST = 0.5
+OUTPUT_ROW_COST = 0.5
+AGGREGATE_ROW_COST = 1.0
+# Rows a Gather is estimated to return; the places rows are gathered from keep no statistics
+GATHER_ROWS = 1000
+
+# Rows a scan reads between checks for cancellation
+CANCEL_CHECK_ROWS = 1024
+
+# Used for columns ANALYZE has not seen
+DEFAULT_DISTINCT = 200
+DEFAULT_RANGE_SELECTIVITY = 1 / 3
+DEFAULT_SELECTIVITY = {'IsNull': 0.01, 'Like': 0.1, 'In': 0.05}
+
+
+class QueryCancelled(ValueError):
+    """A running query was cancelled, e.g. because its client gave up waiting."""
+
+
+class PlanNode:
+    """A physical operator. iterate() yields its rows lazily; run() collects them."""
+    label = ''
+
+    def __init__(self, children: List['PlanNode'], rows: float, cost: float):
+        self.children = children
+        # Estimated output rows and total cost, including the children's
+        self.rows = rows
+        self.cost = cost
+        # Set by instrument() for EXPLAIN ANALYZE
+        self.instrumented = False
+        # Set by cancel_on()
+        self.cancel_event: Optional[threading.Event] = None
+        # Filled in while an instrumented node is iterated
+        self.actual_rows: Optional[int] = None
+        self.elapsed: Optional[float] = None
+
+    def run(self) -> List[Row]:
+        return list(self.iterate())
+
+    def iterate(self) -> Iterator[Row]:
+        rows = self.stream()
+        if self.cancel_event is not None and not self.children:
+            # Checking the scans is enough: every other operator is driven by them
+            rows = _cancellable(rows, self.cancel_event)
+        if self.instrumented:
+            rows = self._measured(rows)
+        return rows
+
+    def stream(self) -> Iterator[Row]:
+        raise NotImplementedError
+
+    def instrument(self):
+        """Count the rows of this node and its children and time them, at some cost per row."""
+        self.instrumented = True
+        for child in self.children:
+            child.instrument()
+
+    def cancel_on(self, event: threading.Event):
+        """Make the plan fail with QueryCancelled soon after `event` is set."""
+        self.cancel_event = event
+        for child in self.children:
+            child.cancel_on(event)
+
+    def _measured(self, rows: Iterator[Row]) -> Iterator[Row]:
+        # Time spent inside this node's next(), which includes the time its children take
+        self.actual_rows, self.elapsed = 0, 0.0
+        clock = time.perf_counter
+        while True:
+            start = clock()
+            try:
+                row = next(rows)
+            except StopIteration:
+                self.elapsed += clock() - start
+                return
+            self.elapsed += clock() - start
+            self.actual_rows += 1
+            yield row
+
+    def describe(self) -> str:
+        return self.label
+
+
+class SeqScan(PlanNode):
+    label = 'Seq Scan'
+
+    def __init__(self, table: Table, where, columns: Optional[List[str]], rows: float, cost: float):
+        super().__init__([], rows, cost)
+        self.table = table
+        # Normalized WHERE expression for this table alone
+        self.where = where
+        self.predicate = compile_predicate(where)
+        # Columns to keep, or None for every column
+        self.columns = columns
+        # Rows the scan reads, set when it starts; see scan_counts
+        self.rows_scanned = 0
+
+    def stream(self) -> Iterator[Row]:
+        store = self.table.store
+        self.rows_scanned = len(store)
+        if isinstance(store, RowStore):
+            # Filters the stored tuples, so only matching rows become dicts
+            return store.scan(compile_predicate(self.where, store.positions), self.columns)
+        predicate = self.predicate
+        if predicate is None:
+            return _prune(iter(store), self.columns)
+        return _prune((row for row in store if predicate(row)), self.columns)
+
+    def row_ids(self) -> List[int]:
+        store = self.table.store
+        if isinstance(store, RowStore):
+            return store.matching_ids(compile_predicate(self.where, store.positions))
+        predicate = self.predicate
+        return [row_id for row_id, row in store.items() if predicate is None or predicate(row)]
+
+    def describe(self) -> str:
+        return f"{self.label} on {self.table.name}{_filter_text(self.where)}"
+
+
+class BatchScan(SeqScan):
+    label = 'Batch Scan'
+
+    def __init__(self, table: Table, where, columns: Optional[List[str]], rows: float, cost: float,
+                 batch_size: int):
+        super().__init__(table, where, columns, rows, cost)
+        self.batch_size = batch_size
+
+    def stream(self) -> Iterator[Row]:
+        self.rows_scanned = len(self.table.store)
+        return batch.iter_select(self.table, self.where, ['*'] if self.columns is None else self.columns,
+                                 self.batch_size)
+
+
+class IndexScan(SeqScan):
+    label = 'Index Scan'
+
+    def __init__(self, table: Table, access: 'IndexAccess', where, columns: Optional[List[str]], rows: float,
+                 cost: float):
+        super().__init__(table, where, columns, rows, cost)
+        self.access = access
+
+    def stream(self) -> Iterator[Row]:
+        store, predicate = self.table.store, self.predicate
+        row_ids = sorted(self.access.row_ids(self.table))
+        self.rows_scanned = len(row_ids)
+        if isinstance(store, RowStore):
+            return store.fetch(row_ids, compile_predicate(self.where, store.positions), self.columns)
+        rows = (store.get(row_id) for row_id in row_ids)
+        return _prune((row for row in rows if predicate(row)), self.columns)
+
+    def row_ids(self) -> List[int]:
+        store = self.table.store
+        row_ids = sorted(self.access.row_ids(self.table))
+        if isinstance(store, RowStore):
+            predicate = compile_predicate(self.where, store.positions)
+            if predicate is None:
+                return row_ids
+            slots = store.slots
+            return [row_id for row_id in row_ids if predicate(slots[row_id].values)]
+        predicate = self.predicate
+        return [row_id for row_id in row_ids if predicate(store.get(row_id))]
+
+    def describe(self) -> str:
+        return f"{self.label} on {self.table.name} using {self.access.describe()}{_filter_text(self.where)}"
+
+
+class IndexAccess:
+    """The index lookups of an index scan: equality on one or more values, or a range."""
+
+    def __init__(self, column: str, values: Optional[List[Any]] = None, low=None, high=None,
+                 low_inclusive: bool = True, high_inclusive: bool = True):
+        self.column = column
+        # Values to look up one by one, or None for a range
+        self.values = values
+        self.low, self.high = low, high
+        self.low_inclusive, self.high_inclusive = low_inclusive, high_inclusive
+
+    def row_ids(self, table: Table):
+        if self.values is None:
+            return table.index_range(self.column, self.low, self.high, self.low_inclusive, self.high_inclusive)
+        if len(self.values) == 1:
+            return table.index_lookup(self.column, self.values[0])
+        row_ids = set()
+        for value in self.values:
+            row_ids.update(table.index_lookup(self.column, value))
+        return row_ids
+
+    @property
+    def lookups(self) -> int:
+        return 1 if self.values is None else len(self.values)
+
+    def describe(self) -> str:
+        if self.values is not None:
+            return self.column
+        low = '' if self.low is None else f"{self.low!r} {'<=' if self.low_inclusive else '<'} "
+        high = '' if self.high is None else f" {'<=' if self.high_inclusive else '<'} {self.high!r}"
+        return f"{low}{self.column}{high}"
+
+
+class UnionAccess:
+    """The index lookups of an OR whose branches each have an index: the union of their row ids."""
+
+    def __init__(self, accesses: List[IndexAccess]):
+        self.accesses = accesses
+
+    def row_ids(self, table: Table):
+        row_ids = set()
+        for access in self.accesses:
+            row_ids.update(access.row_ids(table))
+        return row_ids
+
+    @property
+    def lookups(self) -> int:
+        return sum(access.lookups for access in self.accesses)
+
+    def describe(self) -> str:
+        return ' OR '.join(access.describe() for access in self.accesses)
+
+
+class Filter(PlanNode):
+    label = 'Filter'
+
+    def __init__(self, child: PlanNode, where, rows: float, cost: float):
+        super().__init__([child], rows, cost)
+        self.where = where
+        self.predicate = compile_predicate(where)
+
+    def stream(self) -> Iterator[Row]:
+        predicate = self.predicate
+        return (r for r in self.children[0].iterate() if predicate(r))
+
+    def describe(self) -> str:
+        return f"{self.label}{_filter_text(self.where)}"
+
+
+class Project(PlanNode):
+    label = 'Project'
+
+    def __init__(self, child: PlanNode, columns: List[str]):
+        super().__init__([child], child.rows, child.cost + child.rows * OUTPUT_ROW_COST)
+        self.columns = columns
+
+    def stream(self) -> Iterator[Row]:
+        return _prune(self.children[0].iterate(), self.columns)
+
+    def describe(self) -> str:
+        return f"{self.label} {', '.join(self.columns)}"
+
+
+class HashJoin(PlanNode):
+    label = 'Hash Join'
+
+    def __init__(self, left: PlanNode, right: PlanNode, left_key: str, right_key: str, right_table: Table,
+                 build: str, rows: float, cost: float):
+        super().__init__([left, right], rows, cost)
+        self.left_key = left_key
+        self.right_key = right_key
+        self.right_table = right_table
+        # 'left' or 'right': the input loaded into the hash table
+        self.build = build
+
+    def stream(self) -> Iterator[Row]:
+        left, right = self.children
+        return iter_hash_join(left.iterate(), right.iterate(), self.left_key, self.right_key, self.right_table.name,
+                              self.build)
+
+    def describe(self) -> str:
+        left, right = self.children
+        build = (left if self.build == 'left' else right).table.name
+        return f"{self.label} ({left.table.name}.{self.left_key} = {right.table.name}.{self.right_key}), build {build}"
+
+
+class MergeJoin(HashJoin):
+    label = 'Merge Join'
+
+    def stream(self) -> Iterator[Row]:
+        left, right = self.children
+        return iter_sort_merge_join(left.iterate(), right.iterate(), self.left_key, self.right_key,
+                                    self.right_table.name)
+
+    def describe(self) -> str:
+        left, right = self.children
+        return f"{self.label} ({left.table.name}.{self.left_key} = {right.table.name}.{self.right_key})"
+
+
+class IndexNestedLoopJoin(PlanNode):
+    """Reads the outer input and probes the inner table's index on its join key once per row."""
+    label = 'Nested Loop'
+
+    def __init__(self, outer: PlanNode, outer_key: str, inner: Table, inner_key: str, inner_where,
+                 outer_is_left: bool, right_table: Table, rows: float, cost: float):
+        super().__init__([outer], rows, cost)
+        self.outer_key = outer_key
+        self.inner = inner
+        self.inner_key = inner_key
+        self.inner_where = inner_where
+        self.outer_is_left = outer_is_left
+        self.right_table = right_table
+
+    def stream(self) -> Iterator[Row]:
+        return iter_index_nested_loop_join(self.children[0].iterate(), self.outer_key, self.inner, self.inner_key,
+                                           compile_predicate(self.inner_where), self.outer_is_left,
+                                           self.right_table.name)
+
+    def describe(self) -> str:
+        outer = self.children[0].table.name
+        return (f"{self.label} ({outer}.{self.outer_key} = {self.inner.name}.{self.inner_key}), "
+                f"index lookup on {self.inner.name}.{self.inner_key}{_filter_text(self.inner_where)}")
+
+
+class HashAggregate(PlanNode):
+    label = 'Hash Aggregate'
+
+    def __init__(self, child: PlanNode, group_by: List[str], aggregates: List[Aggregate], rows: float):
+        super().__init__([child], rows, child.cost + child.rows * AGGREGATE_ROW_COST)
+        self.group_by = group_by
+        self.aggregates = aggregates
+
+    def stream(self) -> Iterator[Row]:
+        return iter(hash_aggregate(self.children[0].iterate(), self.group_by, self.aggregates))
+
+    def describe(self) -> str:
+        text = ', '.join(aggregate_name(a) for a in self.aggregates)
+        if not self.group_by:
+            return f"Aggregate {text}"
+        return f"{self.label} (group by {', '.join(self.group_by)}) {text}"
+
+
+class MetadataCount(PlanNode):
+    """COUNT(*) of a whole table, read from the live row count."""
+    label = 'Count from metadata'
+
+    def __init__(self, table: Table, aggregates: List[Aggregate]):
+        super().__init__([], 1, INDEX_PROBE_COST)
+        self.table = table
+        self.aggregates = aggregates
+
+    def stream(self) -> Iterator[Row]:
+        count = len(self.table.store)
+        return iter([{aggregate_name(a): count for a in self.aggregates}])
+
+    def describe(self) -> str:
+        return f"{self.label} on {self.table.name}"
+
+
+class Sort(PlanNode):
+    label = 'Sort'
+
+    def __init__(self, child: PlanNode, keys: SortKeys, memory: int):
+        rows = child.rows
+        super().__init__([child], rows, child.cost + rows * math.log2(max(rows, 2.0)) * SORT_ROW_COST)
+        self.keys = keys
+        self.memory = memory
+        self.stats = SortStats()
+
+    def stream(self) -> Iterator[Row]:
+        self.stats = SortStats()
+        return sort_rows(self.children[0].iterate(), self.keys, self.memory, stats=self.stats)
+
+    def describe(self) -> str:
+        text = f"{self.label} ({_keys_text(self.keys)})"
+        if self.actual_rows is None:
+            return text
+        if self.stats.runs:
+            return f"{text}, {self.stats.method} of {self.stats.runs} runs"
+        return f"{text}, {self.stats.method}"
+
+
+class TopN(PlanNode):
+    """ORDER BY ... LIMIT: keeps the first `count` rows in a bounded heap instead of sorting everything."""
+    label = 'Top-N Sort'
+
+    def __init__(self, child: PlanNode, keys: SortKeys, count: int):
+        rows = min(child.rows, count)
+        super().__init__([child], rows, child.cost + child.rows * math.log2(max(count, 2)) * SORT_ROW_COST)
+        self.keys = keys
+        self.count = count
+
+    def stream(self) -> Iterator[Row]:
+        return iter(top_k(self.children[0].iterate(), self.keys, self.count))
+
+    def describe(self) -> str:
+        return f"{self.label} ({_keys_text(self.keys)}), keep {self.count}"
+
+
+class Limit(PlanNode):
+    label = 'Limit'
+
+    def __init__(self, child: PlanNode, limit: Optional[int], offset: int):
+        rows = max(child.rows - offset, 0.0)
+        if limit is not None:
+            rows = min(rows, limit)
+        super().__init__([child], rows, child.cost)
+        self.limit = limit
+        self.offset = offset
+
+    def stream(self) -> Iterator[Row]:
+        # Stops pulling from the child once it has enough rows
+        stop = None if self.limit is None else self.offset + self.limit
+        return itertools.islice(self.children[0].iterate(), self.offset, stop)
+
+    def describe(self) -> str:
+        text = self.label if self.limit is None else f"{self.label} {self.limit}"
+        return f"{text} offset {self.offset}" if self.offset else text
+
+
+class Gather(PlanNode):
+    """Rows computed elsewhere, e.g. by the partitions of a partitioned table, and collected here."""
+    label = 'Gather'
+
+    def __init__(self, fetch: Callable[[], Iterable[Row]], description: str, rows: float, cost: float):
+        super().__init__([], rows, cost)
+        self.fetch = fetch
+        self.description = description
+
+    def stream(self) -> Iterator[Row]:
+        return iter(self.fetch())
+
+    def describe(self) -> str:
+        return f"{self.label} {self.description}"
+
+
+class _Input:
+    """One table read by a query, after predicate pushdown and projection pruning."""
+
+    def __init__(self, table: Table, where, columns: Optional[List[str]]):
+        self.table = table
+        # Normalized expression over this table's own column names
+        self.where = where
+        # None when every column is needed
+        self.columns = columns
+
+
+def plan_select(query, left: Table, right: Optional[Table], left_key: Optional[str] = None,
+                right_key: Optional[str] = None, execution_mode: str = batch.AUTO_MODE,
+                batch_size: int = batch.DEFAULT_BATCH_SIZE, sort_memory: int = DEFAULT_SORT_MEMORY) -> PlanNode:
+    """Plan a SELECT over `left`, or over `left` joined to `right` on left_key = right_key."""
+    output = _Output(query, left, right)
+    where = normalize(query.where)
+    if right is None:
+        if output.counts_rows(left, where):
+            plan: PlanNode = MetadataCount(left, output.aggregates)
+        else:
+            scanned = output.needed
+            if scanned is not None:
+                scanned = [c for c in scanned if c in left.column_map]
+            plan = _access_path(_Input(left, where, scanned), execution_mode, batch_size)
+    else:
+        left_where, right_where, residual = _split_where(where, left, right)
+        left_columns, right_columns = _needed_columns(output.needed, left, right, left_key, right_key, residual)
+        left_input = _Input(left, left_where, left_columns)
+        right_input = _Input(right, right_where, right_columns)
+        plan = _join(left_input, right_input, left_key, right_key, execution_mode, batch_size)
+        if residual is not None:
+            rows = plan.rows * _selectivity(None, residual)
+            plan = Filter(plan, residual, rows, plan.cost + plan.rows * SEQ_ROW_COST)
+
+    if output.grouped and not isinstance(plan, MetadataCount):
+        plan = HashAggregate(plan, output.group_by, output.aggregates,
+                             _group_count(plan.rows, output.group_by, left, right))
+    return _finish(plan, query, output, left, right, sort_memory)
+
+
+def plan_gathered(query, left: Table, right: Optional[Table], rows: Callable[..., Iterable[Row]],
+                  groups: Callable[..., Groups], description: str,
+                  sort_memory: int = DEFAULT_SORT_MEMORY) -> PlanNode:
+    """Plan a SELECT whose scans, join and WHERE run elsewhere, e.g. in the partitions of a table.
+
+    `rows(columns, limit)` returns the matching rows, with `columns` or with every column
+    when that is None; with a `limit`, each source returns at most that many rows, its
+    first ones in the query's ORDER BY. `groups(columns, group_by, aggregates)` returns
+    the partial aggregates of the matching rows instead. Merging them, ORDER BY, LIMIT
+    and the final projection are planned here as for any other query.
+    """
+    output = _Output(query, left, right)
+    columns = None
+    if right is None and output.needed:
+        columns = [c for c in output.needed if c in left.column_map] or None
+    if output.grouped:
+        group_by, aggregates = output.group_by, output.aggregates
+        plan: PlanNode = Gather(lambda: finalize(groups(columns, group_by, aggregates), group_by, aggregates),
+                                f"partial aggregates {description}", GATHER_ROWS, GATHER_ROWS * SEQ_ROW_COST)
+    else:
+        limit, offset = _row_count(query.limit, 'LIMIT'), _row_count(query.offset, 'OFFSET') or 0
+        count = None if limit is None else offset + limit
+        plan = Gather(lambda: rows(columns, count), f"rows {description}", GATHER_ROWS, GATHER_ROWS * SEQ_ROW_COST)
+    return _finish(plan, query, output, left, right, sort_memory)
+
+
+def pushed_down(query, left: Table, right: Table) -> Tuple[Any, Any]:
+    """The conjuncts of a joined query's WHERE that the left and the right table can each apply by themselves."""
+    left_where, right_where, _ = _split_where(normalize(query.where), left, right)
+    return left_where, right_where
+
+
+def _finish(plan: PlanNode, query, output: '_Output', left: Table, right: Optional[Table],
+            sort_memory: int) -> PlanNode:
+    # ORDER BY, LIMIT/OFFSET and the final projection over a plan's rows
+    limit, offset = _row_count(query.limit, 'LIMIT'), _row_count(query.offset, 'OFFSET') or 0
+    if output.order and limit is not None:
+        plan = TopN(plan, output.order, offset + limit)
+    elif output.order:
+        plan = Sort(plan, output.order, sort_memory)
+    if limit is not None or offset:
+        plan = Limit(plan, limit, offset)
+    columns = output.columns
+    if columns is not None and columns != output.produced(left, right):
+        plan = Project(plan, columns)
+    return plan
+
+
+class _Output:
+    """The select list, GROUP BY and ORDER BY of a query, in the names of the rows they apply to.
+
+    In a join those are the names merge_rows gives the joined columns; aggregates keep
+    the name the query wrote them with.
+    """
+
+    def __init__(self, query, left: Table, right: Optional[Table]):
+        if right is None:
+            def name(column: str) -> str:
+                return column
+        else:
+            def name(column: str) -> str:
+                return _joined_name(column, left, right)
+        self.group_by = [name(c) for c in query.group_by]
+        # Aggregates to compute, over renamed columns and aliased with their output names
+        self.aggregates: List[Aggregate] = []
+        self.columns: Optional[List[str]] = None
+        if query.columns != ['*']:
+            self.columns = [self._aggregate(c, name) if isinstance(c, Aggregate) else name(c)
+                            for c in query.columns]
+        aliases = {a.alias for a in self.aggregates}
+        self.order: SortKeys = []
+        for item in query.order_by:
+            column = item.column
+            if isinstance(column, Aggregate):
+                column = self._aggregate(column, name)
+            elif column not in aliases:
+                column = name(column)
+            self.order.append((column, item.descending))
+        self.grouped = bool(self.aggregates or self.group_by)
+        if self.grouped:
+            self._check(left, right)
+
+    def _aggregate(self, aggregate: Aggregate, name) -> str:
+        output = aggregate_name(aggregate)
+        column = None if aggregate.column is None else name(aggregate.column)
+        renamed = Aggregate(aggregate.function, column, output)
+        if renamed not in self.aggregates:
+            self.aggregates.append(renamed)
+        return output
+
+    def _check(self, left: Table, right: Optional[Table]):
+        if self.columns is None:
+            raise ValueError("SELECT * cannot be combined with GROUP BY or aggregates")
+        available = set(self.group_by) | {a.alias for a in self.aggregates}
+        for column in self.columns + [column for column, _ in self.order]:
+            if column not in available:
+                raise ValueError(f"Column {column} must appear in GROUP BY or be used in an aggregate")
+        for column in self.group_by:
+            _column_of(column, left, right)
+        for aggregate in self.aggregates:
+            if aggregate.column is None:
+                continue
+            col = _column_of(aggregate.column, left, right)
+            if aggregate.function in NUMERIC_FUNCTIONS and col.data_type not in (DataType.INTEGER, DataType.FLOAT):
+                raise ValueError(f"{aggregate.function} needs a numeric column, {aggregate.column} is "
+                                 f"{col.data_type.value}")
+
+    @property
+    def needed(self) -> Optional[List[str]]:
+        """Columns the rows under aggregation, sorting and projection must have, or None for all."""
+        if self.grouped:
+            names = self.group_by + [a.column for a in self.aggregates if a.column is not None]
+        elif self.columns is None:
+            return None
+        else:
+            names = self.columns + [column for column, _ in self.order]
+        return list(dict.fromkeys(names))
+
+    def produced(self, left: Table, right: Optional[Table]) -> Optional[List[str]]:
+        # The columns of the rows under the final projection; None when they are whole joined rows
+        if self.grouped:
+            return self.group_by + [a.alias for a in self.aggregates]
+        if right is not None:
+            return None
+        return [c for c in self.needed if c in left.column_map]
+
+    def counts_rows(self, table: Table, where) -> bool:
+        """Whether the query is COUNT(*)s of a whole table, which its row count answers."""
+        if where is not None or self.group_by or not self.aggregates:
+            return False
+        for aggregate in self.aggregates:
+            if aggregate.function != 'COUNT':
+                return False
+            col = table.column_map.get(aggregate.column) if aggregate.column else None
+            if aggregate.column is not None and (col is None or col.nullable and not col.primary_key):
+                return False
+        return True
+
+
+def matching_row_ids(table: Table, where) -> List[int]:
+    """Ids of the rows matching a WHERE expression, found by the cheapest row-at-a-time access path."""
+    scan = _access_path(_Input(table, normalize(where), None), batch.ROW_MODE, batch.DEFAULT_BATCH_SIZE)
+    return scan.row_ids()
+
+
+def scan_counts(plan: PlanNode) -> Tuple[int, int, int]:
+    """Index scans, full scans and rows scanned of a plan that has run.
+
+    A full scan counts every row of its table, and an index scan the rows its lookups
+    found; index nested loop joins count as one index scan each.
+    """
+    index_scans = full_scans = rows_scanned = 0
+    nodes = [plan]
+    while nodes:
+        node = nodes.pop()
+        nodes.extend(node.children)
+        if isinstance(node, (IndexScan, IndexNestedLoopJoin)):
+            index_scans += 1
+        elif isinstance(node, SeqScan):
+            full_scans += 1
+        if isinstance(node, SeqScan):
+            rows_scanned += node.rows_scanned
+    return index_scans, full_scans, rows_scanned
+
+
+def explain(plan: PlanNode, analyze: bool = False, planning_time: float = 0.0,
+            execution_time: float = 0.0) -> List[Row]:
+    """EXPLAIN output: one {'plan': line} row per operator, children indented under their parent."""
+    lines = []
+
+    def walk(node: PlanNode, depth: int):
+        prefix = '   ' * (depth - 1) + '-> ' if depth else ''
+        line = f"{prefix}{node.describe()}  (rows={node.rows:.0f} cost={node.cost:.1f})"
+        if analyze and node.actual_rows is not None:
+            line += f" (actual rows={node.actual_rows} time={node.elapsed * 1000:.3f} ms)"
+        lines.append(line)
+        for child in node.children:
+            walk(child, depth + 1)
+
+    walk(plan, 0)
+    if analyze:
+        lines.append(f"Planning time: {planning_time * 1000:.3f} ms")
+        lines.append(f"Execution time: {execution_time * 1000:.3f} ms")
+    return [{'plan': line} for line in lines]
+
+
+def _access_path(source: _Input, execution_mode: str, batch_size: int) -> PlanNode:
+    # The cheapest way to read one table: an index scan driven by one WHERE conjunct, or a full scan.
+    table, where, columns = source.table, source.where, source.columns
+    total = len(table.store)
+    rows = total * _selectivity(table, where)
+    terms = conjuncts(where)
+    pk_col = table.primary_key_column
+    if execution_mode != batch.BATCH_MODE and pk_col:
+        for term in terms:
+            if isinstance(term, Comparison) and term.op == '=' and term.column == pk_col.name:
+                access = IndexAccess(term.column, [term.value])
+                return IndexScan(table, access, where, columns, rows, INDEX_PROBE_COST + rows * INDEX_ROW_COST)
+
+    if execution_mode == batch.BATCH_MODE or (
+            execution_mode == batch.AUTO_MODE and batch.np is not None
+            and table.store.engine == StorageEngine.COLUMNAR):
+        best: PlanNode = BatchScan(table, where, columns, rows, total * VECTOR_ROW_COST, batch_size)
+        if execution_mode == batch.BATCH_MODE:
+            return best
+    else:
+        best = SeqScan(table, where, columns, rows, total * SEQ_ROW_COST)
+    for access, selectivity in _index_accesses(table, terms):
+        cost = access.lookups * INDEX_PROBE_COST + total * selectivity * INDEX_ROW_COST
+        if cost < best.cost:
+            best = IndexScan(table, access, where, columns, rows, cost)
+    return best
+
+
+def _index_accesses(table: Table, terms: List[Any]):
+    """(IndexAccess, selectivity) for every conjunct an index can answer."""
+    bounds: Dict[str, list] = {}
+    for term in terms:
+        if isinstance(term, Or):
+            # Usable only when every branch can be read from an index
+            branches = [min(_index_accesses(table, conjuncts(branch)), key=lambda a: a[1], default=None)
+                        for branch in term.terms]
+            if all(branches):
+                yield UnionAccess([access for access, _ in branches]), _selectivity(table, term)
+            continue
+        if isinstance(term, And):
+            continue
+        column = term.column
+        if isinstance(term, Comparison) and term.op == '=' or isinstance(term, IsNull) and not term.negated:
+            if table.is_indexed(column):
+                value = term.value if isinstance(term, Comparison) else None
+                yield IndexAccess(column, [value]), _leaf_selectivity(table, term)
+        elif isinstance(term, In) and not term.negated:
+            if table.is_indexed(column):
+                yield IndexAccess(column, list(dict.fromkeys(term.values))), _leaf_selectivity(table, term)
+        elif isinstance(term, Comparison) and term.op != '!=' and table.has_range_index(column):
+            bound = bounds.setdefault(column, [None, True, None, True])
+            if bound is None or term.value is None:
+                continue
+            low, low_inclusive, high, high_inclusive = bound
+            try:
+                if term.op in ('>', '>=') and (low is None or term.value >= low):
+                    inclusive = term.op == '>=' and (low is None or term.value > low or low_inclusive)
+                    bounds[column][:2] = [term.value, inclusive]
+                elif term.op in ('<', '<=') and (high is None or term.value <= high):
+                    inclusive = term.op == '<=' and (high is None or term.value < high or high_inclusive)
+                    bounds[column][2:] = [term.value, inclusive]
+            except TypeError:
+                # Bounds of different types cannot be combined; leave the column to a scan
+                bounds[column] = None
+    for column, bound in bounds.items():
+        if bound is None:
+            continue
+        low, low_inclusive, high, high_inclusive = bound
+        yield (IndexAccess(column, None, low, high, low_inclusive, high_inclusive),
+               _range_selectivity(table, column, low, high))
+
+
+def _join(left: _Input, right: _Input, left_key: str, right_key: str, execution_mode: str,
+          batch_size: int) -> PlanNode:
+    left_scan = _access_path(left, execution_mode, batch_size)
+    right_scan = _access_path(right, execution_mode, batch_size)
+    n_left, n_right = left_scan.rows, right_scan.rows
+    left_distinct = _distinct(left.table, left_key)
+    right_distinct = _distinct(right.table, right_key)
+    rows = n_left * n_right / max(left_distinct, right_distinct, 1.0)
+    output = rows * OUTPUT_ROW_COST
+    inputs = left_scan.cost + right_scan.cost
+
+    build = 'right' if n_right <= n_left else 'left'
+    cost = inputs + min(n_left, n_right) * HASH_BUILD_ROW_COST + max(n_left, n_right) * HASH_PROBE_ROW_COST + output
+    best: PlanNode = HashJoin(left_scan, right_scan, left_key, right_key, right.table, build, rows, cost)
+
+    cost = (inputs + _sort_cost(left.table, left_key, n_left) + _sort_cost(right.table, right_key, n_right)
+            + (n_left + n_right) * MERGE_ROW_COST + output)
+    if cost < best.cost:
+        best = MergeJoin(left_scan, right_scan, left_key, right_key, right.table, 'left', rows, cost)
+
+    # Index nested loop: scan one side, probe the other's index and never scan it
+    for outer, outer_key, inner, inner_key, outer_is_left in ((left_scan, left_key, right, right_key, True),
+                                                             (right_scan, right_key, left, left_key, False)):
+        if not inner.table.is_indexed(inner_key):
+            continue
+        per_probe = len(inner.table.store) / _distinct(inner.table, inner_key)
+        cost = outer.cost + outer.rows * (INDEX_PROBE_COST + per_probe * INDEX_ROW_COST) + output
+        if cost < best.cost:
+            best = IndexNestedLoopJoin(outer, outer_key, inner.table, inner_key, inner.where, outer_is_left,
+                                       right.table, rows, cost)
+    return best
+
+
+def _split_where(where, left: Table, right: Table):
+    """Split a joined query's WHERE into the conjuncts that only touch one input and the rest.
+
+    Pushed-down conjuncts are renamed to their table's own columns, the rest to the
+    names merge_rows gives the joined columns.
+    """
+    left_terms, right_terms, residual = [], [], []
+
+    def own_name(name: str) -> str:
+        return resolve_column(name, left, right)[1]
+
+    def joined_name(name: str) -> str:
+        return _joined_name(name, left, right)
+
+    for term in conjuncts(where):
+        sides = {resolve_column(name, left, right)[0] for name in columns_of(term)}
+        if sides == {'left'}:
+            left_terms.append(rename_columns(term, own_name))
+        elif sides == {'right'}:
+            right_terms.append(rename_columns(term, own_name))
+        else:
+            residual.append(rename_columns(term, joined_name))
+    return conjunction(left_terms), conjunction(right_terms), conjunction(residual)
+
+
+def _joined_name(name: str, left: Table, right: Table) -> str:
+    """The name merge_rows gives a column of a joined row."""
+    side, col = resolve_column(name, left, right)
+    if side == 'right' and col in left.column_map:
+        return f"{right.name}_{col}"
+    return col if side else name
+
+
+def _column_of(name: str, left: Table, right: Optional[Table]):
+    if right is None:
+        col = left.column_map.get(name)
+    else:
+        side, own = resolve_column(name, left, right)
+        col = None if side is None else (left if side == 'left' else right).column_map[own]
+    if col is None:
+        raise ValueError(f"Column {name} not found")
+    return col
+
+
+def _row_count(value, clause: str) -> Optional[int]:
+    # LIMIT and OFFSET values, checked again here because they may come from parameters
+    if value is not None and (type(value) is not int or value < 0):
+        raise ValueError(f"{clause} needs a non-negative integer")
+    return value
+
+
+def _group_count(rows: float, group_by: List[str], left: Table, right: Optional[Table]) -> float:
+    """Estimated number of groups: the product of the grouping columns' distinct counts, at most `rows`."""
+    if not group_by:
+        return 1.0
+    groups = 1.0
+    for name in group_by:
+        if right is None:
+            groups *= _distinct(left, name)
+        else:
+            side, col = resolve_column(name, left, right)
+            groups *= _distinct(left if side == 'left' else right, col) if side else DEFAULT_DISTINCT
+    return max(min(groups, rows), 1.0)
+
+
+def _needed_columns(columns: Optional[List[str]], left: Table, right: Table, left_key: str, right_key: str,
+                    residual):
+    """Columns each join input must produce, or (None, None) when all are needed."""
+    if columns is None:
+        return None, None
+    left_needed: Set[str] = {left_key}
+    right_needed: Set[str] = {right_key}
+    for name in list(columns) + sorted(columns_of(residual)):
+        side, col = resolve_column(name, left, right)
+        if side == 'left':
+            left_needed.add(col)
+        elif side == 'right':
+            right_needed.add(col)
+    # merge_rows renames a right column that clashes with a left one, so keep the left
+    # copy of every clashing column for the right one to keep its name.
+    left_needed.update(col for col in right_needed if col in left.column_map)
+    return ([c.name for c in left.columns if c.name in left_needed],
+            [c.name for c in right.columns if c.name in right_needed])
+
+
+def _selectivity(table: Optional[Table], where) -> float:
+    """Estimated fraction of rows matching a normalized expression; table None means unknown columns."""
+    if where is None:
+        return 1.0
+    if isinstance(where, And):
+        selectivity = 1.0
+        for term in where.terms:
+            selectivity *= _selectivity(table, term)
+        return selectivity
+    if isinstance(where, Or):
+        missed = 1.0
+        for term in where.terms:
+            missed *= 1.0 - _selectivity(table, term)
+        return 1.0 - missed
+    return _leaf_selectivity(table, where)
+
+
+def _leaf_selectivity(table: Optional[Table], leaf) -> float:
+    if table is None:
+        if isinstance(leaf, Comparison):
+            return 1.0 / DEFAULT_DISTINCT if leaf.op == '=' else DEFAULT_RANGE_SELECTIVITY
+        return DEFAULT_SELECTIVITY[type(leaf).__name__]
+    col = table.column_map.get(leaf.column)
+    if col is None:
+        return 1.0 if value_test(leaf)(None) else 0.0
+    stats = table.statistics.columns.get(leaf.column) if table.statistics else None
+    if isinstance(leaf, IsNull):
+        nulls = 0.0 if col.primary_key else stats.null_fraction if stats else DEFAULT_SELECTIVITY['IsNull']
+        return 1.0 - nulls if leaf.negated else nulls
+    if isinstance(leaf, Like):
+        selectivity = DEFAULT_SELECTIVITY['Like']
+        return 1.0 - selectivity if leaf.negated else selectivity
+    if isinstance(leaf, In):
+        selectivity = min(1.0, sum(_column_selectivity(table, leaf.column, v) for v in set(leaf.values)))
+        return 1.0 - selectivity if leaf.negated else selectivity
+    if leaf.op == '=':
+        return _column_selectivity(table, leaf.column, leaf.value)
+    if leaf.op == '!=':
+        return max(1.0 - _column_selectivity(table, leaf.column, leaf.value), 0.0)
+    if leaf.op in ('<', '<='):
+        return _range_selectivity(table, leaf.column, None, leaf.value)
+    return _range_selectivity(table, leaf.column, leaf.value, None)
+
+
+def _range_selectivity(table: Table, column: str, low, high) -> float:
+    stats = table.statistics.columns.get(column) if table.statistics else None
+    selectivity = stats.range_selectivity(low, high) if stats is not None else None
+    if selectivity is not None:
+        return selectivity
+    if low is not None and high is not None:
+        return DEFAULT_RANGE_SELECTIVITY * DEFAULT_RANGE_SELECTIVITY
+    return DEFAULT_RANGE_SELECTIVITY
+
+
+def _column_selectivity(table: Table, column: str, value) -> float:
+    total = max(len(table.store), 1)
+    col = table.column_map.get(column)
+    if col is None:
+        return 1.0 if value is None else 0.0
+    if col.primary_key or col.unique:
+        return 1.0 / total
+    stats = table.statistics.columns.get(column) if table.statistics else None
+    if stats is not None:
+        return stats.equal_selectivity(value)
+    return 1.0 / min(DEFAULT_DISTINCT, total)
+
+
+def _distinct(table: Table, column: str) -> float:
+    total = max(len(table.store), 1)
+    col = table.column_map.get(column)
+    if col is not None and (col.primary_key or col.unique):
+        return float(total)
+    stats = table.statistics.columns.get(column) if table.statistics else None
+    if stats is not None:
+        return float(max(stats.distinct, 1))
+    return float(min(DEFAULT_DISTINCT, total))
+
+
+def _sort_cost(table: Table, column: str, rows: float) -> float:
+    stats = table.statistics.columns.get(column) if table.statistics else None
+    if stats is not None and stats.ordered:
+        return rows * SEQ_ROW_COST * 0.1
+    return rows * math.log2(max(rows, 2.0)) * SORT_ROW_COST
+
+
+def _cancellable(rows: Iterator[Row], event: threading.Event) -> Iterator[Row]:
+    for i, row in enumerate(rows):
+        if not i % CANCEL_CHECK_ROWS and event.is_set():
+            raise QueryCancelled("Query cancelled")
+        yield row
+
+
+def _prune(rows: Iterator[Row], columns: Optional[List[str]]) -> Iterator[Row]:
+    if columns is None:
+        return rows
+    return ({k: r[k] for k in columns if k in r} for r in rows)
+
+
+def _keys_text(keys: SortKeys) -> str:
+    return ', '.join(f"{column} DESC" if descending else column for column, descending in keys)
+
+
+def _filter_text(where) -> str:
+    if where is None:
+        return ''
+    return f" ({expression_text(where)})"
@@ -0,0 +1,192 @@
+"""WHERE expressions: normalization and compilation into row predicates.
+
+normalize() rewrites a parsed expression into negation normal form: BETWEEN becomes a
+pair of comparisons, NOT is pushed down onto the leaves (NOT a < 1 is a >= 1, NOT a IN
+(...) is a NOT IN leaf, and so on) and nested ANDs and ORs are flattened. With no NOT
+above them, leaves can treat NULL as plain false and still give SQL's three-valued
+result, so the compiled predicates and the batch masks only ever deal in booleans.
+
+`col = NULL` and `col != NULL` are read as IS NULL and IS NOT NULL.
+"""
+import operator
+import re
+from typing import Any, Callable, Dict, List, Optional, Set
+from infrastructure.parsers.sql_ast import Comparison, Between, In, Like, IsNull, And, Or, Not
+
+Row = Dict[str, Any]
+Predicate = Callable[[Row], bool]
+
+_OPERATORS = {'=': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le,
+              '>': operator.gt, '>=': operator.ge}
+_NEGATED = {'=': '!=', '!=': '=', '<': '>=', '<=': '>', '>': '<=', '>=': '<'}
+
+
+def normalize(expr, negate: bool = False):
+    """Negation normal form of a WHERE expression, or None for no WHERE."""
+    if expr is None:
+        return None
+    if isinstance(expr, Not):
+        return normalize(expr.term, not negate)
+    if isinstance(expr, (And, Or)):
+        kind = type(expr)
+        if negate:
+            kind = Or if kind is And else And
+        terms = []
+        for term in expr.terms:
+            term = normalize(term, negate)
+            terms.extend(term.terms if isinstance(term, kind) else [term])
+        return terms[0] if len(terms) == 1 else kind(terms)
+    if isinstance(expr, Between):
+        low, high = Comparison(expr.column, '>=', expr.low), Comparison(expr.column, '<=', expr.high)
+        return normalize(Or([Not(low), Not(high)]) if expr.negated else And([low, high]), negate)
+    if isinstance(expr, Comparison):
+        op = _NEGATED[expr.op] if negate else expr.op
+        if expr.value is None and op in ('=', '!='):
+            return IsNull(expr.column, op == '!=')
+        return Comparison(expr.column, op, expr.value)
+    if isinstance(expr, (In, Like)):
+        values = expr.values if isinstance(expr, In) else expr.pattern
+        return type(expr)(expr.column, values, expr.negated != negate)
+    if isinstance(expr, IsNull):
+        return IsNull(expr.column, expr.negated != negate)
+    raise ValueError(f"Unsupported WHERE expression {expr!r}")
+
+
+def compile_predicate(expr, positions: Optional[Dict[str, int]] = None) -> Optional[Predicate]:
+    """A function row -> bool for a normalized expression, or None when there is no WHERE.
+
+    With `positions` the function takes a row stored as a tuple instead of a dict, with
+    each column at the position given; columns not in `positions` are NULL.
+    """
+    if expr is None:
+        return None
+    if isinstance(expr, (And, Or)):
+        parts = [compile_predicate(term, positions) for term in expr.terms]
+        if len(parts) == 2:
+            first, second = parts
+            if isinstance(expr, And):
+                return lambda row: first(row) and second(row)
+            return lambda row: first(row) or second(row)
+        if isinstance(expr, And):
+            return lambda row: all(part(row) for part in parts)
+        return lambda row: any(part(row) for part in parts)
+    column = expr.column
+    equals = isinstance(expr, Comparison) and expr.op == '='
+    value = expr.value if equals else None
+    test = None if equals else value_test(expr)
+    if positions is not None:
+        position = positions.get(column)
+        if position is None:
+            result = test(None) if test else False
+            return lambda row: result
+        if equals:
+            return lambda row: row[position] == value
+        return lambda row: test(row[position])
+    if equals:
+        # The commonest case, without the NULL and type checks of value_test
+        return lambda row: row.get(column) == value
+    return lambda row: test(row.get(column))
+
+
+def value_test(leaf) -> Callable[[Any], bool]:
+    """A function value -> bool for one normalized leaf; NULL and incomparable values are false."""
+    if isinstance(leaf, IsNull):
+        if leaf.negated:
+            return lambda value: value is not None
+        return lambda value: value is None
+    if isinstance(leaf, In):
+        values = {v for v in leaf.values if v is not None}
+        if not leaf.negated:
+            return lambda value: value is not None and value in values
+        if any(v is None for v in leaf.values):
+            # x NOT IN (..., NULL) is never true
+            return lambda value: False
+        return lambda value: value is not None and value not in values
+    if isinstance(leaf, Like):
+        match = like_regex(leaf.pattern).fullmatch
+        if leaf.negated:
+            return lambda value: isinstance(value, str) and match(value) is None
+        return lambda value: isinstance(value, str) and match(value) is not None
+    compare = _OPERATORS[leaf.op]
+    target = leaf.value
+
+    def test(value):
+        if value is None:
+            return False
+        try:
+            return compare(value, target)
+        except TypeError:
+            return False
+    return test
+
+
+def like_regex(pattern: str):
+    # A backslash makes the next character literal, e.g. 'a\_b' matches only 'a_b'
+    parts = []
+    chars = iter(pattern)
+    for char in chars:
+        if char == '\\':
+            parts.append(re.escape(next(chars, '\\')))
+        elif char == '%':
+            parts.append('.*')
+        elif char == '_':
+            parts.append('.')
+        else:
+            parts.append(re.escape(char))
+    return re.compile(''.join(parts), re.DOTALL)
+
+
+def conjuncts(expr) -> List[Any]:
+    """The terms of a normalized expression's top-level AND."""
+    if expr is None:
+        return []
+    return list(expr.terms) if isinstance(expr, And) else [expr]
+
+
+def conjunction(terms: List[Any]):
+    if not terms:
+        return None
+    return terms[0] if len(terms) == 1 else And(terms)
+
+
+def columns_of(expr) -> Set[str]:
+    if expr is None:
+        return set()
+    if isinstance(expr, (And, Or)):
+        return set().union(*(columns_of(term) for term in expr.terms))
+    if isinstance(expr, Not):
+        return columns_of(expr.term)
+    return {expr.column}
+
+
+def rename_columns(expr, rename: Callable[[str], str]):
+    """Copy of a normalized expression with every column name passed through rename."""
+    if isinstance(expr, (And, Or)):
+        return type(expr)([rename_columns(term, rename) for term in expr.terms])
+    if isinstance(expr, Comparison):
+        return Comparison(rename(expr.column), expr.op, expr.value)
+    if isinstance(expr, In):
+        return In(rename(expr.column), expr.values, expr.negated)
+    if isinstance(expr, Like):
+        return Like(rename(expr.column), expr.pattern, expr.negated)
+    return IsNull(rename(expr.column), expr.negated)
+
+
+def from_equalities(where: Optional[Row]):
+    """The normalized expression for a {column: value} equality filter."""
+    if not where:
+        return None
+    return normalize(conjunction([Comparison(k, '=', v) for k, v in where.items()]))
+
+
+def expression_text(expr) -> str:
+    if isinstance(expr, (And, Or)):
+        text = f" {type(expr).__name__.upper()} ".join(expression_text(term) for term in expr.terms)
+        return f"({text})" if isinstance(expr, Or) else text
+    if isinstance(expr, Comparison):
+        return f"{expr.column} {expr.op} {expr.value!r}"
+    if isinstance(expr, In):
+        return f"{expr.column} {'NOT IN' if expr.negated else 'IN'} ({', '.join(map(repr, expr.values))})"
+    if isinstance(expr, Like):
+        return f"{expr.column} {'NOT LIKE' if expr.negated else 'LIKE'} {expr.pattern!r}"
+    return f"{expr.column} IS {'NOT NULL' if expr.negated else 'NULL'}"
@@ -0,0 +1,135 @@
+"""ORDER BY: in-memory sort, bounded-heap top-k and external merge sort.
+
+NULLs sort after every value in ascending order and before every value in descending
+order. All three methods are stable, so rows with equal keys keep their input order.
+"""
+import heapq
+import pickle
+import sys
+import tempfile
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+Row = Dict[str, Any]
+# (column, descending)
+SortKeys = List[Tuple[str, bool]]
+
+# Bytes of rows a sort may hold in memory before it spills sorted runs to temporary files
+DEFAULT_SORT_MEMORY = 64 * 2 ** 20
+# Rows pickled together in a run file
+_SPILL_BLOCK = 1024
+# Row sizes are estimated from every n-th row
+_SIZE_SAMPLE = 256
+
+
+class SortStats:
+    """How a sort ran, for EXPLAIN ANALYZE."""
+
+    def __init__(self):
+        self.method = 'in memory'
+        # Sorted runs written to disk by an external sort
+        self.runs = 0
+
+
+class _Descending:
+    """Wraps one key value so that it sorts in reverse, for keys with mixed directions."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def sort_key(keys: SortKeys) -> Tuple[Callable[[Row], Any], bool]:
+    """A key function and a reverse flag implementing the ORDER BY `keys` for sorted() and heapq."""
+    columns = [column for column, _ in keys]
+    if all(descending for _, descending in keys) or not any(descending for _, descending in keys):
+        # (is None, value) puts NULLs last; reversing the whole sort puts them first
+        if len(columns) == 1:
+            column = columns[0]
+
+            def single(row):
+                value = row.get(column)
+                return (value is None, value)
+            return single, keys[0][1]
+        return lambda row: [(row.get(c) is None, row.get(c)) for c in columns], keys[0][1]
+
+    def mixed(row):
+        key = []
+        for column, descending in keys:
+            value = row.get(column)
+            part = (value is None, value)
+            key.append(_Descending(part) if descending else part)
+        return key
+    return mixed, False
+
+
+def sort_rows(rows: Iterable[Row], keys: SortKeys, memory: int = DEFAULT_SORT_MEMORY,
+              spill_dir: Optional[str] = None, stats: Optional[SortStats] = None) -> Iterator[Row]:
+    """Sort rows, spilling sorted runs to temporary files when they outgrow `memory` bytes."""
+    key, reverse = sort_key(keys)
+    stats = stats or SortStats()
+    runs = []
+    try:
+        for chunk, last in _chunks(rows, memory):
+            chunk.sort(key=key, reverse=reverse)
+            if last and not runs:
+                yield from chunk
+                return
+            runs.append(_spill(chunk, spill_dir))
+        stats.method = 'external merge'
+        stats.runs = len(runs)
+        # heapq.merge prefers earlier runs on ties, which keeps the sort stable
+        yield from heapq.merge(*(_read_run(run) for run in runs), key=key, reverse=reverse)
+    finally:
+        for run in runs:
+            run.close()
+
+
+def top_k(rows: Iterable[Row], keys: SortKeys, k: int) -> List[Row]:
+    """The first k rows in ORDER BY `keys` order, keeping only k rows at a time."""
+    key, reverse = sort_key(keys)
+    if reverse:
+        return heapq.nlargest(k, rows, key=key)
+    return heapq.nsmallest(k, rows, key=key)
+
+
+def _chunks(rows: Iterable[Row], memory: int) -> Iterator[Tuple[List[Row], bool]]:
+    # Lists of rows that fit in `memory`, each with a flag saying whether it is the last one
+    chunk: List[Row] = []
+    used = 0
+    row_size = 0
+    for i, row in enumerate(rows):
+        if i % _SIZE_SAMPLE == 0:
+            row_size = _row_size(row)
+        if used + row_size > memory and chunk:
+            yield chunk, False
+            chunk, used = [], 0
+        chunk.append(row)
+        used += row_size
+    yield chunk, True
+
+
+def _row_size(row: Row) -> int:
+    return sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row.values())
+
+
+def _spill(rows: List[Row], spill_dir: Optional[str]):
+    run = tempfile.TemporaryFile(dir=spill_dir)
+    for start in range(0, len(rows), _SPILL_BLOCK):
+        pickle.dump(rows[start:start + _SPILL_BLOCK], run, pickle.HIGHEST_PROTOCOL)
+    run.seek(0)
+    return run
+
+
+def _read_run(run) -> Iterator[Row]:
+    while True:
+        try:
+            block = pickle.load(run)
+        except EOFError:
+            return
+        yield from block
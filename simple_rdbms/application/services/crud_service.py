@@ -1,21 +1,47 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional
 from domain.entities.table import Table
 from domain.entities.column import Column
+from domain.value_objects.index_type import IndexType
+from domain.value_objects.storage_engine import StorageEngine
 from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.store_factory import create_store
 
 class CrudService:
     def __init__(self, table_repo: TableRepository):
         self.table_repo = table_repo
 
-    def create_table(self, name: str, columns: List[Column]):
-        table = Table(name, columns)
+    def create_table(self, name: str, columns: List[Column], engine: StorageEngine = StorageEngine.ROW):
+        table = Table(name, columns, create_store(engine, columns))
         self.table_repo.save(table)
 
-    def insert(self, table_name: str, row: Dict[str, Any]):
+    def create_index(self, table_name: str, index_name: str, column: str, index_type: IndexType):
         table = self.table_repo.find_by_name(table_name)
         if not table:
             raise ValueError("Table not found")
-        table.insert_row(row)
+        table.create_index(index_name, column, index_type)
+        self.table_repo.update(table)
+
+    def drop_index(self, index_name: str, table_name: Optional[str] = None):
+        names = [table_name] if table_name else self.table_repo.find_all_names()
+        for name in names:
+            table = self.table_repo.find_by_name(name)
+            if table and index_name in table.indexes:
+                table.drop_index(index_name)
+                self.table_repo.update(table)
+                return
+        raise ValueError(f"Index {index_name} not found")
+
+    def insert(self, table_name: str, row: Dict[str, Any], validate: bool = True):
+        table = self.table_repo.find_by_name(table_name)
+        if not table:
+            raise ValueError("Table not found")
+        table.insert_row(row, validate)
+
+    def bulk_insert(self, table_name: str, rows: Iterable[Dict[str, Any]], validate: bool = True) -> int:
+        table = self.table_repo.find_by_name(table_name)
+        if not table:
+            raise ValueError("Table not found")
+        return table.bulk_insert(rows, validate)
 
     def select(self, table_name: str, where=None):
         table = self.table_repo.find_by_name(table_name)
@@ -33,4 +59,16 @@ class CrudService:
         table = self.table_repo.find_by_name(table_name)
         if not table:
             raise ValueError("Table not found")
-        table.delete_row(pk_value)
\ No newline at end of file
+        table.delete_row(pk_value)
+
+    def update_rows(self, table_name: str, row_ids: List[int], updates: Dict[str, Any]) -> int:
+        table = self.table_repo.find_by_name(table_name)
+        if not table:
+            raise ValueError("Table not found")
+        return table.update_rows(row_ids, updates)
+
+    def delete_rows(self, table_name: str, row_ids: List[int]) -> int:
+        table = self.table_repo.find_by_name(table_name)
+        if not table:
+            raise ValueError("Table not found")
+        return table.delete_rows(row_ids)
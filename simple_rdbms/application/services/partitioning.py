@@ -0,0 +1,387 @@
+"""Partitioned tables: a table's rows spread over worker processes by primary key.
+
+A table created with PARTITION BY HASH (key) PARTITIONS n, or PARTITION BY RANGE (key)
+BOUNDS (b1, ..., bn-1), keeps partition i of its rows in worker process i, as an
+ordinary table of the same name in a database of the worker's own. Worker i holds
+partition i of every partitioned table, so two tables partitioned alike on their join
+keys can be joined inside each worker.
+
+QueryService is the coordinator. It routes every row to the partition of its key, and
+sends a SELECT, UPDATE or DELETE only to the partitions its WHERE conditions on the key
+leave, so primary key point operations reach a single worker. Everything else is
+scattered to all the partitions at once and gathered back: scans return the matching
+rows, aggregates return partial aggregates for the coordinator to merge, and ORDER BY
+with a LIMIT returns each partition's first rows.
+
+Workers are spawned rather than forked, since the servers that create them run
+threads, and talk to the coordinator over pipes with pickled statements and results.
+A spawned worker imports the main module afresh, so a script that creates partitioned
+tables needs the usual `if __name__ == "__main__":` guard.
+"""
+import bisect
+import itertools
+import multiprocessing
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Set, Tuple
+from application.execution.aggregation import Groups, merge_partials, partial_aggregate
+from application.execution.predicates import conjuncts
+from domain.entities.table import Table
+from infrastructure.parsers.sql_ast import (
+    Aggregate, Between, Comparison, CreateIndex, CreateTable, Delete, DropIndex, In, Insert, Select, Update,
+)
+
+Row = Dict[str, Any]
+
+MAX_PARTITIONS = 64
+# Seconds a stopping worker gets to exit before it is terminated
+STOP_TIMEOUT = 5.0
+
+
+def _key_hash(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        # Unlike hash(), the same in every process and every run
+        return zlib.crc32(value.encode('utf-8'))
+    # Numbers hash to themselves (and 1 and 1.0 alike), in every process
+    return hash(value)
+
+
+class Partitioning:
+    """Which partition each value of a table's partition key belongs to."""
+    method = ''
+
+    def __init__(self, column: str, count: int):
+        self.column = column
+        self.count = count
+
+    def partition_of(self, value) -> int:
+        raise NotImplementedError
+
+    def partitions_for(self, where) -> List[int]:
+        """The partitions that can hold rows matching a normalized WHERE expression."""
+        candidates = set(range(self.count))
+        for term in conjuncts(where):
+            if getattr(term, 'column', None) != self.column:
+                continue
+            try:
+                found = self._term_partitions(term)
+            except TypeError:
+                # A value that cannot be compared with the bounds; the partitions will reject it
+                found = None
+            if found is not None:
+                candidates &= found
+        return sorted(candidates)
+
+    def _term_partitions(self, term) -> Optional[Set[int]]:
+        if isinstance(term, Comparison) and term.op == '=':
+            return set() if term.value is None else {self.partition_of(term.value)}
+        if isinstance(term, In) and not term.negated:
+            return {self.partition_of(value) for value in term.values if value is not None}
+        return None
+
+    def same_layout(self, other: 'Partitioning') -> bool:
+        """Whether equal keys of the two tables always land in the same partition."""
+        return type(self) is type(other) and self.count == other.count
+
+    def describe(self) -> str:
+        return f"{self.method} ({self.column}) into {self.count} partitions"
+
+
+class HashPartitioning(Partitioning):
+    method = 'HASH'
+
+    def partition_of(self, value) -> int:
+        return _key_hash(value) % self.count
+
+
+class RangePartitioning(Partitioning):
+    """Partition i holds keys from bounds[i - 1] up to, not including, bounds[i]; NULLs go to the first."""
+    method = 'RANGE'
+
+    def __init__(self, column: str, bounds: List[Any]):
+        super().__init__(column, len(bounds) + 1)
+        self.bounds = bounds
+
+    def partition_of(self, value) -> int:
+        return 0 if value is None else bisect.bisect_right(self.bounds, value)
+
+    def _term_partitions(self, term) -> Optional[Set[int]]:
+        if isinstance(term, Comparison) and term.value is not None:
+            if term.op in ('<', '<='):
+                return set(range(self.partition_of(term.value) + 1))
+            if term.op in ('>', '>='):
+                return set(range(self.partition_of(term.value), self.count))
+        if isinstance(term, Between) and not term.negated and None not in (term.low, term.high):
+            return set(range(self.partition_of(term.low), self.partition_of(term.high) + 1))
+        return super()._term_partitions(term)
+
+    def same_layout(self, other: 'Partitioning') -> bool:
+        return super().same_layout(other) and self.bounds == other.bounds
+
+
+class PartitionWorker:
+    """One worker process and the pipe to it."""
+
+    def __init__(self, context, index: int):
+        self.index = index
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child,), name=f"rdbms-partition-{index}", daemon=True)
+        self.process.start()
+        child.close()
+        # A request and its reply are one exchange; threads take turns
+        self.lock = threading.Lock()
+
+    def send(self, request: tuple):
+        try:
+            self.connection.send(request)
+        except (OSError, ValueError):
+            raise ValueError(f"Partition worker {self.index} has stopped") from None
+
+    def receive(self) -> Tuple[bool, Any]:
+        try:
+            return self.connection.recv()
+        except (EOFError, OSError):
+            return False, ValueError(f"Partition worker {self.index} has stopped")
+
+    def close(self):
+        try:
+            self.connection.send(('stop',))
+        except (OSError, ValueError):
+            pass
+        self.process.join(STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.connection.close()
+
+
+class PartitionPool:
+    """The worker processes of a coordinator, started as partitions need them."""
+
+    def __init__(self):
+        self.workers: List[PartitionWorker] = []
+        self.context = multiprocessing.get_context('spawn')
+        self.lock = threading.Lock()
+
+    def start(self, count: int):
+        """Make sure workers 0 .. count - 1 are running."""
+        with self.lock:
+            while len(self.workers) < count:
+                self.workers.append(PartitionWorker(self.context, len(self.workers)))
+
+    def exchange(self, requests: Dict[int, tuple]) -> Dict[int, Tuple[bool, Any]]:
+        """Send every worker its request, then collect each one's (ok, result or error).
+
+        All requests go out before the first reply is read, so the workers run them in
+        parallel. Workers are locked in index order, so concurrent exchanges cannot deadlock.
+        """
+        workers = [self.workers[i] for i in sorted(requests)]
+        for worker in workers:
+            worker.lock.acquire()
+        try:
+            sent = []
+            replies = {}
+            for worker in workers:
+                try:
+                    worker.send(requests[worker.index])
+                    sent.append(worker)
+                except ValueError as e:
+                    replies[worker.index] = (False, e)
+            for worker in sent:
+                replies[worker.index] = worker.receive()
+            return replies
+        finally:
+            for worker in workers:
+                worker.lock.release()
+
+    def scatter(self, requests: Dict[int, tuple]) -> Dict[int, Any]:
+        """Run each worker's request and return their results; raises the first error any of them had."""
+        replies = self.exchange(requests)
+        for ok, result in replies.values():
+            if not ok:
+                raise result
+        return {index: result for index, (_, result) in replies.items()}
+
+    def close(self):
+        with self.lock:
+            for worker in self.workers:
+                worker.close()
+            self.workers = []
+
+
+class PartitionedTable:
+    """The coordinator's handle on a partitioned table: its schema, its partitioning and its workers."""
+
+    def __init__(self, schema: Table, partitioning: Partitioning, pool: PartitionPool):
+        # Never holds rows; planning and validation read the columns from it
+        self.schema = schema
+        self.partitioning = partitioning
+        self.pool = pool
+        # Secondary index name -> column; every partition has its own index of that name
+        self.indexes: Dict[str, str] = {}
+
+    @property
+    def name(self) -> str:
+        return self.schema.name
+
+    @property
+    def all_partitions(self) -> List[int]:
+        return list(range(self.partitioning.count))
+
+    def create(self, engine: str, columns) -> None:
+        self.pool.start(self.partitioning.count)
+        self.broadcast(CreateTable(self.name, columns, engine))
+
+    def broadcast(self, statement, partitions: Optional[List[int]] = None) -> Dict[int, Any]:
+        """Run a statement on the given partitions (default: all of them) at once."""
+        if partitions is None:
+            partitions = self.all_partitions
+        return self.pool.scatter({i: ('execute', statement) for i in partitions})
+
+    def insert(self, rows: List[Row], validate: bool = True) -> int:
+        """Send each row to the partition of its key; all or nothing."""
+        key = self.partitioning.column
+        names = [col.name for col in self.schema.columns]
+        validate_key = self.schema.column_map[key].validate_value
+        partition_of = self.partitioning.partition_of
+        parts: Dict[int, List[List[Any]]] = {}
+        for row in rows:
+            if validate:
+                self.schema.validate_row(row)
+            else:
+                validate_key(row.get(key))
+            parts.setdefault(partition_of(row.get(key)), []).append([row.get(name) for name in names])
+        replies = self.pool.exchange({i: ('execute', Insert(self.name, names, values)) for i, values in parts.items()})
+        errors = [result for ok, result in replies.values() if not ok]
+        if errors:
+            # Take back what the other partitions inserted. The table is write-locked, so
+            # nobody has seen those rows.
+            position = names.index(key)
+            done = [i for i, (ok, _) in replies.items() if ok]
+            if done:
+                self.pool.scatter({i: ('execute', Delete(self.name, In(key, [values[position] for values in parts[i]])))
+                                   for i in done})
+            raise errors[0]
+        return len(rows)
+
+    def modify(self, statement, where) -> None:
+        """Run an UPDATE or DELETE on the partitions its normalized WHERE can match."""
+        self.broadcast(statement, self.partitioning.partitions_for(where))
+
+    def update_key(self, statement: Update, where) -> None:
+        """Run an UPDATE that sets the partition key: the row moves to the partition of its new key.
+
+        As on any table, only one row can be given a new key at a time. The row is
+        inserted with its new values first, so a key that is taken leaves it where it was,
+        then deleted from where it was.
+        """
+        key = self.partitioning.column
+        partitions = self.partitioning.partitions_for(where)
+        found = self.broadcast(Select(self.name, ['*'], None, statement.where), partitions)
+        rows = list(itertools.chain.from_iterable(found[i] for i in partitions))
+        self.schema.validate_updates(statement.assignments, len(rows))
+        if not rows:
+            return
+        row = {**rows[0], **statement.assignments}
+        if row[key] == rows[0][key]:
+            self.modify(statement, where)
+            return
+        self.insert([row])
+        old = Delete(self.name, Comparison(key, '=', rows[0][key]))
+        try:
+            self.modify(old, old.where)
+        except ValueError:
+            self.modify(Delete(self.name, Comparison(key, '=', row[key])), Comparison(key, '=', row[key]))
+            raise
+
+    def create_index(self, statement: CreateIndex):
+        if statement.column not in self.schema.column_map:
+            raise ValueError(f"Unknown column {statement.column}")
+        if statement.name in self.indexes:
+            raise ValueError(f"Index {statement.name} already exists")
+        self.broadcast(statement)
+        self.indexes[statement.name] = statement.column
+
+    def drop_index(self, name: str):
+        if name not in self.indexes:
+            raise ValueError(f"Index {name} not found")
+        self.broadcast(DropIndex(name, self.name))
+        del self.indexes[name]
+
+    def rows(self, query: Select, columns: Optional[List[str]], limit: Optional[int],
+             partitions: List[int]) -> List[Row]:
+        """The rows of `query`'s table (and join) matching its WHERE, from each of `partitions`.
+
+        With a limit, each partition returns its first `limit` rows in the query's ORDER BY.
+        """
+        select = Select(query.table, columns or ['*'], query.join, query.where, [],
+                        query.order_by if limit is not None else [], limit)
+        results = self.broadcast(select, partitions)
+        return list(itertools.chain.from_iterable(results[i] for i in partitions))
+
+    def groups(self, query: Select, columns: Optional[List[str]], group_by: List[str],
+               aggregates: List[Aggregate], partitions: List[int]) -> Groups:
+        """Each partition's partial aggregates of the rows matching `query`, merged."""
+        select = Select(query.table, columns or ['*'], query.join, query.where)
+        results = self.pool.scatter({i: ('aggregate', select, group_by, aggregates) for i in partitions})
+        groups: Groups = {}
+        for i in partitions:
+            merge_partials(groups, results[i])
+        return groups
+
+    def gather_table(self, where) -> Table:
+        """The rows matching a WHERE over this table's own columns, gathered into a temporary table."""
+        select = Select(self.name, ['*'], None, where)
+        table = Table(self.name, self.schema.columns)
+        for result in self.broadcast(select).values():
+            table.insert_batch(result)
+        for name, column in self.indexes.items():
+            table.create_index(name, column)
+        return table
+
+    def describe(self, partitions: List[int]) -> str:
+        return f"from {len(partitions)} of {self.partitioning.count} partitions of {self.name}"
+
+
+def make_partitioning(method: str, column: str, count: int, bounds: List[Any]) -> Partitioning:
+    if not 1 <= count <= MAX_PARTITIONS:
+        raise ValueError(f"A table can have 1 to {MAX_PARTITIONS} partitions")
+    if method == 'HASH':
+        return HashPartitioning(column, count)
+    if any(b is None for b in bounds):
+        raise ValueError("Partition bounds cannot be NULL")
+    try:
+        ascending = all(low < high for low, high in zip(bounds, bounds[1:]))
+    except TypeError:
+        ascending = False
+    if not ascending:
+        raise ValueError("Partition bounds must be in ascending order")
+    return RangePartitioning(column, bounds)
+
+
+def _serve(connection):
+    # Runs in the worker process: statements in, results out, until told to stop
+    from application.services.crud_service import CrudService
+    from application.services.query_service import QueryService
+    from infrastructure.repositories.table_repository import TableRepository
+    from infrastructure.storage.in_memory_storage import InMemoryStorage
+    service = QueryService(CrudService(TableRepository(InMemoryStorage())))
+    while True:
+        try:
+            request = connection.recv()
+        except (EOFError, OSError):
+            return
+        if request[0] == 'stop':
+            return
+        try:
+            if request[0] == 'aggregate':
+                _, select, group_by, aggregates = request
+                with service.stream(select) as rows:
+                    reply = (True, partial_aggregate(rows, group_by, aggregates))
+            else:
+                reply = (True, service.execute(request[1]))
+        except Exception as e:
+            # Errors are ValueErrors everywhere else; anything else may not survive pickling
+            reply = (False, e if isinstance(e, ValueError) else ValueError(f"{type(e).__name__}: {e}"))
+        connection.send(reply)
@@ -0,0 +1,77 @@
+from typing import Any, Dict, List, Optional, Union
+from domain.entities.table import Table
+from infrastructure.parsers.sql_ast import Insert, Parameter, bind_parameters
+
+
+class PreparedStatement:
+    """A parsed statement plus everything that can be worked out before its parameters are known.
+
+    INSERTs resolve their target columns and validators once: literal values are validated
+    at prepare time and each placeholder keeps the validator of the column it fills, so an
+    execution only checks the bound values and skips Table's generic per-column checks.
+    Other statements keep their AST and are executed with the parameters substituted in.
+    """
+
+    def __init__(self, name: str, statement, parameters: List[Optional[str]], table: Optional[Table] = None):
+        self.name = name
+        self.statement = statement
+        self.parameters = parameters
+        # Per VALUES tuple: its literal values, and (column name, validator, parameter index)
+        # for each of its placeholders
+        self.constants: List[Dict[str, Any]] = []
+        self.slots: List[list] = []
+        if isinstance(statement, Insert):
+            self._compile_insert(table)
+
+    @property
+    def is_insert(self) -> bool:
+        return isinstance(self.statement, Insert)
+
+    def bind_values(self, params: Union[None, List[Any], Dict[str, Any]]) -> List[Any]:
+        """Order the caller's parameters by placeholder index."""
+        if isinstance(params, dict):
+            if self.parameters and self.parameters[0] is None:
+                raise ValueError("Statement uses ? placeholders; pass parameters as a list")
+            missing = [name for name in self.parameters if name not in params]
+            if missing:
+                raise ValueError(f"Missing parameters: {', '.join(missing)}")
+            return [params[name] for name in self.parameters]
+        values = list(params or [])
+        if len(values) != len(self.parameters):
+            raise ValueError(f"Expected {len(self.parameters)} parameters, got {len(values)}")
+        return values
+
+    def bind(self, values: List[Any]):
+        return bind_parameters(self.statement, values)
+
+    def build_rows(self, values: List[Any]) -> List[Dict[str, Any]]:
+        rows = []
+        for constants, slots in zip(self.constants, self.slots):
+            row = dict(constants)
+            for column_name, validate, index in slots:
+                value = values[index]
+                validate(value)
+                row[column_name] = value
+            rows.append(row)
+        return rows
+
+    def _compile_insert(self, table: Table):
+        if table is None:
+            raise ValueError("Table not found")
+        names = self.statement.columns or [col.name for col in table.columns]
+        for name in names:
+            if name not in table.column_map:
+                raise ValueError(f"Unknown column {name}")
+        for values in self.statement.rows:
+            if len(names) != len(values):
+                raise ValueError(f"Expected {len(names)} values, got {len(values)}")
+            constants, slots = {}, []
+            for name, value in zip(names, values):
+                column = table.column_map[name]
+                if isinstance(value, Parameter):
+                    slots.append((name, column.validate_value, value.index))
+                else:
+                    column.validate_value(value)
+                    constants[name] = value
+            self.constants.append(constants)
+            self.slots.append(slots)
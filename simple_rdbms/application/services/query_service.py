@@ -1,64 +1,671 @@
-from typing import Dict, Any, List
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
 from domain.value_objects.data_type import DataType
+from domain.value_objects.index_type import IndexType
+from domain.value_objects.storage_engine import StorageEngine
 from domain.entities.column import Column
+from domain.entities.statistics import collect_statistics
+from domain.entities.table import Table
 from application.services.crud_service import CrudService
+from application.execution.joins import resolve_join_keys
+from application.execution import batch
+from application.execution.planner import (
+    PlanNode, plan_select, plan_gathered, pushed_down, matching_row_ids, explain, scan_counts,
+)
+from application.execution.predicates import normalize, conjuncts
+from application.execution.sorting import DEFAULT_SORT_MEMORY
+from application.services.partitioning import PartitionedTable, PartitionPool, make_partitioning
+from application.services.prepared_statement import PreparedStatement
+from application.services.row_stream import RowStream
+from application.services.transaction import Session, Transaction
+from infrastructure.caching.result_cache import ResultCache
+from infrastructure.concurrency.rw_lock import LockManager, LockTimeout
+from infrastructure.loaders.file_readers import read_rows
+from infrastructure.monitoring.metrics import NULL_TRACE, QueryMetrics, QueryTrace
+from infrastructure.storage import snapshot
+from infrastructure.parsers.sql_ast import (
+    CreateTable, CreateIndex, DropIndex, Insert, Copy, Select, Update, Delete, Prepare, Execute, Deallocate,
+    Begin, Commit, Rollback, Explain, Analyze, Save, Load, Aggregate, Comparison,
+)
+
+# Seconds a statement inside a transaction waits for a lock before the transaction is rolled back
+DEFAULT_LOCK_TIMEOUT = 5.0
 
 class QueryService:
-    def __init__(self, crud_service: CrudService):
+    """Executes parsed statements.
+
+    Safe to share between threads: each statement runs under the LockManager's locks,
+    shared on the tables it reads and exclusive on the table it changes.
+
+    BEGIN, COMMIT and ROLLBACK apply to a Session. Callers that serve several clients
+    pass one Session per client; everyone else shares the service's own `session`.
+    A transaction keeps the tables it writes locked until it ends, which is how
+    deadlocks become possible: a statement inside a transaction that waits more than
+    `lock_timeout` seconds for a lock fails with LockTimeout and the transaction is
+    rolled back. Autocommit statements take their locks in a fixed order, cannot
+    deadlock and wait as long as they need to.
+
+    It is also the coordinator of partitioned tables (see partitioning.py), which are
+    kept apart from the catalog's tables in `partitioned` and cannot be used in
+    transactions.
+    """
+
+    def __init__(self, crud_service: CrudService, execution_mode: str = batch.AUTO_MODE,
+                 batch_size: int = batch.DEFAULT_BATCH_SIZE, allow_copy: bool = True,
+                 locks: Optional[LockManager] = None, lock_timeout: float = DEFAULT_LOCK_TIMEOUT,
+                 sort_memory: int = DEFAULT_SORT_MEMORY, result_cache_bytes: int = 0,
+                 metrics: Optional[QueryMetrics] = None):
         self.crud = crud_service
+        self.locks = locks or LockManager()
+        self.lock_timeout = lock_timeout
+        self.session = Session()
+        # 'row' evaluates one dict at a time, 'batch' always vectorizes scans, 'auto' picks per query
+        self.execution_mode = execution_mode
+        self.batch_size = batch_size
+        # Bytes of rows an ORDER BY sorts in memory before spilling runs to temporary files
+        self.sort_memory = sort_memory
+        # Results of SELECTs outside transactions, reused until a table they read changes;
+        # off when the budget is 0
+        self.result_cache = ResultCache(result_cache_bytes) if result_cache_bytes > 0 else None
+        # Counters and stage timings of every statement; None turns them off
+        self.metrics = metrics
+        # COPY, SAVE and LOAD use server-side files, so front ends open to remote clients switch them off
+        self.allow_copy = allow_copy
+        # Partitioned tables by name, and the worker processes holding their partitions
+        self.partitioned: Dict[str, PartitionedTable] = {}
+        self.partition_pool: Optional[PartitionPool] = None
+        # Prepared statements by handle
+        self.prepared: Dict[str, PreparedStatement] = {}
+        self._next_handle = 1
+        self._prepared_lock = threading.Lock()
+
+    def close(self):
+        """Stop the partition worker processes, if any; their partitions are lost."""
+        if self.partition_pool is not None:
+            self.partition_pool.close()
+            self.partition_pool = None
+            self.partitioned = {}
+
+    def trace(self, sql: Optional[str] = None, profile: bool = False) -> QueryTrace:
+        """A trace for a front end to time its own stages of a statement in, e.g. parsing.
+
+        It is a no-op stand-in when metrics are off and no profile is asked for.
+        """
+        if self.metrics is None and not profile:
+            return NULL_TRACE
+        return QueryTrace(self.metrics, sql, profile)
+
+    def execute(self, query, session: Optional[Session] = None, nowait: bool = False,
+                trace: Optional[QueryTrace] = None) -> Any:
+        """Run a statement and return its result.
+
+        With `nowait`, an autocommit statement that would have to wait for a lock fails
+        with LockTimeout at once instead. A `trace` passed in is filled in and left for the
+        caller to finish; without one the statement is recorded in `metrics` here.
+        """
+        own = trace is None
+        if own:
+            trace = self.trace()
+        trace.start(type(query).__name__)
+        try:
+            with trace.profiling():
+                result = self._run(query, session or self.session, nowait, trace)
+        except BaseException:
+            if own:
+                trace.finish(error=True)
+            raise
+        if own:
+            trace.finish()
+        return result
+
+    def _run(self, query, session: Session, nowait: bool, trace: QueryTrace) -> Any:
+        if isinstance(query, Begin):
+            self.begin(session)
+        elif isinstance(query, Commit):
+            self.commit(session)
+        elif isinstance(query, Rollback):
+            self.rollback(session)
+        elif isinstance(query, Analyze) and query.table is None:
+            # One table at a time, each under its own read lock
+            for name in self.crud.table_repo.find_all_names():
+                self._run(Analyze(name), session, nowait, trace)
+        elif isinstance(query, (Save, Load)):
+            # Server-side files, like COPY; they lock what they touch themselves
+            if not self.allow_copy:
+                raise ValueError(f"{type(query).__name__.upper()} is disabled")
+            if session.transaction is not None:
+                raise ValueError(f"{type(query).__name__.upper()} is not allowed inside a transaction")
+            with trace.stage('execute'):
+                if isinstance(query, Save):
+                    return self.save_snapshot(query.path, query.compression)
+                return self.load_snapshot(query.path)
+        else:
+            if session.transaction is not None and isinstance(query, (CreateTable, CreateIndex, DropIndex)):
+                raise ValueError("Schema changes are not allowed inside a transaction")
+            reads, writes, catalog_write = self._lock_sets(query)
+            waited = time.perf_counter()
+            with self._locked(session, reads, writes, catalog_write, 0 if nowait else None):
+                trace.add_stage('lock', time.perf_counter() - waited)
+                if isinstance(query, Select):
+                    # Times its planning and execution separately
+                    return self._execute(query, session, trace)
+                with trace.stage('execute'):
+                    return self._execute(query, session, trace)
+        return None
+
+    def save_snapshot(self, path: str, compression: str = 'NONE') -> int:
+        """Write every table to a snapshot file at `path`; returns the number of rows written.
+
+        Tables are read under shared locks, so the snapshot is consistent while writers wait.
+        """
+        names = self.crud.table_repo.find_all_names()
+        with self.locks.locked(reads=names):
+            tables = [table for table in map(self.crud.table_repo.find_by_name, names) if table is not None]
+            return snapshot.write_snapshot(path, tables, compression)
+
+    def load_snapshot(self, path: str, workers: int = snapshot.DEFAULT_WORKERS) -> int:
+        """Create the tables of the snapshot at `path` and load their rows; returns the row count.
+
+        None of the tables may exist yet. The catalog is locked throughout, and if any table
+        fails to load, the tables already created are dropped again.
+        """
+        created: List[str] = []
+
+        def build(image: snapshot.TableImage) -> int:
+            self.crud.create_table(image.name, image.columns, image.engine)
+            created.append(image.name)
+            for name, column, index_type in image.indexes:
+                self.crud.create_index(image.name, name, column, index_type)
+            table = self._table(image.name)
+            count = table.load_columns(image.values)
+            self.crud.table_repo.update(table)
+            return count
+
+        with self.locks.locked(catalog_write=True):
+            try:
+                return sum(snapshot.read_snapshot(path, build, workers))
+            except BaseException:
+                for name in created:
+                    self.crud.table_repo.delete(name)
+                raise
+
+    @contextmanager
+    def _traced(self, trace: Optional[QueryTrace], query):
+        # Yields the trace to fill in: the caller's, or one of our own that is finished here.
+        # The same as execute() does for itself.
+        own = trace is None
+        if own:
+            trace = self.trace()
+        trace.start(type(query).__name__)
+        try:
+            with trace.profiling():
+                yield trace
+        except BaseException:
+            if own:
+                trace.finish(error=True)
+            raise
+        if own:
+            trace.finish()
+
+    def is_point_lookup(self, query) -> bool:
+        """Whether a statement is a SELECT of at most one row found through the primary key or a unique column."""
+        if not isinstance(query, Select) or query.join or query.group_by or query.order_by:
+            return False
+        if any(isinstance(item, Aggregate) for item in query.columns):
+            return False
+        table = self.crud.table_repo.find_by_name(query.table)
+        if table is None:
+            return False
+        keys = set(table.unique_indexes)
+        if table.primary_key_column is not None:
+            keys.add(table.primary_key_column.name)
+        return any(isinstance(term, Comparison) and term.op == '=' and term.column in keys
+                   for term in conjuncts(normalize(query.where)))
+
+    def stream(self, query, session: Optional[Session] = None, trace: Optional[QueryTrace] = None) -> RowStream:
+        """Run a statement and return its rows as an iterator.
+
+        A SELECT is run lazily: each row is computed as the stream is advanced, so memory
+        use does not grow with the size of the result. Its read locks are held until the
+        stream is exhausted or closed, and the session must not run another statement
+        before then. Other statements run at once.
+
+        A SELECT's 'execute' stage lasts until the stream is closed, so it includes the
+        time the reader spends between rows, and its trace is finished then.
+        """
+        session = session or self.session
+        if not isinstance(query, Select):
+            result = self.execute(query, session, trace=trace)
+            return RowStream(iter(result if isinstance(result, list) else []))
+        own = trace is None
+        if own:
+            trace = self.trace()
+        trace.start('select')
+        reads, writes, catalog_write = self._lock_sets(query)
+        locks = ExitStack()
+        try:
+            with trace.stage('lock'):
+                locks.enter_context(self._locked(session, reads, writes, catalog_write))
+            with trace.stage('plan'):
+                plan = self._plan(query, session)
+                rows = trace.counted(plan.iterate())
+        except BaseException:
+            locks.close()
+            if own:
+                trace.finish(error=True)
+            raise
+        started = time.perf_counter()
+
+        def release():
+            locks.close()
+            trace.add_stage('execute', time.perf_counter() - started)
+            trace.count_scans(*scan_counts(plan))
+            trace.finish()
+        return RowStream(rows, release)
+
+    def fetch_page(self, query: Select, offset: int, page_size: int, session: Optional[Session] = None,
+                   trace: Optional[QueryTrace] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """Rows offset .. offset + page_size of a SELECT's result, and whether any follow.
+
+        The page is its own statement, with the query's LIMIT and OFFSET narrowed to it, so
+        no state is kept between pages. Without an ORDER BY on a unique column, a table
+        changed between pages can make rows shift from one page to another.
+        """
+        if page_size < 1 or offset < 0:
+            raise ValueError("Pages need a positive size and a non-negative offset")
+        limit = page_size + 1
+        if query.limit is not None:
+            limit = min(limit, max(query.limit - offset, 0))
+        page = Select(query.table, query.columns, query.join, query.where, query.group_by, query.order_by,
+                      limit, (query.offset or 0) + offset)
+        rows = self.execute(page, session, trace=trace)
+        return rows[:page_size], len(rows) > page_size
+
+    def begin(self, session: Optional[Session] = None):
+        session = session or self.session
+        if session.transaction is not None:
+            raise ValueError("A transaction is already in progress")
+        session.transaction = Transaction(self.crud.table_repo)
 
-    def execute(self, query: Dict[str, Any]) -> Any:
-        if query['type'] == 'create_table':
+    def commit(self, session: Optional[Session] = None):
+        """Write the transaction's buffered rows and end it; on a constraint violation it is rolled back."""
+        session = session or self.session
+        txn = self._transaction(session)
+        session.transaction = None
+        txn.commit()
+
+    def rollback(self, session: Optional[Session] = None):
+        session = session or self.session
+        txn = self._transaction(session)
+        session.transaction = None
+        txn.rollback()
+
+    def _transaction(self, session: Session) -> Transaction:
+        if session.transaction is None:
+            raise ValueError("No transaction in progress")
+        return session.transaction
+
+    @contextmanager
+    def _locked(self, session: Session, reads=(), writes=(), catalog_write: bool = False,
+                timeout: Optional[float] = None):
+        # Statement-level locks outside a transaction, waiting up to `timeout` seconds. Inside
+        # one, written tables are locked until it ends and only read locks are released after
+        # the statement.
+        txn = session.transaction
+        if txn is None:
+            with self.locks.locked(reads, writes, catalog_write, timeout=timeout):
+                yield
+            return
+        try:
+            try:
+                for name in sorted(set(writes).difference(txn.held)):
+                    lock = self.locks.table_lock(name)
+                    if not lock.acquire_write(self.lock_timeout):
+                        raise LockTimeout(f"Timed out waiting for a lock on {name}")
+                    txn.held[name] = lock
+                with self.locks.locked(reads, held=txn.held, timeout=self.lock_timeout):
+                    yield
+            except LockTimeout as e:
+                txn.rollback()
+                raise LockTimeout(f"{e}; transaction rolled back")
+        finally:
+            if txn.closed:
+                session.transaction = None
+
+    def _execute(self, query, session: Session, trace: QueryTrace = NULL_TRACE) -> Any:
+        txn = session.transaction
+        if self.partitioned and not isinstance(query, (Select, Explain)):
+            partitioned = self.partitioned.get(getattr(query, 'table', None))
+            if partitioned is not None:
+                return self._execute_partitioned(partitioned, query, txn)
+        if isinstance(query, CreateTable):
             columns = []
-            for col_def in query['columns']:
-                dt = DataType(col_def['type'])
-                col = Column(col_def['name'], dt, col_def['primary_key'], col_def['unique'])
+            for col_def in query.columns:
+                dt = DataType(col_def.data_type)
+                col = Column(col_def.name, dt, col_def.primary_key, col_def.unique, col_def.nullable)
                 columns.append(col)
-            self.crud.create_table(query['name'], columns)
-        elif query['type'] == 'insert':
-            table = self.crud.table_repo.find_by_name(query['table'])
-            row_dict = {}
-            for i, val in enumerate(query['values']):
-                col = table.columns[i]
-                row_dict[col.name] = val
-            self.crud.insert(query['table'], row_dict)
-        elif query['type'] == 'select':
-            if query.get('join'):
-                # Perform join
-                rows1 = self.crud.select(query['table'])
-                rows2 = self.crud.select(query['join']['table'])
-                joined = []
-                left_col = query['join']['on']['left']
-                right_col = query['join']['on']['right']
-                # Assume no table prefix for simplicity
-                left_key = left_col.split('.')[1] if '.' in left_col else left_col
-                right_key = right_col.split('.')[1] if '.' in right_col else right_col
-                for r1 in rows1:
-                    for r2 in rows2:
-                        if r1.get(left_key) == r2.get(right_key):
-                            # Merge rows carefully to preserve both tables' fields.
-                            merged = {}
-                            for k, v in r1.items():
-                                merged[k] = v
-                            for k, v in r2.items():
-                                if k in merged:
-                                    # avoid clobbering keys from the left table
-                                    merged[f"{query['join']['table']}_{k}"] = v
-                                else:
-                                    merged[k] = v
-                            joined.append(merged)
-                rows = joined
+            if query.name in self.partitioned:
+                raise ValueError("Table already exists")
+            if query.partition is not None:
+                self._create_partitioned(query, columns)
+            else:
+                self.crud.create_table(query.name, columns, StorageEngine(query.engine))
+        elif isinstance(query, CreateIndex):
+            self.crud.create_index(query.table, query.name, query.column, IndexType(query.index_type))
+        elif isinstance(query, DropIndex):
+            owner = next((t for t in self.partitioned.values() if query.name in t.indexes), None)
+            if query.table is None and owner is not None:
+                owner.drop_index(query.name)
+            else:
+                self.crud.drop_index(query.name, query.table)
+        elif isinstance(query, Insert):
+            table = self._table(query.table)
+            names = query.columns or [col.name for col in table.columns]
+            for values in query.rows:
+                if len(names) != len(values):
+                    raise ValueError(f"Expected {len(names)} values, got {len(values)}")
+            if txn is not None:
+                txn.insert(table, [dict(zip(names, values)) for values in query.rows])
+            elif len(query.rows) == 1:
+                self.crud.insert(query.table, dict(zip(names, query.rows[0])))
+            else:
+                self.crud.bulk_insert(query.table, [dict(zip(names, values)) for values in query.rows])
+        elif isinstance(query, Copy):
+            if not self.allow_copy:
+                raise ValueError("COPY is disabled")
+            table = self._table(query.table)
+            rows = read_rows(query.path, query.format, table.columns, query.columns, query.header)
+            if txn is not None:
+                return txn.insert(table, list(rows))
+            return self.crud.bulk_insert(query.table, rows)
+        elif isinstance(query, Select):
+            if self.result_cache is None or txn is not None or self._reads_partitioned(query):
+                return self._select(query, session, trace)
+            # Read under the statement's locks, so no table can change before the result is cached
+            key = repr(query)
+            versions = tuple(self._table(name).version for name in sorted(self._lock_sets(query)[0]))
+            rows = self.result_cache.get(key, versions)
+            if rows is None:
+                rows = self._select(query, session, trace)
+                self.result_cache.put(key, versions, rows)
             else:
-                rows = self.crud.select(query['table'], query.get('where'))
-            if query.get('where') and query.get('join'):
-                # Apply where after join
-                rows = [r for r in rows if all(r.get(k) == v for k, v in query['where'].items())]
-            if query['columns'] == ['*']:
-                return rows
+                trace.count_returned(len(rows))
+            return rows
+        elif isinstance(query, Explain):
+            start = time.perf_counter()
+            plan = self._plan(query.statement, session)
+            planning_time = time.perf_counter() - start
+            execution_time = 0.0
+            if query.analyze:
+                plan.instrument()
+                start = time.perf_counter()
+                plan.run()
+                execution_time = time.perf_counter() - start
+            return explain(plan, query.analyze, planning_time, execution_time)
+        elif isinstance(query, Analyze):
+            table = self._table(query.table)
+            table.statistics = collect_statistics(table)
+        elif isinstance(query, Update):
+            table = self._table(query.table)
+            if txn is not None:
+                txn.flush(query.table)
+                txn.update_rows(table, matching_row_ids(table, query.where), query.assignments)
+            else:
+                self.crud.update_rows(query.table, matching_row_ids(table, query.where), query.assignments)
+        elif isinstance(query, Delete):
+            table = self._table(query.table)
+            if txn is not None:
+                txn.flush(query.table)
+                txn.delete_rows(table, matching_row_ids(table, query.where))
+            else:
+                self.crud.delete_rows(query.table, matching_row_ids(table, query.where))
+        elif isinstance(query, Prepare):
+            # Runs outside this statement's locks; see _lock_sets
+            self.prepare(query.statement, query.parameters, query.name, session)
+        elif isinstance(query, Execute):
+            return self.execute_prepared(query.name, query.values, session)
+        elif isinstance(query, Deallocate):
+            self.deallocate(query.name)
+        else:
+            raise ValueError("Unsupported SQL statement")
+        return None
+
+    def _create_partitioned(self, query: CreateTable, columns: List[Column]):
+        spec = query.partition
+        if self.crud.table_repo.find_by_name(query.name) is not None:
+            raise ValueError("Table already exists")
+        schema = Table(query.name, columns)
+        key = schema.column_map.get(spec.column)
+        if key is None:
+            raise ValueError(f"Unknown column {spec.column}")
+        if not key.primary_key:
+            raise ValueError("Tables are partitioned by their primary key")
+        if any(col.unique for col in columns):
+            # Each partition could only check its own rows
+            raise ValueError("Partitioned tables cannot have UNIQUE columns")
+        for bound in spec.bounds:
+            key.validate_value(bound)
+        partitioning = make_partitioning(spec.method, spec.column, spec.count, spec.bounds)
+        if self.partition_pool is None:
+            self.partition_pool = PartitionPool()
+        table = PartitionedTable(schema, partitioning, self.partition_pool)
+        table.create(query.engine, query.columns)
+        self.partitioned[query.name] = table
+
+    def _execute_partitioned(self, table: PartitionedTable, query, txn: Optional[Transaction]) -> Any:
+        # Writes and DDL on a partitioned table; SELECTs are planned by _partitioned_plan
+        if txn is not None:
+            raise ValueError("Partitioned tables cannot be used inside a transaction")
+        if isinstance(query, Insert):
+            names = query.columns or [col.name for col in table.schema.columns]
+            for values in query.rows:
+                if len(names) != len(values):
+                    raise ValueError(f"Expected {len(names)} values, got {len(values)}")
+            table.insert([dict(zip(names, values)) for values in query.rows])
+        elif isinstance(query, Copy):
+            if not self.allow_copy:
+                raise ValueError("COPY is disabled")
+            return table.insert(list(read_rows(query.path, query.format, table.schema.columns, query.columns,
+                                               query.header)))
+        elif isinstance(query, Update):
+            if table.partitioning.column in query.assignments:
+                table.update_key(query, normalize(query.where))
+            else:
+                table.modify(query, normalize(query.where))
+        elif isinstance(query, Delete):
+            table.modify(query, normalize(query.where))
+        elif isinstance(query, CreateIndex):
+            table.create_index(query)
+        elif isinstance(query, DropIndex):
+            table.drop_index(query.name)
+        elif isinstance(query, Analyze):
+            # For the partitions' own planners
+            table.broadcast(query)
+        else:
+            raise ValueError("Unsupported SQL statement")
+        return None
+
+    def _partitioned_plan(self, query: Select) -> PlanNode:
+        # Scattered to the partitions of the tables the query reads and gathered back here
+        left = self.partitioned.get(query.table)
+        right = self.partitioned.get(query.join.table) if query.join else None
+        left_schema = left.schema if left else self._table(query.table)
+        if not query.join:
+            partitions = left.partitioning.partitions_for(normalize(query.where))
+            return plan_gathered(
+                query, left_schema, None,
+                lambda columns, limit: left.rows(query, columns, limit, partitions),
+                lambda columns, group_by, aggregates: left.groups(query, columns, group_by, aggregates, partitions),
+                left.describe(partitions), self.sort_memory)
+        right_schema = right.schema if right else self._table(query.join.table)
+        left_key, right_key = resolve_join_keys(left_schema, right_schema, query.join.left, query.join.right)
+        left_where, right_where = pushed_down(query, left_schema, right_schema)
+        if (left and right and left.partitioning.same_layout(right.partitioning)
+                and (left_key, right_key) == (left.partitioning.column, right.partitioning.column)):
+            # Matching keys are in the same worker, which joins its two partitions itself
+            partitions = sorted(set(left.partitioning.partitions_for(left_where))
+                                & set(right.partitioning.partitions_for(right_where)))
+            return plan_gathered(
+                query, left_schema, right_schema,
+                lambda columns, limit: left.rows(query, None, limit, partitions),
+                lambda columns, group_by, aggregates: left.groups(query, None, group_by, aggregates, partitions),
+                f"{left.describe(partitions)} joined to {right.name}", self.sort_memory)
+        # Otherwise the partitioned tables' matching rows are gathered and joined here
+        left_table = left.gather_table(left_where) if left else left_schema
+        right_table = right.gather_table(right_where) if right else right_schema
+        return plan_select(query, left_table, right_table, left_key, right_key, self.execution_mode,
+                           self.batch_size, self.sort_memory)
+
+    def _select(self, query: Select, session: Session, trace: QueryTrace) -> List[Dict[str, Any]]:
+        with trace.stage('plan'):
+            plan = self._plan(query, session)
+        with trace.stage('execute'):
+            rows = plan.run()
+        if trace.enabled:
+            trace.count_scans(*scan_counts(plan))
+            trace.count_returned(len(rows))
+        return rows
+
+    def prepare(self, statement, parameters: List[Optional[str]], name: Optional[str] = None,
+                session: Optional[Session] = None) -> str:
+        """Keep a parsed statement under a handle; returns the handle."""
+        with self._locked(session or self.session, reads=[statement.table]):
+            table = self.crud.table_repo.find_by_name(statement.table)
+            if table is None and statement.table in self.partitioned:
+                table = self.partitioned[statement.table].schema
+            prepared = PreparedStatement(name, statement, parameters, table)
+        with self._prepared_lock:
+            if name is None:
+                while f"stmt_{self._next_handle}" in self.prepared:
+                    self._next_handle += 1
+                name = f"stmt_{self._next_handle}"
+            prepared.name = name
+            self.prepared[name] = prepared
+        return name
+
+    def execute_prepared(self, name: str, params: Union[None, List[Any], Dict[str, Any]] = None,
+                         session: Optional[Session] = None, trace: Optional[QueryTrace] = None) -> Any:
+        session = session or self.session
+        prepared = self._prepared(name)
+        if prepared.is_insert:
+            with self._traced(trace, prepared.statement) as trace:
+                rows = prepared.build_rows(prepared.bind_values(params))
+                with trace.stage('execute'):
+                    self._insert_prepared(prepared, rows, session)
+            return None
+        return self.execute(prepared.bind(prepared.bind_values(params)), session, trace=trace)
+
+    def execute_many(self, name: str, param_sets: Iterable[Union[List[Any], Dict[str, Any]]],
+                     session: Optional[Session] = None) -> int:
+        """Execute a prepared statement once per parameter set, all or nothing; returns the number of sets.
+
+        An INSERT's rows are validated first and inserted as one batch. Other statements
+        run one after another, in a transaction of their own unless the session has one open.
+        """
+        session = session or self.session
+        prepared = self._prepared(name)
+        count = 0
+        if prepared.is_insert:
+            rows = []
+            for params in param_sets:
+                rows.extend(prepared.build_rows(prepared.bind_values(params)))
+                count += 1
+            if rows:
+                with self._traced(None, prepared.statement) as trace, trace.stage('execute'):
+                    self._insert_prepared(prepared, rows, session)
+            return count
+        own_transaction = session.transaction is None
+        if own_transaction:
+            self.begin(session)
+        try:
+            for params in param_sets:
+                self.execute(prepared.bind(prepared.bind_values(params)), session)
+                count += 1
+        except BaseException:
+            if own_transaction and session.transaction is not None:
+                self.rollback(session)
+            raise
+        if own_transaction:
+            self.commit(session)
+        return count
+
+    def _prepared(self, name: str) -> PreparedStatement:
+        prepared = self.prepared.get(name)
+        if prepared is None:
+            raise ValueError(f"Prepared statement {name} not found")
+        return prepared
+
+    def _insert_prepared(self, prepared: PreparedStatement, rows: List[Dict[str, Any]], session: Session):
+        table = prepared.statement.table
+        with self._locked(session, writes=[table]):
+            if table in self.partitioned:
+                if session.transaction is not None:
+                    raise ValueError("Partitioned tables cannot be used inside a transaction")
+                self.partitioned[table].insert(rows, validate=False)
+            elif session.transaction is not None:
+                session.transaction.insert(self._table(table), rows, validate=False)
+            elif len(rows) == 1:
+                self.crud.insert(table, rows[0], validate=False)
             else:
-                return [{k: r[k] for k in query['columns'] if k in r} for r in rows]
-        elif query['type'] == 'update':
-            self.crud.update(query['table'], query['pk_val'], query['updates'])
-        elif query['type'] == 'delete':
-            self.crud.delete(query['table'], query['pk_val'])
-        return None
\ No newline at end of file
+                self.crud.bulk_insert(table, rows, validate=False)
+
+    def deallocate(self, name: str):
+        with self._prepared_lock:
+            if self.prepared.pop(name, None) is None:
+                raise ValueError(f"Prepared statement {name} not found")
+
+    def _plan(self, query: Select, session: Session) -> PlanNode:
+        plan = self._build_plan(query, session.transaction)
+        if session.cancel_event is not None:
+            plan.cancel_on(session.cancel_event)
+        return plan
+
+    def _build_plan(self, query: Select, txn: Optional[Transaction]) -> PlanNode:
+        if self._reads_partitioned(query):
+            if txn is not None:
+                raise ValueError("Partitioned tables cannot be used inside a transaction")
+            return self._partitioned_plan(query)
+        if txn is not None:
+            # The transaction's own buffered rows must be visible to it
+            txn.flush(query.table)
+            if query.join:
+                txn.flush(query.join.table)
+        left = self._table(query.table)
+        if not query.join:
+            return plan_select(query, left, None, execution_mode=self.execution_mode, batch_size=self.batch_size,
+                               sort_memory=self.sort_memory)
+        right = self._table(query.join.table)
+        left_key, right_key = resolve_join_keys(left, right, query.join.left, query.join.right)
+        return plan_select(query, left, right, left_key, right_key, self.execution_mode, self.batch_size,
+                           self.sort_memory)
+
+    @staticmethod
+    def _lock_sets(query) -> Tuple[Set[str], Set[str], bool]:
+        """Tables a statement reads, tables it writes, and whether it changes the catalog."""
+        if isinstance(query, Explain):
+            query = query.statement
+        if isinstance(query, (Insert, Copy, Update, Delete, CreateIndex)):
+            return set(), {query.table}, False
+        if isinstance(query, Select):
+            return {query.table, query.join.table} if query.join else {query.table}, set(), False
+        if isinstance(query, DropIndex):
+            # Without a table name the index is looked for in every table
+            return (set(), {query.table}, False) if query.table else (set(), set(), True)
+        if isinstance(query, CreateTable):
+            return set(), set(), True
+        if isinstance(query, Analyze):
+            return {query.table}, set(), False
+        # PREPARE, EXECUTE and DEALLOCATE lock what they run themselves
+        return set(), set(), False
+
+    def _reads_partitioned(self, query: Select) -> bool:
+        return bool(self.partitioned) and (query.table in self.partitioned
+                                           or query.join is not None and query.join.table in self.partitioned)
+
+    def _table(self, name: str):
+        table = self.crud.table_repo.find_by_name(name)
+        if not table:
+            raise ValueError("Table not found")
+        return table
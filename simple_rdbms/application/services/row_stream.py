@@ -0,0 +1,48 @@
+from typing import Any, Callable, Dict, Iterator, Optional
+
+Row = Dict[str, Any]
+
+
+class RowStream:
+    """The rows of a statement, produced as they are read.
+
+    `release` runs once, when the rows run out, when reading them fails or when the
+    stream is closed, whichever comes first. QueryService passes a function that
+    releases the statement's locks, so a stream that is dropped half-read must still
+    be closed (or used in a `with` block) to let writers in.
+    """
+
+    def __init__(self, rows: Iterator[Row], release: Optional[Callable[[], None]] = None):
+        self._rows = rows
+        self._release = release
+
+    def __iter__(self) -> 'RowStream':
+        return self
+
+    def __next__(self) -> Row:
+        if self._rows is None:
+            raise StopIteration
+        try:
+            return next(self._rows)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        rows, self._rows = self._rows, None
+        if hasattr(rows, 'close'):
+            # Lets the plan's generators clean up, e.g. an external sort's temporary files
+            rows.close()
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def __enter__(self) -> 'RowStream':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        # A last resort for streams nobody closed
+        self.close()
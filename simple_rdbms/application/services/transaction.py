@@ -0,0 +1,159 @@
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from domain.entities.table import Table
+from infrastructure.concurrency.rw_lock import RWLock
+from infrastructure.repositories.table_repository import TableRepository
+
+Row = Dict[str, Any]
+
+# Undo log entry kinds
+_INSERTED = 'inserted'
+_UPDATED = 'updated'
+_DELETED = 'deleted'
+
+
+class Transaction:
+    """The changes one session makes between BEGIN and COMMIT or ROLLBACK.
+
+    INSERTs are type-checked when issued but only buffered. A table's buffered rows
+    are written by one Table.insert_batch call at COMMIT, or earlier if a later statement
+    of the transaction reads or changes that table. That call checks key and unique
+    constraints and updates every index once for the whole batch. UPDATE and DELETE
+    apply at once. Everything written is recorded in an undo log, which ROLLBACK
+    replays backwards.
+
+    A constraint violation found while writing buffered rows rolls the whole
+    transaction back. The storage transaction makes the changes durable together,
+    with one WAL commit. Tables in `held` have been written and stay locked
+    exclusively until the transaction ends.
+    """
+
+    def __init__(self, table_repo: TableRepository):
+        self.table_repo = table_repo
+        self.storage_txn = table_repo.begin_transaction()
+        # Buffered rows per table name
+        self.pending: Dict[str, List[Row]] = {}
+        self.undo: List[Tuple[str, Table, Any]] = []
+        # Tables written so far, enlisted in the storage transaction
+        self.written: Dict[str, Table] = {}
+        # Table name -> exclusive lock held until the end
+        self.held: Dict[str, RWLock] = {}
+        self.closed = False
+
+    def insert(self, table: Table, rows: List[Row], validate: bool = True) -> int:
+        if validate:
+            table.validate_rows(rows)
+        self._enlist(table)
+        self.pending.setdefault(table.name, []).extend(rows)
+        return len(rows)
+
+    def update(self, table: Table, pk_value, updates: Row):
+        self.flush(table.name)
+        row = table.get_row_by_pk(pk_value)
+        if row is None:
+            raise ValueError("Row not found")
+        self._enlist(table)
+        old_values = {name: row.get(name) for name in updates}
+        table.update_row(pk_value, updates)
+        pk_col = table.primary_key_column
+        self.undo.append((_UPDATED, table, (updates.get(pk_col.name, pk_value), old_values)))
+
+    def update_rows(self, table: Table, row_ids: List[int], updates: Row):
+        """Apply updates to several rows; they are undone by primary key."""
+        pk_col = table.primary_key_column
+        if pk_col is None:
+            raise ValueError("UPDATE inside a transaction needs a table with a primary key")
+        table.validate_updates(updates, len(row_ids))
+        keys = [table.store.get(row_id).get(pk_col.name) for row_id in row_ids]
+        for key in keys:
+            self.update(table, key, updates)
+
+    def delete_rows(self, table: Table, row_ids: List[int]):
+        self.flush(table.name)
+        if not row_ids:
+            return
+        self._enlist(table)
+        rows = [dict(table.store.get(row_id)) for row_id in row_ids]
+        # Compaction waits for the end of the transaction, when no undo entry holds a row id
+        table.remove_rows(row_ids)
+        self.undo.extend((_DELETED, table, row) for row in rows)
+
+    def flush(self, name: str):
+        """Write the table's buffered rows, so the transaction's next statement sees them."""
+        rows = self.pending.pop(name, None)
+        if not rows:
+            return
+        table = self.written[name]
+        try:
+            row_ids = table.insert_batch(rows)
+        except ValueError as e:
+            self.rollback()
+            raise ValueError(f"{e}; transaction rolled back")
+        pk_col = table.primary_key_column
+        # Primary keys survive compaction and row moves; tables without one can only be inserted into
+        keys = [row.get(pk_col.name) for row in rows] if pk_col else row_ids
+        self.undo.append((_INSERTED, table, keys))
+
+    def commit(self):
+        for name in list(self.pending):
+            self.flush(name)
+        self._compact()
+        self._end()
+
+    def rollback(self):
+        self.pending = {}
+        # Every entry is attempted even if one fails, so one bad entry cannot leave the rest
+        # of the transaction applied.
+        failures = []
+        try:
+            for kind, table, data in reversed(self.undo):
+                try:
+                    self._undo(kind, table, data)
+                except (ValueError, KeyError) as e:
+                    failures.append(f"{kind} row in {table.name}: {e}")
+            self.undo = []
+            self._compact()
+        finally:
+            self._end()
+        if failures:
+            raise ValueError("Rollback could not undo " + "; ".join(failures))
+
+    @staticmethod
+    def _undo(kind: str, table: Table, data):
+        if kind == _INSERTED:
+            pk_col = table.primary_key_column
+            row_ids = [table.primary_key_index[key] for key in data] if pk_col else data
+            table.remove_rows(row_ids)
+        elif kind == _UPDATED:
+            pk_value, old_values = data
+            table.update_row(pk_value, old_values)
+        else:
+            table.insert_row(data, validate=False)
+
+    def _compact(self):
+        # remove_rows leaves compaction to the end, when no undo entry holds a row id
+        for table in self.written.values():
+            if table.store.needs_compaction():
+                table.compact()
+
+    def _enlist(self, table: Table):
+        if table.name not in self.written:
+            self.table_repo.enlist(self.storage_txn, table)
+            self.written[table.name] = table
+
+    def _end(self):
+        # Undo records are logged under the storage transaction too, so a rollback commits them
+        self.table_repo.commit_transaction(self.storage_txn)
+        for lock in self.held.values():
+            lock.release_write()
+        self.held = {}
+        self.closed = True
+
+
+class Session:
+    """Per-client state for QueryService, e.g. one REPL or one connection."""
+
+    def __init__(self, cancel_event: Optional[threading.Event] = None):
+        self.transaction: Optional[Transaction] = None
+        # Setting this event makes the session's running SELECT fail with QueryCancelled
+        self.cancel_event = cancel_event
@@ -0,0 +1,66 @@
+"""Batch execution benchmark: run with `python -m benchmarks.bench_batch [rows]`.
+
+Runs full-scan SELECTs through QueryService on a ROW table evaluated one dict at a
+time and on a COLUMNAR table evaluated in NumPy batches (and with the pure-Python
+batch fallback).
+"""
+import sys
+import time
+from domain.entities.column import Column
+from domain.value_objects.data_type import DataType
+from domain.value_objects.storage_engine import StorageEngine
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+from infrastructure.repositories.table_repository import TableRepository
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from application.execution import batch
+from infrastructure.parsers.sql_ast import Select, Comparison, And
+
+CITIES = ['Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret', 'Thika', 'Malindi', 'Kitale']
+
+QUERIES = [
+    ("city = 'Kisumu'", ['*'], {'city': 'Kisumu'}),
+    ("quantity = 42", ['*'], {'quantity': 42}),
+    ("quantity = 42 AND paid", ['id', 'amount'], {'quantity': 42, 'paid': True}),
+    ("project id, amount", ['id', 'amount'], None),
+]
+
+
+def load(engine: StorageEngine, n: int) -> CrudService:
+    crud = CrudService(TableRepository(InMemoryStorage()))
+    crud.create_table('sales', [
+        Column('id', DataType.INTEGER, primary_key=True),
+        Column('amount', DataType.FLOAT),
+        Column('city', DataType.VARCHAR),
+        Column('paid', DataType.BOOLEAN),
+        Column('quantity', DataType.INTEGER),
+    ], engine)
+    table = crud.table_repo.find_by_name('sales')
+    for i in range(n):
+        table.insert_row({'id': i, 'amount': i * 0.5, 'city': CITIES[i % 8], 'paid': i % 3 == 0, 'quantity': i % 97})
+    return crud
+
+
+def timed(service: QueryService, columns, where) -> float:
+    query = Select('sales', columns, where=And([Comparison(k, '=', v) for k, v in where.items()]) if where else None)
+    start = time.perf_counter()
+    service.execute(query)
+    return time.perf_counter() - start
+
+
+def main(n: int):
+    row_service = QueryService(load(StorageEngine.ROW, n), batch.ROW_MODE)
+    batch_service = QueryService(load(StorageEngine.COLUMNAR, n), batch.BATCH_MODE)
+    numpy = batch.np
+    print(f"{'query':<26} {'row (s)':>9} {'numpy (s)':>10} {'python (s)':>11} {'speedup':>8}")
+    for label, columns, where in QUERIES:
+        row_time = timed(row_service, columns, where)
+        numpy_time = timed(batch_service, columns, where) if numpy is not None else float('nan')
+        batch.np = None
+        python_time = timed(batch_service, columns, where)
+        batch.np = numpy
+        print(f"{label:<26} {row_time:>9.3f} {numpy_time:>10.3f} {python_time:>11.3f} {row_time / numpy_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
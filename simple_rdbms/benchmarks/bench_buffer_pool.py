@@ -0,0 +1,81 @@
+"""Buffer pool benchmark: run with `python -m benchmarks.bench_buffer_pool [rows] [pool_mib]`.
+
+Loads a disk table several times larger than the buffer pool, then mixes point lookups
+on a hot set of keys with full table scans. It reports the hot-lookup hit rate and
+lookup throughput when scans use the sequential path, and when every scanned page is
+pulled into the pool as an ordinary fetch would do.
+"""
+import random
+import shutil
+import sys
+import tempfile
+import time
+from infrastructure.storage.disk_storage import DiskStorage
+from infrastructure.repositories.table_repository import TableRepository
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.parsers.sql_parser import SqlParser
+
+
+def load(path: str, rows: int, pool_bytes: int) -> DiskStorage:
+    storage = DiskStorage(path, fsync_policy='off', buffer_pool_bytes=pool_bytes)
+    query_svc = QueryService(CrudService(TableRepository(storage)))
+    parser = SqlParser()
+    query_svc.execute(parser.parse("CREATE TABLE events (id INTEGER PRIMARY KEY, kind VARCHAR, payload VARCHAR)"))
+    for start in range(0, rows, 5000):
+        query_svc.execute(parser.parse("INSERT INTO events VALUES " + ", ".join(
+            f"({i}, 'kind{i % 10}', '{'x' * 60}')" for i in range(start, min(start + 5000, rows)))))
+    storage.checkpoint()
+    return storage
+
+
+def pooled_scan(store):
+    # A scan without the sequential hint: every page takes a frame like a point lookup would.
+    for page_no in range(store.page_count):
+        store.pool.unpin(store._fetch(page_no))
+
+
+def run_mix(storage: DiskStorage, hot_keys, sequential: bool, rounds: int = 10, lookups: int = 2_000):
+    table = storage.get_table('events')
+    pool = storage.buffer_pool
+    for key in hot_keys:
+        table.get_row_by_pk(key)
+    hits = misses = 0
+    elapsed = 0.0
+    for _ in range(rounds):
+        if sequential:
+            sum(1 for _ in table.store)
+        else:
+            pooled_scan(table.store)
+        before = pool.hits, pool.misses
+        start = time.perf_counter()
+        for key in random.choices(hot_keys, k=lookups):
+            table.get_row_by_pk(key)
+        elapsed += time.perf_counter() - start
+        hits += pool.hits - before[0]
+        misses += pool.misses - before[1]
+    label = "sequential scans" if sequential else "pooled scans"
+    print(f"{label:<18} hot hit rate {hits / (hits + misses):6.1%} "
+          f"{rounds * lookups / elapsed:>10,.0f} lookups/s  evictions {pool.evictions:,}")
+
+
+def main(rows: int, pool_mib: int):
+    path = tempfile.mkdtemp()
+    try:
+        storage = load(path, rows, pool_mib * 2 ** 20)
+        store = storage.get_table('events').store
+        print(f"{rows:,} rows in {store.page_count:,} pages; pool holds {storage.buffer_pool.capacity:,} pages")
+        # Hot keys spread over about half the pool's worth of pages
+        per_page = rows // store.page_count
+        hot_keys = [page * per_page for page in random.sample(range(store.page_count), storage.buffer_pool.capacity // 2)]
+        for sequential in (True, False):
+            run_mix(storage, hot_keys, sequential)
+        print(storage.stats())
+        storage.close()
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(args[0] if args else 300_000, args[1] if len(args) > 1 else 4)
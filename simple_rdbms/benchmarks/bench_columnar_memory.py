@@ -0,0 +1,58 @@
+"""Memory benchmark: run with `python -m benchmarks.bench_columnar_memory [rows]`.
+
+Loads the same rows into a ROW table (one dict per row) and a COLUMNAR table and
+reports the memory allocated by each, measured with tracemalloc. Primary key index
+memory is identical for both engines and is included in the totals.
+"""
+import gc
+import sys
+import tracemalloc
+from domain.entities.column import Column
+from domain.entities.table import Table
+from domain.value_objects.data_type import DataType
+from domain.value_objects.storage_engine import StorageEngine
+from infrastructure.storage.store_factory import create_store
+
+CITIES = ['Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret', 'Thika', 'Malindi', 'Kitale']
+
+
+def columns():
+    return [
+        Column('id', DataType.INTEGER, primary_key=True),
+        Column('amount', DataType.FLOAT),
+        Column('city', DataType.VARCHAR),
+        Column('paid', DataType.BOOLEAN),
+        Column('quantity', DataType.INTEGER),
+    ]
+
+
+def measure(engine: StorageEngine, n: int):
+    gc.collect()
+    tracemalloc.start()
+    cols = columns()
+    table = Table('sales', cols, create_store(engine, cols))
+    for i in range(n):
+        table.insert_row({
+            'id': i,
+            'amount': i * 1.25,
+            'city': CITIES[i % len(CITIES)],
+            'paid': i % 3 == 0,
+            'quantity': None if i % 10 == 0 else i % 97,
+        })
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, table
+
+
+def main(n: int):
+    results = {}
+    for engine in (StorageEngine.ROW, StorageEngine.COLUMNAR):
+        size, table = measure(engine, n)
+        results[engine] = size
+        print(f"{engine.value:<9} {size / 2 ** 20:>9.1f} MiB {size / n:>8.1f} bytes/row")
+        del table
+    print(f"columnar uses {results[StorageEngine.COLUMNAR] / results[StorageEngine.ROW]:.0%} of the row engine's memory")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
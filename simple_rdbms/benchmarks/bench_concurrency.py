@@ -0,0 +1,92 @@
+"""Concurrency benchmark: run with `python -m benchmarks.bench_concurrency [seconds] [write_pct]`.
+
+Threads share one QueryService and run a mix of prepared primary-key SELECTs and
+UPDATEs against one table for a fixed time. It reports statements per second, split
+into reads and writes, at 1 to 32 threads for in-memory storage and for disk storage
+with the `always` and `off` fsync policies.
+
+Python threads share the interpreter lock, so CPU-bound statements do not run in
+parallel and the numbers show what locking costs as contention grows rather than a
+speedup. Writers to one table also hold its lock through the WAL fsync, so with
+`always` their commits cannot share an fsync.
+"""
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.disk_storage import DiskStorage
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+
+ROWS = 10_000
+THREADS = (1, 2, 4, 8, 16, 32)
+
+
+def setup(storage):
+    query_svc = QueryService(CrudService(TableRepository(storage)))
+    parser = SqlParser()
+    query_svc.execute(parser.parse("CREATE TABLE accounts (id INTEGER PRIMARY KEY, owner VARCHAR, balance INTEGER)"))
+    query_svc.execute(parser.parse("INSERT INTO accounts VALUES " + ", ".join(
+        f"({i}, 'owner{i % 100}', 100)" for i in range(ROWS))))
+    return query_svc, parser
+
+
+def worker(query_svc, parser, deadline, write_pct, counts, seed):
+    rng = random.Random(seed)
+    read = parser.parse_prepared("SELECT * FROM accounts WHERE id = ?")
+    write = parser.parse_prepared("UPDATE accounts SET balance = ? WHERE id = ?")
+    read_handle = query_svc.prepare(*read)
+    write_handle = query_svc.prepare(*write)
+    reads = writes = 0
+    while time.perf_counter() < deadline:
+        key = rng.randrange(ROWS)
+        if rng.randrange(100) < write_pct:
+            query_svc.execute_prepared(write_handle, [rng.randrange(1000), key])
+            writes += 1
+        else:
+            query_svc.execute_prepared(read_handle, [key])
+            reads += 1
+    counts.append((reads, writes))
+
+
+def run(query_svc, parser, threads: int, seconds: float, write_pct: int):
+    counts = []
+    deadline = time.perf_counter() + seconds
+    pool = [threading.Thread(target=worker, args=(query_svc, parser, deadline, write_pct, counts, n))
+            for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    reads = sum(c[0] for c in counts)
+    writes = sum(c[1] for c in counts)
+    return reads / seconds, writes / seconds
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    write_pct = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f"{ROWS:,} rows, {write_pct}% writes, {seconds:g}s per run")
+    print(f"{'storage':<14}{'threads':>8}{'stmts/s':>12}{'reads/s':>12}{'writes/s':>12}")
+    configs = [('memory', None), ('disk always', 'always'), ('disk off', 'off')]
+    for label, fsync in configs:
+        path = tempfile.mkdtemp() if fsync else None
+        storage = DiskStorage(path, fsync_policy=fsync) if fsync else InMemoryStorage()
+        try:
+            query_svc, parser = setup(storage)
+            for threads in THREADS:
+                reads, writes = run(query_svc, parser, threads, seconds, write_pct)
+                print(f"{label:<14}{threads:>8}{reads + writes:>12,.0f}{reads:>12,.0f}{writes:>12,.0f}")
+        finally:
+            if fsync:
+                storage.close()
+                shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main()
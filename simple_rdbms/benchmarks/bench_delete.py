@@ -0,0 +1,48 @@
+"""Delete benchmark: run with `python -m benchmarks.bench_delete [rows] [deletes]`.
+
+Deletes rows from a table with a unique column and a secondary index, then checks
+that every primary key lookup still returns the right row.
+"""
+import random
+import sys
+import time
+from domain.entities.column import Column
+from domain.entities.table import Table
+from domain.value_objects.data_type import DataType
+from domain.value_objects.index_type import IndexType
+
+
+def main(n: int, deletes: int):
+    table = Table('accounts', [
+        Column('id', DataType.INTEGER, primary_key=True),
+        Column('email', DataType.VARCHAR, unique=True),
+        Column('region', DataType.INTEGER),
+    ])
+    start = time.perf_counter()
+    for i in range(n):
+        table.insert_row({'id': i, 'email': f'user{i}@example.com', 'region': i % 50})
+    table.create_index('idx_region', 'region', IndexType.HASH)
+    print(f"loaded {n:,} rows in {time.perf_counter() - start:.2f} s")
+
+    victims = random.sample(range(n), deletes)
+    start = time.perf_counter()
+    for pk in victims:
+        table.delete_row(pk)
+    elapsed = time.perf_counter() - start
+    print(f"deleted {deletes:,} rows in {elapsed:.2f} s ({deletes / elapsed:,.0f} deletes/s)")
+
+    deleted = set(victims)
+    start = time.perf_counter()
+    for pk in range(n):
+        row = table.get_row_by_pk(pk)
+        if pk in deleted:
+            assert row is None, pk
+        else:
+            assert row is not None and row['id'] == pk, pk
+    print(f"verified {n:,} PK lookups in {time.perf_counter() - start:.2f} s")
+    assert len(table.store) == n - deletes
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(args[0] if args else 1_000_000, args[1] if len(args) > 1 else 100_000)
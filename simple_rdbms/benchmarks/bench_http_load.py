@@ -0,0 +1,131 @@
+"""HTTP load test: run with `python -m benchmarks.bench_http_load [seconds] [clients] [rows]`.
+
+Starts the asyncio server (presentation.web.async_server) in its own process, loads a
+table over HTTP and then keeps `clients` keep-alive connections busy for a fixed time,
+each sending one query after another. Queries are primary-key lookups, which the
+server answers on its event loop, or full scans with an aggregate, which go to its
+worker threads. For several shares of scans it reports queries per second and the
+p50 and p99 latency of each kind of query, plus any 503 and 504 answers.
+
+Worker threads share the interpreter lock with the event loop, so while scans run
+the lookups answered on the loop get slower too; the lookup p99 shows by how much.
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from urllib.request import urlopen
+
+ROWS = 100_000
+CLIENTS = 32
+SCAN_SHARES = (0, 1, 10, 50)
+WORKERS = 4
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int) -> subprocess.Popen:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    server = subprocess.Popen([sys.executable, '-m', 'presentation.web.async_server', '--port', str(port),
+                               '--workers', str(WORKERS), '--max-queue', '1000'], cwd=root,
+                              stdout=subprocess.PIPE)
+    server.stdout.readline()
+    return server
+
+
+class Connection:
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+
+    @classmethod
+    async def open(cls, port: int) -> 'Connection':
+        return cls(*await asyncio.open_connection('127.0.0.1', port))
+
+    async def query(self, sql: str):
+        body = json.dumps({'sql': sql}).encode()
+        self.writer.write(b'POST /query HTTP/1.1\r\nHost: bench\r\nContent-Length: %d\r\n\r\n' % len(body) + body)
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        status = int(head.split(None, 2)[1])
+        length = int(head.lower().split(b'content-length:')[1].split(b'\r\n')[0])
+        payload = json.loads(await self.reader.readexactly(length))
+        return status, payload
+
+    def close(self):
+        self.writer.close()
+
+
+async def load(port: int, rows: int):
+    conn = await Connection.open(port)
+    await conn.query("CREATE TABLE accounts (id INTEGER PRIMARY KEY, owner VARCHAR, balance INTEGER)")
+    for start in range(0, rows, 5000):
+        values = ", ".join(f"({i}, 'owner{i % 100}', {i % 1000})" for i in range(start, min(start + 5000, rows)))
+        status, payload = await conn.query(f"INSERT INTO accounts VALUES {values}")
+        assert status == 200, payload
+    conn.close()
+
+
+async def client(port, deadline, scan_pct, rows, latencies, failures, seed):
+    rng = random.Random(seed)
+    conn = await Connection.open(port)
+    while time.perf_counter() < deadline:
+        if rng.randrange(100) < scan_pct:
+            kind, sql = 'scan', f"SELECT COUNT(*), AVG(balance) FROM accounts WHERE owner = 'owner{rng.randrange(100)}'"
+        else:
+            kind, sql = 'lookup', f"SELECT * FROM accounts WHERE id = {rng.randrange(rows)}"
+        start = time.perf_counter()
+        status, payload = await conn.query(sql)
+        if status == 200:
+            latencies[kind].append(time.perf_counter() - start)
+        else:
+            failures[status] = failures.get(status, 0) + 1
+    conn.close()
+
+
+async def run(port, seconds, clients, scan_pct, rows):
+    latencies = {'lookup': [], 'scan': []}
+    failures = {}
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(client(port, deadline, scan_pct, rows, latencies, failures, n) for n in range(clients)))
+    return latencies, failures
+
+
+def percentile(values, pct) -> str:
+    if not values:
+        return '-'
+    values = sorted(values)
+    return f"{values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000:.1f}ms"
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else CLIENTS
+    rows = int(sys.argv[3]) if len(sys.argv) > 3 else ROWS
+    port = free_port()
+    server = start_server(port)
+    try:
+        asyncio.run(load(port, rows))
+        print(f"{rows} rows, {clients} clients, {WORKERS} workers, {seconds:g} s per mix")
+        print(f"{'scans':>6} {'QPS':>8} {'lookup p50':>11} {'lookup p99':>11} {'scan p50':>9} {'scan p99':>9}  errors")
+        for scan_pct in SCAN_SHARES:
+            latencies, failures = asyncio.run(run(port, seconds, clients, scan_pct, rows))
+            done = len(latencies['lookup']) + len(latencies['scan'])
+            ms = {kind: [percentile(values, p) for p in (50, 99)] for kind, values in latencies.items()}
+            print(f"{scan_pct:>5}% {done / seconds:>8.0f} {ms['lookup'][0]:>11} {ms['lookup'][1]:>11} "
+                  f"{ms['scan'][0]:>9} {ms['scan'][1]:>9}  {failures or '-'}")
+        with urlopen(f"http://127.0.0.1:{port}/health") as response:
+            assert json.loads(response.read()) == {'running': 0, 'queued': 0}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
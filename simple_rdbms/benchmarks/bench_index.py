@@ -0,0 +1,52 @@
+"""Secondary index benchmark: run with `python -m benchmarks.bench_index [rows]`.
+
+Times filtered SELECTs on a non-unique column with no index (full scan), a HASH
+index and a BTREE index, plus BTREE range lookups.
+"""
+import random
+import sys
+import time
+from domain.entities.column import Column
+from domain.entities.table import Table
+from domain.value_objects.data_type import DataType
+from domain.value_objects.index_type import IndexType
+
+
+def build(n: int) -> Table:
+    table = Table('events', [
+        Column('id', DataType.INTEGER, primary_key=True),
+        Column('account', DataType.INTEGER),
+    ])
+    for i in range(n):
+        table.insert_row({'id': i, 'account': i % (n // 10)})
+    return table
+
+
+def timed(label: str, fn, lookups: int):
+    start = time.perf_counter()
+    for _ in range(lookups):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {lookups / elapsed:>12,.0f} lookups/s {elapsed / lookups * 1e6:>10.1f} us/lookup")
+
+
+def main(n: int):
+    table = build(n)
+    keys = [random.randrange(n // 10) for _ in range(1000)]
+    it = iter(keys * 1000)
+    timed("full scan", lambda: table.select_rows({'account': next(it)}), 5)
+
+    for name, kind in (('idx_hash', IndexType.HASH), ('idx_btree', IndexType.BTREE)):
+        start = time.perf_counter()
+        table.create_index(name, 'account', kind)
+        print(f"build {kind.value:<16} {time.perf_counter() - start:>12.3f} s")
+        timed(f"{kind.value} equality", lambda: table.select_rows({'account': next(it)}), len(keys))
+        table.drop_index(name)
+
+    table.create_index('idx_btree', 'account', IndexType.BTREE)
+    index = table.indexes['idx_btree']
+    timed("BTREE range (100 keys)", lambda: index.range(k := next(it), k + 100), len(keys))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
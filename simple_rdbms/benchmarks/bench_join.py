@@ -0,0 +1,41 @@
+"""Join benchmark: run with `python -m benchmarks.bench_join` from the simple_rdbms directory.
+
+Joins two tables of N rows each on a non-indexed column (hash join), on pre-sorted
+columns (sort-merge join) and on a primary key (index nested-loop join). Time per input
+row should stay roughly flat as N doubles, i.e. join time grows linearly.
+"""
+import sys
+import time
+from domain.entities.column import Column
+from domain.entities.table import Table
+from domain.value_objects.data_type import DataType
+from application.execution.joins import join_tables, HASH_JOIN, SORT_MERGE_JOIN, INDEX_NESTED_LOOP_JOIN
+
+
+def build(name: str, n: int) -> Table:
+    table = Table(name, [
+        Column('id', DataType.INTEGER, primary_key=True),
+        Column('fk', DataType.INTEGER),
+        Column('bucket', DataType.INTEGER),
+    ])
+    for i in range(n):
+        table.insert_row({'id': i, 'fk': (i * 7919) % n, 'bucket': i})
+    return table
+
+
+def main(sizes):
+    print(f"{'rows':>10} {'strategy':>18} {'seconds':>10} {'us/row':>8}")
+    for n in sizes:
+        left, right = build('a', n), build('b', n)
+        for strategy, left_key, right_key in ((HASH_JOIN, 'fk', 'fk'),
+                                             (SORT_MERGE_JOIN, 'bucket', 'bucket'),
+                                             (INDEX_NESTED_LOOP_JOIN, 'fk', 'id')):
+            start = time.perf_counter()
+            rows = join_tables(left, right, left_key, right_key, strategy=strategy)
+            elapsed = time.perf_counter() - start
+            assert len(rows) == n
+            print(f"{n:>10} {strategy:>18} {elapsed:>10.3f} {elapsed / n * 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [25_000, 50_000, 100_000, 200_000])
@@ -0,0 +1,86 @@
+"""Load benchmark: run with `python -m benchmarks.bench_load [rows]`.
+
+Loads the same rows into an indexed table four ways -- one INSERT per row, multi-row
+INSERTs of 1,000 tuples, COPY from CSV and COPY from JSONL -- and reports rows/sec.
+"""
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+from infrastructure.repositories.table_repository import TableRepository
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.parsers.sql_parser import SqlParser
+
+SCHEMA = ("CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR UNIQUE, "
+          "age INTEGER, score FLOAT, active BOOLEAN)")
+
+
+def make_db():
+    query_svc = QueryService(CrudService(TableRepository(InMemoryStorage())))
+    parser = SqlParser()
+
+    def run(sql):
+        return query_svc.execute(parser.parse(sql))
+
+    run(SCHEMA)
+    run("CREATE INDEX idx_age ON users (age) USING BTREE")
+    return query_svc, run
+
+
+def make_rows(n: int):
+    return [(i, f'user{i}@example.com', 18 + i % 60, i * 0.5, i % 2 == 0) for i in range(n)]
+
+
+def literal(value) -> str:
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(value)
+
+
+def report(label: str, n: int, elapsed: float, query_svc):
+    assert len(query_svc.crud.table_repo.find_by_name('users').store) == n
+    print(f"{label:<22} {n:>10,} rows {elapsed:>7.2f} s {n / elapsed:>12,.0f} rows/s")
+
+
+def main(n: int):
+    rows = make_rows(n)
+    tuples = [f"({', '.join(literal(v) for v in row)})" for row in rows]
+
+    query_svc, run = make_db()
+    start = time.perf_counter()
+    for values in tuples:
+        run(f"INSERT INTO users VALUES {values}")
+    report("single-row INSERT", n, time.perf_counter() - start, query_svc)
+
+    query_svc, run = make_db()
+    start = time.perf_counter()
+    for i in range(0, n, 1000):
+        run(f"INSERT INTO users VALUES {', '.join(tuples[i:i + 1000])}")
+    report("multi-row INSERT", n, time.perf_counter() - start, query_svc)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'users.csv')
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['id', 'email', 'age', 'score', 'active'])
+            writer.writerows(rows)
+        jsonl_path = os.path.join(tmp, 'users.jsonl')
+        with open(jsonl_path, 'w') as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+
+        for label, path in (("COPY FROM csv", csv_path), ("COPY FROM jsonl", jsonl_path)):
+            query_svc, run = make_db()
+            start = time.perf_counter()
+            run(f"COPY users FROM '{path}'")
+            report(label, n, time.perf_counter() - start, query_svc)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,45 @@
+"""Parser throughput benchmark: run with `python -m benchmarks.bench_parser [seconds]`.
+
+Compares statements/sec of the legacy regex parser, the tokenizer/recursive-descent
+parser with its statement cache disabled, and the same parser answering repeated
+statements from the cache.
+"""
+import sys
+import time
+from benchmarks.legacy_sql_parser import SqlParser as LegacySqlParser
+from infrastructure.parsers.sql_parser import SqlParser
+
+STATEMENTS = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR UNIQUE, age INTEGER)",
+    "INSERT INTO users VALUES (1, 'Alice', 30)",
+    "INSERT INTO orders VALUES (17, 4, 'Garden hose')",
+    "SELECT * FROM users",
+    "SELECT name, age FROM users WHERE id = 1",
+    "SELECT * FROM users JOIN orders ON users.id = orders.user_id WHERE product = 'Book'",
+    "UPDATE users SET age = 31 WHERE id = 1",
+    "DELETE FROM users WHERE id = 2",
+]
+
+
+def throughput(parse, seconds: float) -> float:
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for sql in STATEMENTS:
+            parse(sql)
+        count += len(STATEMENTS)
+    return count / seconds
+
+
+def main(seconds: float):
+    uncached = SqlParser(cache_size=0)
+    cached = SqlParser()
+    for label, parse in (("legacy regex parser", LegacySqlParser().parse),
+                         ("recursive descent, no cache", uncached.parse),
+                         ("recursive descent, cached", cached.parse)):
+        print(f"{label:<30} {throughput(parse, seconds):>12,.0f} statements/s")
+    print(f"cache hits={cached.cache.hits:,} misses={cached.cache.misses:,}")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 2.0)
@@ -0,0 +1,81 @@
+"""Partitioned table scaling: run with `python -m benchmarks.bench_partitions [rows] [max_partitions]`.
+
+Loads the same rows into a table hash partitioned over 1, 2, 4, ... up to
+max_partitions worker processes (default: the CPU count, at least 4) and times a
+full-scan aggregate, a GROUP BY, a filtered scan, a co-located join and primary key
+point lookups, against an ordinary table in the coordinator's own process.
+
+Scans and aggregates run in every worker at once, so they can only speed up when
+there are CPUs for the workers; point lookups go to one worker and pay a pipe round
+trip instead. The workers also pickle their results back, so queries returning many
+rows gain least.
+"""
+import os
+import random
+import sys
+import time
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+
+INSERT_ROWS = 5000
+LOOKUPS = 2000
+QUERIES = {
+    'aggregate': "SELECT COUNT(*) AS n, SUM(balance) AS total, MAX(age) AS oldest FROM users WHERE age > 20",
+    'group by': "SELECT age, COUNT(*) AS n, AVG(balance) AS avg FROM users GROUP BY age",
+    'filter': "SELECT id, name FROM users WHERE balance < 5 AND age = 42",
+    'join': "SELECT COUNT(*) AS n FROM users JOIN orders ON users.id = orders.id WHERE amount > 50",
+}
+
+
+def fill(rows: int, partitions: int):
+    query_svc = QueryService(CrudService(TableRepository(InMemoryStorage())))
+    parser = SqlParser()
+    spec = f" PARTITION BY HASH (id) PARTITIONS {partitions}" if partitions else ""
+    query_svc.execute(parser.parse(
+        f"CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR, age INTEGER, balance FLOAT){spec}"))
+    query_svc.execute(parser.parse(f"CREATE TABLE orders (id INTEGER PRIMARY KEY, amount FLOAT){spec}"))
+    for start in range(0, rows, INSERT_ROWS):
+        batch = range(start, min(start + INSERT_ROWS, rows))
+        query_svc.execute(parser.parse("INSERT INTO users VALUES " + ", ".join(
+            f"({i}, 'user{i}', {i % 80}, {i % 1000 / 10})" for i in batch)))
+        query_svc.execute(parser.parse("INSERT INTO orders VALUES " + ", ".join(
+            f"({i}, {i % 100})" for i in batch if i % 3 == 0)))
+    return query_svc, parser
+
+
+def timed(query_svc, statement) -> float:
+    start = time.perf_counter()
+    query_svc.execute(statement)
+    return time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    max_partitions = int(sys.argv[2]) if len(sys.argv) > 2 else max(4, os.cpu_count() or 1)
+    counts = [0] + [1 << i for i in range(max_partitions.bit_length()) if 1 << i <= max_partitions]
+    print(f"{rows} rows, {os.cpu_count()} CPUs; times in ms, 0 partitions is an ordinary table")
+    print(f"{'partitions':>10}" + "".join(f"{name:>12}" for name in QUERIES) + f"{'lookup':>12}")
+    keys = random.Random(1).sample(range(rows), min(LOOKUPS, rows))
+    for partitions in counts:
+        query_svc, parser = fill(rows, partitions)
+        try:
+            line = f"{partitions:>10}"
+            for sql in QUERIES.values():
+                statement = parser.parse(sql)
+                timed(query_svc, statement)
+                line += f"{min(timed(query_svc, statement) for _ in range(3)) * 1000:12.1f}"
+            lookups = [parser.parse(f"SELECT * FROM users WHERE id = {key}") for key in keys]
+            start = time.perf_counter()
+            for statement in lookups:
+                query_svc.execute(statement)
+            line += f"{(time.perf_counter() - start) / len(keys) * 1000:12.3f}"
+            print(line, flush=True)
+        finally:
+            query_svc.close()
+
+
+if __name__ == "__main__":
+    main()
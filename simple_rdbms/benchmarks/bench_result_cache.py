@@ -0,0 +1,73 @@
+"""Result cache benchmark: run with `python -m benchmarks.bench_result_cache [seconds]`.
+
+A dashboard-like workload: a handful of report queries (a join, a GROUP BY, an
+ORDER BY ... LIMIT) issued over and over, with one UPDATE per WRITE_EVERY reads that
+invalidates the reports over the table it changes. Reports per second and the cache's
+hit ratio are printed with the cache off and on, for several write rates.
+"""
+import random
+import sys
+import time
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+
+CUSTOMERS = 2_000
+ORDERS = 50_000
+WRITE_EVERY = (0, 1000, 100, 10)
+REPORTS = [
+    "SELECT customers.region, COUNT(*) AS orders, SUM(orders.total) AS revenue FROM orders "
+    "JOIN customers ON orders.customer_id = customers.id GROUP BY customers.region",
+    "SELECT status, COUNT(*) AS n, AVG(total) AS average FROM orders GROUP BY status",
+    "SELECT id, total FROM orders ORDER BY total DESC LIMIT 10",
+    "SELECT name FROM customers WHERE region = 'north' ORDER BY name LIMIT 20",
+]
+
+
+def build(cache_bytes: int) -> QueryService:
+    crud = CrudService(TableRepository(InMemoryStorage()))
+    query_svc = QueryService(crud, result_cache_bytes=cache_bytes)
+    parser = SqlParser()
+    query_svc.execute(parser.parse("CREATE TABLE customers (id INTEGER PRIMARY KEY, name VARCHAR, region VARCHAR)"))
+    query_svc.execute(parser.parse(
+        "CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_id INTEGER, total INTEGER, status VARCHAR)"))
+    regions = ['north', 'south', 'east', 'west']
+    crud.bulk_insert('customers', [{'id': i, 'name': f"customer{i}", 'region': regions[i % 4]}
+                                   for i in range(CUSTOMERS)])
+    crud.bulk_insert('orders', [{'id': i, 'customer_id': i % CUSTOMERS, 'total': i * 7919 % 1000,
+                                 'status': 'open' if i % 3 else 'shipped'} for i in range(ORDERS)])
+    return query_svc
+
+
+def run(query_svc: QueryService, seconds: float, write_every: int) -> float:
+    parser = SqlParser()
+    reports = [parser.parse(sql) for sql in REPORTS]
+    rng = random.Random(1)
+    done = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        query_svc.execute(reports[done % len(reports)])
+        done += 1
+        if write_every and done % write_every == 0:
+            query_svc.execute(parser.parse(
+                f"UPDATE orders SET total = {rng.randrange(1000)} WHERE id = {rng.randrange(ORDERS)}"))
+    return done / seconds
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    uncached, cached = build(0), build(64 * 2 ** 20)
+    print(f"{CUSTOMERS} customers, {ORDERS} orders, {len(REPORTS)} report queries")
+    print(f"{'writes':>16} {'no cache':>10} {'cache':>10} {'hit ratio':>10}")
+    for write_every in WRITE_EVERY:
+        cached.result_cache.hits = cached.result_cache.misses = 0
+        off = run(uncached, seconds, write_every)
+        on = run(cached, seconds, write_every)
+        label = f"1 per {write_every} reads" if write_every else "none"
+        print(f"{label:>16} {off:>8.0f}/s {on:>8.0f}/s {cached.result_cache.stats()['hit_ratio']:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
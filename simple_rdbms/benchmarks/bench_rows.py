@@ -0,0 +1,79 @@
+"""Row microbenchmarks: run with `python -m benchmarks.bench_rows [rows]`.
+
+Reports operations per second for the row-level hot paths of an in-memory table:
+Table.insert_row with validation, a prepared INSERT through QueryService, primary-key
+lookups (Table.get_row_by_pk and a prepared SELECT) and full scans (iterating the
+store and a filtered SELECT). It also reports the bytes each stored row takes,
+measured with tracemalloc, for ROW and COLUMNAR tables.
+"""
+import sys
+import time
+import tracemalloc
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+
+CREATE = "CREATE TABLE items (id INTEGER PRIMARY KEY, name VARCHAR, price FLOAT, stock INTEGER, active BOOLEAN)"
+
+
+def make_row(i: int):
+    return {'id': i, 'name': f"item{i % 1000}", 'price': i % 500 / 4, 'stock': i % 97, 'active': i % 2 == 0}
+
+
+def setup(engine: str = 'ROW'):
+    query_svc = QueryService(CrudService(TableRepository(InMemoryStorage())))
+    parser = SqlParser()
+    query_svc.execute(parser.parse(f"{CREATE} ENGINE = {engine}"))
+    return query_svc, parser, query_svc.crud.table_repo.find_by_name('items')
+
+
+def rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:>12,.0f} ops/s"
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def bytes_per_row(engine: str, rows: int) -> float:
+    query_svc, _, table = setup(engine)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(rows):
+        table.insert_row(make_row(i))
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / rows
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    query_svc, parser, table = setup()
+    print(f"{rows} rows of {CREATE[CREATE.index('('):]}")
+
+    print(f"Table.insert_row          {rate(rows, timed(lambda: [table.insert_row(make_row(i)) for i in range(rows)]))}")
+    insert = query_svc.prepare(*parser.parse_prepared("INSERT INTO items VALUES (?, ?, ?, ?, ?)"))
+    params = [list(make_row(i).values()) for i in range(rows, 2 * rows)]
+    print(f"prepared INSERT           {rate(rows, timed(lambda: [query_svc.execute_prepared(insert, p) for p in params]))}")
+
+    keys = [i * 7919 % (2 * rows) for i in range(rows)]
+    print(f"Table.get_row_by_pk       {rate(rows, timed(lambda: [table.get_row_by_pk(k) for k in keys]))}")
+    lookup = query_svc.prepare(*parser.parse_prepared("SELECT * FROM items WHERE id = ?"))
+    lookups = keys[:rows // 10]
+    print(f"prepared SELECT by key    {rate(len(lookups), timed(lambda: [query_svc.execute_prepared(lookup, [k]) for k in lookups]))}")
+
+    total = 2 * rows
+    print(f"store scan                {rate(total, timed(lambda: sum(1 for _ in table.store)))} (rows)")
+    scan = parser.parse("SELECT id, price FROM items WHERE stock < 10")
+    print(f"filtered SELECT scan      {rate(total, timed(lambda: query_svc.execute(scan)))} (rows)")
+
+    for engine in ('ROW', 'COLUMNAR'):
+        print(f"bytes per row, {engine:<9}  {bytes_per_row(engine, rows):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Snapshot save and load times: run with `python -m benchmarks.bench_snapshot [rows]`.
+
+Fills an in-memory table with a primary key, a unique column and a BTREE index, saves
+it with SAVE TO, with and without compression, and times LOAD FROM into a fresh
+database with one and with several worker threads (the table is split in several
+tables for that, since workers take one table each). Replaying the rows as multi-row
+INSERT statements is timed for comparison. Each time is also scaled to that of 1 GB of
+uncompressed snapshot data; loading is linear in the rows, so this stands in for a
+1 GB file on machines without the memory for one.
+"""
+import os
+import sys
+import tempfile
+import time
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+from infrastructure.storage.snapshot import DEFAULT_WORKERS
+
+TABLES = 4
+INSERT_ROWS = 1000
+GIGABYTE = 2 ** 30
+
+
+def make_values(i: int) -> str:
+    return f"({i}, 'user{i}@example.com', 'name {i % 5000}', {i % 1000 / 8}, {i % 97}, {'TRUE' if i % 2 else 'FALSE'})"
+
+
+def fill(rows: int, tables: int = 1) -> QueryService:
+    query_svc = QueryService(CrudService(TableRepository(InMemoryStorage())))
+    parser = SqlParser()
+    per_table = rows // tables
+    for t in range(tables):
+        query_svc.execute(parser.parse(
+            f"CREATE TABLE users{t} (id INTEGER PRIMARY KEY, email VARCHAR UNIQUE, name VARCHAR, "
+            f"balance FLOAT, age INTEGER, active BOOLEAN)"))
+        query_svc.execute(parser.parse(f"CREATE INDEX users{t}_age ON users{t} (age) USING BTREE"))
+        for start in range(0, per_table, INSERT_ROWS):
+            values = ', '.join(make_values(i) for i in range(start, min(start + INSERT_ROWS, per_table)))
+            query_svc.execute(parser.parse(f"INSERT INTO users{t} VALUES {values}"))
+    return query_svc
+
+
+def load_time(path: str, workers: int) -> float:
+    query_svc = QueryService(CrudService(TableRepository(InMemoryStorage())))
+    start = time.perf_counter()
+    query_svc.load_snapshot(path, workers)
+    return time.perf_counter() - start
+
+
+def replay_time(rows: int) -> float:
+    start = time.perf_counter()
+    fill(rows)
+    return time.perf_counter() - start
+
+
+def report(label: str, seconds: float, rows: int, size: int):
+    print(f"{label:<30} {seconds:8.3f} s {rows / seconds:>12,.0f} rows/s {seconds * GIGABYTE / size:8.1f} s/GB")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    workers = max(2, DEFAULT_WORKERS)
+    with tempfile.TemporaryDirectory() as directory:
+        for tables in (1, TABLES):
+            query_svc = fill(rows, tables)
+            print(f"{rows} rows in {tables} table(s)")
+            raw_size = 0
+            for compression in ('NONE', 'ZLIB'):
+                path = os.path.join(directory, f"{tables}-{compression}.snap")
+                start = time.perf_counter()
+                query_svc.save_snapshot(path, compression)
+                saved = time.perf_counter() - start
+                size = os.path.getsize(path)
+                raw_size = raw_size or size
+                print(f"  {compression}: {size / 2 ** 20:.1f} MB, {size / rows:.0f} bytes/row")
+                report("  save", saved, rows, raw_size)
+                report("  load, 1 worker", load_time(path, 1), rows, raw_size)
+                if tables > 1:
+                    report(f"  load, {workers} workers", load_time(path, workers), rows, raw_size)
+        report("replaying INSERTs", replay_time(rows), rows, raw_size)
+
+
+if __name__ == "__main__":
+    main()
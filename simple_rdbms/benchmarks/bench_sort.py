@@ -0,0 +1,56 @@
+"""Aggregation and sorting benchmark: run with `python -m benchmarks.bench_sort [rows]`.
+
+Times COUNT(*) answered from the row count against COUNT(col), which scans; a GROUP BY
+with several aggregates; ORDER BY ... LIMIT 10 (bounded heap) against a full ORDER BY;
+and the same full ORDER BY with a memory budget small enough to force an external
+merge sort through temporary files.
+"""
+import sys
+import time
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+
+
+def build(rows: int) -> CrudService:
+    crud = CrudService(TableRepository(InMemoryStorage()))
+    query_svc = QueryService(crud)
+    parser = SqlParser()
+    query_svc.execute(parser.parse("CREATE TABLE events (id INTEGER PRIMARY KEY, kind VARCHAR, score INTEGER)"))
+    crud.bulk_insert('events', [{'id': i, 'kind': f"kind{i % 50}", 'score': i * 7919 % 100_003}
+                                for i in range(rows)])
+    return crud
+
+
+def timed(query_svc: QueryService, sql: str, repeat: int = 3) -> float:
+    statement = SqlParser().parse(sql)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        query_svc.execute(statement)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    crud = build(rows)
+    in_memory = QueryService(crud)
+    spilling = QueryService(crud, sort_memory=4 * 2 ** 20)
+    print(f"{rows:,} rows")
+    for label, query_svc, sql in [
+        ('COUNT(*) from metadata', in_memory, "SELECT COUNT(*) FROM events"),
+        ('COUNT(score) scan', in_memory, "SELECT COUNT(score) FROM events"),
+        ('GROUP BY kind, 4 aggregates', in_memory,
+         "SELECT kind, COUNT(*), SUM(score), AVG(score), MAX(score) FROM events GROUP BY kind"),
+        ('ORDER BY LIMIT 10 (top-k)', in_memory, "SELECT id, score FROM events ORDER BY score DESC LIMIT 10"),
+        ('ORDER BY, in memory', in_memory, "SELECT id, score FROM events ORDER BY score DESC"),
+        ('ORDER BY, external merge', spilling, "SELECT id, score FROM events ORDER BY score DESC"),
+    ]:
+        print(f"{label:<30}{timed(query_svc, sql) * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
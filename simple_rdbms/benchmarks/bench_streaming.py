@@ -0,0 +1,62 @@
+"""Result delivery memory benchmark: run with `python -m benchmarks.bench_streaming [rows]`.
+
+Measures, with tracemalloc, the peak memory allocated while a SELECT over the whole
+table is turned into a response body: first the way GET /query does it, materializing
+the result list and encoding it as one JSON document, then the two ways POST /query
+can: streaming NDJSON, or the same JSON document in chunks, from QueryService.stream. The table itself is built before
+measuring starts, so only the memory used by the query and its response is counted.
+"""
+import json
+import sys
+import time
+import tracemalloc
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+from presentation.web.app import chunked_json, ndjson
+
+
+def materialized(query_svc: QueryService, statement) -> int:
+    result = query_svc.execute(statement)
+    return len(json.dumps({'result': result}))
+
+
+def streamed(query_svc: QueryService, statement) -> int:
+    return sum(len(chunk) for chunk in ndjson(query_svc.stream(statement)))
+
+
+def streamed_json(query_svc: QueryService, statement) -> int:
+    return sum(len(chunk) for chunk in chunked_json(query_svc.stream(statement)))
+
+
+def measure(run, query_svc: QueryService, statement):
+    # Timed without tracemalloc, which slows allocation-heavy code down a lot
+    start = time.perf_counter()
+    size = run(query_svc, statement)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    run(query_svc, statement)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, peak, elapsed
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    crud = CrudService(TableRepository(InMemoryStorage()))
+    query_svc = QueryService(crud)
+    query_svc.execute(SqlParser().parse("CREATE TABLE events (id INTEGER PRIMARY KEY, kind VARCHAR, score FLOAT)"))
+    crud.bulk_insert('events', [{'id': i, 'kind': f"kind{i % 50}", 'score': i * 0.25} for i in range(rows)])
+    statement = SqlParser().parse("SELECT id, kind, score FROM events")
+    print(f"SELECT of {rows:,} rows")
+    print(f"{'delivery':<24}{'body MB':>10}{'peak MB':>10}{'seconds':>10}")
+    for label, run in (('materialized JSON', materialized), ('streamed NDJSON', streamed),
+                       ('streamed chunked JSON', streamed_json)):
+        size, peak, elapsed = measure(run, query_svc, statement)
+        print(f"{label:<24}{size / 2 ** 20:>10.1f}{peak / 2 ** 20:>10.1f}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
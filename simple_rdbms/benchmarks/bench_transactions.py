@@ -0,0 +1,60 @@
+"""Transaction benchmark: run with `python -m benchmarks.bench_transactions [rows]`.
+
+Inserts the same rows one INSERT statement at a time, first with every statement in
+autocommit mode and then inside a single BEGIN ... COMMIT, and reports rows/sec for
+each. It runs against in-memory storage and against disk storage with the `always` and
+`off` fsync policies. The table has a secondary index, so batching the index updates
+at commit shows up too.
+"""
+import shutil
+import sys
+import tempfile
+import time
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.disk_storage import DiskStorage
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+
+
+def insert_rows(storage, rows: int, transaction: bool) -> float:
+    query_svc = QueryService(CrudService(TableRepository(storage)))
+    parser = SqlParser()
+    query_svc.execute(parser.parse("CREATE TABLE events (id INTEGER PRIMARY KEY, kind VARCHAR, score INTEGER)"))
+    query_svc.execute(parser.parse("CREATE INDEX idx_score ON events (score) USING BTREE"))
+    statements = [parser.parse(f"INSERT INTO events VALUES ({i}, 'kind{i % 10}', {i * 7919 % 1000})")
+                  for i in range(rows)]
+    start = time.perf_counter()
+    if transaction:
+        query_svc.begin()
+    for statement in statements:
+        query_svc.execute(statement)
+    if transaction:
+        query_svc.commit()
+    elapsed = time.perf_counter() - start
+    assert len(storage.get_table('events').store) == rows
+    return rows / elapsed
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    print(f"{rows:,} single-row INSERTs (parsing excluded)")
+    print(f"{'storage':<14}{'autocommit rows/s':>20}{'one transaction':>18}{'speedup':>10}")
+    for label, fsync in [('memory', None), ('disk always', 'always'), ('disk off', 'off')]:
+        results = []
+        for transaction in (False, True):
+            path = tempfile.mkdtemp() if fsync else None
+            storage = DiskStorage(path, fsync_policy=fsync) if fsync else InMemoryStorage()
+            try:
+                results.append(insert_rows(storage, rows, transaction))
+            finally:
+                if fsync:
+                    storage.close()
+                    shutil.rmtree(path)
+        autocommit, batched = results
+        print(f"{label:<14}{autocommit:>20,.0f}{batched:>18,.0f}{batched / autocommit:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""Wire protocol benchmark: run with `python -m benchmarks.bench_wire [seconds] [threads]`.
+
+Starts the binary protocol server and the Flask app in processes of their own on
+loopback ports, loads the same table into both and compares:
+
+- round-trip latency of a primary-key SELECT, one query at a time over a kept-alive
+  connection (`GET /query?sql=...` for Flask);
+- throughput of those SELECTs from several client threads, and for the wire protocol
+  also with pipelines of PIPELINE statements;
+- fetching a 10,000-row result;
+- loading 10,000 rows: one multi-row INSERT statement over HTTP against a batch execute
+  of a prepared INSERT.
+"""
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote
+from presentation.wire.client import Connection, ConnectionPool
+
+ROWS = 10_000
+LATENCY_QUERIES = 2000
+PIPELINE = 64
+THREADS = 8
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start(command, port: int) -> subprocess.Popen:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(command, cwd=root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port)).close()
+            return process
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError(f"{command} did not start")
+
+
+class HttpClient:
+    def __init__(self, port: int):
+        self.conn = http.client.HTTPConnection('127.0.0.1', port)
+
+    def get(self, sql: str):
+        self.conn.request('GET', '/query?sql=' + quote(sql))
+        return self._result()
+
+    def post(self, sql: str):
+        self.conn.request('POST', '/query', json.dumps({'sql': sql}), {'Content-Type': 'application/json'})
+        return self._result()
+
+    def _result(self):
+        response = self.conn.getresponse()
+        body = json.loads(response.read())
+        if response.status != 200:
+            raise ValueError(body['error'])
+        return body['result']
+
+
+def insert_sql(start: int, stop: int) -> str:
+    return "INSERT INTO accounts VALUES " + ", ".join(
+        f"({i}, 'owner{i % 100}', {i % 1000})" for i in range(start, stop))
+
+
+def latency(run_query) -> str:
+    times = []
+    for _ in range(LATENCY_QUERIES):
+        key = random.randrange(ROWS)
+        start = time.perf_counter()
+        run_query(f"SELECT * FROM accounts WHERE id = {key}")
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return f"mean {statistics.mean(times) * 1e6:7.0f} us, p99 {times[int(len(times) * 0.99)] * 1e6:7.0f} us"
+
+
+def throughput(make_worker, seconds: float, threads: int) -> float:
+    counts = []
+    deadline = time.perf_counter() + seconds
+
+    def run():
+        work = make_worker()
+        done = 0
+        while time.perf_counter() < deadline:
+            done += work()
+        counts.append(done)
+    pool = [threading.Thread(target=run) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return sum(counts) / seconds
+
+
+def lookup() -> str:
+    return f"SELECT * FROM accounts WHERE id = {random.randrange(ROWS)}"
+
+
+def timed(function, repeat: int = 1) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else THREADS
+    wire_port, http_port = free_port(), free_port()
+    wire = start([sys.executable, '-m', 'presentation.wire.server', '--port', str(wire_port)], wire_port)
+    flask = start([sys.executable, '-c', "from presentation.web.app import app; "
+                   f"app.run(port={http_port}, threaded=True)"], http_port)
+    try:
+        create = "CREATE TABLE accounts (id INTEGER PRIMARY KEY, owner VARCHAR, balance INTEGER)"
+        pool = ConnectionPool('127.0.0.1', wire_port, size=threads)
+        http_client = HttpClient(http_port)
+        pool.execute(create)
+        http_client.post(create)
+        rows = [[i, f"owner{i % 100}", i % 1000] for i in range(ROWS)]
+        insert_http = timed(lambda: http_client.post(insert_sql(0, ROWS)))
+        insert_wire = timed(lambda: pool.execute_many("INSERT INTO accounts VALUES (?, ?, ?)", rows))
+
+        print(f"{ROWS} rows, {threads} client threads")
+        print(f"point SELECT latency   Flask: {latency(http_client.get)}")
+        print(f"                       wire:  {latency(Connection('127.0.0.1', wire_port).execute)}")
+
+        def http_worker():
+            client = HttpClient(http_port)
+            return lambda: client.get(lookup()) and 1
+
+        def wire_worker():
+            return lambda: pool.execute(lookup()) and 1
+
+        def pipelined_worker():
+            return lambda: len(pool.pipeline([lookup() for _ in range(PIPELINE)]))
+        print(f"point SELECTs/sec      Flask: {throughput(http_worker, seconds, threads):9.0f}")
+        print(f"                       wire:  {throughput(wire_worker, seconds, threads):9.0f}")
+        print(f"  pipelined by {PIPELINE:<3}    wire:  {throughput(pipelined_worker, seconds, threads):9.0f}")
+
+        scan = "SELECT * FROM accounts"
+        print(f"{ROWS}-row result         Flask: {timed(lambda: http_client.get(scan), 10) * 1000:7.1f} ms")
+        print(f"                       wire:  {timed(lambda: pool.execute(scan), 10) * 1000:7.1f} ms")
+        print(f"load {ROWS} rows         Flask: {insert_http * 1000:7.1f} ms (one multi-row INSERT)")
+        print(f"                       wire:  {insert_wire * 1000:7.1f} ms (batch execute)")
+        pool.close()
+    finally:
+        for process in (wire, flask):
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,40 @@
+from typing import Any, Callable
 from domain.value_objects.data_type import DataType
 
+# Python types each DataType accepts, and the error for anything else
+_ACCEPTED = {
+    DataType.INTEGER: (int, "Value for {} must be integer"),
+    DataType.VARCHAR: (str, "Value for {} must be string"),
+    DataType.BOOLEAN: (bool, "Value for {} must be boolean"),
+    DataType.FLOAT: ((int, float), "Value for {} must be number"),
+}
+
 class Column:
+    __slots__ = ('name', 'data_type', 'primary_key', 'unique', 'nullable', 'validate_value')
+
     def __init__(self, name: str, data_type: DataType, primary_key: bool = False, unique: bool = False, nullable: bool = True):
         self.name = name
         self.data_type = data_type
         self.primary_key = primary_key
         self.unique = unique
         self.nullable = nullable
+        # validate_value(value) raises ValueError for a value the column cannot hold. It is
+        # built once for the column's type instead of branching on the type for every value.
+        self.validate_value: Callable[[Any], None] = _compile_validator(name, data_type, nullable)
+
+    def __reduce__(self):
+        # The compiled validator cannot be pickled; it is rebuilt instead
+        return Column, (self.name, self.data_type, self.primary_key, self.unique, self.nullable)
+
+
+def _compile_validator(name: str, data_type: DataType, nullable: bool) -> Callable[[Any], None]:
+    types, message = _ACCEPTED[data_type]
+    message = message.format(name)
 
-    def validate_value(self, value):
-        if value is None and not self.nullable:
-            raise ValueError(f"Column {self.name} cannot be null")
-        if self.data_type == DataType.INTEGER:
-            if not isinstance(value, int) and value is not None:
-                raise ValueError(f"Value for {self.name} must be integer")
-        elif self.data_type == DataType.VARCHAR:
-            if not isinstance(value, str) and value is not None:
-                raise ValueError(f"Value for {self.name} must be string")
-        elif self.data_type == DataType.BOOLEAN:
-            if not isinstance(value, bool) and value is not None:
-                raise ValueError(f"Value for {self.name} must be boolean")
-        elif self.data_type == DataType.FLOAT:
-            if not isinstance(value, (int, float)) and value is not None:
-                raise ValueError(f"Value for {self.name} must be number")
\ No newline at end of file
+    def validate(value):
+        if value is None:
+            if not nullable:
+                raise ValueError(f"Column {name} cannot be null")
+        elif not isinstance(value, types):
+            raise ValueError(message)
+    return validate
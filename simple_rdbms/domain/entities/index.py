@@ -0,0 +1,145 @@
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Set, Tuple
+from domain.value_objects.index_type import IndexType
+
+
+class HashIndex:
+    """Equality index: key -> set of row ids. O(1) lookup."""
+    index_type = IndexType.HASH
+
+    def __init__(self, name: str, column: str):
+        self.name = name
+        self.column = column
+        self.entries: Dict[Any, Set[int]] = {}
+
+    def add(self, key, row_id: int):
+        self.entries.setdefault(key, set()).add(row_id)
+
+    def remove(self, key, row_id: int):
+        ids = self.entries.get(key)
+        if ids is not None:
+            ids.discard(row_id)
+            if not ids:
+                del self.entries[key]
+
+    def lookup(self, key) -> Iterable[int]:
+        return self.entries.get(key, ())
+
+    def clear(self):
+        self.entries = {}
+
+    def bulk_load(self, pairs: List[Tuple[Any, int]]):
+        self.clear()
+        for key, row_id in pairs:
+            self.add(key, row_id)
+
+    def add_many(self, pairs: List[Tuple[Any, int]]):
+        add = self.add
+        for key, row_id in pairs:
+            add(key, row_id)
+
+    def remap(self, mapping: Dict[int, int]):
+        self.entries = {k: {mapping[i] for i in ids} for k, ids in self.entries.items()}
+
+
+class SortedIndex:
+    """Ordered index kept as parallel sorted arrays of keys and row ids.
+
+    Equality and range lookups are O(log n) binary searches. NULL keys are not ordered
+    against other values, so they are kept apart.
+    """
+    index_type = IndexType.BTREE
+
+    def __init__(self, name: str, column: str):
+        self.name = name
+        self.column = column
+        self.keys: List[Any] = []
+        self.row_ids: List[int] = []
+        self.null_ids: Set[int] = set()
+
+    def add(self, key, row_id: int):
+        if key is None:
+            self.null_ids.add(row_id)
+            return
+        pos = bisect_right(self.keys, key)
+        self.keys.insert(pos, key)
+        self.row_ids.insert(pos, row_id)
+
+    def remove(self, key, row_id: int):
+        if key is None:
+            self.null_ids.discard(row_id)
+            return
+        lo, hi = bisect_left(self.keys, key), bisect_right(self.keys, key)
+        for pos in range(lo, hi):
+            if self.row_ids[pos] == row_id:
+                del self.keys[pos]
+                del self.row_ids[pos]
+                return
+
+    def lookup(self, key) -> Iterable[int]:
+        if key is None:
+            return self.null_ids
+        try:
+            lo, hi = bisect_left(self.keys, key), bisect_right(self.keys, key)
+        except TypeError:
+            return ()
+        return self.row_ids[lo:hi]
+
+    def range(self, low=None, high=None, low_inclusive: bool = True, high_inclusive: bool = True) -> List[int]:
+        """Row ids with low <(=) key <(=) high; a None bound is unbounded."""
+        try:
+            if low is None:
+                lo = 0
+            else:
+                lo = bisect_left(self.keys, low) if low_inclusive else bisect_right(self.keys, low)
+            if high is None:
+                hi = len(self.keys)
+            else:
+                hi = bisect_right(self.keys, high) if high_inclusive else bisect_left(self.keys, high)
+        except TypeError:
+            return []
+        return self.row_ids[lo:hi]
+
+    def clear(self):
+        self.keys, self.row_ids, self.null_ids = [], [], set()
+
+    def bulk_load(self, pairs: List[Tuple[Any, int]]):
+        # Sort once instead of paying an insort per row.
+        entries = sorted((p for p in pairs if p[0] is not None), key=lambda p: p[0])
+        self.keys = [k for k, _ in entries]
+        self.row_ids = [i for _, i in entries]
+        self.null_ids = {i for k, i in pairs if k is None}
+
+    def add_many(self, pairs: List[Tuple[Any, int]]):
+        if not self.keys and not self.null_ids:
+            self.bulk_load(pairs)
+            return
+        # Merge the sorted new entries in, copying the existing arrays slice by slice:
+        # linear in the index size instead of one O(n) list insert per entry.
+        new = sorted((p for p in pairs if p[0] is not None), key=lambda p: p[0])
+        old_keys, old_ids = self.keys, self.row_ids
+        keys: List[Any] = []
+        row_ids: List[int] = []
+        prev = 0
+        for key, row_id in new:
+            pos = bisect_right(old_keys, key, prev)
+            keys += old_keys[prev:pos]
+            row_ids += old_ids[prev:pos]
+            keys.append(key)
+            row_ids.append(row_id)
+            prev = pos
+        keys += old_keys[prev:]
+        row_ids += old_ids[prev:]
+        self.keys, self.row_ids = keys, row_ids
+        self.null_ids.update(i for k, i in pairs if k is None)
+
+    def remap(self, mapping: Dict[int, int]):
+        # Keys do not move, so the arrays stay sorted.
+        self.row_ids = [mapping[i] for i in self.row_ids]
+        self.null_ids = {mapping[i] for i in self.null_ids}
+
+
+def create_index(name: str, column: str, index_type: IndexType):
+    if index_type == IndexType.HASH:
+        return HashIndex(name, column)
+    return SortedIndex(name, column)
@@ -0,0 +1,211 @@
+from collections.abc import Mapping
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from domain.entities.column import Column
+from domain.value_objects.storage_engine import StorageEngine
+
+Row = Dict[str, Any]
+# Takes a stored tuple; see RowStore.positions
+TuplePredicate = Callable[[tuple], bool]
+
+
+class StoredRow(Mapping):
+    """One row as the row store keeps it: a tuple of its values, read by column name.
+
+    `values` holds the values in the order of the store's columns and `positions` maps
+    each name to its place, shared by every row of the store. A StoredRow is read-only,
+    so the store hands out the object it keeps rather than a copy; changing a row puts a
+    new StoredRow in its slot. It compares equal to the dict of the same row, copy() or
+    dict(row) gives a dict to change, and it pickles as a dict.
+    """
+    __slots__ = ('positions', 'values')
+
+    def __init__(self, positions: Dict[str, int], values: tuple):
+        self.positions = positions
+        self.values = values
+
+    def __getitem__(self, name: str) -> Any:
+        return self.values[self.positions[name]]
+
+    def get(self, name: str, default: Any = None) -> Any:
+        position = self.positions.get(name)
+        return default if position is None else self.values[position]
+
+    def __contains__(self, name) -> bool:
+        return name in self.positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.positions)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def keys(self):
+        return self.positions.keys()
+
+    def items(self):
+        return list(zip(self.positions, self.values))
+
+    def copy(self) -> Row:
+        return dict(zip(self.positions, self.values))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, StoredRow):
+            return self.positions.keys() == other.positions.keys() and self.values == other.values
+        if isinstance(other, Mapping):
+            return self.copy() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(self.copy())
+
+    def __reduce__(self):
+        return dict, (self.copy(),)
+
+
+class RowStore:
+    """Slot-addressed row storage.
+
+    A row id is the slot a row was placed in and stays valid until the row is deleted.
+    Deleting leaves a tombstone (None) and pushes the slot onto a free list that later
+    inserts reuse, so deletes are O(1) and never shift other rows. When tombstones pile
+    up past `compaction_ratio` of the slots, compact() squeezes them out and returns the
+    old -> new row id mapping so callers can remap their indexes.
+
+    Rows are kept as StoredRows: a tuple in the order of the table's columns, whose names
+    the store holds once for all of them, which takes a little over half the memory of
+    the dict it replaces. Whole-row reads hand out the stored rows themselves, since
+    they are read-only, and update() swaps in a new one, so a reader part way through a
+    row never sees it half updated. scan() and fetch() filter the tuples and build dicts
+    only of the rows and columns asked for.
+    """
+    engine = StorageEngine.ROW
+
+    def __init__(self, columns: List[Column], compaction_ratio: float = 0.5, min_compaction_slots: int = 1024):
+        self.names: Tuple[str, ...] = tuple(col.name for col in columns)
+        self.positions: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self.slots: List[Optional[StoredRow]] = []
+        self.free_slots: List[int] = []
+        self.live_count = 0
+        self.compaction_ratio = compaction_ratio
+        self.min_compaction_slots = min_compaction_slots
+
+    def __len__(self) -> int:
+        return self.live_count
+
+    def __iter__(self) -> Iterator[StoredRow]:
+        return (row for row in self.slots if row is not None)
+
+    def items(self) -> Iterator[Tuple[int, StoredRow]]:
+        return ((row_id, row) for row_id, row in enumerate(self.slots) if row is not None)
+
+    def tuples(self) -> Iterator[tuple]:
+        """The values of every live row, as tuples in column order."""
+        return (row.values for row in self.slots if row is not None)
+
+    def scan(self, predicate: Optional[TuplePredicate] = None, columns: Optional[List[str]] = None) -> Iterator[Row]:
+        """Rows whose tuples pass `predicate`, as dicts of `columns` (default: all of them).
+
+        Rows are only turned into dicts once they pass, and only with the columns asked for.
+        """
+        slots = self.tuples()
+        if predicate is not None:
+            slots = (values for values in slots if predicate(values))
+        return self._project(slots, columns)
+
+    def fetch(self, row_ids: Iterable[int], predicate: Optional[TuplePredicate] = None,
+              columns: Optional[List[str]] = None) -> Iterator[Row]:
+        """Like scan(), over the rows with the given ids, in that order."""
+        slots = self.slots
+        found = (slots[row_id].values for row_id in row_ids)
+        if predicate is not None:
+            found = (values for values in found if predicate(values))
+        return self._project(found, columns)
+
+    def _project(self, slots: Iterator[tuple], columns: Optional[List[str]]) -> Iterator[Row]:
+        if columns is None:
+            names, pick = self.names, None
+        else:
+            names = [name for name in columns if name in self.positions]
+            pick = itemgetter(*[self.positions[name] for name in names]) if len(names) > 1 else None
+        if pick is not None:
+            return (dict(zip(names, pick(values))) for values in slots)
+        if len(names) == 1 and columns is not None:
+            name, position = names[0], self.positions[names[0]]
+            return ({name: values[position]} for values in slots)
+        if not names:
+            return ({} for _ in slots)
+        return (dict(zip(names, values)) for values in slots)
+
+    def matching_ids(self, predicate: Optional[TuplePredicate] = None) -> List[int]:
+        return [row_id for row_id, row in enumerate(self.slots)
+                if row is not None and (predicate is None or predicate(row.values))]
+
+    def insert(self, row: Row) -> int:
+        stored = StoredRow(self.positions, tuple(map(row.get, self.names)))
+        if self.free_slots:
+            row_id = self.free_slots.pop()
+            self.slots[row_id] = stored
+        else:
+            row_id = len(self.slots)
+            self.slots.append(stored)
+        self.live_count += 1
+        return row_id
+
+    def insert_many(self, rows: List[Row]) -> List[int]:
+        names, positions = self.names, self.positions
+        encoded = [StoredRow(positions, tuple(map(row.get, names))) for row in rows]
+        reused = min(len(self.free_slots), len(encoded))
+        row_ids = [self.free_slots.pop() for _ in range(reused)]
+        for row_id, stored in zip(row_ids, encoded):
+            self.slots[row_id] = stored
+        start = len(self.slots)
+        self.slots.extend(encoded[reused:])
+        row_ids.extend(range(start, len(self.slots)))
+        self.live_count += len(encoded)
+        return row_ids
+
+    def load(self, columns: List[List[Any]]) -> int:
+        """Fill an empty store from one list of values per column, in column order; the rows get ids 0..n-1."""
+        if self.slots:
+            raise ValueError("Can only load into an empty store")
+        positions = self.positions
+        self.slots = [StoredRow(positions, values) for values in zip(*columns)]
+        self.live_count = len(self.slots)
+        return self.live_count
+
+    def get(self, row_id: int) -> Optional[StoredRow]:
+        if 0 <= row_id < len(self.slots):
+            return self.slots[row_id]
+        return None
+
+    def update(self, row_id: int, updates: Row):
+        values = list(self.slots[row_id].values)
+        for name, value in updates.items():
+            values[self.positions[name]] = value
+        self.slots[row_id] = StoredRow(self.positions, tuple(values))
+
+    def delete(self, row_id: int):
+        if self.slots[row_id] is None:
+            raise ValueError(f"Row {row_id} already deleted")
+        self.slots[row_id] = None
+        self.free_slots.append(row_id)
+        self.live_count -= 1
+
+    def needs_compaction(self) -> bool:
+        tombstones = len(self.slots) - self.live_count
+        return (len(self.slots) >= self.min_compaction_slots
+                and tombstones > len(self.slots) * self.compaction_ratio)
+
+    def compact(self) -> Dict[int, int]:
+        remap: Dict[int, int] = {}
+        slots: List[Optional[StoredRow]] = []
+        for row_id, row in enumerate(self.slots):
+            if row is not None:
+                remap[row_id] = len(slots)
+                slots.append(row)
+        self.slots = slots
+        self.free_slots = []
+        return remap
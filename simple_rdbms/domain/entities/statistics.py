@@ -0,0 +1,107 @@
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Equi-depth histogram buckets per column
+HISTOGRAM_BUCKETS = 32
+# Values listed individually because they are much more frequent than the average
+MOST_COMMON_VALUES = 10
+
+
+class ColumnStatistics:
+    """What ANALYZE learned about one column, as fractions of the table's rows.
+
+    `histogram` holds HISTOGRAM_BUCKETS + 1 bounds splitting the sorted non-NULL values
+    into buckets of equal size; it is empty when the values cannot be ordered.
+    `ordered` says the values came out of the store already sorted.
+    """
+
+    def __init__(self, null_fraction: float, distinct: int, most_common: Dict[Any, float],
+                 histogram: List[Any], ordered: bool):
+        self.null_fraction = null_fraction
+        self.distinct = distinct
+        self.most_common = most_common
+        self.histogram = histogram
+        self.ordered = ordered
+
+    def equal_selectivity(self, value) -> float:
+        """Estimated fraction of rows whose value equals `value`."""
+        if value is None:
+            return self.null_fraction
+        try:
+            frequency = self.most_common.get(value)
+        except TypeError:
+            return 0.0
+        if frequency is not None:
+            return frequency
+        others = self.distinct - len(self.most_common)
+        if others <= 0:
+            return 0.0
+        rest = 1.0 - self.null_fraction - sum(self.most_common.values())
+        return max(rest, 0.0) / others
+
+    def range_selectivity(self, low=None, high=None) -> Optional[float]:
+        """Estimated fraction of rows with low <= value <= high (a None bound is open).
+
+        Returns None when there is no histogram to estimate from.
+        """
+        if len(self.histogram) < 2:
+            return None
+        try:
+            below_high = 1.0 if high is None else self._fraction_below(high)
+            below_low = 0.0 if low is None else self._fraction_below(low)
+        except TypeError:
+            return 0.0
+        return max(below_high - below_low, 0.0) * (1.0 - self.null_fraction)
+
+    def _fraction_below(self, value) -> float:
+        # Fraction of the non-NULL values less than `value`, interpolating inside a bucket
+        bounds = self.histogram
+        buckets = len(bounds) - 1
+        if value <= bounds[0]:
+            return 0.0
+        if value > bounds[-1]:
+            return 1.0
+        pos = bisect_left(bounds, value) - 1
+        low, high = bounds[pos], bounds[pos + 1]
+        inside = 0.5
+        if isinstance(value, (int, float)) and isinstance(low, (int, float)) and high != low:
+            inside = (value - low) / (high - low)
+        return (pos + inside) / buckets
+
+
+class TableStatistics:
+    def __init__(self, row_count: int, columns: Dict[str, ColumnStatistics]):
+        # Rows when the table was analyzed; planners use the live count and these fractions
+        self.row_count = row_count
+        self.columns = columns
+
+
+def collect_statistics(table) -> TableStatistics:
+    """Scan a table once and summarize every column."""
+    names = [col.name for col in table.columns]
+    values: Dict[str, List[Any]] = {name: [] for name in names}
+    for row in table.store:
+        for name in names:
+            values[name].append(row.get(name))
+    row_count = len(values[names[0]]) if names else 0
+    return TableStatistics(row_count, {name: _column_statistics(values[name]) for name in names})
+
+
+def _column_statistics(values: List[Any]) -> ColumnStatistics:
+    total = len(values)
+    present = [v for v in values if v is not None]
+    if not present:
+        return ColumnStatistics(1.0 if total else 0.0, 0, {}, [], False)
+    counts = Counter(present)
+    average = len(present) / len(counts)
+    most_common = {value: count / total for value, count in counts.most_common(MOST_COMMON_VALUES)
+                   if count > 1 and count > 1.25 * average}
+    try:
+        ordered = all(a <= b for a, b in zip(present, present[1:])) and len(present) == total
+        ordered_values = present if ordered else sorted(present)
+    except TypeError:
+        return ColumnStatistics(1 - len(present) / total, len(counts), most_common, [], False)
+    last = len(ordered_values) - 1
+    histogram = [ordered_values[last * i // HISTOGRAM_BUCKETS] for i in range(HISTOGRAM_BUCKETS + 1)]
+    return ColumnStatistics(1 - len(present) / total, len(counts), most_common, histogram, ordered)
@@ -1,78 +1,416 @@
-from typing import List, Dict, Any
+import itertools
+from typing import List, Dict, Any, Optional, Iterable
 from domain.entities.column import Column
+from domain.entities.index import create_index
+from domain.entities.row_store import RowStore
+from domain.entities.statistics import TableStatistics
+from domain.value_objects.index_type import IndexType
+
+# Table versions come from one counter, so no two tables or states of a table share one
+_versions = itertools.count(1)
 
 class Table:
-    def __init__(self, name: str, columns: List[Column]):
+    __slots__ = ('name', 'columns', 'store', 'primary_key_index', 'unique_indexes', 'indexes', 'column_map',
+                 'primary_key_column', 'statistics', 'version', 'validate_row')
+
+    def __init__(self, name: str, columns: List[Column], store=None):
         self.name = name
         self.columns = columns
-        self.rows: List[Dict[str, Any]] = []
+        # Any object with the RowStore interface, e.g. a columnar store
+        self.store = store if store is not None else RowStore(columns)
+        # Primary key value -> row id
         self.primary_key_index: Dict[Any, int] = {}
-        self.unique_indexes: Dict[str, set] = {}
+        # Unique column value -> row id
+        self.unique_indexes: Dict[str, Dict[Any, int]] = {}
+        # Secondary indexes by index name
+        self.indexes: Dict[str, Any] = {}
         self.column_map = {col.name: col for col in columns}
+        self.primary_key_column: Optional[Column] = next((col for col in columns if col.primary_key), None)
+        # Set by ANALYZE; None until the table has been analyzed
+        self.statistics: Optional[TableStatistics] = None
+        # Changes whenever a row is inserted, updated or deleted
+        self.version = next(_versions)
+        # validate_row(row) checks a dict's columns and values, compiled once for the schema
+        self.validate_row = _row_validator(self.column_map)
 
         # Setup indexes
         for col in columns:
             if col.primary_key:
                 self.primary_key_index = {}
             if col.unique:
-                self.unique_indexes[col.name] = set()
+                self.unique_indexes[col.name] = {}
 
-    def insert_row(self, row_dict: Dict[str, Any]):
-        # Validate
-        for col_name, value in row_dict.items():
-            if col_name not in self.column_map:
-                raise ValueError(f"Unknown column {col_name}")
-            self.column_map[col_name].validate_value(value)
+    @property
+    def rows(self) -> List[Dict[str, Any]]:
+        return list(self.store)
+
+    def insert_row(self, row_dict: Dict[str, Any], validate: bool = True):
+        # Validate, unless the caller already checked every value against its column
+        if validate:
+            self.validate_row(row_dict)
 
         # Check primary key
-        pk_col = next((col for col in self.columns if col.primary_key), None)
+        pk_col = self.primary_key_column
         if pk_col and row_dict.get(pk_col.name) in self.primary_key_index:
             raise ValueError("Primary key violation")
 
         # Check uniques
-        for col_name, unique_set in self.unique_indexes.items():
+        for col_name, unique_index in self.unique_indexes.items():
             value = row_dict.get(col_name)
-            if value in unique_set:
+            if value in unique_index:
                 raise ValueError(f"Unique constraint violation for {col_name}")
 
         # Insert
-        self.rows.append(row_dict)
+        self.version = next(_versions)
+        row_id = self.store.insert(row_dict)
 
         # Update indexes
         if pk_col:
-            self.primary_key_index[row_dict[pk_col.name]] = len(self.rows) - 1
+            self.primary_key_index[row_dict[pk_col.name]] = row_id
         for col_name in self.unique_indexes:
-            self.unique_indexes[col_name].add(row_dict.get(col_name))
+            self.unique_indexes[col_name][row_dict.get(col_name)] = row_id
+        for index in self.indexes.values():
+            index.add(row_dict.get(index.column), row_id)
+
+    def bulk_insert(self, rows: Iterable[Dict[str, Any]], validate: bool = True, batch_size: int = 10000) -> int:
+        """Insert many rows at once; returns the number inserted.
+
+        Rows are validated a batch at a time, constraints are checked for the whole load
+        before anything is written, and rows are appended without per-row index
+        maintenance. The index entries are then built in one pass per index. Either
+        every row is inserted or, on the first error, none is.
+        """
+        pending: List[Dict[str, Any]] = []
+        batch: List[Dict[str, Any]] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                if validate:
+                    self.validate_rows(batch)
+                pending.extend(batch)
+                batch = []
+        if batch:
+            if validate:
+                self.validate_rows(batch)
+            pending.extend(batch)
+        return len(self.insert_batch(pending))
+
+    def insert_batch(self, rows: List[Dict[str, Any]]) -> List[int]:
+        """Insert rows whose values are already validated; returns their row ids.
+
+        Key and unique constraints are checked for the batch as a whole before anything is
+        written, and each index takes the batch's entries in one add_many call.
+        """
+        if not rows:
+            return []
+        pk_col = self.primary_key_column
+        if pk_col:
+            keys = [row.get(pk_col.name) for row in rows]
+            key_set = set(keys)
+            if len(key_set) != len(keys) or not self.primary_key_index.keys().isdisjoint(key_set):
+                raise ValueError("Primary key violation")
+        unique_values = {}
+        for col_name, unique_index in self.unique_indexes.items():
+            values = [row.get(col_name) for row in rows]
+            value_set = set(values)
+            if len(value_set) != len(values) or not unique_index.keys().isdisjoint(value_set):
+                raise ValueError(f"Unique constraint violation for {col_name}")
+            unique_values[col_name] = values
+
+        self.version = next(_versions)
+        row_ids = self.store.insert_many(rows)
+
+        if pk_col:
+            self.primary_key_index.update(zip(keys, row_ids))
+        for col_name, values in unique_values.items():
+            self.unique_indexes[col_name].update(zip(values, row_ids))
+        for index in self.indexes.values():
+            column = index.column
+            index.add_many([(row.get(column), row_id) for row, row_id in zip(rows, row_ids)])
+        return row_ids
+
+    def validate_rows(self, batch: List[Dict[str, Any]]):
+        """Check every value against its column, without checking constraints."""
+        names = self.column_map.keys()
+        for row in batch:
+            if not row.keys() <= names:
+                unknown = next(k for k in row if k not in self.column_map)
+                raise ValueError(f"Unknown column {unknown}")
+        # Column at a time: one validator lookup per column instead of per value
+        for col in self.columns:
+            validate = col.validate_value
+            name = col.name
+            for row in batch:
+                if name in row:
+                    validate(row[name])
 
     def get_row_by_pk(self, pk_value):
-        if self.primary_key_index:
-            idx = self.primary_key_index.get(pk_value)
-            if idx is not None:
-                return self.rows[idx]
-        return None
+        idx = self.primary_key_index.get(pk_value)
+        return None if idx is None else self.store.get(idx)
 
     def update_row(self, pk_value, updates: Dict[str, Any]):
         row = self.get_row_by_pk(pk_value)
         if row is None:
             raise ValueError("Row not found")
+        self.validate_updates(updates)
+        self._update(self.primary_key_index[pk_value], row, updates)
+
+    def update_rows(self, row_ids: Iterable[int], updates: Dict[str, Any]) -> int:
+        """Apply the same updates to every row in row_ids; returns how many were updated.
+
+        Everything that could fail is checked before the first row is changed.
+        """
+        row_ids = list(row_ids)
+        self.validate_updates(updates, len(row_ids))
+        for row_id in row_ids:
+            self._update(row_id, self.store.get(row_id), updates)
+        return len(row_ids)
+
+    def validate_updates(self, updates: Dict[str, Any], row_count: int = 1):
         for col_name, value in updates.items():
             if col_name not in self.column_map:
                 raise ValueError(f"Unknown column {col_name}")
             self.column_map[col_name].validate_value(value)
-        row.update(updates)
+        if row_count > 1:
+            # Setting a key column to one value in several rows can only collide
+            pk_col = self.primary_key_column
+            if pk_col and pk_col.name in updates:
+                raise ValueError("Primary key violation")
+            for col_name in self.unique_indexes:
+                if col_name in updates:
+                    raise ValueError(f"Unique constraint violation for {col_name}")
+
+    def _update(self, row_id: int, row: Dict[str, Any], updates: Dict[str, Any]):
+        pk_col = self.primary_key_column
+        if pk_col:
+            pk_value = row.get(pk_col.name)
+            new_pk = updates.get(pk_col.name, pk_value)
+            if self.primary_key_index.get(new_pk, row_id) != row_id:
+                raise ValueError("Primary key violation")
+        for col_name, unique_index in self.unique_indexes.items():
+            if col_name in updates and unique_index.get(updates[col_name], row_id) != row_id:
+                raise ValueError(f"Unique constraint violation for {col_name}")
+        # The store rejects values it cannot hold before it changes anything, so it goes
+        # first and a failed update leaves the indexes alone
+        new_id = self.store.update(row_id, updates)
+        self.version = next(_versions)
+        if pk_col and new_pk != pk_value:
+            del self.primary_key_index[pk_value]
+            self.primary_key_index[new_pk] = row_id
+        for col_name, unique_index in self.unique_indexes.items():
+            if col_name in updates and unique_index.get(row.get(col_name)) == row_id:
+                del unique_index[row.get(col_name)]
+                unique_index[updates[col_name]] = row_id
+        for index in self.indexes.values():
+            if index.column in updates:
+                index.remove(row.get(index.column), row_id)
+                index.add(updates[index.column], row_id)
+        if new_id is not None and new_id != row_id:
+            # The store had to move the row (e.g. it outgrew its page)
+            self._move_row(row_id, new_id, self.store.get(new_id))
+
+    def _move_row(self, old_id: int, new_id: int, row: Dict[str, Any]):
+        pk_col = self.primary_key_column
+        if pk_col:
+            self.primary_key_index[row.get(pk_col.name)] = new_id
+        for col_name, unique_index in self.unique_indexes.items():
+            unique_index[row.get(col_name)] = new_id
+        for index in self.indexes.values():
+            index.remove(row.get(index.column), old_id)
+            index.add(row.get(index.column), new_id)
 
     def delete_row(self, pk_value):
-        pk_col = next((col for col in self.columns if col.primary_key), None)
+        pk_col = self.primary_key_column
         if pk_col and pk_value in self.primary_key_index:
-            idx = self.primary_key_index[pk_value]
-            del self.rows[idx]
-            del self.primary_key_index[pk_value]
-            # Rebuild unique indexes
-            for col_name in self.unique_indexes:
-                self.unique_indexes[col_name] = set(row.get(col_name) for row in self.rows)
+            self.delete_rows([self.primary_key_index[pk_value]])
+
+    def delete_rows(self, row_ids: Iterable[int]) -> int:
+        """Delete rows by row id, compacting afterwards if needed; returns how many."""
+        row_ids = list(row_ids)
+        self.remove_rows(row_ids)
+        if self.store.needs_compaction():
+            self.compact()
+        return len(row_ids)
+
+    def remove_rows(self, row_ids: Iterable[int]):
+        """Delete rows by row id. Never compacts, so other row ids the caller holds stay valid."""
+        pk_col = self.primary_key_column
+        self.version = next(_versions)
+        for row_id in row_ids:
+            row = self.store.get(row_id)
+            self.store.delete(row_id)
+            if pk_col:
+                self.primary_key_index.pop(row.get(pk_col.name), None)
+            for col_name, unique_index in self.unique_indexes.items():
+                unique_index.pop(row.get(col_name), None)
+            for index in self.indexes.values():
+                index.remove(row.get(index.column), row_id)
+
+    def compact(self):
+        """Squeeze deleted slots out of the row store and remap every index to the new row ids."""
+        remap = self.store.compact()
+        self.primary_key_index = {k: remap[v] for k, v in self.primary_key_index.items()}
+        for col_name, unique_index in self.unique_indexes.items():
+            self.unique_indexes[col_name] = {k: remap[v] for k, v in unique_index.items()}
+        for index in self.indexes.values():
+            index.remap(remap)
+
+    def rebuild_indexes(self):
+        """Rebuild the key, unique and secondary indexes from the stored rows in one scan."""
+        # Called after rows were loaded into the store directly
+        self.version = next(_versions)
+        pk_col = self.primary_key_column
+        primary_key_index: Dict[Any, int] = {}
+        unique_indexes: Dict[str, Dict[Any, int]] = {name: {} for name in self.unique_indexes}
+        pairs: Dict[str, List] = {name: [] for name in self.indexes}
+        for row_id, row in self.store.items():
+            if pk_col:
+                primary_key_index[row.get(pk_col.name)] = row_id
+            for col_name, unique_index in unique_indexes.items():
+                unique_index[row.get(col_name)] = row_id
+            for name, index in self.indexes.items():
+                pairs[name].append((row.get(index.column), row_id))
+        self.primary_key_index = primary_key_index
+        self.unique_indexes = unique_indexes
+        for name, index in self.indexes.items():
+            index.clear()
+            index.bulk_load(pairs[name])
+
+    def load_columns(self, values: List[List[Any]]) -> int:
+        """Fill an empty table from one list of already validated values per column; returns the row count.
+
+        The rows take row ids 0..n-1, so the key, unique and secondary indexes are built
+        straight from the column lists without going through row dicts.
+        """
+        if len(self.store):
+            raise ValueError(f"Table {self.name} is not empty")
+        if len(values) != len(self.columns):
+            raise ValueError(f"Table {self.name} has {len(self.columns)} columns, not {len(values)}")
+        if not values or not values[0]:
+            return 0
+        by_name = {col.name: column_values for col, column_values in zip(self.columns, values)}
+        count = len(values[0])
+        pk_col = self.primary_key_column
+        primary_key_index: Dict[Any, int] = {}
+        if pk_col:
+            primary_key_index = dict(zip(by_name[pk_col.name], range(count)))
+            if len(primary_key_index) != count:
+                raise ValueError("Primary key violation")
+        unique_indexes: Dict[str, Dict[Any, int]] = {}
+        for col_name in self.unique_indexes:
+            unique_indexes[col_name] = dict(zip(by_name[col_name], range(count)))
+            if len(unique_indexes[col_name]) != count:
+                raise ValueError(f"Unique constraint violation for {col_name}")
+
+        if isinstance(self.store, RowStore):
+            self.store.load(values)
+        else:
+            names = [col.name for col in self.columns]
+            self.store.insert_many([dict(zip(names, row)) for row in zip(*values)])
+        self.version = next(_versions)
+        self.primary_key_index = primary_key_index
+        self.unique_indexes = unique_indexes
+        for index in self.indexes.values():
+            index.bulk_load(list(zip(by_name[index.column], range(count))))
+        return count
+
+    def create_index(self, name: str, column: str, index_type: IndexType = IndexType.HASH):
+        if column not in self.column_map:
+            raise ValueError(f"Unknown column {column}")
+        if name in self.indexes:
+            raise ValueError(f"Index {name} already exists")
+        index = create_index(name, column, index_type)
+        index.bulk_load([(row.get(column), row_id) for row_id, row in self.store.items()])
+        self.indexes[name] = index
+
+    def drop_index(self, name: str):
+        if name not in self.indexes:
+            raise ValueError(f"Index {name} not found")
+        del self.indexes[name]
+
+    def is_indexed(self, column: str) -> bool:
+        if column in self.unique_indexes:
+            return True
+        if any(col.primary_key and col.name == column for col in self.columns):
+            return True
+        return any(index.column == column for index in self.indexes.values())
 
     def select_rows(self, where_clause=None):
         if where_clause is None:
             return self.rows
         # where_clause is dict of col: value
-        return [row for row in self.rows if all(row.get(k) == v for k, v in where_clause.items())]
\ No newline at end of file
+        row_ids = self._index_lookup(where_clause)
+        if row_ids is None:
+            return self.scan_rows(where_clause)
+        return self.fetch_rows(row_ids, where_clause)
+
+    def scan_rows(self, where_clause=None):
+        """Full scan, without looking at any index."""
+        if not where_clause:
+            return self.rows
+        return [row for row in self.store if all(row.get(k) == v for k, v in where_clause.items())]
+
+    def fetch_rows(self, row_ids: Iterable[int], where_clause=None):
+        """The rows at row_ids, in storage order, that match where_clause."""
+        rows = (self.store.get(i) for i in sorted(row_ids))
+        if not where_clause:
+            return list(rows)
+        return [row for row in rows if all(row.get(k) == v for k, v in where_clause.items())]
+
+    def index_lookup(self, column: str, value) -> Optional[Iterable[int]]:
+        """Row ids whose column equals value, from the best index on the column, or None if it has none."""
+        pk_col = self.primary_key_column
+        if pk_col and pk_col.name == column or column in self.unique_indexes:
+            key_index = self.primary_key_index if pk_col and pk_col.name == column else self.unique_indexes[column]
+            idx = key_index.get(value)
+            return () if idx is None else (idx,)
+        best = None
+        for index in self.indexes.values():
+            if index.column == column:
+                if index.index_type == IndexType.HASH:
+                    return index.lookup(value)
+                best = best or index
+        return None if best is None else best.lookup(value)
+
+    def index_range(self, column: str, low=None, high=None, low_inclusive: bool = True,
+                    high_inclusive: bool = True) -> Optional[List[int]]:
+        """Row ids with low <(=) column <(=) high from a BTREE index, or None if the column has none."""
+        for index in self.indexes.values():
+            if index.column == column and index.index_type == IndexType.BTREE:
+                return index.range(low, high, low_inclusive, high_inclusive)
+        return None
+
+    def has_range_index(self, column: str) -> bool:
+        return any(index.column == column and index.index_type == IndexType.BTREE
+                   for index in self.indexes.values())
+
+    def _index_lookup(self, where_clause: Dict[str, Any]) -> Optional[Iterable[int]]:
+        # Candidate row positions from the most selective index on a WHERE column, or None to scan.
+        pk_col = self.primary_key_column
+        if pk_col and pk_col.name in where_clause:
+            return self.index_lookup(pk_col.name, where_clause[pk_col.name])
+        for col_name, value in where_clause.items():
+            if col_name in self.unique_indexes:
+                return self.index_lookup(col_name, value)
+        best = None
+        for index in self.indexes.values():
+            if index.column in where_clause:
+                if index.index_type == IndexType.HASH:
+                    return index.lookup(where_clause[index.column])
+                best = best or index
+        if best is not None:
+            return best.lookup(where_clause[best.column])
+        return None
+
+
+def _row_validator(column_map: Dict[str, Column]):
+    validators = {name: col.validate_value for name, col in column_map.items()}
+    get = validators.get
+
+    def validate_row(row: Dict[str, Any]):
+        for col_name, value in row.items():
+            validate = get(col_name)
+            if validate is None:
+                raise ValueError(f"Unknown column {col_name}")
+            validate(value)
+    return validate_row
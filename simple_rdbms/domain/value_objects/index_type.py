@@ -0,0 +1,5 @@
+from enum import Enum
+
+class IndexType(Enum):
+    HASH = "HASH"
+    BTREE = "BTREE"
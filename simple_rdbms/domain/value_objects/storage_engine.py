@@ -0,0 +1,5 @@
+from enum import Enum
+
+class StorageEngine(Enum):
+    ROW = "ROW"
+    COLUMNAR = "COLUMNAR"
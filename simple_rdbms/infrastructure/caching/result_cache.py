@@ -0,0 +1,94 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+Row = Dict[str, Any]
+Versions = Tuple[int, ...]
+
+# Results larger than this share of the cache are not kept: one would push out everything else
+MAX_ENTRY_SHARE = 0.25
+# Rows sampled to estimate the size of a result
+_SIZE_SAMPLE = 32
+
+
+class ResultCache:
+    """SELECT results by statement, each valid while the tables it was read from are unchanged.
+
+    An entry keeps the versions its tables had when the result was computed. A lookup
+    with other versions finds the entry invalid and drops it. Entries are evicted least
+    recently used first once their estimated sizes add up to more than `max_bytes`.
+    Thread-safe.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        # key -> (versions, rows, estimated bytes)
+        self.entries: "OrderedDict[Hashable, Tuple[Versions, Tuple[Row, ...], int]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # Entries dropped because a table changed, and to make room
+        self.invalidations = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable, versions: Versions) -> Optional[List[Row]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] != versions:
+                self._drop(key)
+                self.invalidations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            # Rows of its own, so callers cannot change the cached result
+            return [dict(row) for row in entry[1]]
+
+    def put(self, key: Hashable, versions: Versions, rows: List[Row]):
+        size = result_size(rows)
+        if size > self.max_bytes * MAX_ENTRY_SHARE:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            # Copied, since the caller goes on to hand the same rows to its own caller
+            self.entries[key] = (versions, tuple(dict(row) for row in rows), size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_ratio': self.hits / lookups if lookups else 0.0,
+                    'entries': len(self.entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                    'invalidations': self.invalidations, 'evictions': self.evictions}
+
+    def _drop(self, key: Hashable):
+        _, _, size = self.entries.pop(key)
+        self.bytes -= size
+
+
+def result_size(rows: List[Row]) -> int:
+    """Estimated bytes of a result, from the sizes of evenly spaced sample rows."""
+    size = sys.getsizeof(rows) + 64
+    if not rows:
+        return size
+    step = max(1, len(rows) // _SIZE_SAMPLE)
+    sample = rows[::step]
+    per_row = sum(sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row.values()) for row in sample) / len(sample)
+    return size + int(per_row * len(rows))
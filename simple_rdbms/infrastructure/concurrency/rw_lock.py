@@ -0,0 +1,143 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional
+
+
+class LockTimeout(ValueError):
+    """A lock could not be taken within the allowed time, e.g. because of a deadlock."""
+
+
+class RWLock:
+    """Reader/writer lock: any number of readers or one writer.
+
+    Waiting writers block new readers, so a steady stream of reads cannot starve
+    writes. The lock is not reentrant: a thread must not take it again, in either
+    mode, while it already holds it.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire_read(self, timeout: Optional[float] = None) -> bool:
+        """Take the lock shared; False if `timeout` seconds pass first."""
+        with self._cond:
+            if not self._wait(lambda: not self._writer and not self._waiting_writers, timeout):
+                return False
+            self._readers += 1
+            return True
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self, timeout: Optional[float] = None) -> bool:
+        """Take the lock exclusively; False if `timeout` seconds pass first."""
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                acquired = self._wait(lambda: not self._writer and not self._readers, timeout)
+            finally:
+                self._waiting_writers -= 1
+                if not self._waiting_writers:
+                    # Readers held back by this writer may go if it gave up
+                    self._cond.notify_all()
+            if acquired:
+                self._writer = True
+            return acquired
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    def _wait(self, ready: Callable[[], bool], timeout: Optional[float]) -> bool:
+        if timeout is None:
+            while not ready():
+                self._cond.wait()
+            return True
+        deadline = time.monotonic() + timeout
+        while not ready():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._cond.wait(remaining)
+        return True
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class LockManager:
+    """Statement-level locks: one RWLock for the catalog and one per table.
+
+    Every statement holds the catalog lock in shared mode, or exclusively when it
+    creates or drops tables, and then the locks of the tables it touches, shared for
+    reads and exclusive for writes. Locks are always taken in the same order (catalog
+    first, then tables by name), so statements cannot deadlock.
+
+    Transactions keep the tables they write locked from statement to statement, which
+    breaks that ordering; they pass `held` to skip the locks they already own and a
+    `timeout` so that a deadlock ends in LockTimeout rather than a hang.
+    """
+
+    def __init__(self):
+        self.catalog = RWLock()
+        self.tables: Dict[str, RWLock] = {}
+        self._guard = threading.Lock()
+
+    def table_lock(self, name: str) -> RWLock:
+        lock = self.tables.get(name)
+        if lock is None:
+            with self._guard:
+                lock = self.tables.setdefault(name, RWLock())
+        return lock
+
+    @contextmanager
+    def locked(self, reads: Iterable[str] = (), writes: Iterable[str] = (), catalog_write: bool = False,
+               held: Iterable[str] = (), timeout: Optional[float] = None):
+        writes = set(writes)
+        names = sorted(writes.union(reads).difference(held))
+        taken = []
+        try:
+            if catalog_write:
+                self._take('the catalog', self.catalog.acquire_write, timeout)
+                taken.append(self.catalog.release_write)
+            else:
+                self._take('the catalog', self.catalog.acquire_read, timeout)
+                taken.append(self.catalog.release_read)
+            for name in names:
+                lock = self.table_lock(name)
+                if name in writes:
+                    self._take(name, lock.acquire_write, timeout)
+                    taken.append(lock.release_write)
+                else:
+                    self._take(name, lock.acquire_read, timeout)
+                    taken.append(lock.release_read)
+            yield
+        finally:
+            for release in reversed(taken):
+                release()
+
+    @staticmethod
+    def _take(name: str, acquire: Callable[[Optional[float]], bool], timeout: Optional[float]):
+        if not acquire(timeout):
+            raise LockTimeout(f"Timed out waiting for a lock on {name}")
@@ -0,0 +1,94 @@
+"""Streaming readers for COPY FROM.
+
+Each reader yields one row dict at a time so a load never holds the raw file in memory
+on top of the parsed rows. CSV fields arrive as text and are converted with one
+converter per column, chosen once from the column types; an empty field is NULL.
+"""
+import csv
+import json
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from domain.entities.column import Column
+from domain.value_objects.data_type import DataType
+
+Row = Dict[str, Any]
+
+_TRUE = {'true', 't', '1', 'yes'}
+_FALSE = {'false', 'f', '0', 'no'}
+
+
+def _to_bool(text: str) -> bool:
+    lowered = text.lower()
+    if lowered in _TRUE:
+        return True
+    if lowered in _FALSE:
+        return False
+    raise ValueError(f"Invalid boolean {text!r}")
+
+
+_CONVERTERS: Dict[DataType, Callable[[str], Any]] = {
+    DataType.INTEGER: int,
+    DataType.FLOAT: float,
+    DataType.BOOLEAN: _to_bool,
+    DataType.VARCHAR: str,
+}
+
+
+def read_rows(path: str, fmt: str, columns: List[Column], names: Optional[List[str]] = None,
+              header: bool = True) -> Iterator[Row]:
+    """Yield the rows of a CSV or JSONL file as dicts keyed by column name."""
+    if fmt == 'CSV':
+        return read_csv(path, columns, names, header)
+    if fmt == 'JSONL':
+        return read_jsonl(path, columns, names)
+    raise ValueError(f"Unsupported COPY format {fmt}")
+
+
+def read_csv(path: str, columns: List[Column], names: Optional[List[str]] = None,
+             header: bool = True) -> Iterator[Row]:
+    column_map = {col.name: col for col in columns}
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        if header:
+            file_names = next(reader, None)
+            if file_names is None:
+                return
+            # An explicit column list wins over the header line
+            names = names or [name.strip() for name in file_names]
+        names = names or [col.name for col in columns]
+        for name in names:
+            if name not in column_map:
+                raise ValueError(f"Unknown column {name}")
+        fields = [(name, _CONVERTERS[column_map[name].data_type]) for name in names]
+        width = len(fields)
+        for record in reader:
+            if not record:
+                continue
+            if len(record) != width:
+                raise ValueError(f"Line {reader.line_num}: expected {width} fields, got {len(record)}")
+            try:
+                yield {name: convert(text) if text != '' else None
+                       for (name, convert), text in zip(fields, record)}
+            except ValueError as e:
+                raise ValueError(f"Line {reader.line_num}: {e}") from None
+
+
+def read_jsonl(path: str, columns: List[Column], names: Optional[List[str]] = None) -> Iterator[Row]:
+    """Each line is a JSON object keyed by column name, or an array in column order."""
+    explicit = names is not None
+    names = names or [col.name for col in columns]
+    with open(path, encoding='utf-8') as f:
+        for line_num, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Line {line_num}: invalid JSON ({e})") from None
+            if isinstance(record, dict):
+                yield {name: record.get(name) for name in names} if explicit else record
+            elif isinstance(record, list):
+                if len(record) != len(names):
+                    raise ValueError(f"Line {line_num}: expected {len(names)} values, got {len(record)}")
+                yield dict(zip(names, record))
+            else:
+                raise ValueError(f"Line {line_num}: expected a JSON object or array")
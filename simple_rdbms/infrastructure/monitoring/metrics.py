@@ -0,0 +1,257 @@
+import bisect
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+# Upper bounds, in seconds, of the query duration histogram
+DURATION_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+# Functions listed in a captured profile
+PROFILE_LINES = 25
+
+slow_query_log = logging.getLogger('simple_rdbms.slow_query')
+_clock = time.perf_counter
+
+
+class QueryTrace:
+    """Where the time of one statement went, and how it read its rows.
+
+    Stages are timed with the monotonic perf_counter, once per stage rather than per row:
+    'parse' and 'serialize' by the front end, 'lock', 'plan' and 'execute' by QueryService.
+    A front end that makes a trace passes it to QueryService.execute and calls finish()
+    once the response is ready; finish() hands the trace to `metrics`, if any.
+
+    With `profile`, the code run inside profiling() is captured with cProfile and its
+    busiest functions end up in `profile_text`.
+    """
+
+    def __init__(self, metrics: Optional['QueryMetrics'] = None, sql: Optional[str] = None, profile: bool = False):
+        self.metrics = metrics
+        self.sql = sql
+        # False only for NULL_TRACE, so callers can skip work whose results it would drop
+        self.enabled = True
+        # Statement type, e.g. 'select'
+        self.statement: Optional[str] = None
+        # Seconds by stage
+        self.stages: Dict[str, float] = {}
+        # Rows the scans read (a full scan counts its whole table, even when a LIMIT stops it early)
+        self.rows_scanned = 0
+        self.rows_returned = 0
+        self.index_scans = 0
+        self.full_scans = 0
+        self.profile = profile
+        self.profile_text: Optional[str] = None
+        self.duration: Optional[float] = None
+        self.started = _clock()
+        self._profiling = False
+
+    def start(self, statement: str):
+        if self.statement is None:
+            self.statement = statement.lower()
+
+    def stage(self, name: str) -> '_Stage':
+        """A context manager timing its block into stage `name`."""
+        return _Stage(self, name)
+
+    def add_stage(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count_scans(self, index_scans: int, full_scans: int, rows_scanned: int):
+        self.index_scans += index_scans
+        self.full_scans += full_scans
+        self.rows_scanned += rows_scanned
+
+    def count_returned(self, rows: int):
+        self.rows_returned += rows
+
+    def counted(self, rows):
+        """`rows`, counting them into rows_returned as they are read."""
+        for row in rows:
+            self.rows_returned += 1
+            yield row
+
+    def profiling(self):
+        """A context manager that captures its block with cProfile when the trace has `profile`.
+
+        Nested blocks are part of the outer capture.
+        """
+        if not self.profile or self._profiling:
+            return _NOTHING
+        return self._profiled()
+
+    @contextmanager
+    def _profiled(self):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Some other profiler has hooked the process already
+            yield
+            return
+        self._profiling = True
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._profiling = False
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_LINES)
+            self.profile_text = out.getvalue()
+
+    def finish(self, error: bool = False):
+        if self.duration is not None:
+            return
+        self.duration = _clock() - self.started
+        if self.metrics is not None:
+            self.metrics.record(self, error)
+
+    def summary(self) -> str:
+        """E.g. '1.234 ms (parse 0.050, lock 0.001, plan 0.100, execute 1.000)'."""
+        duration = self.duration if self.duration is not None else _clock() - self.started
+        stages = ', '.join(f"{name} {seconds * 1000:.3f}" for name, seconds in self.stages.items())
+        return f"{duration * 1000:.3f} ms ({stages})" if stages else f"{duration * 1000:.3f} ms"
+
+
+class _Stage:
+    # A class rather than @contextmanager: it is entered several times per statement
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace: QueryTrace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = _clock()
+
+    def __exit__(self, *exc_info):
+        self.trace.add_stage(self.name, _clock() - self.start)
+
+
+_NOTHING = nullcontext()
+
+
+class NullTrace(QueryTrace):
+    """Stands in for a trace when nobody would read it, at next to no cost."""
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = False
+
+    def start(self, statement: str):
+        pass
+
+    def stage(self, name: str):
+        return _NOTHING
+
+    def add_stage(self, name: str, seconds: float):
+        pass
+
+    def count_scans(self, index_scans: int, full_scans: int, rows_scanned: int):
+        pass
+
+    def count_returned(self, rows: int):
+        pass
+
+    def counted(self, rows):
+        return rows
+
+    def profiling(self):
+        return _NOTHING
+
+    def finish(self, error: bool = False):
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+
+class QueryMetrics:
+    """Counters and timings of the statements a QueryService runs.
+
+    render() writes them in the Prometheus text exposition format. Statements that take
+    `slow_query_seconds` or longer are counted and logged at WARNING to the
+    'simple_rdbms.slow_query' logger with their SQL and stage timings; None turns the
+    log off. Thread-safe.
+    """
+
+    def __init__(self, slow_query_seconds: Optional[float] = None):
+        self.slow_query_seconds = slow_query_seconds
+        self.queries: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.stage_seconds: Dict[str, float] = {}
+        self.stage_count: Dict[str, int] = {}
+        # Statements per duration bucket, the last one for those slower than every bound
+        self.duration_counts: List[int] = [0] * (len(DURATION_BUCKETS) + 1)
+        self.duration_sum = 0.0
+        self.rows_scanned = 0
+        self.rows_returned = 0
+        self.index_scans = 0
+        self.full_scans = 0
+        self.slow_queries = 0
+        self.lock = threading.Lock()
+
+    def record(self, trace: QueryTrace, error: bool = False):
+        statement = trace.statement or 'unknown'
+        duration = trace.duration
+        slow = self.slow_query_seconds is not None and duration >= self.slow_query_seconds
+        bucket = bisect.bisect_left(DURATION_BUCKETS, duration)
+        with self.lock:
+            self.queries[statement] = self.queries.get(statement, 0) + 1
+            if error:
+                self.errors[statement] = self.errors.get(statement, 0) + 1
+            for name, seconds in trace.stages.items():
+                self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+                self.stage_count[name] = self.stage_count.get(name, 0) + 1
+            self.duration_counts[bucket] += 1
+            self.duration_sum += duration
+            self.rows_scanned += trace.rows_scanned
+            self.rows_returned += trace.rows_returned
+            self.index_scans += trace.index_scans
+            self.full_scans += trace.full_scans
+            if slow:
+                self.slow_queries += 1
+        if slow:
+            slow_query_log.warning("Slow query, %s, %d rows scanned, %d returned: %s", trace.summary(),
+                                   trace.rows_scanned, trace.rows_returned, trace.sql or statement)
+
+    def render(self) -> str:
+        with self.lock:
+            lines = []
+            _family(lines, 'rdbms_queries_total', 'counter', "Statements run, by type",
+                    [(f'{{statement="{name}"}}', count) for name, count in sorted(self.queries.items())])
+            _family(lines, 'rdbms_query_errors_total', 'counter', "Statements that failed, by type",
+                    [(f'{{statement="{name}"}}', count) for name, count in sorted(self.errors.items())])
+            lines.append("# HELP rdbms_query_duration_seconds Time from the start to the end of a statement")
+            lines.append("# TYPE rdbms_query_duration_seconds histogram")
+            total = 0
+            for bound, count in zip(DURATION_BUCKETS + (float('inf'),), self.duration_counts):
+                total += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'rdbms_query_duration_seconds_bucket{{le="{le}"}} {total}')
+            lines.append(f"rdbms_query_duration_seconds_sum {self.duration_sum!r}")
+            lines.append(f"rdbms_query_duration_seconds_count {total}")
+            lines.append("# HELP rdbms_stage_seconds Time spent in each stage of running a statement")
+            lines.append("# TYPE rdbms_stage_seconds summary")
+            for name in sorted(self.stage_seconds):
+                lines.append(f'rdbms_stage_seconds_sum{{stage="{name}"}} {self.stage_seconds[name]!r}')
+                lines.append(f'rdbms_stage_seconds_count{{stage="{name}"}} {self.stage_count[name]}')
+            _family(lines, 'rdbms_rows_scanned_total', 'counter', "Rows read by scans", [('', self.rows_scanned)])
+            _family(lines, 'rdbms_rows_returned_total', 'counter', "Rows returned by SELECTs",
+                    [('', self.rows_returned)])
+            _family(lines, 'rdbms_index_scans_total', 'counter', "Tables read through an index",
+                    [('', self.index_scans)])
+            _family(lines, 'rdbms_full_scans_total', 'counter', "Tables read by a full scan", [('', self.full_scans)])
+            _family(lines, 'rdbms_slow_queries_total', 'counter', "Statements over the slow query threshold",
+                    [('', self.slow_queries)])
+        return '\n'.join(lines) + '\n'
+
+
+def _family(lines: List[str], name: str, kind: str, help_text: str, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{labels} {value}")
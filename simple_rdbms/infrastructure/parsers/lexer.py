@@ -0,0 +1,75 @@
+import re
+from typing import List
+
+# Reserved words: they can never be identifiers. Every other word the grammar uses (KEY,
+# PRIMARY, INDEX, WITH, BEGIN, ...) is lexed as an identifier and only recognised by the
+# parser where it is expected, so it can still name a table or column.
+KEYWORDS = {
+    'AND', 'CREATE', 'DELETE', 'DROP', 'FALSE', 'FROM', 'INSERT', 'INTO', 'JOIN', 'NOT', 'NULL', 'ON',
+    'SELECT', 'SET', 'TRUE', 'UPDATE', 'VALUES', 'WHERE',
+}
+
+# Token kinds
+KEYWORD = 'KEYWORD'
+IDENT = 'IDENT'
+NUMBER = 'NUMBER'
+STRING = 'STRING'
+SYMBOL = 'SYMBOL'
+PARAM = 'PARAM'
+EOF = 'EOF'
+
+# Leading whitespace is consumed by each match, and any other character falls through to
+# `error`, so findall() walks the whole statement without silently skipping anything.
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>(?:-?\d+\.\d*|-?\d*\.\d+|-?\d+)(?:[eE][+-]?\d+)?)
+      | (?P<string>'(?:[^']|'')*')
+      | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<param>\?|:[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<symbol><=|>=|<>|!=|[(),;=.*<>])
+      | (?P<error>\S)
+    )
+""", re.VERBOSE)
+
+
+class Token:
+    __slots__ = ('kind', 'value')
+
+    def __init__(self, kind: str, value):
+        self.kind = kind
+        self.value = value
+
+    def __repr__(self):
+        return f"Token({self.kind}, {self.value!r})"
+
+
+def tokenize(sql: str) -> List[Token]:
+    """Split SQL into tokens in one left-to-right pass.
+
+    Keywords are upper-cased, identifiers keep their spelling, string literals are
+    unquoted ('' is an escaped quote), numbers are converted to int or float and
+    placeholders become PARAM tokens whose value is the name, or None for '?'.
+    """
+    tokens = []
+    append = tokens.append
+    # findall() hands back plain tuples, which is much cheaper than a Match object per token.
+    for number, string, word, param, symbol, error in _TOKEN_RE.findall(sql):
+        if word:
+            upper = word.upper()
+            if upper in KEYWORDS:
+                append(Token(KEYWORD, upper))
+            else:
+                append(Token(IDENT, word))
+        elif symbol:
+            append(Token(SYMBOL, symbol))
+        elif number:
+            append(Token(NUMBER, int(number) if number.lstrip('-').isdigit() else float(number)))
+        elif string:
+            append(Token(STRING, string[1:-1].replace("''", "'")))
+        elif param:
+            # '?' is positional, ':name' is named
+            append(Token(PARAM, param[1:] or None))
+        elif error:
+            raise ValueError(f"Unexpected character {error!r}")
+    append(Token(EOF, None))
+    return tokens
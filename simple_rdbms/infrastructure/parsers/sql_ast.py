@@ -0,0 +1,359 @@
+"""Typed syntax tree produced by SqlParser and consumed by QueryService.
+
+Nodes are plain __slots__ classes. Parsed statements are shared through the parser's
+statement cache, so nothing downstream may mutate them.
+"""
+from typing import Any, Dict, List, Optional
+
+
+class Node:
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+# Statements
+
+class ColumnDef(Node):
+    __slots__ = ('name', 'data_type', 'primary_key', 'unique', 'nullable')
+
+    def __init__(self, name: str, data_type: str, primary_key: bool = False, unique: bool = False,
+                 nullable: bool = True):
+        self.name = name
+        self.data_type = data_type
+        self.primary_key = primary_key
+        self.unique = unique
+        self.nullable = nullable
+
+
+class PartitionBy(Node):
+    """PARTITION BY HASH (column) PARTITIONS n, or PARTITION BY RANGE (column) BOUNDS (b1, ...)."""
+    __slots__ = ('method', 'column', 'count', 'bounds')
+
+    def __init__(self, method: str, column: str, count: int, bounds: Optional[List[Any]] = None):
+        # 'HASH' or 'RANGE'
+        self.method = method
+        self.column = column
+        self.count = count
+        # RANGE only: partition i holds keys from bounds[i - 1] up to, not including, bounds[i]
+        self.bounds = bounds or []
+
+
+class CreateTable(Node):
+    __slots__ = ('name', 'columns', 'engine', 'partition')
+
+    def __init__(self, name: str, columns: List[ColumnDef], engine: str = 'ROW',
+                 partition: Optional[PartitionBy] = None):
+        self.name = name
+        self.columns = columns
+        self.engine = engine
+        self.partition = partition
+
+
+class CreateIndex(Node):
+    __slots__ = ('name', 'table', 'column', 'index_type')
+
+    def __init__(self, name: str, table: str, column: str, index_type: str = 'HASH'):
+        self.name = name
+        self.table = table
+        self.column = column
+        self.index_type = index_type
+
+
+class DropIndex(Node):
+    __slots__ = ('name', 'table')
+
+    def __init__(self, name: str, table: Optional[str] = None):
+        self.name = name
+        self.table = table
+
+
+class Insert(Node):
+    __slots__ = ('table', 'columns', 'rows')
+
+    def __init__(self, table: str, columns: Optional[List[str]], rows: List[List[Any]]):
+        self.table = table
+        # None means values are given in table column order
+        self.columns = columns
+        # One list of values per VALUES tuple
+        self.rows = rows
+
+
+class Copy(Node):
+    __slots__ = ('table', 'columns', 'path', 'format', 'header')
+
+    def __init__(self, table: str, columns: Optional[List[str]], path: str, format: str = 'CSV',
+                 header: bool = True):
+        self.table = table
+        self.columns = columns
+        self.path = path
+        # CSV or JSONL
+        self.format = format
+        self.header = header
+
+
+class Join(Node):
+    __slots__ = ('table', 'left', 'right')
+
+    def __init__(self, table: str, left: str, right: str):
+        self.table = table
+        self.left = left
+        self.right = right
+
+
+class Aggregate(Node):
+    """COUNT, SUM, AVG, MIN or MAX of a column, or COUNT(*) when column is None."""
+    __slots__ = ('function', 'column', 'alias')
+
+    def __init__(self, function: str, column: Optional[str], alias: Optional[str] = None):
+        self.function = function
+        self.column = column
+        self.alias = alias
+
+
+class OrderItem(Node):
+    __slots__ = ('column', 'descending')
+
+    def __init__(self, column, descending: bool = False):
+        # A column name, an alias or an Aggregate
+        self.column = column
+        self.descending = descending
+
+
+class Select(Node):
+    __slots__ = ('table', 'columns', 'join', 'where', 'group_by', 'order_by', 'limit', 'offset')
+
+    def __init__(self, table: str, columns: list, join: Optional[Join] = None, where=None,
+                 group_by: Optional[List[str]] = None, order_by: Optional[List[OrderItem]] = None,
+                 limit: Any = None, offset: Any = None):
+        self.table = table
+        # ['*'] or a list of column names, possibly table-qualified, and Aggregates
+        self.columns = columns
+        self.join = join
+        self.where = where
+        self.group_by = group_by or []
+        self.order_by = order_by or []
+        # None for no LIMIT / no OFFSET
+        self.limit = limit
+        self.offset = offset
+
+
+class Update(Node):
+    __slots__ = ('table', 'assignments', 'where')
+
+    def __init__(self, table: str, assignments: Dict[str, Any], where=None):
+        self.table = table
+        self.assignments = assignments
+        self.where = where
+
+
+class Delete(Node):
+    __slots__ = ('table', 'where')
+
+    def __init__(self, table: str, where=None):
+        self.table = table
+        self.where = where
+
+
+class Prepare(Node):
+    __slots__ = ('name', 'statement', 'parameters')
+
+    def __init__(self, name: str, statement, parameters: List[Optional[str]]):
+        self.name = name
+        self.statement = statement
+        # One entry per distinct placeholder, in index order: the name, or None for '?'
+        self.parameters = parameters
+
+
+class Execute(Node):
+    __slots__ = ('name', 'values')
+
+    def __init__(self, name: str, values: List[Any]):
+        self.name = name
+        self.values = values
+
+
+class Deallocate(Node):
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class Begin(Node):
+    __slots__ = ()
+
+
+class Commit(Node):
+    __slots__ = ()
+
+
+class Rollback(Node):
+    __slots__ = ()
+
+
+class Explain(Node):
+    __slots__ = ('statement', 'analyze')
+
+    def __init__(self, statement, analyze: bool = False):
+        self.statement = statement
+        # EXPLAIN ANALYZE runs the statement and reports actual row counts and timings
+        self.analyze = analyze
+
+
+class Analyze(Node):
+    __slots__ = ('table',)
+
+    def __init__(self, table: Optional[str] = None):
+        # None analyzes every table
+        self.table = table
+
+
+class Save(Node):
+    __slots__ = ('path', 'compression')
+
+    def __init__(self, path: str, compression: str = 'NONE'):
+        # Snapshot file written on the server
+        self.path = path
+        # 'NONE' or 'ZLIB'
+        self.compression = compression
+
+
+class Load(Node):
+    __slots__ = ('path',)
+
+    def __init__(self, path: str):
+        self.path = path
+
+
+class Parameter(Node):
+    """A `?` or `:name` placeholder standing in for a literal value."""
+    __slots__ = ('index', 'name')
+
+    def __init__(self, index: int, name: Optional[str] = None):
+        self.index = index
+        self.name = name
+
+
+# WHERE expressions
+
+class Comparison(Node):
+    __slots__ = ('column', 'op', 'value')
+
+    def __init__(self, column: str, op: str, value: Any):
+        self.column = column
+        self.op = op
+        self.value = value
+
+
+class Between(Node):
+    __slots__ = ('column', 'low', 'high', 'negated')
+
+    def __init__(self, column: str, low: Any, high: Any, negated: bool = False):
+        self.column = column
+        self.low = low
+        self.high = high
+        self.negated = negated
+
+
+class In(Node):
+    __slots__ = ('column', 'values', 'negated')
+
+    def __init__(self, column: str, values: List[Any], negated: bool = False):
+        self.column = column
+        self.values = values
+        self.negated = negated
+
+
+class Like(Node):
+    __slots__ = ('column', 'pattern', 'negated')
+
+    def __init__(self, column: str, pattern: Any, negated: bool = False):
+        self.column = column
+        # % matches any run of characters, _ any single character
+        self.pattern = pattern
+        self.negated = negated
+
+
+class IsNull(Node):
+    __slots__ = ('column', 'negated')
+
+    def __init__(self, column: str, negated: bool = False):
+        self.column = column
+        self.negated = negated
+
+
+class And(Node):
+    __slots__ = ('terms',)
+
+    def __init__(self, terms: list):
+        self.terms = terms
+
+
+class Or(Node):
+    __slots__ = ('terms',)
+
+    def __init__(self, terms: list):
+        self.terms = terms
+
+
+class Not(Node):
+    __slots__ = ('term',)
+
+    def __init__(self, term):
+        self.term = term
+
+
+def bind_parameters(node, values: List[Any]):
+    """Return a copy of a statement with every Parameter replaced by values[index]."""
+    if isinstance(node, Parameter):
+        return values[node.index]
+    if isinstance(node, Insert):
+        return Insert(node.table, node.columns,
+                      [[bind_parameters(v, values) for v in row] for row in node.rows])
+    if isinstance(node, Select):
+        return Select(node.table, node.columns, node.join, bind_parameters(node.where, values), node.group_by,
+                      node.order_by, bind_parameters(node.limit, values), bind_parameters(node.offset, values))
+    if isinstance(node, Update):
+        return Update(node.table, {k: bind_parameters(v, values) for k, v in node.assignments.items()},
+                      bind_parameters(node.where, values))
+    if isinstance(node, Delete):
+        return Delete(node.table, bind_parameters(node.where, values))
+    if isinstance(node, Comparison):
+        return Comparison(node.column, node.op, bind_parameters(node.value, values))
+    if isinstance(node, Between):
+        return Between(node.column, bind_parameters(node.low, values), bind_parameters(node.high, values),
+                       node.negated)
+    if isinstance(node, In):
+        return In(node.column, [bind_parameters(v, values) for v in node.values], node.negated)
+    if isinstance(node, Like):
+        return Like(node.column, bind_parameters(node.pattern, values), node.negated)
+    if isinstance(node, (And, Or)):
+        return type(node)([bind_parameters(term, values) for term in node.terms])
+    if isinstance(node, Not):
+        return Not(bind_parameters(node.term, values))
+    return node
+
+
+def equality_conditions(expr) -> Optional[Dict[str, Any]]:
+    """Flatten a conjunction of `column = value` comparisons into {column: value}.
+
+    Returns None for an empty WHERE. Raises ValueError for anything else.
+    """
+    if expr is None:
+        return None
+    terms = expr.terms if isinstance(expr, And) else [expr]
+    conditions = {}
+    for term in terms:
+        if not isinstance(term, Comparison) or term.op != '=':
+            raise ValueError("Only equality conditions joined by AND are supported")
+        conditions[term.column] = term.value
+    return conditions
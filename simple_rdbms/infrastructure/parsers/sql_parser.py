@@ -1,153 +1,573 @@
-import re
-from typing import Dict, Any, List
+import os
+from typing import Any, List, Optional, Tuple
 from domain.value_objects.data_type import DataType
+from domain.value_objects.index_type import IndexType
+from domain.value_objects.storage_engine import StorageEngine
+from infrastructure.caching.lru_cache import LRUCache
+from infrastructure.parsers.lexer import tokenize, Token, KEYWORD, IDENT, NUMBER, STRING, SYMBOL, PARAM, EOF
+from infrastructure.parsers.sql_ast import (
+    ColumnDef, PartitionBy, CreateTable, CreateIndex, DropIndex, Insert, Copy, Join, Aggregate, OrderItem, Select, Update, Delete,
+    Prepare, Execute, Deallocate, Begin, Commit, Rollback, Explain, Analyze, Save, Load, Parameter, Comparison, Between, In,
+    Like, IsNull, And, Or, Not,
+)
+
+
+# Longer statements (multi-row INSERTs, mostly) are one-offs and too big to keep around.
+MAX_CACHED_LENGTH = 4096
+
+# Comparison symbols and the operator each one stands for in the AST
+COMPARISON_OPERATORS = {'=': '=', '!=': '!=', '<>': '!=', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
+
+# Only recognised when followed by '(', so they can still name columns
+AGGREGATE_FUNCTIONS = ('COUNT', 'SUM', 'AVG', 'MIN', 'MAX')
+
 
 class SqlParser:
-    def parse(self, sql: str) -> Dict[str, Any]:
-        sql = sql.strip()
-        if sql.upper().startswith("CREATE TABLE"):
-            return self._parse_create_table(sql)
-        elif sql.upper().startswith("INSERT INTO"):
-            return self._parse_insert(sql)
-        elif sql.upper().startswith("SELECT"):
-            return self._parse_select(sql)
-        elif sql.upper().startswith("UPDATE"):
-            return self._parse_update(sql)
-        elif sql.upper().startswith("DELETE FROM"):
-            return self._parse_delete(sql)
+    def __init__(self, cache_size: int = 1024):
+        # Parsed statements keyed by normalized SQL text
+        self.cache = LRUCache(cache_size)
+
+    def parse(self, sql: str):
+        statement, parameters = self.parse_prepared(sql)
+        if parameters:
+            raise ValueError("Placeholders are only allowed in prepared statements")
+        return statement
+
+    def parse_prepared(self, sql: str) -> Tuple[Any, List[Optional[str]]]:
+        """Parse a statement that may contain ? or :name placeholders.
+
+        Returns the statement and its placeholders in index order (name, or None for '?').
+        """
+        key = self.normalize(sql)
+        entry = self.cache.get(key)
+        if entry is None:
+            parser = _Parser(tokenize(key))
+            statement = parser.parse_statement()
+            entry = (statement, parser.parameters)
+            if len(key) <= MAX_CACHED_LENGTH:
+                self.cache.put(key, entry)
+        return entry
+
+    @staticmethod
+    def normalize(sql: str) -> str:
+        sql = sql.strip().rstrip(';').rstrip()
+        # Collapsing whitespace is only safe when no string literal could contain it.
+        if "'" not in sql:
+            sql = ' '.join(sql.split())
+        return sql
+
+
+class _Parser:
+    """Recursive-descent parser over the token list of one statement."""
+
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.pos = 0
+        # Placeholders seen so far: name, or None for '?', in index order
+        self.parameters: List[Optional[str]] = []
+
+    # Token helpers
+
+    def peek(self) -> Token:
+        return self.tokens[self.pos]
+
+    def advance(self) -> Token:
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def at_keyword(self, *words: str) -> bool:
+        token = self.tokens[self.pos]
+        if token.kind == KEYWORD:
+            return token.value in words
+        # Unreserved keywords arrive as identifiers
+        return token.kind == IDENT and token.value.upper() in words
+
+    def at_symbol(self, symbol: str) -> bool:
+        token = self.tokens[self.pos]
+        return token.kind == SYMBOL and token.value == symbol
+
+    def accept_keyword(self, word: str) -> bool:
+        if self.at_keyword(word):
+            self.pos += 1
+            return True
+        return False
+
+    def accept_symbol(self, symbol: str) -> bool:
+        if self.at_symbol(symbol):
+            self.pos += 1
+            return True
+        return False
+
+    def expect_keyword(self, word: str):
+        if not self.accept_keyword(word):
+            self.error(word)
+
+    def expect_symbol(self, symbol: str):
+        if not self.accept_symbol(symbol):
+            self.error(f"'{symbol}'")
+
+    def expect_ident(self) -> str:
+        token = self.peek()
+        if token.kind != IDENT:
+            self.error("identifier")
+        self.pos += 1
+        return token.value
+
+    def error(self, expected: str):
+        token = self.peek()
+        found = "end of statement" if token.kind == EOF else repr(token.value)
+        raise ValueError(f"Expected {expected}, found {found}")
+
+    # Statements
+
+    def parse_statement(self):
+        if self.accept_keyword('PREPARE'):
+            statement = self.parse_prepare()
+        elif self.accept_keyword('EXECUTE'):
+            statement = self.parse_execute()
+        elif self.accept_keyword('DEALLOCATE'):
+            self.accept_keyword('PREPARE')
+            statement = Deallocate(self.expect_ident())
+        elif self.accept_keyword('BEGIN'):
+            self.accept_noise_word()
+            statement = Begin()
+        elif self.accept_keyword('COMMIT'):
+            self.accept_noise_word()
+            statement = Commit()
+        elif self.accept_keyword('ROLLBACK'):
+            self.accept_noise_word()
+            statement = Rollback()
+        elif self.accept_keyword('EXPLAIN'):
+            # EXPLAIN [ANALYZE] SELECT ...
+            analyze = self.accept_keyword('ANALYZE')
+            if not self.at_keyword('SELECT'):
+                raise ValueError("Only SELECT can be explained")
+            statement = Explain(self.parse_body(), analyze)
+        elif self.accept_keyword('ANALYZE'):
+            # ANALYZE [table]
+            statement = Analyze(self.expect_ident() if self.peek().kind == IDENT else None)
+        elif self.accept_keyword('SAVE'):
+            statement = self.parse_save()
+        elif self.accept_keyword('LOAD'):
+            # LOAD FROM 'path'
+            self.expect_keyword('FROM')
+            statement = Load(self.expect_path())
+        else:
+            statement = self.parse_body()
+        self.accept_symbol(';')
+        if self.peek().kind != EOF:
+            self.error("end of statement")
+        return statement
+
+    def accept_noise_word(self):
+        # BEGIN/COMMIT/ROLLBACK [TRANSACTION | WORK]
+        if self.at_keyword('TRANSACTION', 'WORK'):
+            self.advance()
+
+    def parse_body(self):
+        if self.at_keyword('CREATE'):
+            self.advance()
+            if self.accept_keyword('TABLE'):
+                statement = self.parse_create_table()
+            elif self.accept_keyword('INDEX'):
+                statement = self.parse_create_index()
+            else:
+                raise ValueError("Unsupported SQL statement")
+        elif self.at_keyword('DROP'):
+            self.advance()
+            self.expect_keyword('INDEX')
+            statement = self.parse_drop_index()
+        elif self.accept_keyword('INSERT'):
+            statement = self.parse_insert()
+        elif self.accept_keyword('COPY'):
+            statement = self.parse_copy()
+        elif self.accept_keyword('SELECT'):
+            statement = self.parse_select()
+        elif self.accept_keyword('UPDATE'):
+            statement = self.parse_update()
+        elif self.accept_keyword('DELETE'):
+            statement = self.parse_delete()
         else:
             raise ValueError("Unsupported SQL statement")
+        return statement
+
+    def parse_prepare(self) -> Prepare:
+        # PREPARE name AS statement
+        name = self.expect_ident()
+        self.expect_keyword('AS')
+        if not self.at_keyword('INSERT', 'SELECT', 'UPDATE', 'DELETE'):
+            raise ValueError("Only INSERT, SELECT, UPDATE and DELETE can be prepared")
+        statement = self.parse_body()
+        parameters, self.parameters = self.parameters, []
+        return Prepare(name, statement, parameters)
 
-    def _parse_create_table(self, sql: str) -> Dict[str, Any]:
-        # CREATE TABLE table_name (col_def, ...)
-        match = re.match(r"CREATE TABLE (\w+)\s*\((.+)\)", sql, re.IGNORECASE)
-        if not match:
-            raise ValueError("Invalid CREATE TABLE syntax")
-        table_name = match.group(1)
-        col_defs_str = match.group(2)
-        columns = []
-        for col_def_str in col_defs_str.split(','):
-            col_def_str = col_def_str.strip()
-            parts = col_def_str.split()
-            name = parts[0]
-            type_str = parts[1].upper()
-            primary_key = "PRIMARY KEY" in col_def_str.upper()
-            unique = "UNIQUE" in col_def_str.upper()
-            data_type = DataType(type_str)
-            columns.append({
-                'name': name,
-                'type': type_str,
-                'primary_key': primary_key,
-                'unique': unique
-            })
-        return {
-            'type': 'create_table',
-            'name': table_name,
-            'columns': columns
-        }
-
-    def _parse_insert(self, sql: str) -> Dict[str, Any]:
-        # INSERT INTO table VALUES (val1, val2, ...)
-        match = re.match(r"INSERT INTO (\w+)\s+VALUES\s*\((.+)\)", sql, re.IGNORECASE)
-        if not match:
-            raise ValueError("Invalid INSERT syntax")
-        table_name = match.group(1)
-        values_str = match.group(2)
-        values = [self._parse_value(v.strip()) for v in values_str.split(',')]
-        # Assume order matches columns
-        return {
-            'type': 'insert',
-            'table': table_name,
-            'values': values  # list of values
-        }
-
-    def _parse_select(self, sql: str) -> Dict[str, Any]:
-        # SELECT * FROM table [JOIN table2 ON col1 = col2] [WHERE col = val]
-        match = re.match(r"SELECT (.+) FROM (\w+)(?:\s+JOIN (\w+) ON (.+?))?(?:\s+WHERE (.+))?", sql, re.IGNORECASE)
-        if not match:
-            raise ValueError("Invalid SELECT syntax")
-        columns_str = match.group(1).strip()
-        table_name = match.group(2)
-        join_table = match.group(3)
-        on_condition = match.group(4)
-        where_str = match.group(5)
-        columns = [c.strip() for c in columns_str.split(',')] if columns_str != '*' else ['*']
+    def parse_execute(self) -> Execute:
+        # EXECUTE name [(val, ...)]
+        name = self.expect_ident()
+        values = []
+        if self.accept_symbol('('):
+            if not self.at_symbol(')'):
+                values.append(self.parse_literal())
+                while self.accept_symbol(','):
+                    values.append(self.parse_literal())
+            self.expect_symbol(')')
+        return Execute(name, values)
+
+    def parse_create_table(self) -> CreateTable:
+        # CREATE TABLE name (col TYPE [PRIMARY KEY] [UNIQUE] [NOT NULL], ...) [ENGINE [=] ROW|COLUMNAR]
+        #   [PARTITION BY ...]
+        name = self.expect_ident()
+        self.expect_symbol('(')
+        columns = [self.parse_column_def()]
+        while self.accept_symbol(','):
+            columns.append(self.parse_column_def())
+        self.expect_symbol(')')
+        engine = StorageEngine.ROW.value
+        if self.accept_keyword('ENGINE'):
+            self.accept_symbol('=')
+            engine = self.expect_ident().upper()
+            if engine not in StorageEngine.__members__:
+                raise ValueError(f"Unsupported storage engine {engine}")
+        partition = None
+        if self.accept_keyword('PARTITION'):
+            partition = self.parse_partition_by()
+        return CreateTable(name, columns, engine, partition)
+
+    def parse_partition_by(self) -> PartitionBy:
+        # PARTITION BY HASH (col) PARTITIONS n | PARTITION BY RANGE (col) BOUNDS (value, ...)
+        self.expect_keyword('BY')
+        method = self.expect_ident().upper()
+        if method not in ('HASH', 'RANGE'):
+            raise ValueError(f"Unsupported partitioning {method}")
+        self.expect_symbol('(')
+        column = self.expect_ident()
+        self.expect_symbol(')')
+        if method == 'HASH':
+            self.expect_keyword('PARTITIONS')
+            token = self.advance()
+            if token.kind != NUMBER or type(token.value) is not int:
+                self.pos -= 1
+                self.error("a number of partitions")
+            return PartitionBy(method, column, token.value)
+        self.expect_keyword('BOUNDS')
+        self.expect_symbol('(')
+        bounds = [self.parse_literal()]
+        while self.accept_symbol(','):
+            bounds.append(self.parse_literal())
+        self.expect_symbol(')')
+        return PartitionBy(method, column, len(bounds) + 1, bounds)
+
+    def parse_column_def(self) -> ColumnDef:
+        name = self.expect_ident()
+        type_name = self.expect_ident().upper()
+        if type_name not in DataType.__members__:
+            raise ValueError(f"Unsupported data type {type_name}")
+        # Accept and ignore a length, e.g. VARCHAR(255)
+        if self.accept_symbol('('):
+            if self.advance().kind != NUMBER:
+                self.error("length")
+            self.expect_symbol(')')
+        column = ColumnDef(name, type_name)
+        while True:
+            if self.accept_keyword('PRIMARY'):
+                self.expect_keyword('KEY')
+                column.primary_key = True
+            elif self.accept_keyword('UNIQUE'):
+                column.unique = True
+            elif self.accept_keyword('NOT'):
+                self.expect_keyword('NULL')
+                column.nullable = False
+            elif self.accept_keyword('NULL'):
+                column.nullable = True
+            else:
+                return column
+
+    def parse_create_index(self) -> CreateIndex:
+        # CREATE INDEX name ON table (col) [USING HASH|BTREE]
+        name = self.expect_ident()
+        self.expect_keyword('ON')
+        table = self.expect_ident()
+        self.expect_symbol('(')
+        column = self.expect_ident()
+        self.expect_symbol(')')
+        index_type = IndexType.HASH.value
+        if self.accept_keyword('USING'):
+            index_type = self.expect_ident().upper()
+            if index_type not in IndexType.__members__:
+                raise ValueError(f"Unsupported index type {index_type}")
+        return CreateIndex(name, table, column, index_type)
+
+    def parse_drop_index(self) -> DropIndex:
+        # DROP INDEX name [ON table]
+        name = self.expect_ident()
+        table = self.expect_ident() if self.accept_keyword('ON') else None
+        return DropIndex(name, table)
+
+    def parse_insert(self) -> Insert:
+        # INSERT INTO table [(col, ...)] VALUES (val, ...) [, (val, ...) ...]
+        self.expect_keyword('INTO')
+        table = self.expect_ident()
+        columns = None
+        if self.accept_symbol('('):
+            columns = self.parse_ident_list()
+            self.expect_symbol(')')
+        self.expect_keyword('VALUES')
+        rows = [self.parse_value_tuple()]
+        while self.accept_symbol(','):
+            rows.append(self.parse_value_tuple())
+        return Insert(table, columns, rows)
+
+    def parse_value_tuple(self) -> List[Any]:
+        self.expect_symbol('(')
+        values = [self.parse_literal()]
+        while self.accept_symbol(','):
+            values.append(self.parse_literal())
+        self.expect_symbol(')')
+        return values
+
+    def parse_copy(self) -> Copy:
+        # COPY table [(col, ...)] FROM 'path' [WITH (FORMAT CSV|JSONL, HEADER [TRUE|FALSE])]
+        table = self.expect_ident()
+        columns = None
+        if self.accept_symbol('('):
+            columns = self.parse_ident_list()
+            self.expect_symbol(')')
+        self.expect_keyword('FROM')
+        path = self.expect_path()
+        # Default the format from the file extension
+        extension = os.path.splitext(path)[1].lower()
+        fmt = 'JSONL' if extension in ('.jsonl', '.ndjson') else 'CSV'
+        header = True
+        if self.accept_keyword('WITH'):
+            self.expect_symbol('(')
+            while True:
+                # FORMAT and HEADER are only special here, so they stay usable as column names
+                option = self.expect_ident().upper()
+                if option == 'FORMAT':
+                    fmt = self.expect_ident().upper()
+                    if fmt not in ('CSV', 'JSONL'):
+                        raise ValueError(f"Unsupported COPY format {fmt}")
+                elif option == 'HEADER':
+                    header = True
+                    if self.at_keyword('TRUE', 'FALSE'):
+                        header = self.advance().value == 'TRUE'
+                else:
+                    raise ValueError(f"Unknown COPY option {option}")
+                if not self.accept_symbol(','):
+                    break
+            self.expect_symbol(')')
+        return Copy(table, columns, path, fmt, header)
+
+    def parse_save(self) -> Save:
+        # SAVE TO 'path' [WITH (COMPRESSION ZLIB|NONE)]
+        self.expect_keyword('TO')
+        path = self.expect_path()
+        compression = 'NONE'
+        if self.accept_keyword('WITH'):
+            self.expect_symbol('(')
+            while True:
+                option = self.expect_ident().upper()
+                if option == 'COMPRESSION':
+                    compression = self.expect_ident().upper()
+                    if compression not in ('NONE', 'ZLIB'):
+                        raise ValueError(f"Unsupported snapshot compression {compression}")
+                else:
+                    raise ValueError(f"Unknown SAVE option {option}")
+                if not self.accept_symbol(','):
+                    break
+            self.expect_symbol(')')
+        return Save(path, compression)
+
+    def expect_path(self) -> str:
+        token = self.advance()
+        if token.kind != STRING:
+            self.pos -= 1
+            self.error("a file path")
+        return token.value
+
+    def parse_select(self) -> Select:
+        # SELECT * | item, ... FROM table [[INNER] JOIN table2 ON a = b] [WHERE expr]
+        #   [GROUP BY col, ...] [ORDER BY item [ASC|DESC], ...] [LIMIT n] [OFFSET n]
+        if self.accept_symbol('*'):
+            columns = ['*']
+        else:
+            columns = [self.parse_select_item()]
+            while self.accept_symbol(','):
+                columns.append(self.parse_select_item())
+        self.expect_keyword('FROM')
+        table = self.expect_ident()
         join = None
-        if join_table and on_condition:
-            # Simple: col1 = col2
-            on_match = re.match(r"(.+)\s*=\s*(.+)", on_condition.strip())
-            if on_match:
-                left = on_match.group(1).strip()
-                right = on_match.group(2).strip()
-                join = {'table': join_table, 'on': {'left': left, 'right': right}}
-        where = None
-        if where_str:
-            where_match = re.match(r"(\w+)\s*=\s*(.+)", where_str.strip())
-            if where_match:
-                col = where_match.group(1)
-                val = self._parse_value(where_match.group(2).strip())
-                where = {col: val}
-        return {
-            'type': 'select',
-            'table': table_name,
-            'columns': columns,
-            'join': join,
-            'where': where
-        }
-
-    def _parse_update(self, sql: str) -> Dict[str, Any]:
-        # UPDATE table SET col = val WHERE pk = val
-        match = re.match(r"UPDATE (\w+)\s+SET (.+)\s+WHERE (.+)", sql, re.IGNORECASE)
-        if not match:
-            raise ValueError("Invalid UPDATE syntax")
-        table_name = match.group(1)
-        set_str = match.group(2)
-        where_str = match.group(3)
-        updates = {}
-        for assign in set_str.split(','):
-            assign = assign.strip()
-            col, val_str = assign.split('=')
-            col = col.strip()
-            val = self._parse_value(val_str.strip())
-            updates[col] = val
-        # Assume where is pk = val
-        where_match = re.match(r"(\w+)\s*=\s*(.+)", where_str.strip())
-        pk_col = where_match.group(1)
-        pk_val = self._parse_value(where_match.group(2).strip())
-        return {
-            'type': 'update',
-            'table': table_name,
-            'updates': updates,
-            'pk_col': pk_col,
-            'pk_val': pk_val
-        }
-
-    def _parse_delete(self, sql: str) -> Dict[str, Any]:
-        # DELETE FROM table WHERE pk = val
-        match = re.match(r"DELETE FROM (\w+)\s+WHERE (.+)", sql, re.IGNORECASE)
-        if not match:
-            raise ValueError("Invalid DELETE syntax")
-        table_name = match.group(1)
-        where_str = match.group(2)
-        where_match = re.match(r"(\w+)\s*=\s*(.+)", where_str.strip())
-        pk_col = where_match.group(1)
-        pk_val = self._parse_value(where_match.group(2).strip())
-        return {
-            'type': 'delete',
-            'table': table_name,
-            'pk_col': pk_col,
-            'pk_val': pk_val
-        }
-
-    def _parse_value(self, val_str: str):
-        val_str = val_str.strip()
-        if val_str.startswith("'") and val_str.endswith("'"):
-            return val_str[1:-1]
-        elif val_str.lower() == 'true':
-            return True
-        elif val_str.lower() == 'false':
-            return False
-        elif '.' in val_str:
-            return float(val_str)
+        if self.at_keyword('INNER', 'JOIN'):
+            self.accept_keyword('INNER')
+            self.expect_keyword('JOIN')
+            join_table = self.expect_ident()
+            self.expect_keyword('ON')
+            left = self.parse_column_ref()
+            self.expect_symbol('=')
+            right = self.parse_column_ref()
+            join = Join(join_table, left, right)
+        where = self.parse_where()
+        group_by = []
+        if self.accept_keyword('GROUP'):
+            self.expect_keyword('BY')
+            group_by = [self.parse_column_ref()]
+            while self.accept_symbol(','):
+                group_by.append(self.parse_column_ref())
+        order_by = []
+        if self.accept_keyword('ORDER'):
+            self.expect_keyword('BY')
+            order_by = [self.parse_order_item()]
+            while self.accept_symbol(','):
+                order_by.append(self.parse_order_item())
+        limit = self.parse_row_count('LIMIT') if self.accept_keyword('LIMIT') else None
+        offset = self.parse_row_count('OFFSET') if self.accept_keyword('OFFSET') else None
+        return Select(table, columns, join, where, group_by, order_by, limit, offset)
+
+    def parse_select_item(self):
+        # col | FUNC(col) [AS alias] | COUNT(*) [AS alias]
+        if not self.at_aggregate():
+            return self.parse_column_ref()
+        aggregate = self.parse_aggregate()
+        if self.accept_keyword('AS'):
+            aggregate.alias = self.expect_ident()
+        return aggregate
+
+    def at_aggregate(self) -> bool:
+        token, following = self.peek(), self.tokens[self.pos + 1]
+        return (token.kind == IDENT and token.value.upper() in AGGREGATE_FUNCTIONS
+                and following.kind == SYMBOL and following.value == '(')
+
+    def parse_aggregate(self) -> Aggregate:
+        function = self.advance().value.upper()
+        self.expect_symbol('(')
+        if self.accept_symbol('*'):
+            if function != 'COUNT':
+                raise ValueError(f"{function}(*) is not supported")
+            column = None
         else:
-            return int(val_str)
\ No newline at end of file
+            column = self.parse_column_ref()
+        self.expect_symbol(')')
+        return Aggregate(function, column)
+
+    def parse_order_item(self) -> OrderItem:
+        column = self.parse_aggregate() if self.at_aggregate() else self.parse_column_ref()
+        descending = False
+        if self.at_keyword('ASC', 'DESC'):
+            descending = self.advance().value.upper() == 'DESC'
+        return OrderItem(column, descending)
+
+    def parse_row_count(self, clause: str):
+        value = self.parse_literal()
+        if not isinstance(value, Parameter) and (type(value) is not int or value < 0):
+            raise ValueError(f"{clause} needs a non-negative integer")
+        return value
+
+    def parse_update(self) -> Update:
+        # UPDATE table SET col = val, ... WHERE expr
+        table = self.expect_ident()
+        self.expect_keyword('SET')
+        assignments = {}
+        while True:
+            column = self.expect_ident()
+            self.expect_symbol('=')
+            assignments[column] = self.parse_literal()
+            if not self.accept_symbol(','):
+                break
+        if not self.at_keyword('WHERE'):
+            self.error("WHERE")
+        return Update(table, assignments, self.parse_where())
+
+    def parse_delete(self) -> Delete:
+        # DELETE FROM table WHERE expr
+        self.expect_keyword('FROM')
+        table = self.expect_ident()
+        if not self.at_keyword('WHERE'):
+            self.error("WHERE")
+        return Delete(table, self.parse_where())
+
+    # Expressions
+
+    def parse_where(self):
+        if not self.accept_keyword('WHERE'):
+            return None
+        return self.parse_or()
+
+    def parse_or(self):
+        terms = [self.parse_and()]
+        while self.accept_keyword('OR'):
+            terms.append(self.parse_and())
+        return terms[0] if len(terms) == 1 else Or(terms)
+
+    def parse_and(self):
+        terms = [self.parse_not()]
+        while self.accept_keyword('AND'):
+            terms.append(self.parse_not())
+        return terms[0] if len(terms) == 1 else And(terms)
+
+    def parse_not(self):
+        if self.accept_keyword('NOT'):
+            return Not(self.parse_not())
+        if self.accept_symbol('('):
+            expr = self.parse_or()
+            self.expect_symbol(')')
+            return expr
+        return self.parse_predicate()
+
+    def parse_predicate(self):
+        # col op value | col [NOT] BETWEEN a AND b | col [NOT] IN (v, ...) | col [NOT] LIKE 'p' | col IS [NOT] NULL
+        column = self.parse_column_ref()
+        token = self.peek()
+        if token.kind == SYMBOL and token.value in COMPARISON_OPERATORS:
+            self.pos += 1
+            return Comparison(column, COMPARISON_OPERATORS[token.value], self.parse_literal())
+        if self.accept_keyword('IS'):
+            negated = self.accept_keyword('NOT')
+            self.expect_keyword('NULL')
+            return IsNull(column, negated)
+        negated = self.accept_keyword('NOT')
+        if self.accept_keyword('BETWEEN'):
+            low = self.parse_literal()
+            self.expect_keyword('AND')
+            return Between(column, low, self.parse_literal(), negated)
+        if self.accept_keyword('IN'):
+            return In(column, self.parse_value_tuple(), negated)
+        if self.accept_keyword('LIKE'):
+            pattern = self.parse_literal()
+            if not isinstance(pattern, (str, Parameter)):
+                raise ValueError("LIKE needs a string pattern")
+            return Like(column, pattern, negated)
+        self.error("a comparison")
+
+    def parse_column_ref(self) -> str:
+        name = self.expect_ident()
+        if self.accept_symbol('.'):
+            name = f"{name}.{self.expect_ident()}"
+        return name
+
+    def parse_ident_list(self) -> List[str]:
+        names = [self.expect_ident()]
+        while self.accept_symbol(','):
+            names.append(self.expect_ident())
+        return names
+
+    def parse_literal(self) -> Any:
+        token = self.peek()
+        if token.kind in (NUMBER, STRING):
+            self.pos += 1
+            return token.value
+        if token.kind == KEYWORD and token.value in ('TRUE', 'FALSE', 'NULL'):
+            self.pos += 1
+            return {'TRUE': True, 'FALSE': False, 'NULL': None}[token.value]
+        if token.kind == PARAM:
+            self.pos += 1
+            return self.parameter(token.value)
+        self.error("a literal value")
+
+    def parameter(self, name: Optional[str]) -> Parameter:
+        if self.parameters and (name is None) != (self.parameters[0] is None):
+            raise ValueError("Cannot mix ? and :name placeholders")
+        if name is not None and name in self.parameters:
+            return Parameter(self.parameters.index(name), name)
+        self.parameters.append(name)
+        return Parameter(len(self.parameters) - 1, name)
@@ -12,8 +12,20 @@ class TableRepository:
     def find_by_name(self, name: str) -> Table:
         return self.storage.get_table(name)
 
+    def update(self, table: Table):
+        self.storage.update_table(table)
+
     def delete(self, name: str):
         self.storage.drop_table(name)
 
     def find_all_names(self) -> List[str]:
-        return self.storage.list_tables()
\ No newline at end of file
+        return self.storage.list_tables()
+
+    def begin_transaction(self):
+        return self.storage.begin_transaction()
+
+    def enlist(self, txn, table: Table):
+        self.storage.enlist(txn, table)
+
+    def commit_transaction(self, txn):
+        self.storage.commit_transaction(txn)
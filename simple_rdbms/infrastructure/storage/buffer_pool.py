@@ -0,0 +1,146 @@
+import threading
+from typing import Callable, Dict, Hashable, List, Optional
+
+
+class Frame:
+    """One buffer pool slot: a page's bytes, its pin count, CLOCK reference bit and dirty flag."""
+    __slots__ = ('key', 'buf', 'pins', 'referenced', 'dirty')
+
+    def __init__(self, key, buf):
+        self.key = key
+        self.buf = buf
+        self.pins = 0
+        self.referenced = False
+        self.dirty = False
+
+
+class BufferPool:
+    """Fixed-budget cache of pages shared by every table of a DiskStorage, with CLOCK eviction.
+
+    fetch() pins a page in a frame and unpin() releases it; a pinned frame is never
+    evicted, so a page can be read in place for as long as the caller holds the pin.
+    Dirty frames are not evicted either: they leave the pool's care only once a
+    checkpoint has written them back and called mark_clean(). When every frame is
+    pinned or dirty the pool grows past its budget rather than fail, and the owner is
+    expected to checkpoint (see `dirty_count`).
+
+    A sequential fetch, used by full scans, reads a page that is not already resident
+    straight from `load` without giving it a frame. One large scan therefore neither
+    evicts the hot pages of other queries nor fills the pool with pages it will not
+    revisit.
+    """
+
+    def __init__(self, capacity_bytes: int, page_size: int):
+        self.page_size = page_size
+        self.capacity = max(8, capacity_bytes // page_size)
+        self.frames: Dict[Hashable, Frame] = {}
+        # Frames in CLOCK order; `hand` is the next one to consider for eviction
+        self.clock: List[Frame] = []
+        self.hand = 0
+        self.dirty_count = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def fetch(self, key: Hashable, load: Callable[[], bytes], sequential: bool = False) -> Frame:
+        """Pin the frame holding `key`, reading the page with `load` on a miss."""
+        with self.lock:
+            frame = self.frames.get(key)
+            if frame is not None:
+                self.hits += 1
+                frame.pins += 1
+                if not sequential:
+                    frame.referenced = True
+                return frame
+            self.misses += 1
+            if sequential:
+                # Read in place and hand back a frame that was never in the pool
+                frame = Frame(None, load())
+                frame.pins = 1
+                return frame
+            frame = self._claim(key)
+            frame.buf[:] = load()
+            frame.pins = 1
+            frame.referenced = True
+            return frame
+
+    def create(self, key: Hashable, buf: bytearray) -> Frame:
+        """Add a page that exists only in memory (e.g. one just allocated), pinned and dirty."""
+        with self.lock:
+            frame = self._claim(key)
+            frame.buf[:] = buf
+            frame.pins = 1
+            frame.referenced = True
+            frame.dirty = True
+            self.dirty_count += 1
+            return frame
+
+    def unpin(self, frame: Frame):
+        if frame.key is None:
+            return
+        with self.lock:
+            frame.pins -= 1
+
+    def mark_dirty(self, frame: Frame):
+        with self.lock:
+            if not frame.dirty:
+                frame.dirty = True
+                self.dirty_count += 1
+
+    def mark_clean(self, frame: Frame):
+        with self.lock:
+            if frame.dirty:
+                frame.dirty = False
+                self.dirty_count -= 1
+
+    def discard(self, owner: Hashable):
+        """Drop every frame whose key is (owner, ...), e.g. when a table is dropped."""
+        with self.lock:
+            for frame in self.clock:
+                if frame.key is not None and frame.key[0] == owner:
+                    del self.frames[frame.key]
+                    if frame.dirty:
+                        self.dirty_count -= 1
+                    frame.key, frame.pins, frame.dirty, frame.referenced = None, 0, False, False
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'capacity': self.capacity,
+            'resident': len(self.frames),
+            'dirty': self.dirty_count,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def _claim(self, key: Hashable) -> Frame:
+        # A free frame while under budget, else the CLOCK victim, else grow past the budget.
+        frame = self._victim() if len(self.clock) >= self.capacity else None
+        if frame is None:
+            frame = Frame(key, bytearray(self.page_size))
+            self.clock.append(frame)
+        else:
+            if frame.key is not None:
+                del self.frames[frame.key]
+                self.evictions += 1
+            frame.key = key
+            frame.dirty = False
+        self.frames[key] = frame
+        return frame
+
+    def _victim(self) -> Optional[Frame]:
+        clock = self.clock
+        # Two sweeps: the first clears reference bits, the second finds what they exposed.
+        for _ in range(2 * len(clock)):
+            frame = clock[self.hand]
+            self.hand = (self.hand + 1) % len(clock)
+            if frame.key is None:
+                return frame
+            if frame.pins or frame.dirty:
+                continue
+            if frame.referenced:
+                frame.referenced = False
+                continue
+            return frame
+        return None
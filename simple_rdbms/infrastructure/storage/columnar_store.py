@@ -0,0 +1,280 @@
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from domain.entities.column import Column
+from domain.value_objects.data_type import DataType
+from domain.value_objects.storage_engine import StorageEngine
+
+Row = Dict[str, Any]
+
+
+class Bitmap:
+    """Growable bit vector backed by a bytearray (one bit per row)."""
+
+    def __init__(self, size: int = 0):
+        self.bits = bytearray((size + 7) // 8)
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def get(self, i: int) -> bool:
+        return bool(self.bits[i >> 3] & (1 << (i & 7)))
+
+    def set(self, i: int, value: bool):
+        if value:
+            self.bits[i >> 3] |= 1 << (i & 7)
+        else:
+            self.bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+    def append(self, value: bool):
+        if self.size & 7 == 0:
+            self.bits.append(0)
+        self.size += 1
+        if value:
+            self.set(self.size - 1, True)
+
+    def any(self) -> bool:
+        return any(self.bits)
+
+
+class ColumnVector:
+    """Values of one column, indexed by slot, with a null bitmap."""
+
+    def __init__(self, column: Column):
+        self.column = column
+        self.nulls = Bitmap()
+
+    def __len__(self) -> int:
+        return len(self.nulls)
+
+    def append(self, value):
+        self.nulls.append(value is None)
+        self._append(self._default() if value is None else value)
+
+    def get(self, i: int):
+        if self.nulls.get(i):
+            return None
+        return self._get(i)
+
+    def set(self, i: int, value):
+        self.nulls.set(i, value is None)
+        self._set(i, self._default() if value is None else value)
+
+    def values(self) -> List[Any]:
+        """All slot values, including tombstoned slots, with None for nulls."""
+        nulls = self.nulls
+        return [None if nulls.get(i) else v for i, v in enumerate(self._values())]
+
+    def take(self, slots: List[int]) -> "ColumnVector":
+        vector = type(self)(self.column)
+        for i in slots:
+            vector.append(self.get(i))
+        return vector
+
+    def check(self, value):
+        pass
+
+    def _default(self):
+        return 0
+
+
+class NumericVector(ColumnVector):
+    def __init__(self, column: Column, typecode: str):
+        super().__init__(column)
+        self.typecode = typecode
+        self.data = array(typecode)
+
+    def take(self, slots: List[int]) -> "NumericVector":
+        vector = NumericVector(self.column, self.typecode)
+        for i in slots:
+            vector.append(self.get(i))
+        return vector
+
+    def check(self, value):
+        # Checked before any vector is written so a failed insert leaves no partial row.
+        if self.typecode == 'q' and not -2 ** 63 <= value < 2 ** 63:
+            raise ValueError(f"Value for {self.column.name} is out of range")
+
+    def _append(self, value):
+        self.data.append(value)
+
+    def _get(self, i: int):
+        return self.data[i]
+
+    def _set(self, i: int, value):
+        self.data[i] = value
+
+    def _values(self):
+        return self.data
+
+
+class BooleanVector(ColumnVector):
+    def __init__(self, column: Column):
+        super().__init__(column)
+        self.data = Bitmap()
+
+    def _append(self, value):
+        self.data.append(bool(value))
+
+    def _get(self, i: int):
+        return self.data.get(i)
+
+    def _set(self, i: int, value):
+        self.data.set(i, bool(value))
+
+    def _values(self):
+        return (self.data.get(i) for i in range(len(self.data)))
+
+    def _default(self):
+        return False
+
+
+class DictionaryVector(ColumnVector):
+    """VARCHAR stored as an array of codes into a table of distinct strings."""
+
+    def __init__(self, column: Column):
+        super().__init__(column)
+        self.codes = array('I')
+        self.dictionary: List[str] = []
+        self.lookup: Dict[str, int] = {}
+
+    def code_for(self, value: str) -> int:
+        code = self.lookup.get(value)
+        if code is None:
+            code = len(self.dictionary)
+            self.dictionary.append(value)
+            self.lookup[value] = code
+        return code
+
+    def _append(self, value):
+        self.codes.append(self.code_for(value))
+
+    def _get(self, i: int):
+        return self.dictionary[self.codes[i]]
+
+    def _set(self, i: int, value):
+        self.codes[i] = self.code_for(value)
+
+    def _values(self):
+        dictionary = self.dictionary
+        return (dictionary[c] for c in self.codes)
+
+    def _default(self):
+        return ""
+
+
+def create_vector(column: Column) -> ColumnVector:
+    if column.data_type == DataType.INTEGER:
+        return NumericVector(column, 'q')
+    if column.data_type == DataType.FLOAT:
+        return NumericVector(column, 'd')
+    if column.data_type == DataType.BOOLEAN:
+        return BooleanVector(column)
+    return DictionaryVector(column)
+
+
+class ColumnarStore:
+    """Column-at-a-time storage with the same slot/row id interface as RowStore.
+
+    Each column is a typed vector (array('q') for INTEGER, array('d') for FLOAT, a bitmap
+    for BOOLEAN, dictionary codes for VARCHAR) plus a null bitmap. Rows are only
+    materialised as dicts when read. Deleted slots are tracked in a liveness bitmap and
+    reused through a free list, exactly like RowStore.
+    """
+    engine = StorageEngine.COLUMNAR
+
+    def __init__(self, columns: List[Column], compaction_ratio: float = 0.5, min_compaction_slots: int = 1024):
+        self.columns = columns
+        self.vectors: Dict[str, ColumnVector] = {col.name: create_vector(col) for col in columns}
+        self.live = Bitmap()
+        self.free_slots: List[int] = []
+        self.live_count = 0
+        self.compaction_ratio = compaction_ratio
+        self.min_compaction_slots = min_compaction_slots
+
+    def __len__(self) -> int:
+        return self.live_count
+
+    def __iter__(self) -> Iterator[Row]:
+        return (row for _, row in self.items())
+
+    @property
+    def slot_count(self) -> int:
+        return len(self.live)
+
+    def items(self) -> Iterator[Tuple[int, Row]]:
+        names = [col.name for col in self.columns]
+        columns = [self.vectors[name].values() for name in names]
+        live = self.live
+        for row_id, values in enumerate(zip(*columns)):
+            if live.get(row_id):
+                yield row_id, dict(zip(names, values))
+
+    def insert(self, row: Row) -> int:
+        self._check(row)
+        return self._place(row)
+
+    def insert_many(self, rows: List[Row]) -> List[int]:
+        # Check everything first so a bad row leaves the store untouched.
+        for row in rows:
+            self._check(row)
+        return [self._place(row) for row in rows]
+
+    def _check(self, row: Row):
+        for name in row:
+            if name not in self.vectors:
+                raise ValueError(f"Unknown column {name}")
+            if row[name] is not None:
+                self.vectors[name].check(row[name])
+
+    def _place(self, row: Row) -> int:
+        if self.free_slots:
+            row_id = self.free_slots.pop()
+            for name, vector in self.vectors.items():
+                vector.set(row_id, row.get(name))
+            self.live.set(row_id, True)
+        else:
+            row_id = self.slot_count
+            for name, vector in self.vectors.items():
+                vector.append(row.get(name))
+            self.live.append(True)
+        self.live_count += 1
+        return row_id
+
+    def get(self, row_id: int) -> Optional[Row]:
+        if not (0 <= row_id < self.slot_count) or not self.live.get(row_id):
+            return None
+        return {name: vector.get(row_id) for name, vector in self.vectors.items()}
+
+    def update(self, row_id: int, updates: Row):
+        for name, value in updates.items():
+            if value is not None:
+                self.vectors[name].check(value)
+        for name, value in updates.items():
+            self.vectors[name].set(row_id, value)
+
+    def delete(self, row_id: int):
+        if not self.live.get(row_id):
+            raise ValueError(f"Row {row_id} already deleted")
+        self.live.set(row_id, False)
+        self.free_slots.append(row_id)
+        self.live_count -= 1
+
+    def column_values(self, name: str) -> List[Any]:
+        """Values of one column for the live rows, in slot order."""
+        live = self.live
+        return [v for i, v in enumerate(self.vectors[name].values()) if live.get(i)]
+
+    def needs_compaction(self) -> bool:
+        tombstones = self.slot_count - self.live_count
+        return (self.slot_count >= self.min_compaction_slots
+                and tombstones > self.slot_count * self.compaction_ratio)
+
+    def compact(self) -> Dict[int, int]:
+        slots = [i for i in range(self.slot_count) if self.live.get(i)]
+        self.vectors = {name: vector.take(slots) for name, vector in self.vectors.items()}
+        self.live = Bitmap()
+        for _ in slots:
+            self.live.append(True)
+        self.free_slots = []
+        return {old: new for new, old in enumerate(slots)}
@@ -0,0 +1,283 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+from domain.entities.column import Column
+from domain.entities.index import create_index
+from domain.entities.table import Table
+from domain.value_objects.data_type import DataType
+from domain.value_objects.index_type import IndexType
+from domain.value_objects.storage_engine import StorageEngine
+from infrastructure.concurrency.rw_lock import RWLock
+from infrastructure.storage import wal as wal_records
+from infrastructure.storage.buffer_pool import BufferPool
+from infrastructure.storage.page_file import PageFile
+from infrastructure.storage.paged_store import PagedStore
+from infrastructure.storage.slotted_page import MAX_PAGE_SIZE
+from infrastructure.storage.wal import WriteAheadLog, FSYNC_ALWAYS
+
+CATALOG_FILE = 'catalog.json'
+WAL_FILE = 'wal.log'
+# Seconds a checkpoint started by a commit waits for changes in progress
+CHECKPOINT_WAIT = 0.1
+
+
+class DiskStorage:
+    """Durable storage backend with the same interface as InMemoryStorage.
+
+    A data directory holds `catalog.json` (table schemas and index definitions), one
+    page file per table and a shared write-ahead log. Row changes are committed to the
+    WAL and kept in dirty pages; a checkpoint writes the dirty pages back to the data
+    files and truncates the WAL. Checkpoints run when the WAL passes `checkpoint_bytes`,
+    on close() and after recovery.
+
+    With `full_page_writes`, a checkpoint logs an image of every page it is about to
+    write before writing it, so a page torn by a crash mid-write is restored on restart.
+
+    Pages are cached in a BufferPool of `buffer_pool_bytes`, so tables can be larger than
+    memory. Dirty pages cannot be evicted until a checkpoint has written them, so a
+    checkpoint also runs when more than `max_dirty_ratio` of the pool is dirty.
+
+    Indexes live in memory and are rebuilt from the pages when the directory is opened.
+
+    Tables can be changed from several threads as long as each table has one writer at a
+    time. Row changes share `gate`, which a checkpoint takes exclusively; catalog changes
+    (create, drop, update_table) are serialized by `catalog_lock`.
+
+    begin_transaction() groups the changes of several statements, possibly to several
+    tables, into one WAL transaction, so a crash keeps all of them or none. An open
+    transaction holds the gate from its first change until commit_transaction(), and
+    checkpoints started by commits do not wait for it: they are skipped until it ends.
+    """
+
+    def __init__(self, path: str, fsync_policy: str = FSYNC_ALWAYS, page_size: int = 8192,
+                 checkpoint_bytes: int = 64 * 1024 * 1024, full_page_writes: bool = True,
+                 sync_interval: float = 0.1, buffer_pool_bytes: int = 64 * 1024 * 1024,
+                 max_dirty_ratio: float = 0.5):
+        if not 512 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"Page size must be between 512 and {MAX_PAGE_SIZE} bytes")
+        self.path = path
+        self.checkpoint_bytes = checkpoint_bytes
+        self.max_dirty_ratio = max_dirty_ratio
+        self.full_page_writes = full_page_writes
+        self.tables: Dict[str, Table] = {}
+        # Table name -> id; ids are never reused, so WAL records of a dropped table are recognisable
+        self.table_ids: Dict[str, int] = {}
+        self.next_table_id = 1
+        os.makedirs(path, exist_ok=True)
+        catalog = self._read_catalog()
+        self.page_size = catalog.get('page_size', page_size)
+        self.buffer_pool = BufferPool(buffer_pool_bytes, self.page_size)
+        self.wal = WriteAheadLog(os.path.join(path, WAL_FILE), fsync_policy, sync_interval)
+        self.gate = RWLock()
+        self.catalog_lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+        # Open transactions: WAL transaction id -> stores enlisted in it
+        self.transactions: Dict[int, List[PagedStore]] = {}
+        # Transactions that have enlisted a store and so hold the gate
+        self.writing_transactions = 0
+        self._transactions_lock = threading.Lock()
+        self._open(catalog)
+
+    def create_table(self, table: Table):
+        with self.catalog_lock:
+            if table.name in self.tables:
+                raise ValueError("Table already exists")
+            if table.store.engine != StorageEngine.ROW:
+                raise ValueError("Disk storage only supports ROW tables")
+            table_id = self.next_table_id
+            self.next_table_id += 1
+            rows = list(table.store)
+            table.store = self._open_store(table_id, table.columns)
+            table.store.load()
+            if rows:
+                table.store.insert_many(rows)
+                table.rebuild_indexes()
+            self.tables[table.name] = table
+            self.table_ids[table.name] = table_id
+            self._write_catalog()
+
+    def get_table(self, name: str) -> Table:
+        return self.tables.get(name)
+
+    def drop_table(self, name: str):
+        with self.catalog_lock:
+            if name not in self.tables:
+                return
+            table = self.tables.pop(name)
+            table_id = self.table_ids.pop(name)
+            self._write_catalog()
+        # Wait out a checkpoint that may be flushing this table's pages
+        with self.gate.write():
+            table.store.close()
+        os.remove(self._data_path(table_id))
+
+    def list_tables(self):
+        return list(self.tables.keys())
+
+    def update_table(self, table: Table):
+        """Persist a change to a table's definition, such as a new or dropped index."""
+        with self.catalog_lock:
+            if table.name in self.tables:
+                self._write_catalog()
+
+    def begin_transaction(self) -> int:
+        """Start a transaction; returns the handle to pass to enlist() and commit_transaction()."""
+        txn = self.wal.begin()
+        with self._transactions_lock:
+            self.transactions[txn] = []
+        return txn
+
+    def enlist(self, txn: int, table: Table):
+        """Log the table's changes under the transaction until it is committed."""
+        stores = self.transactions[txn]
+        if table.store in stores:
+            return
+        if not stores:
+            with self._transactions_lock:
+                self.writing_transactions += 1
+            # Keeps checkpoints from writing pages with uncommitted changes
+            self.gate.acquire_read()
+        table.store.txn = txn
+        stores.append(table.store)
+
+    def commit_transaction(self, txn: int):
+        """Commit everything logged under the transaction with a single WAL commit."""
+        with self._transactions_lock:
+            stores = self.transactions.pop(txn)
+            if stores:
+                self.writing_transactions -= 1
+        if not stores:
+            return
+        for store in stores:
+            store.txn = None
+        self.wal.commit(txn)
+        self.gate.release_read()
+        self._maybe_checkpoint()
+
+    def checkpoint(self, timeout: Optional[float] = None) -> bool:
+        """Write every dirty page to its data file and truncate the WAL.
+
+        Waits for changes in progress, including open transactions, for at most `timeout`
+        seconds; returns False if it gave up or another checkpoint was already running.
+        """
+        # One checkpoint at a time; a thread that finds one running does not wait for it.
+        if not self._checkpoint_lock.acquire(blocking=False):
+            return False
+        try:
+            if not self.gate.acquire_write(timeout):
+                return False
+            try:
+                stores = [table.store for table in list(self.tables.values()) if table.store.dirty]
+                if self.full_page_writes:
+                    txn = self.wal.begin()
+                    for store in stores:
+                        for page_no, page in store.dirty_pages():
+                            self.wal.append(txn, wal_records.PAGE_IMAGE, store.table_id, page_no, bytes(page))
+                    self.wal.commit(txn)
+                self.wal.sync()
+                for store in stores:
+                    store.flush()
+                self.wal.truncate()
+            finally:
+                self.gate.release_write()
+            return True
+        finally:
+            self._checkpoint_lock.release()
+
+    def stats(self) -> Dict[str, int]:
+        """Buffer pool counters: capacity and resident/dirty frames in pages, hits, misses, evictions."""
+        return self.buffer_pool.stats()
+
+    def close(self):
+        if self.wal.fd is None:
+            return
+        self.checkpoint()
+        for table in self.tables.values():
+            table.store.close()
+        self.wal.close()
+
+    def _maybe_checkpoint(self):
+        pool = self.buffer_pool
+        if self.writing_transactions:
+            return
+        if self.wal.size >= self.checkpoint_bytes or pool.dirty_count > pool.capacity * self.max_dirty_ratio:
+            # Brief: only a transaction that began since the check above can hold it up
+            self.checkpoint(timeout=CHECKPOINT_WAIT)
+
+    def _open(self, catalog: dict):
+        self.next_table_id = catalog.get('next_table_id', 1)
+        stores: Dict[int, PagedStore] = {}
+        for entry in catalog.get('tables', []):
+            columns = [Column(c['name'], DataType(c['type']), c['primary_key'], c['unique'], c['nullable'])
+                       for c in entry['columns']]
+            store = self._open_store(entry['id'], columns)
+            table = Table(entry['name'], columns, store)
+            for index in entry['indexes']:
+                table.indexes[index['name']] = create_index(index['name'], index['column'], IndexType(index['type']))
+            self.tables[table.name] = table
+            self.table_ids[table.name] = entry['id']
+            stores[entry['id']] = store
+        # Redo committed WAL records; those of dropped tables are skipped.
+        replayed = 0
+        for lsn, kind, table_id, key, payload in self.wal.records():
+            store = stores.get(table_id)
+            if store is not None:
+                store.redo(lsn, kind, key, payload)
+                replayed += 1
+        for table in self.tables.values():
+            table.store.load()
+            table.rebuild_indexes()
+        if replayed:
+            self.checkpoint()
+
+    def _open_store(self, table_id: int, columns: List[Column]) -> PagedStore:
+        page_file = PageFile(self._data_path(table_id), self.page_size)
+        return PagedStore(table_id, columns, page_file, self.wal, self.buffer_pool, self._maybe_checkpoint,
+                          self.gate)
+
+    def _data_path(self, table_id: int) -> str:
+        return os.path.join(self.path, f"table_{table_id}.db")
+
+    def _read_catalog(self) -> dict:
+        try:
+            with open(os.path.join(self.path, CATALOG_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_catalog(self):
+        catalog = {
+            'page_size': self.page_size,
+            'next_table_id': self.next_table_id,
+            'tables': [{
+                'id': self.table_ids[table.name],
+                'name': table.name,
+                'columns': [{'name': col.name, 'type': col.data_type.value, 'primary_key': col.primary_key,
+                             'unique': col.unique, 'nullable': col.nullable} for col in table.columns],
+                'indexes': [{'name': index.name, 'column': index.column, 'type': index.index_type.value}
+                            for index in table.indexes.values()],
+            } for table in self.tables.values()],
+        }
+        # Write-then-rename, so a crash leaves either the old catalog or the new one.
+        path = os.path.join(self.path, CATALOG_FILE)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(catalog, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        _fsync_dir(self.path)
+
+
+def _fsync_dir(path: str):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -17,5 +17,20 @@ class InMemoryStorage:
         if name in self.tables:
             del self.tables[name]
 
+    def update_table(self, table: Table):
+        # Tables are live objects here, so there is nothing to persist.
+        pass
+
     def list_tables(self):
-        return list(self.tables.keys())
\ No newline at end of file
+        return list(self.tables.keys())
+
+    # Changes apply to the live tables at once, so transactions need nothing from storage.
+
+    def begin_transaction(self):
+        return None
+
+    def enlist(self, txn, table: Table):
+        pass
+
+    def commit_transaction(self, txn):
+        pass
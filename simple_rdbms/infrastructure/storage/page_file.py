@@ -0,0 +1,54 @@
+import mmap
+import os
+
+
+class PageFile:
+    """A data file of fixed-size pages.
+
+    Reads go through a read-only memory map and return memoryviews into it, so scanning
+    a page copies nothing. Writes use pwrite on the same file and are visible through the
+    map. The map is recreated when the file grows; views handed out earlier keep the old
+    map alive until they are released.
+    """
+
+    def __init__(self, path: str, page_size: int):
+        self.path = path
+        self.page_size = page_size
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        size = os.fstat(self.fd).st_size
+        if size % page_size:
+            # A crash while the file was growing can leave a partial page at the end.
+            size -= size % page_size
+            os.ftruncate(self.fd, size)
+        self.page_count = size // page_size
+        self._map = None
+        self._mapped_pages = 0
+
+    def read(self, page_no: int) -> memoryview:
+        if page_no >= self.page_count:
+            raise ValueError(f"Page {page_no} is past the end of {self.path}")
+        if page_no >= self._mapped_pages:
+            self._remap()
+        start = page_no * self.page_size
+        return self._view[start:start + self.page_size]
+
+    def write(self, page_no: int, data):
+        if len(data) != self.page_size:
+            raise ValueError("Page writes must be exactly one page")
+        os.pwrite(self.fd, data, page_no * self.page_size)
+        self.page_count = max(self.page_count, page_no + 1)
+
+    def sync(self):
+        os.fsync(self.fd)
+
+    def close(self):
+        self._map = self._view = None
+        self._mapped_pages = 0
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def _remap(self):
+        self._map = mmap.mmap(self.fd, self.page_count * self.page_size, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self._mapped_pages = self.page_count
@@ -0,0 +1,315 @@
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from domain.entities.column import Column
+from domain.value_objects.storage_engine import StorageEngine
+from infrastructure.concurrency.rw_lock import RWLock
+from infrastructure.storage.buffer_pool import BufferPool, Frame
+from infrastructure.storage.page_file import PageFile
+from infrastructure.storage.row_codec import RowCodec
+from infrastructure.storage.slotted_page import SlottedPage, HEADER, SLOT
+from infrastructure.storage import wal as wal_records
+from infrastructure.storage.wal import WriteAheadLog
+
+Row = Dict[str, Any]
+
+# A row id is the page number shifted left by SLOT_BITS, plus the slot within the page.
+SLOT_BITS = 13
+MAX_SLOTS = 1 << SLOT_BITS
+
+
+class PagedStore:
+    """Row storage in the slotted pages of a data file, with every change logged to a WAL.
+
+    Pages are read through a BufferPool shared with the other tables: lookups pin the
+    page's frame while they decode a row, and full scans use the pool's sequential path,
+    decoding rows straight from the file's memory map when the page is not resident.
+    A changed page stays in the pool, dirty, until the next checkpoint writes it back;
+    the WAL record describing the change is always appended first. Each
+    insert/update/delete is one WAL transaction, and insert_many logs all of its rows
+    under a single one.
+
+    Changes hold `gate` in shared mode while their transaction is open; a checkpoint
+    takes it exclusively, so it never sees a half-made change. Callers serialize
+    changes to one table themselves, e.g. with a LockManager.
+
+    While `txn` is set, changes are logged under that WAL transaction instead of one of
+    their own, and whoever set it (DiskStorage.enlist) commits it and holds the gate.
+
+    Row ids never change while a row lives in its page, so compaction is not needed:
+    deleted space is reused by later inserts into the same page. An update that no longer
+    fits its page moves the row and returns its new id.
+    """
+    engine = StorageEngine.ROW
+
+    def __init__(self, table_id: int, columns: List[Column], page_file: PageFile, wal: WriteAheadLog,
+                 pool: BufferPool, on_commit: Optional[Callable[[], None]] = None,
+                 gate: Optional[RWLock] = None):
+        self.table_id = table_id
+        self.codec = RowCodec(columns)
+        self.page_file = page_file
+        self.page_size = page_file.page_size
+        self.wal = wal
+        self.pool = pool
+        # Called after every commit, e.g. to start a checkpoint once the WAL is large
+        self.on_commit = on_commit
+        self.gate = gate or RWLock()
+        self.txn: Optional[int] = None
+        # Pages changed since the last checkpoint; their frames stay in the pool until then
+        self.dirty: Set[int] = set()
+        self.page_count = page_file.page_count
+        # Free bytes per page, and pages that deletes have opened up for reuse
+        self.page_free: List[int] = []
+        self.sparse_pages = set()
+        self.live_count = 0
+        self.max_record = self.page_size - HEADER.size - SLOT.size
+
+    def __len__(self) -> int:
+        return self.live_count
+
+    def __iter__(self) -> Iterator[Row]:
+        return (row for _, row in self.items())
+
+    def items(self) -> Iterator[Tuple[int, Row]]:
+        decode = self.codec.decode
+        for page_no in range(self.page_count):
+            base = page_no << SLOT_BITS
+            # Decode the whole page under one pin, and hold no pin while the caller runs.
+            frame = self._fetch(page_no, sequential=True)
+            try:
+                rows = [(base | slot, decode(record)) for slot, record in SlottedPage(frame.buf).records()]
+            finally:
+                self.pool.unpin(frame)
+            yield from rows
+
+    def get(self, row_id: int) -> Optional[Row]:
+        page_no = row_id >> SLOT_BITS
+        if not 0 <= page_no < self.page_count:
+            return None
+        frame = self._fetch(page_no)
+        try:
+            record = SlottedPage(frame.buf).record(row_id & (MAX_SLOTS - 1))
+            return None if record is None else self.codec.decode(record)
+        finally:
+            self.pool.unpin(frame)
+
+    def insert(self, row: Row) -> int:
+        data = self._encode(row)
+        with self._change() as txn:
+            return self._place(txn, data)
+
+    def insert_many(self, rows: List[Row]) -> List[int]:
+        # Encode everything first so a bad row fails before any page is touched.
+        encoded = [self._encode(row) for row in rows]
+        with self._change() as txn:
+            return [self._place(txn, data) for data in encoded]
+
+    def update(self, row_id: int, updates: Row) -> Optional[int]:
+        """Apply updates to a row. Returns the row's new id if it had to move, else None."""
+        row = self.get(row_id)
+        if row is None:
+            raise ValueError(f"Row {row_id} not found")
+        row.update(updates)
+        data = self._encode(row)
+        page_no, slot = row_id >> SLOT_BITS, row_id & (MAX_SLOTS - 1)
+        new_id = None
+        with self._change() as txn:
+            frame = self._modify(page_no)
+            try:
+                page = SlottedPage(frame.buf)
+                old_length = len(page.record(slot))
+                if page.put(slot, data):
+                    page.lsn = self.wal.append(txn, wal_records.UPDATE, self.table_id, row_id, data)
+                    self._adjust_free(page_no, old_length - len(data))
+                    moved = False
+                else:
+                    moved = True
+            finally:
+                self.pool.unpin(frame)
+            if moved:
+                # Too big for what is left of its page: delete and re-insert elsewhere, in one transaction.
+                self._remove(txn, row_id)
+                new_id = self._place(txn, data)
+        return new_id
+
+    def delete(self, row_id: int):
+        if self.get(row_id) is None:
+            raise ValueError(f"Row {row_id} already deleted")
+        with self._change() as txn:
+            self._remove(txn, row_id)
+
+    def needs_compaction(self) -> bool:
+        return False
+
+    def compact(self) -> Dict[int, int]:
+        return {}
+
+    # Recovery and checkpoints
+
+    def load(self):
+        """Work out free space and the live row count from the pages, checking every checksum."""
+        self.page_free = []
+        self.sparse_pages = set()
+        self.live_count = 0
+        for page_no in range(self.page_count):
+            frame = self._fetch(page_no, sequential=True)
+            try:
+                page = SlottedPage(frame.buf)
+                if page_no not in self.dirty and not page.verify():
+                    raise ValueError(f"Page {page_no} of {self.page_file.path} is corrupt")
+                self.page_free.append(page.free_space())
+                self.live_count += sum(1 for _ in page.records())
+            finally:
+                self.pool.unpin(frame)
+            if self.page_free[-1] >= self.page_size // 4:
+                self.sparse_pages.add(page_no)
+
+    def redo(self, lsn: int, kind: int, key: int, payload: bytes):
+        """Reapply one committed WAL record, unless the page already reflects it."""
+        if kind == wal_records.PAGE_IMAGE:
+            # A full image logged by a checkpoint: it repairs a page torn while being written.
+            if key < self.page_count:
+                frame = self._fetch(key)
+                try:
+                    current = SlottedPage(frame.buf)
+                    stale = not current.verify() or current.lsn <= SlottedPage(payload).lsn
+                finally:
+                    self.pool.unpin(frame)
+                if not stale:
+                    return
+            self._grow(key)
+            frame = self._modify(key)
+            frame.buf[:] = payload
+            self.pool.unpin(frame)
+            return
+        page_no, slot = key >> SLOT_BITS, key & (MAX_SLOTS - 1)
+        self._grow(page_no)
+        frame = self._modify(page_no)
+        try:
+            page = SlottedPage(frame.buf)
+            if page.lsn >= lsn:
+                return
+            if kind == wal_records.DELETE:
+                page.delete(slot)
+            elif not page.put(slot, payload):
+                raise ValueError(f"WAL record {lsn} does not fit page {page_no}")
+            page.lsn = lsn
+        finally:
+            self.pool.unpin(frame)
+
+    def dirty_pages(self) -> Iterator[Tuple[int, bytearray]]:
+        for page_no in sorted(self.dirty):
+            frame = self._fetch(page_no)
+            try:
+                SlottedPage(frame.buf).seal()
+                yield page_no, frame.buf
+            finally:
+                self.pool.unpin(frame)
+
+    def flush(self):
+        """Write dirty pages back to the data file, fsync it and release the frames to eviction."""
+        if not self.dirty:
+            return
+        for page_no, page in self.dirty_pages():
+            self.page_file.write(page_no, page)
+        self.page_file.sync()
+        for page_no in self.dirty:
+            frame = self._fetch(page_no)
+            self.pool.mark_clean(frame)
+            self.pool.unpin(frame)
+        self.dirty = set()
+
+    def close(self):
+        self.pool.discard(self.table_id)
+        self.page_file.close()
+
+    # Internals
+
+    def _encode(self, row: Row) -> bytes:
+        data = self.codec.encode(row)
+        if len(data) > self.max_record:
+            raise ValueError(f"Row of {len(data)} bytes does not fit in a {self.page_size} byte page")
+        return data
+
+    def _fetch(self, page_no: int, sequential: bool = False) -> Frame:
+        return self.pool.fetch((self.table_id, page_no), lambda: self.page_file.read(page_no), sequential)
+
+    def _modify(self, page_no: int) -> Frame:
+        """Pin a page for writing and mark it dirty; the caller unpins it."""
+        if page_no >= self.page_file.page_count and page_no not in self.dirty:
+            # Allocated since the last checkpoint, so it exists only in memory
+            frame = self.pool.create((self.table_id, page_no), SlottedPage.empty(self.page_size))
+        else:
+            frame = self._fetch(page_no)
+            self.pool.mark_dirty(frame)
+        self.dirty.add(page_no)
+        return frame
+
+    def _grow(self, page_no: int):
+        while self.page_count <= page_no:
+            self.pool.unpin(self._modify(self.page_count))
+            self.page_free.append(self.page_size - HEADER.size)
+            self.page_count += 1
+
+    def _place(self, txn: int, data: bytes) -> int:
+        need = len(data) + SLOT.size
+        candidates = [self.page_count - 1] if self.page_count else []
+        candidates.extend(self.sparse_pages)
+        for page_no in candidates:
+            if self.page_free[page_no] >= need:
+                row_id = self._place_in(txn, page_no, data)
+                if row_id is not None:
+                    return row_id
+            elif page_no in self.sparse_pages and self.page_free[page_no] < self.page_size // 4:
+                self.sparse_pages.discard(page_no)
+        page_no = self.page_count
+        self._grow(page_no)
+        return self._place_in(txn, page_no, data)
+
+    def _place_in(self, txn: int, page_no: int, data: bytes) -> Optional[int]:
+        frame = self._modify(page_no)
+        try:
+            page = SlottedPage(frame.buf)
+            slots = page.slot_count
+            slot = page.insert(data, MAX_SLOTS)
+            if slot is None:
+                return None
+            row_id = page_no << SLOT_BITS | slot
+            page.lsn = self.wal.append(txn, wal_records.INSERT, self.table_id, row_id, data)
+        finally:
+            self.pool.unpin(frame)
+        self.page_free[page_no] -= len(data) + (SLOT.size if slot >= slots else 0)
+        self.live_count += 1
+        return row_id
+
+    def _remove(self, txn: int, row_id: int):
+        page_no, slot = row_id >> SLOT_BITS, row_id & (MAX_SLOTS - 1)
+        frame = self._modify(page_no)
+        try:
+            page = SlottedPage(frame.buf)
+            length = len(page.record(slot))
+            page.delete(slot)
+            page.lsn = self.wal.append(txn, wal_records.DELETE, self.table_id, row_id)
+        finally:
+            self.pool.unpin(frame)
+        self.live_count -= 1
+        self._adjust_free(page_no, length)
+
+    def _adjust_free(self, page_no: int, delta: int):
+        self.page_free[page_no] += delta
+        if self.page_free[page_no] >= self.page_size // 4:
+            self.sparse_pages.add(page_no)
+
+    @contextmanager
+    def _change(self):
+        # Yields the WAL transaction to log one change under, committing it afterwards
+        # unless the change belongs to an enclosing transaction.
+        if self.txn is not None:
+            yield self.txn
+            return
+        with self.gate.read():
+            txn = self.wal.begin()
+            yield txn
+            self.wal.commit(txn)
+        # Outside the gate: on_commit may checkpoint, which needs the gate exclusively.
+        if self.on_commit is not None:
+            self.on_commit()
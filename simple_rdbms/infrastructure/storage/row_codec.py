@@ -0,0 +1,67 @@
+import struct
+from typing import Any, Dict, List
+from domain.entities.column import Column
+from domain.value_objects.data_type import DataType
+
+Row = Dict[str, Any]
+
+_FIXED_FORMATS = {DataType.INTEGER: 'q', DataType.FLOAT: 'd', DataType.BOOLEAN: '?'}
+_LENGTH = struct.Struct('<H')
+
+
+class RowCodec:
+    """Typed binary encoding of the rows of one schema.
+
+    A row is a null bitmap, then every INTEGER/FLOAT/BOOLEAN column packed with one
+    precompiled struct (NULLs as zero), then each VARCHAR as a 2-byte length and UTF-8
+    bytes. Columns are written in schema order within each group, so nothing but the
+    values is stored.
+    """
+
+    def __init__(self, columns: List[Column]):
+        self.names = [col.name for col in columns]
+        self.null_bytes = (len(columns) + 7) // 8
+        fixed = [col for col in columns if col.data_type in _FIXED_FORMATS]
+        self.fixed = struct.Struct('<' + ''.join(_FIXED_FORMATS[col.data_type] for col in fixed))
+        self.fixed_names = [col.name for col in fixed]
+        self.string_names = [col.name for col in columns if col.data_type not in _FIXED_FORMATS]
+        position = {name: i for i, name in enumerate(self.names)}
+        self.fixed_positions = [position[name] for name in self.fixed_names]
+        self.string_positions = [position[name] for name in self.string_names]
+
+    def encode(self, row: Row) -> bytes:
+        get = row.get
+        mask = 0
+        for i, name in enumerate(self.names):
+            if get(name) is None:
+                mask |= 1 << i
+        fixed = [get(name) for name in self.fixed_names]
+        try:
+            parts = [mask.to_bytes(self.null_bytes, 'little'),
+                     self.fixed.pack(*[0 if v is None else v for v in fixed])]
+            for name in self.string_names:
+                value = get(name)
+                data = b'' if value is None else value.encode('utf-8')
+                parts.append(_LENGTH.pack(len(data)))
+                parts.append(data)
+        except struct.error:
+            raise ValueError("Value out of range for its column type") from None
+        return b''.join(parts)
+
+    def decode(self, buf) -> Row:
+        """Decode one row from a bytes-like object, e.g. a memoryview into a page."""
+        values: List[Any] = [None] * len(self.names)
+        for i, value in zip(self.fixed_positions, self.fixed.unpack_from(buf, self.null_bytes)):
+            values[i] = value
+        pos = self.null_bytes + self.fixed.size
+        for i in self.string_positions:
+            length = buf[pos] | buf[pos + 1] << 8
+            pos += 2
+            values[i] = str(buf[pos:pos + length], 'utf-8')
+            pos += length
+        mask = int.from_bytes(buf[:self.null_bytes], 'little')
+        if mask:
+            for i in range(len(values)):
+                if mask >> i & 1:
+                    values[i] = None
+        return dict(zip(self.names, values))
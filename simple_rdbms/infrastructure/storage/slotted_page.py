@@ -0,0 +1,133 @@
+import struct
+import zlib
+from typing import Iterator, Optional, Tuple
+
+# Page LSN, checksum, number of slots, offset where record data starts
+HEADER = struct.Struct('<QIHH')
+# Record offset and length; length 0 marks an empty slot
+SLOT = struct.Struct('<HH')
+
+MAX_PAGE_SIZE = 32768
+
+
+class SlottedPage:
+    """A fixed-size page of variable-length records.
+
+    The slot directory grows forward from the header and record data grows backward
+    from the end of the page, so records can be placed, resized and removed without
+    moving other slots: a record keeps its slot number for as long as it lives in the
+    page. The buffer may be a writable bytearray or a read-only memoryview into a mapped
+    file; only the methods that modify the page need it to be writable.
+    """
+    __slots__ = ('buf',)
+
+    def __init__(self, buf):
+        self.buf = buf
+
+    @staticmethod
+    def empty(page_size: int) -> bytearray:
+        buf = bytearray(page_size)
+        HEADER.pack_into(buf, 0, 0, 0, 0, page_size)
+        return buf
+
+    @property
+    def lsn(self) -> int:
+        return HEADER.unpack_from(self.buf, 0)[0]
+
+    @lsn.setter
+    def lsn(self, value: int):
+        struct.pack_into('<Q', self.buf, 0, value)
+
+    @property
+    def slot_count(self) -> int:
+        return HEADER.unpack_from(self.buf, 0)[2]
+
+    def record(self, slot: int):
+        """The record in a slot as a zero-copy view, or None for an empty slot."""
+        _, _, count, _ = HEADER.unpack_from(self.buf, 0)
+        if slot >= count:
+            return None
+        offset, length = SLOT.unpack_from(self.buf, HEADER.size + slot * SLOT.size)
+        if not length:
+            return None
+        return memoryview(self.buf)[offset:offset + length]
+
+    def records(self) -> Iterator[Tuple[int, memoryview]]:
+        buf = self.buf
+        view = memoryview(buf)
+        count = HEADER.unpack_from(buf, 0)[2]
+        for slot, (offset, length) in enumerate(SLOT.iter_unpack(buf[HEADER.size:HEADER.size + count * SLOT.size])):
+            if length:
+                yield slot, view[offset:offset + length]
+
+    def free_space(self) -> int:
+        """Bytes left for record data once the page is defragmented."""
+        count = self.slot_count
+        used = sum(length for _, length in SLOT.iter_unpack(self.buf[HEADER.size:HEADER.size + count * SLOT.size]))
+        return len(self.buf) - HEADER.size - count * SLOT.size - used
+
+    def insert(self, data: bytes, max_slots: int) -> Optional[int]:
+        """Store a record in the first empty slot; returns the slot, or None if it does not fit."""
+        count = self.slot_count
+        slot = next((i for i, (_, length) in enumerate(self._slots(count)) if not length), None)
+        if slot is None:
+            if count >= max_slots:
+                return None
+            slot = count
+        return slot if self.put(slot, data) else None
+
+    def put(self, slot: int, data: bytes) -> bool:
+        """Store a record in a given slot, replacing what was there. False if it does not fit."""
+        buf = self.buf
+        lsn, checksum, count, start = HEADER.unpack_from(buf, 0)
+        old_offset, old_length = SLOT.unpack_from(buf, HEADER.size + slot * SLOT.size) if slot < count else (0, 0)
+        if len(data) <= old_length:
+            buf[old_offset:old_offset + len(data)] = data
+            SLOT.pack_into(buf, HEADER.size + slot * SLOT.size, old_offset, len(data))
+            return True
+        new_count = max(count, slot + 1)
+        directory_end = HEADER.size + new_count * SLOT.size
+        if start - directory_end < len(data):
+            if self.free_space() - (new_count - count) * SLOT.size + old_length < len(data):
+                return False
+            self.delete(slot)
+            start = self._defragment()
+        if new_count > count:
+            # Slots between the old end and the new one start out empty.
+            buf[HEADER.size + count * SLOT.size:directory_end] = bytes(directory_end - HEADER.size - count * SLOT.size)
+        start -= len(data)
+        buf[start:start + len(data)] = data
+        SLOT.pack_into(buf, HEADER.size + slot * SLOT.size, start, len(data))
+        HEADER.pack_into(buf, 0, lsn, checksum, new_count, start)
+        return True
+
+    def delete(self, slot: int):
+        if slot < self.slot_count:
+            SLOT.pack_into(self.buf, HEADER.size + slot * SLOT.size, 0, 0)
+
+    def seal(self):
+        """Store the checksum of the page contents; done right before the page is written out."""
+        struct.pack_into('<I', self.buf, 8, self._checksum())
+
+    def verify(self) -> bool:
+        return HEADER.unpack_from(self.buf, 0)[1] == self._checksum()
+
+    def _checksum(self) -> int:
+        return zlib.crc32(self.buf[12:], zlib.crc32(self.buf[:8]))
+
+    def _slots(self, count: int):
+        return SLOT.iter_unpack(self.buf[HEADER.size:HEADER.size + count * SLOT.size])
+
+    def _defragment(self) -> int:
+        # Pack live records against the end of the page, keeping their slot numbers.
+        buf = self.buf
+        lsn, checksum, count, _ = HEADER.unpack_from(buf, 0)
+        live = [(slot, bytes(buf[offset:offset + length]))
+                for slot, (offset, length) in enumerate(self._slots(count)) if length]
+        start = len(buf)
+        for slot, data in live:
+            start -= len(data)
+            buf[start:start + len(data)] = data
+            SLOT.pack_into(buf, HEADER.size + slot * SLOT.size, start, len(data))
+        HEADER.pack_into(buf, 0, lsn, checksum, count, start)
+        return start
@@ -0,0 +1,11 @@
+from typing import List
+from domain.entities.column import Column
+from domain.entities.row_store import RowStore
+from domain.value_objects.storage_engine import StorageEngine
+from infrastructure.storage.columnar_store import ColumnarStore
+
+
+def create_store(engine: StorageEngine, columns: List[Column]):
+    if engine == StorageEngine.COLUMNAR:
+        return ColumnarStore(columns)
+    return RowStore(columns)
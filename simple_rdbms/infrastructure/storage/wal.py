@@ -0,0 +1,201 @@
+"""Append-only write-ahead log.
+
+Every change to a page is appended here before the page itself is written. Changes
+that must be applied together share a transaction id from begin(), and a COMMIT record
+for that id makes them take effect. Transactions on different tables may interleave in
+the file; on restart the records of committed transactions are replayed in LSN order
+and those of transactions without a COMMIT are ignored.
+
+The fsync policy decides what a commit waits for:
+
+- `always`: the commit is on disk before commit() returns. Threads committing at the
+  same time share one fsync (group commit).
+- `interval`: the commit is handed to the OS at once and fsynced at most every
+  `sync_interval` seconds, so a power failure can lose that much recent work.
+- `off`: the OS decides when to write; the log is only fsynced at checkpoints and close.
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List, Tuple
+
+FSYNC_ALWAYS = 'always'
+FSYNC_INTERVAL = 'interval'
+FSYNC_OFF = 'off'
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_OFF)
+
+# Record kinds
+INSERT = 1
+UPDATE = 2
+DELETE = 3
+PAGE_IMAGE = 4
+COMMIT = 5
+
+_MAGIC = b'RDBWAL01'
+# Magic and the LSN of the first record in the file
+FILE_HEADER = struct.Struct('<8sQ')
+# Payload length, CRC32 of everything after this field, LSN, kind, transaction id, table id, key
+RECORD_HEADER = struct.Struct('<IIQBIIQ')
+_BODY_HEADER = struct.Struct('<QBIIQ')
+
+# (lsn, kind, table id, key, payload)
+WalRecord = Tuple[int, int, int, int, bytes]
+
+
+class WriteAheadLog:
+    def __init__(self, path: str, fsync_policy: str = FSYNC_ALWAYS, sync_interval: float = 0.1):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {fsync_policy}")
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self.sync_interval = sync_interval
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        # Appends are serialized by `lock`; writing and fsyncing the buffer by `flush_lock`,
+        # so one thread can fsync while others keep appending.
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.buffer: List[bytes] = []
+        self.buffered_bytes = 0
+        # Transactions with records but no COMMIT yet
+        self.open_transactions = set()
+        self.next_txn = 1
+        self.last_sync = time.monotonic()
+        self._committed: List[WalRecord] = []
+        self._open()
+
+    @property
+    def size(self) -> int:
+        """Bytes in the log, including records not yet written to the file."""
+        return self.file_size + self.buffered_bytes
+
+    def begin(self) -> int:
+        """A new transaction id for append() and commit()."""
+        with self.lock:
+            txn = self.next_txn
+            self.next_txn += 1
+            return txn
+
+    def append(self, txn: int, kind: int, table_id: int, key: int, payload: bytes = b'') -> int:
+        """Buffer a record; returns its LSN. It takes effect once its transaction commits."""
+        with self.lock:
+            self.open_transactions.add(txn)
+            return self._append(kind, txn, table_id, key, payload)
+
+    def commit(self, txn: int):
+        """Log the transaction's COMMIT and make it durable per the fsync policy."""
+        with self.lock:
+            if txn not in self.open_transactions:
+                return
+            self.open_transactions.discard(txn)
+            lsn = self._append(COMMIT, txn, 0, 0, b'')
+        if self.fsync_policy == FSYNC_ALWAYS:
+            self._flush(lsn, True)
+        elif self.fsync_policy == FSYNC_INTERVAL:
+            self._flush(lsn, time.monotonic() - self.last_sync >= self.sync_interval)
+        else:
+            self._flush(lsn, False)
+
+    def sync(self):
+        """Write and fsync everything appended so far, whatever the policy."""
+        with self.lock:
+            lsn = self.next_lsn - 1
+        self._flush(lsn, True)
+
+    def records(self) -> Iterator[WalRecord]:
+        """Committed records found in the file when it was opened, in LSN order."""
+        return iter(self._committed)
+
+    def truncate(self):
+        """Drop every record. LSNs keep counting up from where they were."""
+        with self.flush_lock, self.lock:
+            self.buffer = []
+            self.buffered_bytes = 0
+            self.open_transactions = set()
+            self._committed = []
+            os.ftruncate(self.fd, 0)
+            os.pwrite(self.fd, FILE_HEADER.pack(_MAGIC, self.next_lsn), 0)
+            os.fsync(self.fd)
+            self.file_size = FILE_HEADER.size
+            self.written_lsn = self.durable_lsn = self.next_lsn - 1
+
+    def close(self):
+        if self.fd is not None:
+            self.sync()
+            os.close(self.fd)
+            self.fd = None
+
+    def _append(self, kind: int, txn: int, table_id: int, key: int, payload: bytes) -> int:
+        lsn = self.next_lsn
+        self.next_lsn += 1
+        body = _BODY_HEADER.pack(lsn, kind, txn, table_id, key) + payload
+        record = struct.pack('<II', len(payload), zlib.crc32(body)) + body
+        self.buffer.append(record)
+        self.buffered_bytes += len(record)
+        return lsn
+
+    def _flush(self, lsn: int, fsync: bool):
+        with self.flush_lock:
+            if self.durable_lsn >= lsn or (not fsync and self.written_lsn >= lsn):
+                # Another thread's write or fsync already covered this commit.
+                return
+            with self.lock:
+                data = b''.join(self.buffer)
+                self.buffer = []
+                self.buffered_bytes = 0
+                upto = self.next_lsn - 1
+            if data:
+                os.pwrite(self.fd, data, self.file_size)
+                self.file_size += len(data)
+            self.written_lsn = upto
+            if fsync:
+                os.fsync(self.fd)
+                self.durable_lsn = upto
+                self.last_sync = time.monotonic()
+
+    def _open(self):
+        size = os.fstat(self.fd).st_size
+        if size < FILE_HEADER.size:
+            os.ftruncate(self.fd, 0)
+            os.pwrite(self.fd, FILE_HEADER.pack(_MAGIC, 1), 0)
+            os.fsync(self.fd)
+            self.file_size = FILE_HEADER.size
+            self.next_lsn = 1
+        else:
+            end, self.next_lsn = self._scan(size)
+            if end < size:
+                # Drop a record torn by a crash, and any uncommitted tail before it.
+                os.ftruncate(self.fd, end)
+                os.fsync(self.fd)
+            self.file_size = end
+        self.written_lsn = self.durable_lsn = self.next_lsn - 1
+
+    def _scan(self, size: int) -> Tuple[int, int]:
+        # Returns the end of the last COMMIT record and the next LSN to hand out.
+        with mmap.mmap(self.fd, size, access=mmap.ACCESS_READ) as data:
+            magic, next_lsn = FILE_HEADER.unpack_from(data, 0)
+            if magic != _MAGIC:
+                raise ValueError(f"{self.path} is not a write-ahead log")
+            pos = end = FILE_HEADER.size
+            committed_lsn = next_lsn - 1
+            pending: Dict[int, List[WalRecord]] = {}
+            while pos + RECORD_HEADER.size <= size:
+                length, crc, lsn, kind, txn, table_id, key = RECORD_HEADER.unpack_from(data, pos)
+                body_end = pos + RECORD_HEADER.size + length
+                if body_end > size or zlib.crc32(data[pos + 8:body_end]) != crc or lsn != next_lsn:
+                    break
+                next_lsn += 1
+                pos = body_end
+                # Transaction ids must not repeat while their records are still in the file
+                self.next_txn = max(self.next_txn, txn + 1)
+                if kind == COMMIT:
+                    self._committed.extend(pending.pop(txn, ()))
+                    end = pos
+                    committed_lsn = lsn
+                else:
+                    pending.setdefault(txn, []).append((lsn, kind, table_id, key, data[pos - length:pos]))
+        self._committed.sort(key=lambda record: record[0])
+        # LSNs of a discarded tail are handed out again; no page on disk can carry them.
+        return end, committed_lsn + 1
@@ -1,4 +1,29 @@
+import argparse
 from presentation.cli.repl import Repl
+from infrastructure.storage.disk_storage import DiskStorage
+from infrastructure.storage.snapshot import DEFAULT_WORKERS
+from infrastructure.storage.wal import FSYNC_POLICIES, FSYNC_ALWAYS
+
+
+def make_storage(args):
+    if args.data_dir:
+        return DiskStorage(args.data_dir, args.fsync, buffer_pool_bytes=args.buffer_pool_mb * 2 ** 20)
+    return None
+
 
 if __name__ == "__main__":
-    Repl().cmdloop()
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(description="Simple RDBMS REPL")
+    arg_parser.add_argument('--data-dir', help="Keep tables on disk in this directory instead of in memory")
+    arg_parser.add_argument('--fsync', choices=FSYNC_POLICIES, default=FSYNC_ALWAYS,
+                            help="When commits are fsynced to the write-ahead log (default: always)")
+    arg_parser.add_argument('--buffer-pool-mb', type=int, default=64,
+                            help="Memory budget for cached pages of disk tables (default: 64)")
+    arg_parser.add_argument('--load-snapshot', metavar='PATH', help="Load the tables of a SAVE snapshot at startup")
+    arg_parser.add_argument('--load-workers', type=int, default=DEFAULT_WORKERS,
+                            help=f"Threads that decode snapshot tables (default: {DEFAULT_WORKERS})")
+    args = arg_parser.parse_args()
+    repl = Repl(make_storage(args))
+    if args.load_snapshot:
+        rows = repl.query_service.load_snapshot(args.load_snapshot, args.load_workers)
+        print(f"Loaded {rows} rows from {args.load_snapshot}")
+    repl.cmdloop()
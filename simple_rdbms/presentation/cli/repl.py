@@ -2,6 +2,7 @@ import cmd
 from infrastructure.parsers.sql_parser import SqlParser
 from application.services.query_service import QueryService
 from application.services.crud_service import CrudService
+from infrastructure.monitoring.metrics import NULL_TRACE, QueryTrace
 from infrastructure.repositories.table_repository import TableRepository
 from infrastructure.storage.in_memory_storage import InMemoryStorage
 
@@ -9,26 +10,59 @@ class Repl(cmd.Cmd):
     intro = "Welcome to Simple RDBMS. Type SQL commands or 'quit' to exit."
     prompt = "rdbms> "
 
-    def __init__(self):
+    def __init__(self, storage=None):
         super().__init__()
-        self.storage = InMemoryStorage()
+        self.storage = storage if storage is not None else InMemoryStorage()
         self.table_repo = TableRepository(self.storage)
         self.crud_service = CrudService(self.table_repo)
         self.query_service = QueryService(self.crud_service)
         self.parser = SqlParser()
+        # Toggled by \timing: print how long each statement took, stage by stage
+        self.timing = False
+
+    def postloop(self):
+        if self.query_service.session.transaction is not None:
+            print("Rolling back the open transaction")
+            self.query_service.rollback()
+        self.query_service.close()
+        # Durable backends checkpoint and release their files on the way out
+        if hasattr(self.storage, 'close'):
+            self.storage.close()
 
     def default(self, line):
         if line.strip().lower() in ['quit', 'exit']:
             return True
+        if line.strip().startswith('\\'):
+            self.meta_command(line.strip()[1:].split())
+            return None
+        trace = QueryTrace(self.query_service.metrics, line) if self.timing else NULL_TRACE
         try:
-            query = self.parser.parse(line)
-            result = self.query_service.execute(query)
-            if result is not None:
-                print(result)
-            else:
-                print("OK")
+            with trace.stage('parse'):
+                query = self.parser.parse(line)
+            result = self.query_service.execute(query, trace=trace)
+            with trace.stage('print'):
+                if result is not None:
+                    print(result)
+                else:
+                    print("OK")
+            trace.finish()
         except Exception as e:
+            trace.finish(error=True)
             print(f"Error: {e}")
+        if self.timing:
+            print(f"Time: {trace.summary()}")
+        return None
+
+    def meta_command(self, words):
+        if words and words[0] == 'timing' and len(words) <= 2:
+            setting = words[1].lower() if len(words) == 2 else None
+            if setting not in (None, 'on', 'off'):
+                print("Usage: \\timing [on|off]")
+                return
+            self.timing = not self.timing if setting is None else setting == 'on'
+            print(f"Timing is {'on' if self.timing else 'off'}.")
+        else:
+            print(f"Unknown command: \\{' '.join(words)}")
 
     def do_quit(self, line):
         return True
@@ -1,30 +1,245 @@
-from flask import Flask, request, jsonify
+import atexit
+import base64
+import json
+import os
+from flask import Flask, Response, request, jsonify
 from infrastructure.parsers.sql_parser import SqlParser
 from application.services.query_service import QueryService
 from application.services.crud_service import CrudService
+from application.services.transaction import Session
+from infrastructure.monitoring.metrics import QueryMetrics
+from infrastructure.parsers.sql_ast import Select
 from infrastructure.repositories.table_repository import TableRepository
 from infrastructure.storage.in_memory_storage import InMemoryStorage
+from infrastructure.storage.disk_storage import DiskStorage
 
 app = Flask(__name__)
 
-storage = InMemoryStorage()
+# RDBMS_DATA_DIR keeps tables on disk; RDBMS_FSYNC picks the WAL fsync policy,
+# RDBMS_BUFFER_POOL_MB the page cache budget and RDBMS_RESULT_CACHE_MB that of the
+# SELECT result cache (0 turns it off). Statements slower than RDBMS_SLOW_QUERY_MS
+# are logged (0 turns the log off). RDBMS_LOAD_SNAPSHOT names a SAVE snapshot to load
+# at startup.
+if os.environ.get('RDBMS_DATA_DIR'):
+    storage = DiskStorage(os.environ['RDBMS_DATA_DIR'], os.environ.get('RDBMS_FSYNC', 'always'),
+                          buffer_pool_bytes=int(os.environ.get('RDBMS_BUFFER_POOL_MB', 64)) * 2 ** 20)
+    atexit.register(storage.close)
+else:
+    storage = InMemoryStorage()
 table_repo = TableRepository(storage)
 crud_service = CrudService(table_repo)
-query_service = QueryService(crud_service)
+slow_query_ms = float(os.environ.get('RDBMS_SLOW_QUERY_MS', 1000))
+metrics = QueryMetrics(slow_query_ms / 1000 if slow_query_ms > 0 else None)
+# COPY, SAVE and LOAD would let any client read and write files on the server
+query_service = QueryService(crud_service, allow_copy=False,
+                             result_cache_bytes=int(os.environ.get('RDBMS_RESULT_CACHE_MB', 64)) * 2 ** 20,
+                             metrics=metrics)
+atexit.register(query_service.close)
+if os.environ.get('RDBMS_LOAD_SNAPSHOT'):
+    query_service.load_snapshot(os.environ['RDBMS_LOAD_SNAPSHOT'])
 parser = SqlParser()
 
+# Rows per chunk of a streamed NDJSON response
+STREAM_CHUNK_ROWS = 500
+MAX_PAGE_SIZE = 10_000
+
+
+def run_statement(execute):
+    # Each request is its own session: a transaction could not outlive the request anyway
+    session = Session()
+    result = execute(session)
+    if session.transaction is not None:
+        query_service.rollback(session)
+        raise ValueError("Transactions cannot span HTTP requests")
+    return result
+
+def wants_profile(value) -> bool:
+    return value in (True, '1', 'true')
+
+
+def traced_result(trace, result):
+    # The profile covers parsing and execution, which are over by now
+    payload = {'result': result}
+    if trace.profile_text is not None:
+        payload['profile'] = trace.profile_text
+    with trace.stage('serialize'):
+        response = jsonify(payload)
+    trace.finish()
+    return response
+
 @app.route('/query', methods=['GET'])
 def query():
+    """Run the SQL in ?sql=...; with &profile=1 the response has a cProfile report under "profile"."""
     sql = request.args.get('sql')
     if not sql:
         return jsonify({'error': 'No SQL provided'}), 400
+    trace = query_service.trace(sql, wants_profile(request.args.get('profile')))
     try:
-        query = parser.parse(sql)
-        result = query_service.execute(query)
-        return jsonify({'result': result})
+        with trace.profiling():
+            with trace.stage('parse'):
+                query = parser.parse(sql)
+            result = run_statement(lambda session: query_service.execute(query, session, trace=trace))
+        return traced_result(trace, result)
     except Exception as e:
+        trace.finish(error=True)
         return jsonify({'error': str(e)}), 400
 
+@app.route('/query', methods=['POST'])
+def query_stream():
+    """Run the SQL in a JSON body.
+
+    {"sql": ...} streams a SELECT's rows as NDJSON, one JSON object per line; a failure
+    part way through ends the stream with an {"error": ...} line. With "format": "json"
+    the rows are streamed as the {"result": [...]} document GET returns, in chunks, and a
+    failure adds an "error" member after the rows sent so far. With "page_size" the
+    response is one page, {"rows": [...], "cursor": ...}, and {"cursor": ...} fetches the
+    next one; the cursor is null after the last page. Other statements answer
+    {"result": ...} as GET does, with a cProfile report under "profile" when the body
+    has "profile": true.
+    """
+    body = request.get_json(silent=True) or {}
+    trace = None
+    try:
+        if body.get('cursor'):
+            sql, offset, page_size = decode_cursor(body['cursor'])
+        else:
+            sql, offset, page_size = body.get('sql'), 0, body.get('page_size')
+        if not sql:
+            return jsonify({'error': 'No SQL provided'}), 400
+        trace = query_service.trace(sql, wants_profile(body.get('profile')))
+        with trace.stage('parse'):
+            query = parser.parse(sql)
+        if not isinstance(query, Select):
+            with trace.profiling():
+                result = run_statement(lambda session: query_service.execute(query, session, trace=trace))
+            return traced_result(trace, result)
+        if page_size is not None:
+            if type(page_size) is not int or not 0 < page_size <= MAX_PAGE_SIZE:
+                raise ValueError(f"page_size must be an integer from 1 to {MAX_PAGE_SIZE}")
+            rows, more = query_service.fetch_page(query, offset, page_size, Session(), trace)
+            cursor = encode_cursor(sql, offset + page_size, page_size) if more else None
+            with trace.stage('serialize'):
+                response = jsonify({'rows': rows, 'cursor': cursor})
+            trace.finish()
+            return response
+        if body.get('format', 'ndjson') not in ('ndjson', 'json'):
+            raise ValueError("format must be ndjson or json")
+        # Finishes the trace when the rows have been sent
+        rows = query_service.stream(query, Session(), trace)
+    except Exception as e:
+        if trace is not None:
+            trace.finish(error=True)
+        return jsonify({'error': str(e)}), 400
+    if body.get('format') == 'json':
+        response = Response(chunked_json(rows), mimetype='application/json')
+    else:
+        response = Response(ndjson(rows), mimetype='application/x-ndjson')
+    # Also releases the locks of a response that is never read
+    response.call_on_close(rows.close)
+    return response
+
+
+def ndjson(rows):
+    # The statement's locks are held until this generator finishes or the client goes away
+    try:
+        lines = []
+        for row in rows:
+            lines.append(json.dumps(row))
+            if len(lines) == STREAM_CHUNK_ROWS:
+                lines.append('')
+                yield '\n'.join(lines)
+                lines = []
+        if lines:
+            lines.append('')
+            yield '\n'.join(lines)
+    except Exception as e:
+        yield json.dumps({'error': str(e)}) + '\n'
+    finally:
+        rows.close()
+
+
+def chunked_json(rows):
+    # One json.dumps per chunk rather than per row: much cheaper than NDJSON to encode
+    try:
+        yield '{"result": ['
+        chunk, separator = [], ''
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == STREAM_CHUNK_ROWS:
+                yield separator + json.dumps(chunk)[1:-1]
+                chunk, separator = [], ', '
+        if chunk:
+            yield separator + json.dumps(chunk)[1:-1]
+        yield ']}'
+    except Exception as e:
+        yield '], "error": ' + json.dumps(str(e)) + '}'
+    finally:
+        rows.close()
+
+
+def encode_cursor(sql: str, offset: int, page_size: int) -> str:
+    # Pages are re-run from the SQL, so the cursor carries all the state there is
+    data = json.dumps({'sql': sql, 'offset': offset, 'page_size': page_size})
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return data['sql'], int(data['offset']), int(data['page_size'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+@app.route('/prepare', methods=['POST'])
+def prepare():
+    body = request.get_json(silent=True) or {}
+    sql = body.get('sql')
+    if not sql:
+        return jsonify({'error': 'No SQL provided'}), 400
+    try:
+        statement, parameters = parser.parse_prepared(sql)
+        handle = query_service.prepare(statement, parameters)
+        return jsonify({'handle': handle, 'parameters': [p or '?' for p in parameters]})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/execute', methods=['POST'])
+def execute():
+    body = request.get_json(silent=True) or {}
+    handle = body.get('handle')
+    if not handle:
+        return jsonify({'error': 'No statement handle provided'}), 400
+    trace = query_service.trace(f"EXECUTE {handle}", wants_profile(body.get('profile')))
+    try:
+        with trace.profiling():
+            result = run_statement(
+                lambda session: query_service.execute_prepared(handle, body.get('params'), session, trace))
+        return traced_result(trace, result)
+    except Exception as e:
+        trace.finish(error=True)
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/deallocate', methods=['POST'])
+def deallocate():
+    body = request.get_json(silent=True) or {}
+    try:
+        query_service.deallocate(body.get('handle'))
+        return jsonify({'result': None})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/metrics', methods=['GET'])
+def metrics_text():
+    """Statement counts, durations, stage timings and scan counters in the Prometheus text format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache', methods=['GET'])
+def cache_stats():
+    """Hit and miss counts, size and evictions of the result cache."""
+    if query_service.result_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **query_service.result_cache.stats()})
+
 @app.route('/')
 def index():
     return """
@@ -40,4 +255,5 @@ def index():
     """
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    # Each request runs in its own thread; QueryService locks tables per statement
+    app.run(debug=True, threaded=True)
\ No newline at end of file
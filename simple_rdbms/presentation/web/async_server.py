@@ -0,0 +1,329 @@
+"""An asyncio HTTP front end for serving many clients.
+
+Short SELECTs of one row through the primary key or a unique column run on the event
+loop itself, which is cheaper than handing them to a thread. Everything else runs in a
+pool of worker threads, at most `max_concurrency` statements at a time; up to
+`max_queue` more wait for a turn and further requests are turned away with 503.
+
+Every statement gets `timeout` seconds, waiting included. When they run out the client
+gets 504 and a running SELECT is cancelled: its scans notice within a few thousand rows
+and give up their locks. Statements that change data are never interrupted half way,
+so one that times out may still be applied. A client that gives its query an "id" can
+cancel it with POST /cancel.
+
+Endpoints:
+    GET  /query?sql=...                          {"result": ...}
+    POST /query {"sql", "id"?, "timeout"?}       {"result": ...}
+    POST /cancel {"id"}                          {"cancelled": true or false}
+    GET  /health                                 {"running": n, "queued": n}
+    GET  /cache                                  result cache hits, misses, size and evictions
+    GET  /metrics                                statement counters and timings, Prometheus text format
+Errors are {"error": ...}.
+"""
+import argparse
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from application.services.transaction import Session
+from infrastructure.concurrency.rw_lock import LockTimeout
+from infrastructure.monitoring.metrics import QueryMetrics, QueryTrace
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.disk_storage import DiskStorage
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+from infrastructure.storage.wal import FSYNC_POLICIES, FSYNC_ALWAYS
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUE = 64
+# Seconds a statement may take, waiting for a worker included
+DEFAULT_TIMEOUT = 30.0
+# Longer SQL is parsed by a worker: it cannot be a point lookup and would hold up the loop
+INLINE_PARSE_CHARS = 1024
+MAX_BODY_BYTES = 16 * 2 ** 20
+JSON_TYPE = 'application/json'
+METRICS_TYPE = 'text/plain; version=0.0.4'
+
+# Status, body and content type
+Response = Tuple[int, bytes, str]
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class AsyncServer:
+    """Serves one QueryService over HTTP/1.1 with keep-alive."""
+
+    def __init__(self, query_service: QueryService, parser: Optional[SqlParser] = None,
+                 workers: int = DEFAULT_WORKERS, max_concurrency: Optional[int] = None,
+                 max_queue: int = DEFAULT_MAX_QUEUE, timeout: float = DEFAULT_TIMEOUT):
+        self.query_service = query_service
+        self.parser = parser or SqlParser()
+        self.max_concurrency = max_concurrency or workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix='query')
+        # Created on the loop that serves the requests
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.running = 0
+        self.queued = 0
+        # Sessions of queries that were given an id, by id
+        self._sessions: Dict[str, Session] = {}
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8080) -> asyncio.AbstractServer:
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        for session in self._sessions.values():
+            session.cancel_event.set()
+        self.pool.shutdown(wait=True)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              if version == 'HTTP/1.1' else headers.get('connection', '').lower() == 'keep-alive')
+                if length > MAX_BODY_BYTES:
+                    status, body, content_type = error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+                    keep_alive = False
+                else:
+                    if length and headers.get('expect', '').lower() == '100-continue':
+                        writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+                    status, body, content_type = await self.respond(method, target, await reader.readexactly(length))
+                writer.write(response_head(status, len(body), keep_alive, content_type) + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # A client that hung up or does not speak HTTP
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, method: str, target: str, body: bytes) -> Response:
+        url = urlsplit(target)
+        try:
+            if url.path == '/query' and method == 'GET':
+                sql = parse_qs(url.query).get('sql', [None])[0]
+                return await self.run_query(sql)
+            if url.path == '/query' and method == 'POST':
+                params = json_body(body)
+                return await self.run_query(params.get('sql'), params.get('id'), params.get('timeout'))
+            if url.path == '/cancel' and method == 'POST':
+                return ok({'cancelled': self.cancel(json_body(body).get('id'))})
+            if url.path == '/health' and method == 'GET':
+                return ok({'running': self.running, 'queued': self.queued})
+            if url.path == '/cache' and method == 'GET':
+                cache = self.query_service.result_cache
+                return ok({'enabled': False} if cache is None else {'enabled': True, **cache.stats()})
+            if url.path == '/metrics' and method == 'GET':
+                metrics = self.query_service.metrics
+                if metrics is None:
+                    raise HttpError(HTTPStatus.NOT_FOUND, "Metrics are off")
+                return HTTPStatus.OK, metrics.render().encode(), METRICS_TYPE
+            raise HttpError(HTTPStatus.NOT_FOUND, f"No endpoint {method} {url.path}")
+        except HttpError as e:
+            return error(e.status, str(e))
+        except Exception as e:
+            return error(HTTPStatus.BAD_REQUEST, str(e))
+
+    async def run_query(self, sql: Optional[str], query_id: Optional[str] = None,
+                        timeout: Optional[float] = None) -> Response:
+        if not sql:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "No SQL provided")
+        if query_id is not None and query_id in self._sessions:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Query {query_id} is already running")
+        query = None
+        trace = self.query_service.trace(sql)
+        if len(sql) <= INLINE_PARSE_CHARS:
+            try:
+                with trace.stage('parse'):
+                    query = self.parser.parse(sql)
+            except Exception:
+                trace.finish(error=True)
+                raise
+            if self.query_service.is_point_lookup(query):
+                try:
+                    return self._execute(query, Session(), trace, nowait=True)
+                except LockTimeout:
+                    # A writer has the table: wait for it on a worker, not on the loop
+                    pass
+                except Exception:
+                    trace.finish(error=True)
+                    raise
+        if self.queued >= self.max_queue:
+            trace.finish(error=True)
+            raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, "Server busy, try again later")
+        timeout = self.timeout if timeout is None else min(float(timeout), self.timeout)
+        session = Session(threading.Event())
+        if query_id is not None:
+            self._sessions[query_id] = session
+        try:
+            return await asyncio.wait_for(self._dispatch(sql, query, session, trace), timeout)
+        except asyncio.TimeoutError:
+            session.cancel_event.set()
+            trace.finish(error=True)
+            raise HttpError(HTTPStatus.GATEWAY_TIMEOUT, f"Query timed out after {timeout:g} seconds")
+        finally:
+            if query_id is not None:
+                del self._sessions[query_id]
+
+    def cancel(self, query_id: Optional[str]) -> bool:
+        session = self._sessions.get(query_id)
+        if session is None:
+            return False
+        session.cancel_event.set()
+        return True
+
+    async def _dispatch(self, sql: str, query, session: Session, trace: QueryTrace) -> Response:
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self.running += 1
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self.pool, self._run, sql, query, session, trace)
+        except BaseException:
+            self._finished()
+            raise
+        # The slot is given back when the statement really ends, not when its client stops
+        # waiting, so a timed-out query still counts until its cancellation takes effect
+        future.add_done_callback(lambda _: self._finished())
+        return await asyncio.shield(future)
+
+    def _finished(self):
+        self.running -= 1
+        self._slots.release()
+
+    def _run(self, sql: str, query, session: Session, trace: QueryTrace) -> Response:
+        # On a worker thread
+        if session.cancel_event.is_set():
+            trace.finish(error=True)
+            return error(HTTPStatus.BAD_REQUEST, "Query cancelled")
+        try:
+            if query is None:
+                with trace.stage('parse'):
+                    query = self.parser.parse(sql)
+            return self._execute(query, session, trace)
+        except Exception as e:
+            trace.finish(error=True)
+            return error(HTTPStatus.BAD_REQUEST, str(e))
+
+    def _execute(self, query, session: Session, trace: QueryTrace, nowait: bool = False) -> Response:
+        result = self.query_service.execute(query, session, nowait, trace)
+        if session.transaction is not None:
+            # Each request is its own session, so a transaction could not outlive it anyway
+            self.query_service.rollback(session)
+            raise ValueError("Transactions cannot span HTTP requests")
+        with trace.stage('serialize'):
+            response = ok({'result': result})
+        trace.finish()
+        return response
+
+
+def json_body(body: bytes) -> Dict[str, Any]:
+    try:
+        params = json.loads(body or b'{}')
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+    if not isinstance(params, dict):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+    return params
+
+
+def encode(payload) -> bytes:
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+
+def ok(payload) -> Response:
+    return HTTPStatus.OK, encode(payload), JSON_TYPE
+
+
+def error(status: int, message: str) -> Response:
+    return status, encode({'error': message}), JSON_TYPE
+
+
+def response_head(status: int, length: int, keep_alive: bool, content_type: str = JSON_TYPE) -> bytes:
+    return (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {length}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode('latin-1')
+
+
+async def serve(server: AsyncServer, host: str, port: int):
+    listener = await server.start(host, port)
+    print(f"Serving on http://{host}:{port}", flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Simple RDBMS asyncio HTTP server")
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8080)
+    arg_parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                            help=f"Threads running statements that are not point lookups (default: {DEFAULT_WORKERS})")
+    arg_parser.add_argument('--max-concurrency', type=int,
+                            help="Statements running at once (default: the number of workers)")
+    arg_parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                            help=f"Statements waiting for a worker before requests get 503 (default: {DEFAULT_MAX_QUEUE})")
+    arg_parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                            help=f"Seconds a statement may take, waiting included (default: {DEFAULT_TIMEOUT:g})")
+    arg_parser.add_argument('--result-cache-mb', type=int, default=64,
+                            help="Memory budget for cached SELECT results, 0 to turn the cache off (default: 64)")
+    arg_parser.add_argument('--slow-query-ms', type=float, default=1000,
+                            help="Log statements that take at least this long, 0 to turn the log off (default: 1000)")
+    arg_parser.add_argument('--data-dir', help="Keep tables on disk in this directory instead of in memory")
+    arg_parser.add_argument('--fsync', choices=FSYNC_POLICIES, default=FSYNC_ALWAYS,
+                            help="When commits are fsynced to the write-ahead log (default: always)")
+    arg_parser.add_argument('--buffer-pool-mb', type=int, default=64,
+                            help="Memory budget for cached pages of disk tables (default: 64)")
+    arg_parser.add_argument('--load-snapshot', metavar='PATH', help="Load the tables of a SAVE snapshot before serving")
+    args = arg_parser.parse_args(argv)
+    if args.data_dir:
+        storage = DiskStorage(args.data_dir, args.fsync, buffer_pool_bytes=args.buffer_pool_mb * 2 ** 20)
+    else:
+        storage = InMemoryStorage()
+    # COPY, SAVE and LOAD would let any client read and write files on the server
+    query_service = QueryService(CrudService(TableRepository(storage)), allow_copy=False,
+                                 result_cache_bytes=args.result_cache_mb * 2 ** 20,
+                                 metrics=QueryMetrics(args.slow_query_ms / 1000 if args.slow_query_ms > 0 else None))
+    if args.load_snapshot:
+        query_service.load_snapshot(args.load_snapshot)
+    server = AsyncServer(query_service, workers=args.workers, max_concurrency=args.max_concurrency,
+                         max_queue=args.max_queue, timeout=args.timeout)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        query_service.close()
+        if args.data_dir:
+            storage.close()
+
+
+if __name__ == "__main__":
+    main()
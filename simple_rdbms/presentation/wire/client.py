@@ -0,0 +1,154 @@
+"""Python client for the binary protocol server.
+
+    pool = ConnectionPool('127.0.0.1', 5455, size=8)
+    rows = pool.execute("SELECT * FROM users WHERE id = 1")
+    pool.execute_many("INSERT INTO users VALUES (?, ?, ?)", [[1, 'Ann', 30], [2, 'Bob', 25]])
+    first, second = pool.pipeline(["SELECT ...", "SELECT ..."])
+
+SQL errors are raised as ValueError with the server's message; a broken connection
+raises ConnectionError or OSError and is not returned to the pool.
+"""
+import queue
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Union
+from presentation.wire.protocol import (
+    DEFAULT_PORT, QUERY, BATCH, IN_TRANSACTION, decode_result, encode_batch, encode_frame, read_frame,
+)
+
+Params = Union[List[Any], Dict[str, Any]]
+
+# Requests a pipeline sends before reading their replies. Bounded so that neither side
+# can fill its socket buffer with writes the other is not reading yet.
+PIPELINE_WINDOW = 256
+
+
+class Connection:
+    """One connection and its server-side session. Not safe to share between threads."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT, timeout: Optional[float] = None):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self.sock.makefile('rb')
+        self._next_id = 0
+        # From the last reply: whether the session has a transaction open
+        self.in_transaction = False
+        self.closed = False
+
+    def execute(self, sql: str) -> Any:
+        return self.pipeline([sql])[0]
+
+    def execute_many(self, sql: str, param_sets: List[Params]) -> int:
+        """Run a statement with ? or :name placeholders once per parameter set, all or nothing."""
+        return self._roundtrip([(BATCH, encode_batch(sql, list(param_sets)))])[0]
+
+    def pipeline(self, statements: List[str]) -> List[Any]:
+        """Send statements without waiting for each reply; returns their results in order.
+
+        Every statement runs even if an earlier one fails, and the first failure is raised
+        once all replies are in.
+        """
+        return self._roundtrip([(QUERY, sql.encode()) for sql in statements])
+
+    def close(self):
+        self.closed = True
+        self._reader.close()
+        self.sock.close()
+
+    def __enter__(self) -> 'Connection':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _roundtrip(self, requests) -> List[Any]:
+        if self.closed:
+            raise ConnectionError("Connection is closed")
+        results, error = [], None
+        try:
+            for start in range(0, len(requests), PIPELINE_WINDOW):
+                window = requests[start:start + PIPELINE_WINDOW]
+                ids = []
+                frames = []
+                for message_type, body in window:
+                    self._next_id = (self._next_id + 1) % 2 ** 32
+                    ids.append(self._next_id)
+                    frames.append(encode_frame(message_type, self._next_id, body))
+                self.sock.sendall(b''.join(frames))
+                for request_id in ids:
+                    message_type, flags, reply_id, body = read_frame(self._reader)
+                    if reply_id != request_id:
+                        raise ConnectionError(f"Reply {reply_id} does not match request {request_id}")
+                    self.in_transaction = bool(flags & IN_TRANSACTION)
+                    try:
+                        results.append(decode_result(message_type, body))
+                    except ValueError as e:
+                        results.append(None)
+                        error = error or e
+        except BaseException:
+            # The replies still on the way would be taken for those of later requests
+            self.close()
+            raise
+        if error is not None:
+            raise error
+        return results
+
+
+class ConnectionPool:
+    """Up to `size` connections, opened when first needed and reused. Safe to share between threads."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT, size: int = 8,
+                 timeout: Optional[float] = None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle: 'queue.LifoQueue[Connection]' = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        """Borrow a connection, waiting if all of them are in use.
+
+        A transaction left open is rolled back when the connection is given back.
+        """
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = Connection(self.host, self.port, self.timeout)
+            try:
+                yield conn
+            finally:
+                self._give_back(conn)
+        finally:
+            self._slots.release()
+
+    def execute(self, sql: str) -> Any:
+        with self.connection() as conn:
+            return conn.execute(sql)
+
+    def execute_many(self, sql: str, param_sets: List[Params]) -> int:
+        with self.connection() as conn:
+            return conn.execute_many(sql, param_sets)
+
+    def pipeline(self, statements: List[str]) -> List[Any]:
+        with self.connection() as conn:
+            return conn.pipeline(statements)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _give_back(self, conn: Connection):
+        if not conn.closed and conn.in_transaction:
+            try:
+                conn.execute("ROLLBACK")
+            except (ValueError, OSError):
+                conn.close()
+        if not conn.closed:
+            self._idle.put(conn)
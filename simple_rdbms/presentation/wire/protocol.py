@@ -0,0 +1,231 @@
+"""The binary wire protocol shared by the TCP server and its client.
+
+Every message is a frame: a 10-byte header (body length, message type, flags, request
+id; little-endian) and then the body. The client sends QUERY frames (the SQL) and
+BATCH frames (SQL with placeholders and a table of parameter sets). The server answers
+each request, in order, with one frame carrying the same request id: ROWS, VALUE or
+NONE for a result and ERROR with a message for a failure. The IN_TRANSACTION flag of
+a reply says whether the connection's session has a transaction open.
+
+Rows travel column by column. Each column has a name, a DataType and a NULL flag; the
+values follow as packed int64s, float64s, bytes for BOOLEAN, or uint32 lengths plus
+UTF-8 data for VARCHAR, preceded by one byte per row marking NULLs when there are any.
+A column's type is worked out from its values, since results of aggregates and joins
+have no schema of their own.
+"""
+import struct
+import sys
+from array import array
+from typing import Any, BinaryIO, Dict, List, Tuple
+from domain.value_objects.data_type import DataType
+
+Row = Dict[str, Any]
+
+DEFAULT_PORT = 5455
+MAX_FRAME_BYTES = 256 * 2 ** 20
+
+# Requests
+QUERY = ord('Q')
+BATCH = ord('B')
+# Replies
+ROWS = ord('R')
+VALUE = ord('V')
+NONE = ord('N')
+ERROR = ord('E')
+
+# Reply flag
+IN_TRANSACTION = 1
+
+HEADER = struct.Struct('<IBBI')
+_LENGTH = struct.Struct('<I')
+_COLUMNS = struct.Struct('<IH')
+_COLUMN = struct.Struct('<BB')
+
+TYPE_CODES = {DataType.INTEGER: 1, DataType.FLOAT: 2, DataType.BOOLEAN: 3, DataType.VARCHAR: 4}
+_TYPES = {code: data_type for data_type, code in TYPE_CODES.items()}
+_ARRAY_TYPES = {DataType.INTEGER: 'q', DataType.FLOAT: 'd'}
+# Sent in place of NULLs, which the NULL bytes mark
+_EMPTY = {DataType.INTEGER: 0, DataType.FLOAT: 0.0, DataType.BOOLEAN: False, DataType.VARCHAR: ''}
+# Packed numbers are little-endian whatever the machine
+_SWAP = sys.byteorder == 'big'
+
+
+def encode_frame(message_type: int, request_id: int, body: bytes = b'', flags: int = 0) -> bytes:
+    return HEADER.pack(len(body), message_type, flags, request_id) + body
+
+
+def read_frame(stream: BinaryIO) -> Tuple[int, int, int, bytes]:
+    """(message type, flags, request id, body) of the next frame; ConnectionError at end of stream."""
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ConnectionError("Connection closed")
+    length, message_type, flags, request_id = HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ConnectionError(f"Frame of {length} bytes is too large")
+    body = stream.read(length)
+    if len(body) < length:
+        raise ConnectionError("Connection closed")
+    return message_type, flags, request_id, body
+
+
+def column_type(values: List[Any]) -> DataType:
+    found = {type(value) for value in values if value is not None}
+    if not found or found == {str}:
+        return DataType.VARCHAR
+    if found == {bool}:
+        return DataType.BOOLEAN
+    if found <= {int, bool}:
+        return DataType.INTEGER
+    if found <= {int, bool, float}:
+        return DataType.FLOAT
+    raise ValueError(f"Cannot send a column of {', '.join(sorted(t.__name__ for t in found))} values")
+
+
+def encode_columns(names: List[str], columns: List[List[Any]]) -> bytes:
+    count = len(columns[0]) if columns else 0
+    parts = [_COLUMNS.pack(count, len(names))]
+    for name, values in zip(names, columns):
+        data_type = column_type(values)
+        nulls = bytes([value is None for value in values])
+        has_nulls = b'\x01' in nulls
+        name = name.encode()
+        parts.append(_LENGTH.pack(len(name)) + name + _COLUMN.pack(TYPE_CODES[data_type], has_nulls))
+        if has_nulls:
+            parts.append(nulls)
+            values = [_EMPTY[data_type] if value is None else value for value in values]
+        if data_type in _ARRAY_TYPES:
+            try:
+                packed = array(_ARRAY_TYPES[data_type], values)
+            except OverflowError:
+                raise ValueError(f"Column {name.decode()} has an integer too large to send")
+            if _SWAP:
+                packed.byteswap()
+            parts.append(packed.tobytes())
+        elif data_type is DataType.BOOLEAN:
+            parts.append(bytes(values))
+        else:
+            encoded = [value.encode() for value in values]
+            lengths = array('I', [len(value) for value in encoded])
+            if _SWAP:
+                lengths.byteswap()
+            parts.append(lengths.tobytes())
+            parts.append(b''.join(encoded))
+    return b''.join(parts)
+
+
+def decode_columns(body: bytes, offset: int = 0) -> Tuple[List[str], List[List[Any]], int]:
+    """(names, columns, offset after them) of columns encoded at `offset`."""
+    data = memoryview(body)
+    count, width = _COLUMNS.unpack_from(data, offset)
+    offset += _COLUMNS.size
+    names, columns = [], []
+    for _ in range(width):
+        (length,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        names.append(str(data[offset:offset + length], 'utf-8'))
+        offset += length
+        code, has_nulls = _COLUMN.unpack_from(data, offset)
+        offset += _COLUMN.size
+        data_type = _TYPES[code]
+        nulls = None
+        if has_nulls:
+            nulls = data[offset:offset + count]
+            offset += count
+        if data_type in _ARRAY_TYPES:
+            packed = array(_ARRAY_TYPES[data_type])
+            end = offset + count * packed.itemsize
+            packed.frombytes(data[offset:end])
+            if _SWAP:
+                packed.byteswap()
+            values = packed.tolist()
+        elif data_type is DataType.BOOLEAN:
+            end = offset + count
+            values = [byte == 1 for byte in data[offset:end]]
+        else:
+            lengths = array('I')
+            end = offset + count * lengths.itemsize
+            lengths.frombytes(data[offset:end])
+            if _SWAP:
+                lengths.byteswap()
+            text = bytes(data[end:end + sum(lengths)])
+            end += len(text)
+            values = []
+            start = 0
+            for length in lengths:
+                values.append(text[start:start + length].decode())
+                start += length
+        offset = end
+        if nulls is not None:
+            values = [None if null else value for value, null in zip(values, nulls)]
+        columns.append(values)
+    return names, columns, offset
+
+
+def encode_rows(rows: List[Row]) -> bytes:
+    names = list(rows[0]) if rows else []
+    return encode_columns(names, [[row.get(name) for row in rows] for name in names])
+
+
+def decode_rows(body: bytes) -> List[Row]:
+    names, columns, _ = decode_columns(body)
+    if not names:
+        return []
+    return [dict(zip(names, values)) for values in zip(*columns)]
+
+
+def encode_value(value) -> bytes:
+    return encode_columns([''], [[value]])
+
+
+def decode_value(body: bytes):
+    return decode_columns(body)[1][0][0]
+
+
+def encode_result(request_id: int, result, flags: int = 0) -> bytes:
+    if result is None:
+        return encode_frame(NONE, request_id, flags=flags)
+    if isinstance(result, list):
+        return encode_frame(ROWS, request_id, encode_rows(result), flags)
+    return encode_frame(VALUE, request_id, encode_value(result), flags)
+
+
+def decode_result(message_type: int, body: bytes):
+    """The result a reply carries; an ERROR reply raises ValueError with the server's message."""
+    if message_type == ROWS:
+        return decode_rows(body)
+    if message_type == VALUE:
+        return decode_value(body)
+    if message_type == NONE:
+        return None
+    if message_type == ERROR:
+        raise ValueError(body.decode())
+    raise ConnectionError(f"Unexpected message type {message_type}")
+
+
+def encode_batch(sql: str, param_sets: List[Any]) -> bytes:
+    """SQL with placeholders and its parameter sets: lists for ? and dicts for :name placeholders."""
+    named = bool(param_sets) and isinstance(param_sets[0], dict)
+    if named:
+        names = list(param_sets[0])
+        columns = [[params[name] for params in param_sets] for name in names]
+    else:
+        width = len(param_sets[0]) if param_sets else 0
+        if any(len(params) != width for params in param_sets):
+            raise ValueError("Parameter sets must all have the same length")
+        names = [str(i) for i in range(width)]
+        columns = [[params[i] for params in param_sets] for i in range(width)]
+    sql = sql.encode()
+    return (_LENGTH.pack(len(sql)) + sql + _COLUMNS.pack(len(param_sets), named)
+            + encode_columns(names, columns))
+
+
+def decode_batch(body: bytes) -> Tuple[str, List[Any]]:
+    (length,) = _LENGTH.unpack_from(body)
+    sql = body[_LENGTH.size:_LENGTH.size + length].decode()
+    count, named = _COLUMNS.unpack_from(body, _LENGTH.size + length)
+    names, columns, _ = decode_columns(body, _LENGTH.size + length + _COLUMNS.size)
+    rows = list(zip(*columns)) if columns else [()] * count
+    if named:
+        return sql, [dict(zip(names, values)) for values in rows]
+    return sql, [list(values) for values in rows]
+
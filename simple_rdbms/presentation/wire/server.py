@@ -0,0 +1,138 @@
+"""A TCP server speaking the binary protocol in presentation.wire.protocol.
+
+Each connection gets a thread and a Session, so unlike over HTTP a transaction can
+span several requests of one connection. A connection that closes with a transaction
+open has it rolled back. Requests on a connection are answered in the order they
+arrive, which lets clients pipeline them.
+"""
+import argparse
+import socket
+import socketserver
+from typing import Dict, Optional, Tuple
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from application.services.transaction import Session
+from infrastructure.monitoring.metrics import QueryMetrics
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.disk_storage import DiskStorage
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+from infrastructure.storage.wal import FSYNC_POLICIES, FSYNC_ALWAYS
+from presentation.wire.protocol import (
+    DEFAULT_PORT, QUERY, BATCH, ERROR, IN_TRANSACTION, decode_batch, encode_frame, encode_result, read_frame,
+)
+
+
+class WireServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: Tuple[str, int], query_service: QueryService, parser: Optional[SqlParser] = None):
+        super().__init__(address, WireHandler)
+        self.query_service = query_service
+        self.parser = parser or SqlParser()
+
+
+class WireHandler(socketserver.StreamRequestHandler):
+    server: WireServer
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.session = Session()
+        # Handles of the statements this connection's BATCH requests prepared, by SQL
+        self.prepared: Dict[str, str] = {}
+
+    def handle(self):
+        while True:
+            try:
+                message_type, _, request_id, body = read_frame(self.rfile)
+                self.wfile.write(self.respond(message_type, request_id, body))
+            except (ConnectionError, OSError):
+                # The client went away
+                return
+
+    def respond(self, message_type: int, request_id: int, body: bytes) -> bytes:
+        query_service = self.server.query_service
+        trace = None
+        try:
+            if message_type == QUERY:
+                sql = body.decode()
+                trace = query_service.trace(sql)
+                with trace.stage('parse'):
+                    query = self.server.parser.parse(sql)
+                result = query_service.execute(query, self.session, trace=trace)
+                with trace.stage('serialize'):
+                    response = encode_result(request_id, result, self._flags())
+                trace.finish()
+                return response
+            if message_type == BATCH:
+                sql, param_sets = decode_batch(body)
+                result = query_service.execute_many(self._handle(sql), param_sets, self.session)
+                return encode_result(request_id, result, self._flags())
+            raise ValueError(f"Unknown message type {message_type}")
+        except Exception as e:
+            if trace is not None:
+                trace.finish(error=True)
+            return encode_frame(ERROR, request_id, str(e).encode(), self._flags())
+
+    def finish(self):
+        query_service = self.server.query_service
+        if self.session.transaction is not None:
+            query_service.rollback(self.session)
+        for handle in self.prepared.values():
+            query_service.deallocate(handle)
+        super().finish()
+
+    def _handle(self, sql: str) -> str:
+        handle = self.prepared.get(sql)
+        if handle is None:
+            statement, parameters = self.server.parser.parse_prepared(sql)
+            handle = self.prepared[sql] = self.server.query_service.prepare(statement, parameters,
+                                                                             session=self.session)
+        return handle
+
+    def _flags(self) -> int:
+        return IN_TRANSACTION if self.session.transaction is not None else 0
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Simple RDBMS binary protocol server")
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    arg_parser.add_argument('--result-cache-mb', type=int, default=64,
+                            help="Memory budget for cached SELECT results, 0 to turn the cache off (default: 64)")
+    arg_parser.add_argument('--slow-query-ms', type=float, default=1000,
+                            help="Log statements that take at least this long, 0 to turn the log off (default: 1000)")
+    arg_parser.add_argument('--data-dir', help="Keep tables on disk in this directory instead of in memory")
+    arg_parser.add_argument('--fsync', choices=FSYNC_POLICIES, default=FSYNC_ALWAYS,
+                            help="When commits are fsynced to the write-ahead log (default: always)")
+    arg_parser.add_argument('--buffer-pool-mb', type=int, default=64,
+                            help="Memory budget for cached pages of disk tables (default: 64)")
+    arg_parser.add_argument('--load-snapshot', metavar='PATH', help="Load the tables of a SAVE snapshot before serving")
+    args = arg_parser.parse_args(argv)
+    if args.data_dir:
+        storage = DiskStorage(args.data_dir, args.fsync, buffer_pool_bytes=args.buffer_pool_mb * 2 ** 20)
+    else:
+        storage = InMemoryStorage()
+    # COPY, SAVE and LOAD would let any client read and write files on the server
+    query_service = QueryService(CrudService(TableRepository(storage)), allow_copy=False,
+                                 result_cache_bytes=args.result_cache_mb * 2 ** 20,
+                                 metrics=QueryMetrics(args.slow_query_ms / 1000 if args.slow_query_ms > 0 else None))
+    if args.load_snapshot:
+        query_service.load_snapshot(args.load_snapshot)
+    server = WireServer((args.host, args.port), query_service)
+    print(f"Serving on {args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        query_service.close()
+        if args.data_dir:
+            storage.close()
+
+
+if __name__ == "__main__":
+    main()
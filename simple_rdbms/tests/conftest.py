@@ -0,0 +1,34 @@
+import pytest
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+
+
+class Database:
+    """A fresh in-memory database: its services and run(sql) to execute one statement."""
+
+    def __init__(self, engine: str = 'ROW', **options):
+        self.engine = engine
+        self.crud = CrudService(TableRepository(InMemoryStorage()))
+        self.query_svc = QueryService(self.crud, **options)
+        self.parser = SqlParser()
+
+    def run(self, sql: str):
+        return self.query_svc.execute(self.parser.parse(sql))
+
+
+@pytest.fixture(scope='session')
+def make_db():
+    """make_db(*setup, engine='ROW', **options) -> Database.
+
+    `options` go to QueryService. The setup statements run in order, with {engine} in
+    them replaced by `engine`. Databases with partitioned tables are the caller's to close.
+    """
+    def make(*setup, engine='ROW', **options):
+        db = Database(engine, **options)
+        for sql in setup:
+            db.run(sql.format(engine=engine))
+        return db
+    return make
@@ -0,0 +1,105 @@
+import pytest
+from application.execution.aggregation import partial_aggregate, merge_partials, finalize
+from application.execution.sorting import SortStats, sort_rows
+from infrastructure.parsers.sql_ast import Aggregate
+
+CITIES = ['Nairobi', 'Mombasa', None]
+SETUP = [
+    "CREATE TABLE sales (id INTEGER PRIMARY KEY, city VARCHAR, amount FLOAT, qty INTEGER) ENGINE = {engine}",
+    "INSERT INTO sales VALUES " + ", ".join(
+        f"({i}, {repr(CITIES[i % 3]) if CITIES[i % 3] else 'NULL'}, {i * 0.5}, {i % 4 if i % 5 else 'NULL'})"
+        for i in range(60)),
+]
+
+
+def plan(run, sql):
+    return [row['plan'] for row in run("EXPLAIN " + sql)]
+
+
+@pytest.mark.parametrize("engine", ['ROW', 'COLUMNAR'])
+def test_group_by_with_aggregates(engine, make_db):
+    run = make_db(*SETUP, engine=engine).run
+    rows = run("SELECT city, COUNT(*) AS n, COUNT(qty), SUM(qty), AVG(amount), MIN(id), MAX(id) FROM sales "
+               "WHERE id < 30 GROUP BY city ORDER BY city")
+    assert rows == [
+        {'city': 'Mombasa', 'n': 10, 'COUNT(qty)': 8, 'SUM(qty)': 10, 'AVG(amount)': 7.25, 'MIN(id)': 1, 'MAX(id)': 28},
+        {'city': 'Nairobi', 'n': 10, 'COUNT(qty)': 8, 'SUM(qty)': 12, 'AVG(amount)': 6.75, 'MIN(id)': 0, 'MAX(id)': 27},
+        {'city': None, 'n': 10, 'COUNT(qty)': 8, 'SUM(qty)': 14, 'AVG(amount)': 7.75, 'MIN(id)': 2, 'MAX(id)': 29},
+    ]
+    # Without GROUP BY an empty input still gives one row
+    assert run("SELECT COUNT(*), SUM(qty) FROM sales WHERE id > 100") == [{'COUNT(*)': 0, 'SUM(qty)': None}]
+    assert run("SELECT city, COUNT(*) FROM sales WHERE id > 100 GROUP BY city") == []
+
+
+def test_count_star_is_answered_from_metadata(make_db):
+    run = make_db(*SETUP).run
+    assert plan(run, "SELECT COUNT(*) FROM sales") == ["Count from metadata on sales  (rows=1 cost=3.0)"]
+    assert run("SELECT COUNT(*), COUNT(id) AS ids FROM sales") == [{'COUNT(*)': 60, 'ids': 60}]
+    # A nullable column or a WHERE needs the rows
+    assert plan(run, "SELECT COUNT(qty) FROM sales")[0].startswith("Aggregate COUNT(qty)")
+    assert run("SELECT COUNT(*) FROM sales WHERE qty IS NULL") == [{'COUNT(*)': 12}]
+
+
+def test_order_by_limit_uses_a_bounded_heap(make_db):
+    run = make_db(*SETUP).run
+    sql = "SELECT id, qty FROM sales ORDER BY qty DESC, id LIMIT 3 OFFSET 11"
+    lines = plan(run, sql)
+    assert lines[0].startswith("Limit 3 offset 11  (rows=3 ")
+    assert lines[1].startswith("-> Top-N Sort (qty DESC, id), keep 14  (rows=14 ")
+    # NULLs come first in descending order, then ties in id order
+    everything = run("SELECT id, qty FROM sales ORDER BY qty DESC, id")
+    assert [r['qty'] for r in everything[:12]] == [None] * 12
+    assert run(sql) == everything[11:14] == [{'id': 55, 'qty': None}, {'id': 3, 'qty': 3}, {'id': 7, 'qty': 3}]
+    assert run("SELECT id FROM sales ORDER BY amount LIMIT 2") == [{'id': 0}, {'id': 1}]
+    assert run("SELECT id FROM sales LIMIT 0") == []
+
+
+def test_order_by_spills_to_an_external_sort(make_db):
+    run = make_db(*SETUP, sort_memory=2000).run
+    lines = [row['plan'] for row in run("EXPLAIN ANALYZE SELECT id FROM sales ORDER BY city DESC, amount")]
+    assert "external merge of" in lines[1]
+    rows = run("SELECT id, city FROM sales ORDER BY city DESC, amount")
+    assert [r['id'] for r in rows[:3]] == [2, 5, 8]
+    assert [r['city'] for r in rows[19:21]] == [None, 'Nairobi']
+    assert [r['id'] for r in rows[-2:]] == [55, 58]
+
+    rows = [{'k': i % 7, 'i': i} for i in range(1000)]
+    stats = SortStats()
+    result = list(sort_rows(iter(rows), [('k', False)], memory=4000, stats=stats))
+    assert stats.runs > 1
+    # Stable: equal keys keep their input order
+    assert result == sorted(rows, key=lambda r: r['k'])
+
+
+def test_partial_aggregates_merge():
+    aggregates = [Aggregate('COUNT', None), Aggregate('AVG', 'v'), Aggregate('MAX', 'v')]
+    rows = [{'g': i % 2, 'v': i} for i in range(10)]
+    first = partial_aggregate(rows[:3], ['g'], aggregates)
+    second = partial_aggregate(rows[3:], ['g'], aggregates)
+    assert finalize(merge_partials(first, second), ['g'], aggregates) == [
+        {'g': 0, 'COUNT(*)': 5, 'AVG(v)': 4.0, 'MAX(v)': 8},
+        {'g': 1, 'COUNT(*)': 5, 'AVG(v)': 5.0, 'MAX(v)': 9},
+    ]
+
+
+def test_aggregates_over_a_join(make_db):
+    run = make_db(*SETUP).run
+    run("CREATE TABLE stores (id INTEGER PRIMARY KEY, city VARCHAR)")
+    run("INSERT INTO stores VALUES (1, 'Nairobi'), (2, 'Mombasa')")
+    rows = run("SELECT stores.city, COUNT(sales.id) AS n, SUM(qty) FROM sales JOIN stores ON sales.city = stores.city "
+               "GROUP BY stores.city ORDER BY n DESC, stores.city")
+    assert rows == [{'stores_city': 'Mombasa', 'n': 20, 'SUM(qty)': 24},
+                    {'stores_city': 'Nairobi', 'n': 20, 'SUM(qty)': 24}]
+
+
+@pytest.mark.parametrize("sql, message", [
+    ("SELECT * FROM sales GROUP BY city", "SELECT \\* cannot"),
+    ("SELECT city, COUNT(*) FROM sales", "must appear in GROUP BY"),
+    ("SELECT COUNT(*) FROM sales GROUP BY city ORDER BY qty", "must appear in GROUP BY"),
+    ("SELECT AVG(city) FROM sales", "AVG needs a numeric column"),
+    ("SELECT MAX(nope) FROM sales", "Column nope not found"),
+])
+def test_invalid_aggregate_queries(sql, message, make_db):
+    run = make_db(*SETUP).run
+    with pytest.raises(ValueError, match=message):
+        run(sql)
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import threading
+import pytest
+from application.execution.planner import QueryCancelled
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from application.services.transaction import Session
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+from presentation.web.async_server import AsyncServer
+
+
+def make_service():
+    query_svc = QueryService(CrudService(TableRepository(InMemoryStorage())))
+    parser = SqlParser()
+    query_svc.execute(parser.parse("CREATE TABLE t (id INTEGER PRIMARY KEY, name VARCHAR UNIQUE, n INTEGER)"))
+    query_svc.execute(parser.parse("INSERT INTO t VALUES " + ", ".join(
+        f"({i}, 'name{i}', {i % 10})" for i in range(5000))))
+    return query_svc
+
+
+async def request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = json.dumps(body).encode() if body is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(data)}\r\n"
+                 f"Connection: close\r\n\r\n".encode() + data)
+    await writer.drain()
+    head, _, payload = (await reader.read()).partition(b'\r\n\r\n')
+    writer.close()
+    return int(head.split()[1]), json.loads(payload)
+
+
+def serve(test, **options):
+    # Runs test(server, port) on a fresh event loop with a running server
+    async def main():
+        server = AsyncServer(make_service(), **options)
+        listener = await server.start('127.0.0.1', 0)
+        try:
+            return await test(server, listener.sockets[0].getsockname()[1])
+        finally:
+            listener.close()
+            server.close()
+    return asyncio.run(main())
+
+
+def test_point_lookups_and_scans():
+    async def test(server, port):
+        status, body = await request(port, 'GET', '/query?sql=SELECT%20name%20FROM%20t%20WHERE%20id%20%3D%207')
+        assert (status, body) == (200, {'result': [{'name': 'name7'}]})
+        status, body = await request(port, 'POST', '/query', {'sql': "SELECT COUNT(*) AS c FROM t WHERE n = 3"})
+        assert (status, body) == (200, {'result': [{'c': 500}]})
+        status, body = await request(port, 'POST', '/query', {'sql': "SELECT * FROM missing"})
+        assert status == 400 and body['error'] == "Table not found"
+        status, _ = await request(port, 'GET', '/nowhere')
+        assert status == 404
+    serve(test)
+
+
+def test_point_lookup_detection():
+    query_svc, parser = make_service(), SqlParser()
+    assert query_svc.is_point_lookup(parser.parse("SELECT * FROM t WHERE id = 3"))
+    assert query_svc.is_point_lookup(parser.parse("SELECT n FROM t WHERE name = 'name3' AND n > 1"))
+    assert not query_svc.is_point_lookup(parser.parse("SELECT * FROM t WHERE n = 3"))
+    assert not query_svc.is_point_lookup(parser.parse("SELECT * FROM t WHERE id = 3 OR id = 4"))
+    assert not query_svc.is_point_lookup(parser.parse("SELECT COUNT(*) FROM t WHERE id = 3"))
+    assert not query_svc.is_point_lookup(parser.parse("DELETE FROM t WHERE id = 3"))
+
+
+def test_timeout_cancels_query_and_frees_its_worker():
+    async def test(server, port):
+        # A writer holding the table keeps the scan waiting past its timeout
+        with server.query_service.locks.locked(writes=['t']):
+            status, body = await request(port, 'POST', '/query', {'sql': "SELECT * FROM t", 'timeout': 0.2})
+            assert status == 504 and 'timed out' in body['error']
+            # Point lookups do not block the loop while the table is locked either
+            status, _ = await request(port, 'POST', '/query', {'sql': "SELECT * FROM t WHERE id = 1", 'timeout': 0.2})
+            assert status == 504
+            assert (await request(port, 'GET', '/health'))[1]['running'] == 2
+        for _ in range(100):
+            if server.running == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert server.running == 0
+        status, body = await request(port, 'GET', '/query?sql=SELECT%20*%20FROM%20t%20WHERE%20id%20%3D%201')
+        assert status == 200 and body['result'][0]['id'] == 1
+    serve(test)
+
+
+def test_full_queue_is_refused():
+    async def test(server, port):
+        with server.query_service.locks.locked(writes=['t']):
+            first = asyncio.ensure_future(request(port, 'POST', '/query', {'sql': "SELECT * FROM t", 'timeout': 1}))
+            second = asyncio.ensure_future(request(port, 'POST', '/query', {'sql': "SELECT * FROM t", 'timeout': 1}))
+            while server.queued < 1:
+                await asyncio.sleep(0.01)
+            status, body = await request(port, 'POST', '/query', {'sql': "SELECT * FROM t"})
+            assert status == 503 and body['error'] == "Server busy, try again later"
+        assert (await first)[0] == 200 and (await second)[0] == 200
+    serve(test, workers=1, max_queue=1)
+
+
+def test_cancel_endpoint():
+    async def test(server, port):
+        with server.query_service.locks.locked(writes=['t']):
+            running = asyncio.ensure_future(request(port, 'POST', '/query', {'sql': "SELECT * FROM t", 'id': 'q1'}))
+            while server.running < 1:
+                await asyncio.sleep(0.01)
+            assert await request(port, 'POST', '/cancel', {'id': 'q1'}) == (200, {'cancelled': True})
+            assert await request(port, 'POST', '/cancel', {'id': 'q2'}) == (200, {'cancelled': False})
+        assert await running == (400, {'error': "Query cancelled"})
+    serve(test)
+
+
+def test_cancelled_session_stops_select():
+    query_svc, parser = make_service(), SqlParser()
+    session = Session(threading.Event())
+    rows = query_svc.stream(parser.parse("SELECT * FROM t WHERE n = 3"), session)
+    session.cancel_event.set()
+    with pytest.raises(QueryCancelled):
+        list(rows)
+    # The cancelled statement gave back its locks
+    query_svc.execute(parser.parse("DELETE FROM t WHERE id = 1"))
+    session.cancel_event.clear()
+    assert len(query_svc.execute(parser.parse("SELECT * FROM t"), session)) == 4999
@@ -0,0 +1,72 @@
+import pytest
+from domain.entities.column import Column
+from domain.entities.table import Table
+from domain.value_objects.data_type import DataType
+from domain.value_objects.storage_engine import StorageEngine
+from infrastructure.storage.store_factory import create_store
+from application.execution import batch
+from application.execution.predicates import normalize, compile_predicate
+from infrastructure.parsers.sql_parser import SqlParser
+
+
+def make_table(engine):
+    columns = [
+        Column('id', DataType.INTEGER, primary_key=True),
+        Column('city', DataType.VARCHAR),
+        Column('amount', DataType.FLOAT),
+        Column('paid', DataType.BOOLEAN),
+    ]
+    table = Table('sales', columns, create_store(engine, columns))
+    cities = ['Nairobi', 'Mombasa', None]
+    for i in range(50):
+        table.insert_row({'id': i, 'city': cities[i % 3], 'amount': float(i % 4), 'paid': i % 2 == 0})
+    for i in range(0, 50, 7):
+        table.delete_row(i)
+    return table
+
+
+WHERES = [None, {'city': 'Nairobi'}, {'city': None}, {'city': 'Kisumu'}, {'amount': 2},
+          {'paid': True, 'city': 'Mombasa'}, {'amount': 'x'}, {'missing': 1}]
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+@pytest.mark.parametrize("engine", [StorageEngine.ROW, StorageEngine.COLUMNAR])
+@pytest.mark.parametrize("where", WHERES)
+def test_batch_select_matches_row_at_a_time(monkeypatch, use_numpy, engine, where):
+    if not use_numpy:
+        monkeypatch.setattr(batch, 'np', None)
+    elif batch.np is None:
+        pytest.skip("numpy not installed")
+    table = make_table(engine)
+    expected = [r for r in table.rows if all(r.get(k) == v for k, v in (where or {}).items())]
+    assert batch.select(table, where, ['*'], batch_size=16) == expected
+    projected = [{'id': r['id'], 'paid': r['paid']} for r in expected]
+    assert batch.select(table, where, ['id', 'paid', 'nope'], batch_size=16) == projected
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+@pytest.mark.parametrize("engine", [StorageEngine.ROW, StorageEngine.COLUMNAR])
+@pytest.mark.parametrize("sql", [
+    "amount > 1 AND city LIKE 'N%'", "city >= 'N' OR paid = FALSE", "NOT (amount BETWEEN 1 AND 2)",
+    "city NOT IN ('Mombasa', 'Kisumu')", "amount IN (0, 3.0) AND city IS NOT NULL", "city IS NULL OR amount < 1",
+    "amount != 'x'", "missing IS NULL AND id > 40",
+])
+def test_batch_expressions_match_compiled_predicates(monkeypatch, use_numpy, engine, sql):
+    if not use_numpy:
+        monkeypatch.setattr(batch, 'np', None)
+    elif batch.np is None:
+        pytest.skip("numpy not installed")
+    table = make_table(engine)
+    where = normalize(SqlParser().parse(f"SELECT * FROM sales WHERE {sql}").where)
+    predicate = compile_predicate(where)
+    expected = [r for r in table.rows if predicate(r)]
+    assert expected
+    assert batch.select(table, where, ['*'], batch_size=16) == expected
+
+
+def test_auto_mode_prefers_indexes_and_columnar():
+    columnar = make_table(StorageEngine.COLUMNAR)
+    assert not batch.should_use_batch(columnar, {'id': 3})
+    assert batch.should_use_batch(columnar, {'city': 'Nairobi'}) == (batch.np is not None)
+    assert not batch.should_use_batch(make_table(StorageEngine.ROW), None)
+    assert batch.should_use_batch(make_table(StorageEngine.ROW), None, batch.BATCH_MODE)
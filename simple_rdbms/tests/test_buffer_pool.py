@@ -0,0 +1,82 @@
+from infrastructure.storage.buffer_pool import BufferPool
+from infrastructure.repositories.table_repository import TableRepository
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.storage.disk_storage import DiskStorage
+
+
+def page(n):
+    return lambda: bytes([n]) * 16
+
+
+def touch(pool, key, sequential=False):
+    frame = pool.fetch(key, page(key), sequential)
+    pool.unpin(frame)
+    return frame
+
+
+def test_clock_evicts_unreferenced_pages_first():
+    pool = BufferPool(16 * 8, 16)
+    for key in range(8):
+        touch(pool, key)
+    # Every reference bit is set, so the first sweep clears them and page 0 goes.
+    touch(pool, 8)
+    assert 0 not in pool.frames and pool.evictions == 1
+    # Page 1 is referenced again before the next miss, so the hand passes over it.
+    touch(pool, 1)
+    touch(pool, 9)
+    assert 1 in pool.frames and 2 not in pool.frames
+    assert pool.stats()['hits'] == 1 and pool.stats()['misses'] == 10
+
+
+def test_pinned_and_dirty_frames_are_not_evicted():
+    pool = BufferPool(16 * 8, 16)
+    pinned = pool.fetch(0, page(0))
+    dirty = pool.fetch(1, page(1))
+    pool.mark_dirty(dirty)
+    pool.unpin(dirty)
+    for key in range(2, 40):
+        touch(pool, key)
+    assert bytes(pinned.buf) == bytes([0]) * 16 and 0 in pool.frames and 1 in pool.frames
+    pool.unpin(pinned)
+    pool.mark_clean(dirty)
+    for key in range(40, 60):
+        touch(pool, key)
+    assert 0 not in pool.frames and 1 not in pool.frames
+    assert len(pool.frames) == pool.capacity
+
+
+def test_sequential_reads_leave_hot_pages_resident():
+    pool = BufferPool(16 * 8, 16)
+    for key in range(8):
+        touch(pool, key)
+    for key in range(100, 200):
+        frame = touch(pool, key, sequential=True)
+        assert bytes(frame.buf) == bytes([key]) * 16
+    assert sorted(pool.frames) == list(range(8)) and pool.evictions == 0
+
+
+def test_tables_larger_than_the_pool(tmp_path):
+    storage = DiskStorage(str(tmp_path), fsync_policy='off', page_size=1024, buffer_pool_bytes=16 * 1024)
+    query_svc = QueryService(CrudService(TableRepository(storage)))
+    parser = SqlParser()
+
+    def run(sql):
+        return query_svc.execute(parser.parse(sql))
+
+    run("CREATE TABLE t (id INTEGER PRIMARY KEY, v VARCHAR)")
+    for start in range(0, 5000, 500):
+        run("INSERT INTO t VALUES " + ", ".join(f"({i}, 'value {i}')" for i in range(start, start + 500)))
+    assert storage.get_table('t').store.page_count > 4 * storage.buffer_pool.capacity
+    for i in range(0, 5000, 7):
+        assert run(f"SELECT v FROM t WHERE id = {i}") == [{'v': f'value {i}'}]
+    run("UPDATE t SET v = 'changed' WHERE id = 4999")
+    assert len(run("SELECT * FROM t")) == 5000
+    stats = storage.stats()
+    assert stats['evictions'] > 0 and stats['resident'] <= stats['capacity']
+    storage.close()
+
+    storage = DiskStorage(str(tmp_path), buffer_pool_bytes=16 * 1024)
+    assert storage.get_table('t').get_row_by_pk(4999) == {'id': 4999, 'v': 'changed'}
+    storage.close()
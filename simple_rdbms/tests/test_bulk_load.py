@@ -0,0 +1,73 @@
+import json
+import pytest
+from infrastructure.parsers.sql_ast import Copy
+from infrastructure.parsers.sql_parser import SqlParser
+
+SETUP = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR UNIQUE, age INTEGER, active BOOLEAN) ENGINE {engine}",
+    "CREATE INDEX idx_age ON users (age) USING BTREE",
+]
+
+
+@pytest.mark.parametrize('engine', ['ROW', 'COLUMNAR'])
+def test_multi_row_insert_builds_indexes(engine, make_db):
+    run = make_db(*SETUP, engine=engine).run
+    run("INSERT INTO users VALUES (1, 'Alice', 30, TRUE)")
+    run("INSERT INTO users VALUES (2, 'Bob', 25, FALSE), (3, 'Carol', 30, TRUE), (4, 'Dan', NULL, NULL)")
+    assert sorted(r['name'] for r in run("SELECT name FROM users WHERE age = 30")) == ['Alice', 'Carol']
+    assert run("SELECT name FROM users WHERE id = 4") == [{'name': 'Dan'}]
+    assert run("SELECT id FROM users WHERE name = 'Bob'") == [{'id': 2}]
+
+
+def test_failed_bulk_insert_leaves_table_unchanged(make_db):
+    db = make_db(*SETUP)
+    query_svc, run = db.query_svc, db.run
+    run("INSERT INTO users VALUES (1, 'Alice', 30, TRUE)")
+    with pytest.raises(ValueError, match="Primary key"):
+        run("INSERT INTO users VALUES (2, 'Bob', 25, FALSE), (1, 'Eve', 20, TRUE)")
+    with pytest.raises(ValueError, match="Unique"):
+        run("INSERT INTO users VALUES (2, 'Bob', 25, FALSE), (3, 'Bob', 20, TRUE)")
+    with pytest.raises(ValueError, match="integer"):
+        run("INSERT INTO users VALUES (2, 'Bob', 25, FALSE), (3, 'Carol', 'x', TRUE)")
+    assert len(run("SELECT * FROM users")) == 1
+    assert list(query_svc.crud.table_repo.find_by_name('users').indexes['idx_age'].lookup(25)) == []
+
+
+def test_copy_from_csv_and_jsonl(tmp_path, make_db):
+    run = make_db(*SETUP).run
+    csv_path = tmp_path / 'users.csv'
+    csv_path.write_text("id,name,age,active\n1,Alice,30,true\n2,\"Smith, Bob\",,false\n")
+    assert run(f"COPY users FROM '{csv_path}'") == 2
+    assert run("SELECT name, age FROM users WHERE id = 2") == [{'name': 'Smith, Bob', 'age': None}]
+
+    jsonl_path = tmp_path / 'users.jsonl'
+    jsonl_path.write_text(json.dumps({'id': 3, 'name': 'Carol', 'age': 30}) + "\n\n" +
+                          json.dumps([4, 'Dan', 41, True]) + "\n")
+    assert run(f"COPY users FROM '{jsonl_path}'") == 2
+    assert sorted(r['id'] for r in run("SELECT id FROM users WHERE age = 30")) == [1, 3]
+
+
+def test_copy_options_and_errors(tmp_path, make_db):
+    parser = SqlParser()
+    assert parser.parse("COPY users (id, name) FROM 'data.txt' WITH (FORMAT jsonl, HEADER false)") == \
+        Copy('users', ['id', 'name'], 'data.txt', 'JSONL', False)
+    assert parser.parse("COPY users FROM 'rows.ndjson'").format == 'JSONL'
+
+    run = make_db(*SETUP).run
+    path = tmp_path / 'bad.csv'
+    path.write_text("1,Alice,30,true\n2,Bob,old,false\n")
+    with pytest.raises(ValueError, match="Line 2"):
+        run(f"COPY users FROM '{path}' WITH (HEADER false)")
+    assert run("SELECT * FROM users") == []
+
+    locked = make_db(allow_copy=False).query_svc
+    with pytest.raises(ValueError, match="disabled"):
+        locked.execute(parser.parse(f"COPY users FROM '{path}'"))
+
+
+def test_prepared_multi_row_insert(make_db):
+    db = make_db(*SETUP)
+    query_svc, run = db.query_svc, db.run
+    run("PREPARE pair AS INSERT INTO users (id, name) VALUES (?, ?), (?, 'fixed')")
+    run("EXECUTE pair (1, 'Alice', 2)")
+    assert sorted(r['name'] for r in run("SELECT name FROM users")) == ['Alice', 'fixed']
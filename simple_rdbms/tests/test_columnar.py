@@ -0,0 +1,94 @@
+import pytest
+from domain.entities.column import Column
+from domain.entities.table import Table
+from domain.value_objects.data_type import DataType
+from domain.value_objects.index_type import IndexType
+from infrastructure.storage.columnar_store import ColumnarStore
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+from infrastructure.repositories.table_repository import TableRepository
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.parsers.sql_parser import SqlParser
+
+
+def make_table():
+    columns = [
+        Column('id', DataType.INTEGER, primary_key=True),
+        Column('name', DataType.VARCHAR, unique=True),
+        Column('score', DataType.FLOAT),
+        Column('active', DataType.BOOLEAN),
+    ]
+    return Table('people', columns, ColumnarStore(columns))
+
+
+def test_round_trips_typed_values_and_nulls():
+    table = make_table()
+    table.insert_row({'id': 1, 'name': 'Ann', 'score': 1.5, 'active': True})
+    table.insert_row({'id': 2, 'name': None, 'score': None, 'active': False})
+    assert table.get_row_by_pk(1) == {'id': 1, 'name': 'Ann', 'score': 1.5, 'active': True}
+    assert table.get_row_by_pk(2) == {'id': 2, 'name': None, 'score': None, 'active': False}
+
+    table.update_row(2, {'name': 'Ben', 'active': None})
+    assert table.get_row_by_pk(2) == {'id': 2, 'name': 'Ben', 'score': None, 'active': None}
+    assert table.select_rows({'name': 'Ben'})[0]['id'] == 2
+
+
+def test_delete_reuse_and_compaction():
+    table = make_table()
+    table.store.min_compaction_slots = 4
+    table.create_index('idx_score', 'score', IndexType.BTREE)
+    for i in range(10):
+        table.insert_row({'id': i, 'name': f'p{i}', 'score': float(i % 3), 'active': i % 2 == 0})
+    for i in range(6):
+        table.delete_row(i)
+    assert table.store.slot_count == 4 and len(table.store) == 4
+    assert [r['id'] for r in table.rows] == [6, 7, 8, 9]
+    assert sorted(r['id'] for r in table.select_rows({'score': 0.0})) == [6, 9]
+    assert table.store.column_values('active') == [True, False, True, False]
+    # Compaction also drops dictionary entries of deleted strings.
+    assert table.store.vectors['name'].dictionary == ['p6', 'p7', 'p8', 'p9']
+
+    table.delete_row(7)
+    table.insert_row({'id': 10, 'name': 'p10', 'score': 2.5, 'active': None})
+    assert table.store.slot_count == 4
+    assert table.get_row_by_pk(10) == {'id': 10, 'name': 'p10', 'score': 2.5, 'active': None}
+
+
+def test_out_of_range_integer_leaves_no_partial_row():
+    table = make_table()
+    with pytest.raises(ValueError):
+        table.insert_row({'id': 2 ** 70, 'name': 'x', 'score': 0.0, 'active': True})
+    assert len(table.store) == 0 and table.store.slot_count == 0
+
+
+def test_failed_update_leaves_indexes_unchanged():
+    table = make_table()
+    table.create_index('idx_score', 'score', IndexType.HASH)
+    table.insert_row({'id': 1, 'name': 'Ann', 'score': 1.5, 'active': True})
+    version = table.version
+    with pytest.raises(ValueError, match="out of range"):
+        table.update_row(1, {'id': 2 ** 70, 'name': 'Bo', 'score': 2.5})
+    assert table.get_row_by_pk(1) == {'id': 1, 'name': 'Ann', 'score': 1.5, 'active': True}
+    assert table.version == version and 2 ** 70 not in table.primary_key_index
+    assert table.unique_indexes['name'] == {'Ann': 0}
+    assert [r['id'] for r in table.select_rows({'score': 1.5})] == [1] and not table.select_rows({'score': 2.5})
+    with pytest.raises(ValueError, match="Primary key violation"):
+        table.insert_row({'id': 1, 'name': 'Cy', 'score': 0.0, 'active': False})
+
+
+def test_engine_is_chosen_at_create_table():
+    crud = CrudService(TableRepository(InMemoryStorage()))
+    query_svc = QueryService(crud)
+    parser = SqlParser()
+    for sql in ("CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR UNIQUE, age INTEGER) ENGINE = COLUMNAR",
+                "CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER, product VARCHAR)",
+                "INSERT INTO users VALUES (1, 'Alice', 30)",
+                "INSERT INTO orders VALUES (1, 1, 'Book')",
+                "UPDATE users SET age = 31 WHERE id = 1"):
+        query_svc.execute(parser.parse(sql))
+    assert isinstance(crud.table_repo.find_by_name('users').store, ColumnarStore)
+    assert not isinstance(crud.table_repo.find_by_name('orders').store, ColumnarStore)
+    rows = query_svc.execute(parser.parse("SELECT name, age, product FROM users JOIN orders ON users.id = orders.user_id"))
+    assert rows == [{'name': 'Alice', 'age': 31, 'product': 'Book'}]
+    with pytest.raises(ValueError):
+        parser.parse("CREATE TABLE t (id INTEGER) ENGINE = NOPE")
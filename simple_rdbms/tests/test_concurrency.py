@@ -0,0 +1,120 @@
+import sys
+import threading
+import time
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.concurrency.rw_lock import RWLock
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.disk_storage import DiskStorage
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+
+
+def make_runner(storage):
+    query_svc = QueryService(CrudService(TableRepository(storage)))
+    parser = SqlParser()
+    return lambda sql: query_svc.execute(parser.parse(sql))
+
+
+def run_threads(target, count):
+    errors = []
+
+    def guarded(n):
+        try:
+            target(n)
+        except Exception as e:  # collected so the test fails in the main thread
+            errors.append(e)
+
+    threads = [threading.Thread(target=guarded, args=(n,)) for n in range(count)]
+    # Switch threads far more often than usual so races have a chance to show
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+
+
+def test_waiting_writer_blocks_new_readers():
+    lock = RWLock()
+    events = []
+    lock.acquire_read()
+    writer = threading.Thread(target=lambda: (lock.acquire_write(), events.append('write'), lock.release_write()))
+    writer.start()
+    while not lock._waiting_writers:
+        time.sleep(0.001)
+    reader = threading.Thread(target=lambda: (lock.acquire_read(), events.append('read'), lock.release_read()))
+    reader.start()
+    time.sleep(0.02)
+    assert events == []
+    lock.release_read()
+    writer.join()
+    reader.join()
+    assert events == ['write', 'read']
+
+
+def test_readers_never_see_torn_rows_or_shifted_indexes():
+    run = make_runner(InMemoryStorage())
+    run("CREATE TABLE accounts (id INTEGER PRIMARY KEY, a INTEGER, b INTEGER)")
+    run("CREATE INDEX idx_a ON accounts (a)")
+    run("INSERT INTO accounts VALUES " + ", ".join(f"({i}, {i}, {-i})" for i in range(200)))
+
+    def writer(n):
+        for step in range(300):
+            key = (n * 300 + step) % 200
+            run(f"UPDATE accounts SET a = {step}, b = {-step} WHERE id = {key}")
+            # Insert a scratch row and delete it again on the next step
+            scratch = 1000 * (n + 1) + step // 2
+            if step % 2:
+                run(f"DELETE FROM accounts WHERE id = {scratch}")
+            else:
+                run(f"INSERT INTO accounts VALUES ({scratch}, 0, 0)")
+
+    def reader(n):
+        for _ in range(100):
+            for row in run("SELECT * FROM accounts"):
+                # Every update sets a and b together
+                assert row['a'] == -row['b']
+            for row in run("SELECT * FROM accounts WHERE a = 5"):
+                assert row['a'] == 5
+
+    run_threads(lambda n: writer(n) if n < 4 else reader(n), 8)
+    assert len(run("SELECT * FROM accounts")) == 200
+
+
+def test_concurrent_inserts_of_one_key_succeed_once():
+    run = make_runner(InMemoryStorage())
+    run("CREATE TABLE t (id INTEGER PRIMARY KEY, v INTEGER)")
+    inserted = []
+
+    def insert_all(n):
+        for i in range(200):
+            try:
+                run(f"INSERT INTO t VALUES ({i}, {n})")
+                inserted.append(i)
+            except ValueError:
+                pass
+
+    run_threads(insert_all, 8)
+    assert sorted(inserted) == list(range(200))
+    assert len(run("SELECT * FROM t")) == 200
+
+
+def test_disk_writers_on_different_tables_commit_separately(tmp_path):
+    storage = DiskStorage(str(tmp_path), fsync_policy='off', checkpoint_bytes=16 * 1024)
+    run = make_runner(storage)
+    for n in range(4):
+        run(f"CREATE TABLE t{n} (id INTEGER PRIMARY KEY, v VARCHAR)")
+    # Small checkpoints force them to run while other tables are being written
+    run_threads(lambda n: [run(f"INSERT INTO t{n} VALUES ({i}, '{'x' * 50}')") for i in range(300)], 4)
+    storage.wal.sync()
+    storage.close()
+
+    storage = DiskStorage(str(tmp_path))
+    run = make_runner(storage)
+    assert [len(run(f"SELECT * FROM t{n}")) for n in range(4)] == [300] * 4
+    storage.close()
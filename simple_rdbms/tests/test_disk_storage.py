@@ -0,0 +1,170 @@
+import os
+import pytest
+from domain.entities.column import Column
+from domain.entities.table import Table
+from domain.value_objects.data_type import DataType
+from infrastructure.repositories.table_repository import TableRepository
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.storage.columnar_store import ColumnarStore
+from infrastructure.storage.disk_storage import DiskStorage
+from infrastructure.storage.row_codec import RowCodec
+from infrastructure.storage.slotted_page import SlottedPage
+
+
+def open_db(path, **options):
+    storage = DiskStorage(str(path), **options)
+    query_svc = QueryService(CrudService(TableRepository(storage)))
+    parser = SqlParser()
+
+    def run(sql):
+        return query_svc.execute(parser.parse(sql))
+
+    return storage, run
+
+
+def crash(storage):
+    # Simulate a crash: release the files without the checkpoint close() would run.
+    storage.wal.sync()
+    for table in storage.tables.values():
+        table.store.page_file.close()
+    os.close(storage.wal.fd)
+    storage.wal.fd = None
+
+
+def test_row_codec_round_trip():
+    codec = RowCodec([Column('id', DataType.INTEGER), Column('name', DataType.VARCHAR),
+                      Column('score', DataType.FLOAT), Column('ok', DataType.BOOLEAN)])
+    for row in ({'id': 1, 'name': 'Zoë', 'score': 2.5, 'ok': True},
+                {'id': None, 'name': None, 'score': None, 'ok': False}):
+        assert codec.decode(codec.encode(row)) == row
+    with pytest.raises(ValueError):
+        codec.encode({'id': 2 ** 63})
+
+
+def test_slotted_page_reuses_space():
+    page = SlottedPage(SlottedPage.empty(512))
+    slots = [page.insert(bytes([i]) * 40, 64) for i in range(10)]
+    assert None not in slots and page.insert(b'x' * 100, 64) is None
+    page.delete(slots[3])
+    page.delete(slots[4])
+    # Two freed records make room once the page is defragmented; other slots keep their data.
+    assert page.insert(b'y' * 70, 64) == slots[3]
+    assert bytes(page.record(slots[5])) == bytes([5]) * 40
+    assert page.put(slots[0], b'z' * 10) and bytes(page.record(slots[0])) == b'z' * 10
+
+
+def test_rows_and_indexes_survive_restart(tmp_path):
+    storage, run = open_db(tmp_path)
+    run("CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR UNIQUE, age INTEGER)")
+    run("CREATE INDEX idx_age ON users (age) USING BTREE")
+    run("INSERT INTO users VALUES (1, 'Alice', 30), (2, 'Bob', 25), (3, 'Carol', 30)")
+    run("UPDATE users SET age = 26 WHERE id = 2")
+    run("DELETE FROM users WHERE id = 3")
+    storage.close()
+
+    storage, run = open_db(tmp_path)
+    assert run("SELECT name FROM users WHERE age = 30") == [{'name': 'Alice'}]
+    assert run("SELECT age FROM users WHERE name = 'Bob'") == [{'age': 26}]
+    assert 'idx_age' in storage.get_table('users').indexes
+    with pytest.raises(ValueError):
+        run("INSERT INTO users VALUES (4, 'Alice', 1)")
+    storage.close()
+
+
+def test_recovery_replays_committed_wal_and_drops_torn_tail(tmp_path):
+    storage, run = open_db(tmp_path)
+    run("CREATE TABLE t (id INTEGER PRIMARY KEY, v VARCHAR)")
+    run("INSERT INTO t VALUES (1, 'a'), (2, 'b')")
+    run("DELETE FROM t WHERE id = 1")
+    crash(storage)
+    # Half a record at the end of the log, as left by a crash mid-write
+    with open(tmp_path / 'wal.log', 'ab') as f:
+        f.write(b'\x05\x00\x00\x00garbage')
+
+    storage, run = open_db(tmp_path)
+    assert run("SELECT * FROM t") == [{'id': 2, 'v': 'b'}]
+    # Recovery checkpoints, leaving an empty log
+    assert os.path.getsize(tmp_path / 'wal.log') == 16
+    run("INSERT INTO t VALUES (3, 'c')")
+    storage.close()
+    storage, run = open_db(tmp_path)
+    assert len(run("SELECT * FROM t")) == 2
+    storage.close()
+
+
+def test_checkpoint_truncates_wal_and_page_images_repair_torn_pages(tmp_path):
+    storage, run = open_db(tmp_path, page_size=1024, checkpoint_bytes=4096, fsync_policy='off')
+    run("CREATE TABLE t (id INTEGER PRIMARY KEY, v VARCHAR)")
+    for i in range(200):
+        run(f"INSERT INTO t VALUES ({i}, '{'x' * (i % 30)}')")
+    assert storage.wal.size < 4096 + 1024
+    table_file = tmp_path / 'table_1.db'
+    assert os.path.getsize(table_file) > 1024
+
+    # Log page images for dirty pages, then "crash" halfway through writing them.
+    run("UPDATE t SET v = 'changed' WHERE id = 0")
+    store = storage.get_table('t').store
+    txn = storage.wal.begin()
+    for page_no, page in store.dirty_pages():
+        storage.wal.append(txn, 4, store.table_id, page_no, bytes(page))
+    storage.wal.commit(txn)
+    crash(storage)
+    with open(table_file, 'r+b') as f:
+        f.write(b'\xff' * 100)
+
+    storage, run = open_db(tmp_path)
+    assert run("SELECT v FROM t WHERE id = 0") == [{'v': 'changed'}]
+    assert len(run("SELECT * FROM t")) == 200
+    storage.close()
+
+
+def test_updates_that_outgrow_a_page_move_the_row(tmp_path):
+    storage, run = open_db(tmp_path, page_size=512)
+    run("CREATE TABLE t (id INTEGER PRIMARY KEY, v VARCHAR)")
+    run("CREATE INDEX idx_v ON t (v)")
+    run("INSERT INTO t VALUES " + ", ".join(f"({i}, 'short')" for i in range(20)))
+    run(f"UPDATE t SET v = '{'y' * 300}' WHERE id = 0")
+    assert run("SELECT id FROM t WHERE v = '" + 'y' * 300 + "'") == [{'id': 0}]
+    storage.close()
+    storage, run = open_db(tmp_path)
+    assert len(run("SELECT * FROM t WHERE v = 'short'")) == 19
+    storage.close()
+
+
+def test_update_too_big_for_a_page_leaves_indexes_unchanged(tmp_path):
+    storage, run = open_db(tmp_path, page_size=512)
+    run("CREATE TABLE t (id INTEGER PRIMARY KEY, email VARCHAR UNIQUE, v VARCHAR)")
+    run("CREATE INDEX idx_v ON t (v)")
+    run("INSERT INTO t VALUES (1, 'a@x', 'short'), (2, 'b@x', 'short')")
+    with pytest.raises(ValueError, match="does not fit"):
+        run(f"UPDATE t SET id = 5, email = 'c@x', v = '{'y' * 600}' WHERE id = 1")
+    assert run("SELECT * FROM t WHERE id = 1") == [{'id': 1, 'email': 'a@x', 'v': 'short'}]
+    assert run("SELECT id FROM t WHERE v = 'short' ORDER BY id") == [{'id': 1}, {'id': 2}]
+    assert run("SELECT * FROM t WHERE id = 5") == []
+    with pytest.raises(ValueError, match="Primary key violation"):
+        run("INSERT INTO t VALUES (1, 'd@x', 'z')")
+    with pytest.raises(ValueError, match="Unique constraint violation"):
+        run("INSERT INTO t VALUES (3, 'a@x', 'z')")
+    storage.close()
+
+
+def test_drop_table_and_engine_check(tmp_path):
+    storage, run = open_db(tmp_path)
+    run("CREATE TABLE a (id INTEGER PRIMARY KEY)")
+    run("INSERT INTO a VALUES (1)")
+    storage.drop_table('a')
+    run("CREATE TABLE a (id INTEGER PRIMARY KEY)")
+    with pytest.raises(ValueError, match="ROW"):
+        storage.create_table(_columnar_table())
+    crash(storage)
+    storage, run = open_db(tmp_path)
+    # Records logged for the dropped table are not replayed into the new one
+    assert run("SELECT * FROM a") == []
+    storage.close()
+
+
+def _columnar_table():
+    columns = [Column('id', DataType.INTEGER, primary_key=True)]
+    return Table('c', columns, ColumnarStore(columns))
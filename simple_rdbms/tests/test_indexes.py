@@ -0,0 +1,70 @@
+import pytest
+
+SETUP = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR UNIQUE, age INTEGER)",
+    "INSERT INTO users VALUES (1, 'Alice', 30), (2, 'Bob', 25), (3, 'Carol', 30), (4, 'Dave', 41)",
+]
+
+
+@pytest.mark.parametrize("kind", ["HASH", "BTREE"])
+def test_index_lookup_tracks_writes(kind, make_db):
+    db = make_db(*SETUP)
+    crud, run = db.crud, db.run
+    run(f"CREATE INDEX idx_age ON users (age) USING {kind}")
+    users = crud.table_repo.find_by_name('users')
+    assert sorted(users.indexes['idx_age'].lookup(30)) == [0, 2]
+
+    assert [r['name'] for r in run("SELECT * FROM users WHERE age = 30")] == ['Alice', 'Carol']
+    run("UPDATE users SET age = 26 WHERE id = 3")
+    assert [r['name'] for r in run("SELECT * FROM users WHERE age = 30")] == ['Alice']
+    run("DELETE FROM users WHERE id = 1")
+    assert run("SELECT * FROM users WHERE age = 30") == []
+    assert [r['name'] for r in run("SELECT * FROM users WHERE age = 41")] == ['Dave']
+    assert [r['name'] for r in run("SELECT * FROM users WHERE id = 4")] == ['Dave']
+    run("INSERT INTO users VALUES (5, 'Eve', 41)")
+    # Eve reuses the slot freed by the delete.
+    assert sorted(r['name'] for r in run("SELECT * FROM users WHERE age = 41")) == ['Dave', 'Eve']
+
+
+def test_btree_range(make_db):
+    db = make_db(*SETUP)
+    crud, run = db.crud, db.run
+    run("CREATE INDEX idx_age ON users (age) USING BTREE")
+    index = crud.table_repo.find_by_name('users').indexes['idx_age']
+    assert sorted(index.range(25, 30)) == [0, 1, 2]
+    assert sorted(index.range(25, 30, low_inclusive=False)) == [0, 2]
+    assert list(index.range(low=31)) == [3]
+
+
+def test_drop_index_and_errors(make_db):
+    db = make_db(*SETUP)
+    crud, run = db.crud, db.run
+    run("CREATE INDEX idx_age ON users (age)")
+    with pytest.raises(ValueError):
+        run("CREATE INDEX idx_age ON users (age)")
+    with pytest.raises(ValueError):
+        run("CREATE INDEX idx_x ON users (missing)")
+    run("DROP INDEX idx_age")
+    assert crud.table_repo.find_by_name('users').indexes == {}
+    with pytest.raises(ValueError):
+        run("DROP INDEX idx_age ON users")
+
+
+def test_unique_lookup_and_update_violation(make_db):
+    run = make_db(*SETUP).run
+    assert [r['id'] for r in run("SELECT * FROM users WHERE name = 'Carol'")] == [3]
+    with pytest.raises(ValueError):
+        run("UPDATE users SET name = 'Alice' WHERE id = 2")
+    run("UPDATE users SET name = 'Bobby' WHERE id = 2")
+    assert [r['id'] for r in run("SELECT * FROM users WHERE name = 'Bobby'")] == [2]
+    assert run("SELECT * FROM users WHERE name = 'Bob'") == []
+
+
+def test_primary_key_update_moves_the_key_and_rejects_duplicates(make_db):
+    run = make_db(*SETUP).run
+    with pytest.raises(ValueError, match="Primary key violation"):
+        run("UPDATE users SET id = 3 WHERE id = 1")
+    run("UPDATE users SET id = 10 WHERE id = 1")
+    assert run("SELECT * FROM users WHERE id = 1") == []
+    assert [r['name'] for r in run("SELECT * FROM users WHERE id = 10")] == ['Alice']
+    assert [r['name'] for r in run("SELECT * FROM users WHERE id = 3")] == ['Carol']
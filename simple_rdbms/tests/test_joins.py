@@ -0,0 +1,58 @@
+from application.execution.joins import (
+    join_tables, choose_join_strategy, split_where,
+    HASH_JOIN, SORT_MERGE_JOIN, INDEX_NESTED_LOOP_JOIN,
+)
+
+SETUP = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR UNIQUE, age INTEGER)",
+    "CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER, product VARCHAR)",
+    "INSERT INTO users VALUES (1, 'Alice', 30)",
+    "INSERT INTO users VALUES (2, 'Bob', 25)",
+    "INSERT INTO orders VALUES (1, 1, 'Book')",
+    "INSERT INTO orders VALUES (2, 1, 'Pen')",
+    "INSERT INTO orders VALUES (3, 2, 'Lamp')",
+]
+
+
+def test_all_strategies_agree(make_db):
+    crud = make_db(*SETUP).crud
+    users = crud.table_repo.find_by_name('users')
+    orders = crud.table_repo.find_by_name('orders')
+
+    def key(r):
+        return (r['id'], r['orders_id'])
+
+    expected = sorted(join_tables(users, orders, 'id', 'user_id', strategy=HASH_JOIN), key=key)
+    assert len(expected) == 3
+    for strategy in (SORT_MERGE_JOIN, INDEX_NESTED_LOOP_JOIN):
+        assert sorted(join_tables(users, orders, 'id', 'user_id', strategy=strategy), key=key) == expected
+
+
+def test_strategy_choice(make_db):
+    crud = make_db(*SETUP).crud
+    users = crud.table_repo.find_by_name('users')
+    orders = crud.table_repo.find_by_name('orders')
+    strategy, side = choose_join_strategy(users, orders, users.rows, orders.rows, 'id', 'user_id')
+    assert (strategy, side) == (INDEX_NESTED_LOOP_JOIN, 'left')
+    strategy, _ = choose_join_strategy(users, orders, users.rows, orders.rows, 'age', 'user_id')
+    assert strategy == HASH_JOIN
+
+
+def test_where_is_pushed_below_join(make_db):
+    db = make_db(*SETUP)
+    crud, run = db.crud, db.run
+    users = crud.table_repo.find_by_name('users')
+    orders = crud.table_repo.find_by_name('orders')
+    left, right, residual = split_where({'name': 'Alice', 'product': 'Pen', 'orders_id': 2}, users, orders)
+    assert left == {'name': 'Alice'}
+    assert right == {'product': 'Pen', 'id': 2}
+    assert residual is None
+
+    rows = run("SELECT * FROM users JOIN orders ON users.id = orders.user_id WHERE product = 'Lamp'")
+    assert [(r['name'], r['product']) for r in rows] == [('Bob', 'Lamp')]
+
+
+def test_join_on_reversed_condition(make_db):
+    run = make_db(*SETUP).run
+    rows = run("SELECT name, product FROM users JOIN orders ON orders.user_id = users.id WHERE name = 'Alice'")
+    assert sorted(r['product'] for r in rows) == ['Book', 'Pen']
@@ -0,0 +1,116 @@
+import logging
+import pytest
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.monitoring.metrics import QueryMetrics
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+
+
+@pytest.fixture
+def db():
+    metrics = QueryMetrics()
+    query_svc = QueryService(CrudService(TableRepository(InMemoryStorage())), metrics=metrics)
+    parser = SqlParser()
+    query_svc.execute(parser.parse("CREATE TABLE t (id INTEGER PRIMARY KEY, n INTEGER)"))
+    query_svc.execute(parser.parse("INSERT INTO t VALUES " + ", ".join(f"({i}, {i % 10})" for i in range(100))))
+    return query_svc, parser, metrics
+
+
+def test_traces_time_stages_and_count_scans(db):
+    query_svc, parser, metrics = db
+    trace = query_svc.trace("SELECT * FROM t WHERE n = 3")
+    with trace.stage('parse'):
+        query = parser.parse(trace.sql)
+    assert len(query_svc.execute(query, trace=trace)) == 10
+    trace.finish()
+    assert set(trace.stages) == {'parse', 'lock', 'plan', 'execute'}
+    assert trace.statement == 'select' and trace.duration >= sum(trace.stages.values())
+    assert (trace.full_scans, trace.index_scans, trace.rows_scanned, trace.rows_returned) == (1, 0, 100, 10)
+
+    query_svc.execute(parser.parse("SELECT * FROM t WHERE id = 7"))
+    assert (metrics.index_scans, metrics.full_scans) == (1, 1)
+    assert metrics.rows_scanned == 101 and metrics.rows_returned == 11
+    with pytest.raises(ValueError):
+        query_svc.execute(parser.parse("SELECT * FROM missing"))
+    assert metrics.queries == {'createtable': 1, 'insert': 1, 'select': 3}
+    assert metrics.errors == {'select': 1}
+
+
+def test_streamed_select_is_recorded_when_closed(db):
+    query_svc, parser, metrics = db
+    with query_svc.stream(parser.parse("SELECT id FROM t WHERE n < 5")) as rows:
+        next(rows)
+        next(rows)
+        assert metrics.queries.get('select') is None
+    assert metrics.queries['select'] == 1 and metrics.rows_returned == 2 and metrics.full_scans == 1
+
+
+def test_slow_queries_are_logged(db, caplog):
+    query_svc, parser, metrics = db
+    metrics.slow_query_seconds = 0.0
+    with caplog.at_level(logging.WARNING, logger='simple_rdbms.slow_query'):
+        trace = query_svc.trace("SELECT COUNT(*) AS c FROM t WHERE n > 4")
+        query_svc.execute(parser.parse(trace.sql), trace=trace)
+        trace.finish()
+    assert metrics.slow_queries == 1
+    message = caplog.records[0].getMessage()
+    assert "SELECT COUNT(*) AS c FROM t WHERE n > 4" in message and "execute" in message
+    assert "100 rows scanned" in message
+
+
+def test_profile_and_prometheus_text(db):
+    query_svc, parser, metrics = db
+    trace = query_svc.trace(profile=True)
+    query_svc.execute(parser.parse("SELECT * FROM t WHERE n = 1"), trace=trace)
+    assert 'function calls' in trace.profile_text and 'execute' in trace.profile_text
+    trace.finish()
+    text = metrics.render()
+    assert '# TYPE rdbms_query_duration_seconds histogram' in text
+    assert 'rdbms_queries_total{statement="select"} 1' in text
+    assert 'rdbms_query_duration_seconds_bucket{le="+Inf"} 3' in text
+    assert 'rdbms_full_scans_total 1' in text
+    assert 'rdbms_stage_seconds_count{stage="plan"} 1' in text
+
+
+def test_metrics_endpoint_and_profile_parameter():
+    from presentation.web.app import app
+    client = app.test_client()
+    client.get('/query', query_string={'sql': "CREATE TABLE metered (id INTEGER PRIMARY KEY)"})
+    body = client.get('/query', query_string={'sql': "SELECT * FROM metered", 'profile': '1'}).get_json()
+    assert body['result'] == [] and 'function calls' in body['profile']
+    assert 'profile' not in client.get('/query', query_string={'sql': "SELECT * FROM metered"}).get_json()
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    assert 'rdbms_stage_seconds_count{stage="serialize"}' in response.get_data(as_text=True)
+
+
+def test_repl_timing_toggle(capsys):
+    from presentation.cli.repl import Repl
+    repl = Repl()
+    repl.onecmd("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+    repl.onecmd("\\timing")
+    repl.onecmd("SELECT * FROM t")
+    repl.onecmd("\\timing off")
+    repl.onecmd("SELECT * FROM t")
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[1] == "Timing is on."
+    assert lines[3].startswith("Time: ") and "parse" in lines[3] and "execute" in lines[3]
+    assert lines[4:] == ["Timing is off.", "[]"]
+
+
+def test_async_server_records_stages(db):
+    import asyncio
+    from presentation.web.async_server import AsyncServer
+    query_svc, _, metrics = db
+    server = AsyncServer(query_svc)
+    try:
+        status, _, _ = asyncio.run(server.respond('GET', '/query?sql=SELECT%20*%20FROM%20t%20WHERE%20id%20%3D%201', b''))
+        assert status == 200
+        status, body, content_type = asyncio.run(server.respond('GET', '/metrics', b''))
+    finally:
+        server.close()
+    assert content_type.startswith('text/plain')
+    assert 'rdbms_index_scans_total 1' in body.decode()
+    assert set(metrics.stage_count) == {'parse', 'lock', 'plan', 'execute', 'serialize'}
@@ -0,0 +1,115 @@
+import pytest
+from application.services.partitioning import HashPartitioning, RangePartitioning
+from infrastructure.parsers.sql_ast import CreateTable
+from infrastructure.parsers.sql_parser import SqlParser
+
+
+@pytest.fixture(scope='module')
+def db(make_db):
+    # Worker processes take a moment to spawn, so the tests share one database
+    db = make_db(
+        "CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR, age INTEGER) PARTITION BY HASH (id) PARTITIONS 3",
+        "CREATE TABLE orders (id INTEGER PRIMARY KEY, amount FLOAT) PARTITION BY HASH (id) PARTITIONS 3",
+        "CREATE TABLE events (id INTEGER PRIMARY KEY, kind VARCHAR) PARTITION BY RANGE (id) BOUNDS (10, 20)",
+        "CREATE TABLE tags (user_id INTEGER, tag VARCHAR)",
+        "INSERT INTO users VALUES " + ", ".join(f"({i}, 'n{i}', {i % 5})" for i in range(30)),
+        "INSERT INTO orders VALUES " + ", ".join(f"({i}, {i * 1.5})" for i in range(0, 30, 2)),
+        "INSERT INTO events VALUES " + ", ".join(f"({i}, 'k{i % 2}')" for i in range(30)),
+        "INSERT INTO tags VALUES (1, 'a'), (2, 'b'), (3, 'c')",
+    )
+    yield db.query_svc, db.parser
+    db.query_svc.close()
+
+
+def run(db, sql):
+    query_svc, parser = db
+    return query_svc.execute(parser.parse(sql))
+
+
+def test_parse_partition_by():
+    parser = SqlParser()
+    create = parser.parse("CREATE TABLE t (id INTEGER PRIMARY KEY) PARTITION BY HASH (id) PARTITIONS 8")
+    assert isinstance(create, CreateTable)
+    assert (create.partition.method, create.partition.column, create.partition.count) == ('HASH', 'id', 8)
+    create = parser.parse("CREATE TABLE t (id INTEGER PRIMARY KEY) PARTITION BY RANGE (id) BOUNDS (10, 20)")
+    assert (create.partition.method, create.partition.bounds, create.partition.count) == ('RANGE', [10, 20], 3)
+
+
+def test_partition_pruning():
+    parser = SqlParser()
+    hashed = HashPartitioning('id', 4)
+    where = parser.parse("SELECT * FROM t WHERE id = 5 AND name = 'x'").where
+    assert hashed.partitions_for(where) == [hashed.partition_of(5)]
+    assert hashed.partitions_for(parser.parse("SELECT * FROM t WHERE id > 5").where) == [0, 1, 2, 3]
+    ranged = RangePartitioning('id', [10, 20])
+    assert [ranged.partition_of(key) for key in (9, 10, 19, 20)] == [0, 1, 1, 2]
+    assert ranged.partitions_for(parser.parse("SELECT * FROM t WHERE id BETWEEN 12 AND 15").where) == [1]
+    assert ranged.partitions_for(parser.parse("SELECT * FROM t WHERE id >= 15").where) == [1, 2]
+
+
+def test_point_lookups_scans_and_aggregates(db):
+    assert run(db, "SELECT * FROM users WHERE id = 7") == [{'id': 7, 'name': 'n7', 'age': 2}]
+    assert run(db, "SELECT COUNT(*) AS n, SUM(age) AS s, MAX(id) AS m FROM users") == [{'n': 30, 's': 60, 'm': 29}]
+    assert run(db, "SELECT age, COUNT(*) AS n FROM users GROUP BY age ORDER BY age LIMIT 2") == [
+        {'age': 0, 'n': 6}, {'age': 1, 'n': 6}]
+    assert run(db, "SELECT id FROM users ORDER BY id DESC LIMIT 2 OFFSET 1") == [{'id': 28}, {'id': 27}]
+    assert [row['id'] for row in run(db, "SELECT id FROM events WHERE id BETWEEN 8 AND 11 ORDER BY id")] == [
+        8, 9, 10, 11]
+    plan = run(db, "EXPLAIN SELECT * FROM events WHERE id BETWEEN 12 AND 15")[0]['plan']
+    assert 'from 1 of 3 partitions' in plan
+
+
+def test_joins(db):
+    # Partitioned alike on the join keys: joined inside each worker
+    assert run(db, "SELECT COUNT(*) AS n FROM users JOIN orders ON users.id = orders.id") == [{'n': 15}]
+    plan = [row['plan'] for row in run(db, "EXPLAIN SELECT users.id FROM users JOIN orders ON users.id = orders.id")]
+    assert 'Gather rows from 3 of 3 partitions of users joined to orders' in plan[1]
+    assert run(db, "SELECT tag, name FROM tags JOIN users ON tags.user_id = users.id ORDER BY tag") == [
+        {'tag': 'a', 'name': 'n1'}, {'tag': 'b', 'name': 'n2'}, {'tag': 'c', 'name': 'n3'}]
+
+
+def test_writes_and_constraints(db):
+    run(db, "INSERT INTO users VALUES (100, 'x', 1), (101, 'y', 1)")
+    with pytest.raises(ValueError, match="Primary key violation"):
+        run(db, "INSERT INTO users VALUES (102, 'z', 1), (100, 'dup', 1)")
+    # The rows that did reach other partitions are taken back out
+    assert run(db, "SELECT id FROM users WHERE id IN (100, 101, 102) ORDER BY id") == [{'id': 100}, {'id': 101}]
+    run(db, "UPDATE users SET age = 9 WHERE id = 100")
+    assert run(db, "SELECT age FROM users WHERE id = 100") == [{'age': 9}]
+    run(db, "DELETE FROM users WHERE id >= 100")
+    assert run(db, "SELECT COUNT(*) AS n FROM users") == [{'n': 30}]
+    run(db, "CREATE INDEX users_age ON users (age)")
+    assert [row['id'] for row in run(db, "SELECT id FROM users WHERE age = 4 ORDER BY id")] == [4, 9, 14, 19, 24, 29]
+    run(db, "DROP INDEX users_age")
+
+
+def test_updating_the_key_moves_the_row(db):
+    query_svc, _ = db
+    partition_of = query_svc.partitioned['users'].partitioning.partition_of
+    old, new = 1, next(key for key in range(500, 600) if partition_of(key) != partition_of(1))
+    run(db, f"UPDATE users SET id = {new}, age = 7 WHERE id = {old}")
+    assert run(db, f"SELECT * FROM users WHERE id IN ({old}, {new})") == [{'id': new, 'name': 'n1', 'age': 7}]
+    assert run(db, "SELECT COUNT(*) AS n FROM users") == [{'n': 30}]
+    with pytest.raises(ValueError, match="Primary key violation"):
+        run(db, f"UPDATE users SET id = 2 WHERE id = {new}")
+    with pytest.raises(ValueError, match="Primary key violation"):
+        run(db, "UPDATE users SET id = 700 WHERE id < 5")
+    run(db, f"UPDATE users SET id = {old}, age = 1 WHERE id = {new}")
+    assert run(db, "SELECT id, age FROM users WHERE id IN (1, 2) ORDER BY id") == [{'id': 1, 'age': 1}, {'id': 2, 'age': 2}]
+    assert run(db, "SELECT COUNT(*) AS n FROM users") == [{'n': 30}]
+
+
+def test_refused_definitions_and_transactions(db):
+    with pytest.raises(ValueError, match="UNIQUE"):
+        run(db, "CREATE TABLE u2 (id INTEGER PRIMARY KEY, email VARCHAR UNIQUE) PARTITION BY HASH (id) PARTITIONS 2")
+    with pytest.raises(ValueError, match="primary key"):
+        run(db, "CREATE TABLE u3 (id INTEGER PRIMARY KEY, age INTEGER) PARTITION BY HASH (age) PARTITIONS 2")
+    with pytest.raises(ValueError, match="already exists"):
+        run(db, "CREATE TABLE users (id INTEGER)")
+    query_svc, parser = db
+    query_svc.execute(parser.parse("BEGIN"))
+    try:
+        with pytest.raises(ValueError, match="transaction"):
+            query_svc.execute(parser.parse("SELECT * FROM users WHERE id = 1"))
+    finally:
+        query_svc.execute(parser.parse("ROLLBACK"))
@@ -0,0 +1,68 @@
+import pytest
+from domain.entities.statistics import collect_statistics
+
+SETUP = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR, active BOOLEAN)",
+    "CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER, product VARCHAR)",
+    "INSERT INTO users VALUES " + ", ".join(f"({i}, 'u{i}', {'TRUE' if i % 10 else 'FALSE'})" for i in range(1000)),
+    "INSERT INTO orders VALUES " + ", ".join(f"({i}, {i % 1000}, 'p{i % 7}')" for i in range(5000)),
+    "CREATE INDEX idx_active ON users (active)",
+    "CREATE INDEX idx_user ON orders (user_id)",
+]
+
+
+def plan_lines(run, sql):
+    return [row['plan'] for row in run(f"EXPLAIN {sql}")]
+
+
+def test_statistics(make_db):
+    crud = make_db(*SETUP).crud
+    stats = collect_statistics(crud.table_repo.find_by_name('users'))
+    assert stats.row_count == 1000
+    active = stats.columns['active']
+    assert active.distinct == 2
+    assert active.equal_selectivity(True) == pytest.approx(0.9)
+    assert active.equal_selectivity(False) == pytest.approx(0.1)
+    ids = stats.columns['id']
+    assert ids.ordered and ids.distinct == 1000
+    assert ids.range_selectivity(100, 300) == pytest.approx(0.2, abs=0.01)
+    assert ids.range_selectivity(None, 499) == pytest.approx(0.5, abs=0.01)
+
+
+def test_analyze_changes_access_path(make_db):
+    run = make_db(*SETUP).run
+    # Unanalyzed, the index looks selective for either value
+    assert plan_lines(run, "SELECT * FROM users WHERE active = TRUE")[0].startswith("Index Scan")
+    run("ANALYZE users")
+    # 90% of the rows match: scanning is cheaper than fetching them one by one
+    assert plan_lines(run, "SELECT * FROM users WHERE active = TRUE")[0].startswith("Seq Scan")
+    assert plan_lines(run, "SELECT * FROM users WHERE active = FALSE")[0].startswith("Index Scan")
+    assert len(run("SELECT * FROM users WHERE active = TRUE")) == 900
+
+
+def test_join_plans_agree_with_results(make_db):
+    run = make_db(*SETUP).run
+    run("ANALYZE")
+    sql = "SELECT name, product, orders_id FROM users JOIN orders ON users.id = orders.user_id WHERE id = 5"
+    lines = plan_lines(run, sql)
+    assert lines[0] == "Project name, product, orders_id  (rows=5 cost=23.0)"
+    assert lines[1].startswith("-> Nested Loop (users.id = orders.user_id), index lookup on orders.user_id")
+    assert lines[2].startswith("   -> Index Scan on users using id (id = 5)")
+    rows = run(sql)
+    assert sorted(r['orders_id'] for r in rows) == [5, 1005, 2005, 3005, 4005]
+    assert all(r == {'name': 'u5', 'product': f"p{r['orders_id'] % 7}", 'orders_id': r['orders_id']} for r in rows)
+
+    sql = "SELECT * FROM users JOIN orders ON users.id = orders.user_id WHERE product = 'p1'"
+    assert plan_lines(run, sql)[0].startswith("Hash Join")
+    rows = run(sql)
+    assert len(rows) == 715 and all(r['user_id'] == r['id'] and r['product'] == 'p1' for r in rows)
+
+
+def test_explain_analyze_reports_actual_rows(make_db):
+    run = make_db(*SETUP).run
+    lines = plan_lines(run, "ANALYZE SELECT * FROM users JOIN orders ON users.id = orders.user_id")
+    assert "(actual rows=5000 " in lines[0]
+    assert "(actual rows=1000 " in lines[1] and "(actual rows=5000 " in lines[2]
+    assert lines[-2].startswith("Planning time: ") and lines[-1].startswith("Execution time: ")
+    with pytest.raises(ValueError, match="Only SELECT"):
+        run("EXPLAIN DELETE FROM users WHERE id = 1")
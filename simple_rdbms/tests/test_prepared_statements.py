@@ -0,0 +1,52 @@
+import pytest
+
+SETUP = ["CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR UNIQUE, age INTEGER)"]
+
+
+def test_prepare_and_execute_in_sql(make_db):
+    run = make_db(*SETUP).run
+    run("PREPARE add_user AS INSERT INTO users VALUES (?, ?, ?)")
+    run("EXECUTE add_user (1, 'Alice', 30)")
+    run("EXECUTE add_user (2, 'Bob, Jr.', 25)")
+    run("PREPARE by_age AS SELECT name FROM users WHERE age = :age")
+    assert run("EXECUTE by_age (25)") == [{'name': 'Bob, Jr.'}]
+    run("PREPARE birthday AS UPDATE users SET age = ? WHERE id = ?")
+    run("EXECUTE birthday (31, 1)")
+    assert run("SELECT age FROM users WHERE id = 1") == [{'age': 31}]
+    run("DEALLOCATE PREPARE birthday")
+    with pytest.raises(ValueError):
+        run("EXECUTE birthday (32, 1)")
+
+
+def test_handles_with_named_parameters_and_validation(make_db):
+    db = make_db(*SETUP)
+    query_svc, parser, run = db.query_svc, db.parser, db.run
+    statement, parameters = parser.parse_prepared("INSERT INTO users (age, id, name) VALUES (:age, :id, 'same')")
+    assert parameters == ['age', 'id']
+    handle = query_svc.prepare(statement, parameters)
+    query_svc.execute_prepared(handle, {'id': 7, 'age': 40})
+    assert run("SELECT * FROM users") == [{'age': 40, 'id': 7, 'name': 'same'}]
+    # Bound values are still validated against their column, and constraints still apply.
+    with pytest.raises(ValueError):
+        query_svc.execute_prepared(handle, {'id': 'eight', 'age': 1})
+    with pytest.raises(ValueError):
+        query_svc.execute_prepared(handle, {'id': 8, 'age': 1})
+    with pytest.raises(ValueError):
+        query_svc.execute_prepared(handle, {'id': 9})
+    with pytest.raises(ValueError):
+        query_svc.execute_prepared(handle, [9, 1])
+
+
+def test_prepare_rejects_bad_statements(make_db):
+    db = make_db(*SETUP)
+    query_svc, parser, run = db.query_svc, db.parser, db.run
+    with pytest.raises(ValueError):
+        parser.parse("SELECT * FROM users WHERE id = ?")
+    with pytest.raises(ValueError):
+        parser.parse_prepared("SELECT * FROM users WHERE id = ? AND age = :age")
+    with pytest.raises(ValueError):
+        run("PREPARE p AS INSERT INTO users VALUES (?, ?)")
+    with pytest.raises(ValueError):
+        run("PREPARE p AS INSERT INTO users VALUES (?, 5, ?)")
+    with pytest.raises(ValueError):
+        run("PREPARE p AS INSERT INTO missing VALUES (?)")
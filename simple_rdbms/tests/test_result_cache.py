@@ -0,0 +1,109 @@
+import pytest
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.caching.result_cache import ResultCache, result_size
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+
+
+@pytest.fixture
+def db():
+    query_svc = QueryService(CrudService(TableRepository(InMemoryStorage())), result_cache_bytes=2 ** 20)
+    parser = SqlParser()
+
+    def run(sql, *params):
+        if params:
+            statement, parameters = parser.parse_prepared(sql)
+            return query_svc.execute_prepared(query_svc.prepare(statement, parameters), list(params))
+        return query_svc.execute(parser.parse(sql))
+    run("CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR, city VARCHAR)")
+    run("CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER, total INTEGER)")
+    run("INSERT INTO users VALUES (1, 'Ann', 'Oslo'), (2, 'Bob', 'Rome'), (3, 'Cy', 'Oslo')")
+    run("INSERT INTO orders VALUES (1, 1, 10), (2, 1, 20), (3, 2, 5)")
+    return query_svc, run
+
+
+def test_repeated_select_is_served_from_cache(db):
+    query_svc, run = db
+    cache = query_svc.result_cache
+    sql = "SELECT name FROM users WHERE city = 'Oslo' ORDER BY name"
+    assert run(sql) == [{'name': 'Ann'}, {'name': 'Cy'}]
+    # Same statement written differently, and the same one prepared with a parameter
+    assert run("select name  from users where city='Oslo' order by name") == [{'name': 'Ann'}, {'name': 'Cy'}]
+    assert run("SELECT name FROM users WHERE city = ? ORDER BY name", 'Oslo') == [{'name': 'Ann'}, {'name': 'Cy'}]
+    assert (cache.hits, cache.misses) == (2, 1)
+    run("SELECT name FROM users WHERE city = ? ORDER BY name", 'Rome')
+    assert cache.misses == 2
+    # Callers get their own list and rows, whether the result was computed or cached
+    run(sql).clear()
+    run(sql)[0]['name'] = 'changed'
+    cache.clear()
+    run(sql)[1]['name'] = 'changed'
+    assert run(sql) == [{'name': 'Ann'}, {'name': 'Cy'}]
+
+
+@pytest.mark.parametrize("change", [
+    "INSERT INTO users VALUES (4, 'Di', 'Oslo')",
+    "UPDATE users SET city = 'Oslo' WHERE id = 2",
+    "DELETE FROM users WHERE id = 3",
+])
+def test_writes_invalidate(db, change):
+    query_svc, run = db
+    sql = "SELECT COUNT(*) AS n FROM users WHERE city = 'Oslo'"
+    before = run(sql)[0]['n']
+    run(change)
+    assert run(sql)[0]['n'] != before
+    assert query_svc.result_cache.invalidations == 1
+
+
+def test_join_depends_on_both_tables(db):
+    query_svc, run = db
+    sql = "SELECT users.name, orders.total FROM users JOIN orders ON users.id = orders.user_id WHERE orders.total > 6"
+    assert len(run(sql)) == 2
+    run("INSERT INTO orders VALUES (4, 3, 50)")
+    assert len(run(sql)) == 3
+    run("UPDATE users SET name = 'Cyd' WHERE id = 3")
+    assert {'name': 'Cyd', 'total': 50} in run(sql)
+    assert query_svc.result_cache.invalidations == 2
+
+
+def test_transactions_bypass_cache(db):
+    query_svc, run = db
+    run("BEGIN")
+    run("INSERT INTO users VALUES (4, 'Di', 'Oslo')")
+    assert len(run("SELECT * FROM users")) == 4
+    run("ROLLBACK")
+    assert len(run("SELECT * FROM users")) == 3
+    assert query_svc.result_cache.hits == 0
+
+
+def test_lru_is_bounded_by_bytes():
+    rows = [{'id': i, 'name': f"name{i}"} for i in range(10)]
+    size = result_size(rows)
+    cache = ResultCache(size * 4 + size // 2)
+    for key in range(4):
+        cache.put(key, (1,), rows)
+    assert cache.get(0, (1,)) is not None
+    cache.put(4, (1,), rows)
+    # 1 was the least recently used
+    assert cache.get(1, (1,)) is None
+    assert cache.get(0, (1,)) is not None
+    assert len(cache) == 4 and cache.bytes <= cache.max_bytes and cache.evictions == 1
+    # A result too large for its share of the cache is not kept
+    cache.put('big', (1,), rows * 10)
+    assert cache.get('big', (1,)) is None
+    stats = cache.stats()
+    assert stats['entries'] == 4 and stats['hits'] == 2 and stats['misses'] == 2
+
+
+def test_cache_stats_endpoint():
+    from presentation.web.app import app
+    client = app.test_client()
+    client.get('/query', query_string={'sql': "CREATE TABLE cached (id INTEGER PRIMARY KEY)"})
+    before = client.get('/cache').get_json()
+    for _ in range(3):
+        client.get('/query', query_string={'sql': "SELECT * FROM cached"})
+    stats = client.get('/cache').get_json()
+    assert stats['enabled']
+    assert stats['misses'] - before['misses'] == 1 and stats['hits'] - before['hits'] == 2
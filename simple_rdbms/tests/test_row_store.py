@@ -0,0 +1,103 @@
+import pickle
+import pytest
+from domain.entities.column import Column
+from domain.entities.table import Table
+from domain.value_objects.data_type import DataType
+from domain.value_objects.index_type import IndexType
+
+
+def make_table():
+    table = Table('items', [
+        Column('id', DataType.INTEGER, primary_key=True),
+        Column('code', DataType.VARCHAR, unique=True),
+        Column('group_id', DataType.INTEGER),
+    ])
+    table.create_index('idx_group', 'group_id', IndexType.HASH)
+    table.create_index('idx_group_sorted', 'group_id', IndexType.BTREE)
+    return table
+
+
+def test_pk_lookups_stay_correct_after_deletes():
+    table = make_table()
+    for i in range(10):
+        table.insert_row({'id': i, 'code': f'c{i}', 'group_id': i % 3})
+    table.delete_row(2)
+    table.delete_row(5)
+    for i in range(10):
+        row = table.get_row_by_pk(i)
+        assert (row is None) if i in (2, 5) else row['id'] == i
+    assert len(table.store) == 8
+    assert table.select_rows({'code': 'c7'})[0]['id'] == 7
+
+    # Freed slots are reused by later inserts.
+    table.insert_row({'id': 10, 'code': 'c10', 'group_id': 1})
+    assert len(table.store.slots) == 10
+    assert table.get_row_by_pk(10)['code'] == 'c10'
+
+
+def test_compaction_remaps_indexes():
+    table = make_table()
+    table.store.min_compaction_slots = 4
+    for i in range(20):
+        table.insert_row({'id': i, 'code': f'c{i}', 'group_id': i % 4})
+    for i in range(0, 20, 2):
+        table.delete_row(i)
+    table.delete_row(1)
+    # More than half of the slots were tombstones, so the store compacted itself.
+    assert len(table.store.slots) == len(table.store) == 9
+    assert table.store.free_slots == []
+    for i in range(3, 20, 2):
+        assert table.get_row_by_pk(i)['id'] == i
+        assert table.select_rows({'code': f'c{i}'})[0]['id'] == i
+    assert sorted(r['id'] for r in table.select_rows({'group_id': 3})) == [3, 7, 11, 15, 19]
+    assert sorted(table.store.get(i)['id'] for i in table.indexes['idx_group_sorted'].range(1, 1)) == [5, 9, 13, 17]
+
+
+def test_rows_are_stored_as_tuples():
+    table = make_table()
+    table.insert_row({'id': 1, 'code': 'c1'})
+    assert [row.values for row in table.store.slots] == [(1, 'c1', None)]
+    # Readers get the stored row itself, which is read-only, with absent columns as None
+    row = table.get_row_by_pk(1)
+    assert row == {'id': 1, 'code': 'c1', 'group_id': None} and dict(row) == row
+    assert (row.get('code'), row.get('nope', 'x'), 'code' in row, list(row)) == ('c1', 'x', True, ['id', 'code', 'group_id'])
+    with pytest.raises(TypeError):
+        row['code'] = 'changed'
+    copy = row.copy()
+    copy['code'] = 'changed'
+    assert table.get_row_by_pk(1) is row and row['code'] == 'c1'
+    table.update_rows([0], {'group_id': 4})
+    assert table.store.slots[0].values == (1, 'c1', 4)
+    # An update stores a new row, so one read earlier keeps its values; rows pickle as dicts
+    assert row['group_id'] is None and pickle.loads(pickle.dumps(table.get_row_by_pk(1))) == {
+        'id': 1, 'code': 'c1', 'group_id': 4}
+
+
+def test_scan_filters_tuples_and_projects():
+    from application.execution.predicates import compile_predicate
+    from infrastructure.parsers.sql_parser import SqlParser
+    table = make_table()
+    for i in range(6):
+        table.insert_row({'id': i, 'code': f'c{i}', 'group_id': i % 3})
+    where = SqlParser().parse("SELECT * FROM items WHERE group_id = 1 OR missing IS NULL AND id > 4").where
+    predicate = compile_predicate(where, table.store.positions)
+    assert list(table.store.scan(predicate, ['code', 'nope'])) == [{'code': 'c1'}, {'code': 'c4'}, {'code': 'c5'}]
+    assert list(table.store.fetch([4, 1, 2], predicate, ['id'])) == [{'id': 4}, {'id': 1}]
+    assert table.store.matching_ids(predicate) == [1, 4, 5]
+    assert list(table.store.scan(None, ['id', 'code']))[2] == {'id': 2, 'code': 'c2'}
+
+
+def test_columns_validate_and_pickle():
+    import pickle
+    import pytest
+    column = Column('n', DataType.INTEGER, nullable=False)
+    with pytest.raises(ValueError, match="must be integer"):
+        column.validate_value('x')
+    with pytest.raises(ValueError, match="cannot be null"):
+        column.validate_value(None)
+    copy = pickle.loads(pickle.dumps(column))
+    assert (copy.name, copy.nullable) == ('n', False)
+    with pytest.raises(ValueError):
+        copy.validate_value(1.5)
+    with pytest.raises(AttributeError):
+        make_table().extra = 1
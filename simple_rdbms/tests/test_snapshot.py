@@ -0,0 +1,83 @@
+import pytest
+from infrastructure.parsers.sql_ast import Load, Save
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.storage import snapshot
+
+
+@pytest.fixture
+def db(make_db):
+    db = make_db(
+        "CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR UNIQUE, score FLOAT, active BOOLEAN NOT NULL)",
+        "INSERT INTO users VALUES (1, 'ä@example.com', 1.5, TRUE), (2, NULL, NULL, FALSE), (3, '', 2.25, TRUE)",
+        "CREATE INDEX users_score ON users (score) USING BTREE",
+        "CREATE TABLE events (user_id INTEGER, kind VARCHAR) ENGINE = COLUMNAR",
+        "INSERT INTO events VALUES (1, 'login'), (NULL, 'logout'), (3, NULL)",
+    )
+    return db.query_svc, db.parser
+
+
+@pytest.mark.parametrize('compression', ['NONE', 'ZLIB'])
+def test_save_and_load_round_trip(db, tmp_path, compression, make_db):
+    query_svc, parser = db
+    path = str(tmp_path / 'db.snap')
+    assert query_svc.execute(parser.parse(f"SAVE TO '{path}' WITH (COMPRESSION {compression})")) == 6
+
+    restored = make_db().query_svc
+    assert restored.execute(parser.parse(f"LOAD FROM '{path}'")) == 6
+    for sql in ["SELECT * FROM users", "SELECT * FROM events", "SELECT id FROM users WHERE score > 2",
+                "SELECT id FROM users WHERE email = ''"]:
+        assert restored.execute(parser.parse(sql)) == query_svc.execute(parser.parse(sql))
+    users = restored.crud.table_repo.find_by_name('users')
+    assert users.primary_key_index == {1: 0, 2: 1, 3: 2} and 'users_score' in users.indexes
+    assert not users.column_map['active'].nullable
+    with pytest.raises(ValueError, match="Primary key violation"):
+        restored.execute(parser.parse("INSERT INTO users VALUES (3, 'x', 1.0, TRUE)"))
+    restored.execute(parser.parse("INSERT INTO users VALUES (4, 'x', 1.0, TRUE)"))
+    assert restored.crud.table_repo.find_by_name('events').store.engine.value == 'COLUMNAR'
+
+
+def test_large_tables_span_chunks(tmp_path, monkeypatch, make_db):
+    monkeypatch.setattr(snapshot, 'CHUNK_ROWS', 100)
+    db = make_db()
+    query_svc, parser = db.query_svc, db.parser
+    query_svc.execute(parser.parse("CREATE TABLE t (id INTEGER PRIMARY KEY, name VARCHAR)"))
+    query_svc.execute(parser.parse("INSERT INTO t VALUES " + ", ".join(f"({i}, 'n{i}')" for i in range(250))))
+    path = str(tmp_path / 't.snap')
+    query_svc.save_snapshot(path, 'ZLIB')
+    images = snapshot.read_snapshot(path)
+    assert images[0].row_count == 250 and images[0].values[1][-1] == 'n249'
+
+
+def test_load_refuses_existing_tables_and_bad_files(db, tmp_path, make_db):
+    query_svc, parser = db
+    path = str(tmp_path / 'db.snap')
+    query_svc.save_snapshot(path)
+    restored = make_db().query_svc
+    restored.execute(parser.parse("CREATE TABLE events (id INTEGER)"))
+    with pytest.raises(ValueError, match="already exists"):
+        restored.load_snapshot(path)
+    # Nothing is left half loaded
+    assert restored.crud.table_repo.find_all_names() == ['events']
+
+    not_a_snapshot = tmp_path / 'rows.csv'
+    not_a_snapshot.write_text("id\n1\n")
+    with pytest.raises(ValueError, match="not a snapshot"):
+        restored.load_snapshot(str(not_a_snapshot))
+
+
+def test_parse_and_permissions(tmp_path, make_db):
+    parser = SqlParser()
+    save = parser.parse("SAVE TO '/tmp/x.snap' WITH (COMPRESSION zlib)")
+    assert isinstance(save, Save) and (save.path, save.compression) == ('/tmp/x.snap', 'ZLIB')
+    load = parser.parse("LOAD FROM '/tmp/x.snap';")
+    assert isinstance(load, Load) and load.path == '/tmp/x.snap'
+    with pytest.raises(ValueError, match="Unsupported snapshot compression"):
+        parser.parse("SAVE TO 'x' WITH (COMPRESSION LZ4)")
+
+    query_svc = make_db(allow_copy=False).query_svc
+    with pytest.raises(ValueError, match="SAVE is disabled"):
+        query_svc.execute(save)
+    query_svc = make_db().query_svc
+    query_svc.execute(parser.parse("BEGIN"))
+    with pytest.raises(ValueError, match="not allowed inside a transaction"):
+        query_svc.execute(parser.parse(f"SAVE TO '{tmp_path / 'x.snap'}'"))
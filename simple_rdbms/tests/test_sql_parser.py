@@ -0,0 +1,106 @@
+import pytest
+from infrastructure.parsers.lexer import tokenize, KEYWORD, IDENT, STRING, NUMBER
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.parsers.sql_ast import (
+    ColumnDef, CreateTable, CreateIndex, DropIndex, Insert, Join, Aggregate, OrderItem, Select, Update, Delete,
+    Comparison, Between, In, Like, IsNull, And, Or, Not, equality_conditions,
+)
+
+
+def test_tokenizer_handles_commas_and_quotes_inside_strings():
+    tokens = tokenize("insert INTO t VALUES ('a, b', 'it''s', -2.5, 7)")
+    assert [(t.kind, t.value) for t in tokens[:3]] == [(KEYWORD, 'INSERT'), (KEYWORD, 'INTO'), (IDENT, 't')]
+    values = [(t.kind, t.value) for t in tokens if t.kind in (STRING, NUMBER)]
+    assert values == [(STRING, 'a, b'), (STRING, "it's"), (NUMBER, -2.5), (NUMBER, 7)]
+
+
+def test_tokenizer_reads_exponent_literals():
+    values = [t.value for t in tokenize("VALUES (1e300, -1.5e3, .5E-2, 2E+2, 12)") if t.kind == NUMBER]
+    assert values == [1e300, -1500.0, 0.005, 200.0, 12]
+    assert all(isinstance(value, float) for value in values[:4]) and isinstance(values[4], int)
+    assert SqlParser().parse("INSERT INTO t VALUES (1, -1.5e3)") == Insert('t', None, [[1, -1500.0]])
+
+
+def test_parses_typed_statements():
+    parser = SqlParser()
+    assert parser.parse("CREATE TABLE t (id INTEGER PRIMARY KEY, name VARCHAR(20) UNIQUE NOT NULL) ENGINE = COLUMNAR") == \
+        CreateTable('t', [ColumnDef('id', 'INTEGER', primary_key=True),
+                          ColumnDef('name', 'VARCHAR', unique=True, nullable=False)], 'COLUMNAR')
+    assert parser.parse("insert into t (name, id) values ('x, y', 1);") == Insert('t', ['name', 'id'], [['x, y', 1]])
+    assert parser.parse("SELECT a, t.b FROM t INNER JOIN u ON t.id = u.t_id WHERE a = NULL AND u.c = TRUE") == \
+        Select('t', ['a', 't.b'], Join('u', 't.id', 'u.t_id'),
+               And([Comparison('a', '=', None), Comparison('u.c', '=', True)]))
+    assert parser.parse("UPDATE t SET a = 1, b = 'z' WHERE id = 3") == \
+        Update('t', {'a': 1, 'b': 'z'}, Comparison('id', '=', 3))
+    assert parser.parse("DELETE FROM t WHERE id = 3") == Delete('t', Comparison('id', '=', 3))
+    assert parser.parse("CREATE INDEX i ON t (a) USING btree") == CreateIndex('i', 't', 'a', 'BTREE')
+    assert parser.parse("DROP INDEX i") == DropIndex('i')
+    assert equality_conditions(parser.parse("SELECT * FROM t WHERE a = 1 AND b = 2").where) == {'a': 1, 'b': 2}
+
+
+def test_parses_boolean_where_expressions():
+    parser = SqlParser()
+    where = parser.parse("SELECT * FROM t WHERE a < 1 OR NOT b BETWEEN 2 AND 3 AND (c IN (1, 2) OR d LIKE 'x%')").where
+    assert where == Or([
+        Comparison('a', '<', 1),
+        And([Not(Between('b', 2, 3)), Or([In('c', [1, 2]), Like('d', 'x%')])]),
+    ])
+    where = parser.parse("DELETE FROM t WHERE a <> 1 AND b IS NOT NULL AND c NOT IN (1) AND d NOT LIKE 'y'").where
+    assert where == And([Comparison('a', '!=', 1), IsNull('b', True), In('c', [1], True), Like('d', 'y', True)])
+    assert parser.parse("UPDATE t SET a = 1 WHERE b >= 2").where == Comparison('b', '>=', 2)
+
+
+def test_parses_aggregates_order_by_and_limit():
+    parser = SqlParser()
+    # Function names are only special before '(', so they can still name columns
+    assert parser.parse("SELECT count, SUM(v) AS total, COUNT(*) FROM t GROUP BY count "
+                        "ORDER BY total DESC, count, MAX(v) ASC LIMIT 3 OFFSET 1") == \
+        Select('t', ['count', Aggregate('SUM', 'v', 'total'), Aggregate('COUNT', None)], group_by=['count'],
+               order_by=[OrderItem('total', True), OrderItem('count'), OrderItem(Aggregate('MAX', 'v'))],
+               limit=3, offset=1)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM",
+    "SELECT SUM(*) FROM t",
+    "SELECT * FROM t LIMIT -1",
+    "SELECT * FROM t LIMIT 1.5",
+    "SELECT * FROM t ORDER a",
+    "SELECT * FROM t WHERE a BETWEEN 1",
+    "SELECT * FROM t WHERE a LIKE 1",
+    "SELECT * FROM t WHERE (a = 1",
+    "SELECT * FROM t WHERE a IS 1",
+    "INSERT INTO t VALUES (1, 2",
+    "DELETE FROM t",
+    "SELECT * FROM t WHERE a = 1 b",
+    "CREATE TABLE t (id TEXT)",
+    "CREATE TABLE t (id INTEGER) ENGINE = DISK",
+    "SELECT * FROM t WHERE a = $",
+    "GRANT ALL",
+])
+def test_rejects_invalid_sql(sql):
+    with pytest.raises(ValueError):
+        SqlParser().parse(sql)
+
+
+def test_statement_cache_skips_parsing():
+    parser = SqlParser(cache_size=2)
+    first = parser.parse("SELECT * FROM t WHERE a = 1")
+    assert parser.parse("  select  *  from t where a = 1 ;") is not first
+    assert parser.parse("SELECT  *  FROM t  WHERE a = 1;") is first
+    assert (parser.cache.hits, parser.cache.misses) == (1, 2)
+    # Whitespace inside string literals is significant.
+    assert parser.parse("SELECT * FROM t WHERE a = 'x  y'").where.value == 'x  y'
+    assert len(parser.cache) == 2
+
+
+def test_unreserved_keywords_can_name_tables_and_columns():
+    parser = SqlParser()
+    create = parser.parse("CREATE TABLE kv (key VARCHAR PRIMARY KEY, value VARCHAR, index INTEGER UNIQUE)")
+    assert [(c.name, c.primary_key, c.unique) for c in create.columns] == [
+        ('key', True, False), ('value', False, False), ('index', False, True)]
+    assert parser.parse("SELECT key, index FROM kv WHERE key = 'a'").columns == ['key', 'index']
+    assert parser.parse("UPDATE kv SET value = 'b' WHERE key = 'a'").assignments == {'value': 'b'}
+    assert parser.parse("SELECT * FROM begin").table == 'begin'
+    with pytest.raises(ValueError):
+        parser.parse("SELECT from FROM kv")
@@ -0,0 +1,71 @@
+import json
+import threading
+
+
+def make_items(make_db, rows=100):
+    db = make_db("CREATE TABLE items (id INTEGER PRIMARY KEY, grp INTEGER)")
+    db.crud.bulk_insert('items', [{'id': i, 'grp': i % 3} for i in range(rows)])
+    return db.query_svc, db.parser
+
+
+def test_stream_holds_read_locks_until_closed(make_db):
+    query_svc, parser = make_items(make_db)
+    rows = query_svc.stream(parser.parse("SELECT id FROM items WHERE grp = 1"))
+    assert next(rows) == {'id': 1}
+    writer = threading.Thread(target=query_svc.execute, args=(parser.parse("INSERT INTO items VALUES (500, 1)"),))
+    writer.start()
+    writer.join(0.2)
+    assert writer.is_alive()
+    assert [r['id'] for r in rows][:2] == [4, 7]
+    # Exhausting the stream released the locks
+    writer.join(5)
+    assert not writer.is_alive()
+
+    with query_svc.stream(parser.parse("SELECT * FROM items")) as rows:
+        next(rows)
+    query_svc.execute(parser.parse("DELETE FROM items WHERE id = 500"))
+
+
+def test_limit_stops_the_scan_early(make_db):
+    query_svc, parser = make_items(make_db, 1000)
+    lines = [r['plan'] for r in query_svc.execute(parser.parse("EXPLAIN ANALYZE SELECT id FROM items LIMIT 5"))]
+    assert "actual rows=5 " in lines[1] and lines[1].startswith("-> Seq Scan")
+
+
+def test_pages_cover_the_result(make_db):
+    query_svc, parser = make_items(make_db)
+    query = parser.parse("SELECT id FROM items WHERE grp = 0 ORDER BY id DESC LIMIT 30 OFFSET 2")
+    pages, offset, more = [], 0, True
+    while more:
+        rows, more = query_svc.fetch_page(query, offset, 7)
+        pages.append(rows)
+        offset += 7
+    assert [len(p) for p in pages] == [7, 7, 7, 7, 2]
+    assert sum(pages, []) == query_svc.execute(query)
+
+
+def test_post_query_streams_ndjson_and_pages():
+    from presentation.web.app import app, query_service, parser
+    query_service.execute(parser.parse("CREATE TABLE stream_items (id INTEGER PRIMARY KEY, name VARCHAR)"))
+    query_service.execute(parser.parse(
+        "INSERT INTO stream_items VALUES " + ", ".join(f"({i}, 'n{i}')" for i in range(1200))))
+    client = app.test_client()
+
+    response = client.post('/query', json={'sql': "SELECT id FROM stream_items WHERE id < 1100"})
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)['id'] for line in lines] == list(range(1100))
+
+    response = client.post('/query', json={'sql': "SELECT id FROM stream_items WHERE id > 10", 'format': 'json'})
+    assert response.json == {'result': [{'id': i} for i in range(11, 1200)]}
+
+    body = client.post('/query', json={'sql': "SELECT name FROM stream_items ORDER BY id DESC", 'page_size': 500}).json
+    names = [r['name'] for r in body['rows']]
+    while body['cursor']:
+        body = client.post('/query', json={'cursor': body['cursor']}).json
+        names += [r['name'] for r in body['rows']]
+    assert names == [f"n{i}" for i in reversed(range(1200))]
+
+    assert client.post('/query', json={'sql': "SELECT * FROM nowhere"}).json == {'error': 'Table not found'}
+    assert client.post('/query', json={'cursor': 'junk'}).status_code == 400
+    assert client.post('/query', json={'sql': "DELETE FROM stream_items WHERE id >= 0"}).json == {'result': None}
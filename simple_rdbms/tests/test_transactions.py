@@ -0,0 +1,121 @@
+import pytest
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from application.services.transaction import Session
+from infrastructure.concurrency.rw_lock import LockTimeout
+from infrastructure.parsers.sql_ast import Begin, Commit, Rollback
+from infrastructure.parsers.sql_parser import SqlParser
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.disk_storage import DiskStorage
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+from tests.test_disk_storage import crash
+
+parser = SqlParser()
+
+
+def make_service(storage=None, **options):
+    query_svc = QueryService(CrudService(TableRepository(storage or InMemoryStorage())), **options)
+    run = lambda sql, session=None: query_svc.execute(parser.parse(sql), session)
+    run("CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR UNIQUE, age INTEGER)")
+    run("CREATE INDEX idx_age ON users (age) USING BTREE")
+    run("INSERT INTO users VALUES (1, 'Alice', 30), (2, 'Bob', 25)")
+    return query_svc, run
+
+
+def test_parse_transaction_statements():
+    assert parser.parse("BEGIN") == Begin()
+    assert parser.parse("BEGIN TRANSACTION;") == Begin()
+    assert parser.parse("commit work") == Commit()
+    assert parser.parse("ROLLBACK") == Rollback()
+
+
+def test_commit_applies_buffered_inserts_and_rollback_undoes_everything():
+    _, run = make_service()
+    run("BEGIN")
+    run("INSERT INTO users VALUES (3, 'Carol', 30)")
+    # A read in the transaction sees its own buffered rows
+    assert run("SELECT name FROM users WHERE age = 30") == [{'name': 'Alice'}, {'name': 'Carol'}]
+    run("COMMIT")
+    assert len(run("SELECT * FROM users")) == 3
+
+    run("BEGIN")
+    run("INSERT INTO users VALUES (4, 'Dan', 40)")
+    run("UPDATE users SET age = 31, name = 'Al' WHERE id = 1")
+    run("DELETE FROM users WHERE id = 2")
+    assert run("SELECT name FROM users WHERE age = 40") == [{'name': 'Dan'}]
+    run("ROLLBACK")
+    assert run("SELECT * FROM users") == [
+        {'id': 1, 'name': 'Alice', 'age': 30}, {'id': 2, 'name': 'Bob', 'age': 25},
+        {'id': 3, 'name': 'Carol', 'age': 30}]
+    assert run("SELECT id FROM users WHERE age = 40") == []
+    assert run("SELECT id FROM users WHERE name = 'Bob'") == [{'id': 2}]
+    # Unique and key indexes were restored along with the rows
+    with pytest.raises(ValueError, match="Unique"):
+        run("INSERT INTO users VALUES (5, 'Alice', 1)")
+
+
+def test_rollback_of_a_primary_key_change():
+    _, run = make_service()
+    run("BEGIN")
+    run("UPDATE users SET id = 5 WHERE id = 1")
+    run("UPDATE users SET age = 99 WHERE id = 2")
+    run("ROLLBACK")
+    assert run("SELECT * FROM users") == [
+        {'id': 1, 'name': 'Alice', 'age': 30}, {'id': 2, 'name': 'Bob', 'age': 25}]
+    assert run("SELECT name FROM users WHERE id = 1") == [{'name': 'Alice'}]
+    assert run("SELECT * FROM users WHERE id = 5") == []
+
+
+def test_constraint_violation_at_commit_rolls_back_the_transaction():
+    query_svc, run = make_service()
+    run("BEGIN")
+    run("UPDATE users SET age = 99 WHERE id = 2")
+    run("INSERT INTO users VALUES (3, 'Carol', 30)")
+    run("INSERT INTO users VALUES (1, 'Again', 30)")
+    with pytest.raises(ValueError, match="Primary key violation; transaction rolled back"):
+        run("COMMIT")
+    assert query_svc.session.transaction is None
+    assert run("SELECT age FROM users WHERE id = 2") == [{'age': 25}]
+    assert len(run("SELECT * FROM users")) == 2
+    with pytest.raises(ValueError, match="No transaction"):
+        run("COMMIT")
+    with pytest.raises(ValueError, match="Schema changes"):
+        run("BEGIN")
+        run("CREATE INDEX idx_name ON users (name)")
+
+
+def test_written_tables_stay_locked_until_the_transaction_ends():
+    query_svc, run = make_service(lock_timeout=0.05)
+    first, second = Session(), Session()
+    run("BEGIN", first)
+    run("INSERT INTO users VALUES (3, 'Carol', 30)", first)
+    # A waiting transaction gives up and is rolled back
+    run("BEGIN", second)
+    with pytest.raises(LockTimeout, match="rolled back"):
+        run("UPDATE users SET age = 1 WHERE id = 1", second)
+    assert second.transaction is None
+    run("COMMIT", first)
+    assert len(run("SELECT * FROM users")) == 3
+
+
+def test_disk_transaction_is_atomic_across_a_crash(tmp_path):
+    storage = DiskStorage(str(tmp_path))
+    _, run = make_service(storage)
+    run("CREATE TABLE log (id INTEGER PRIMARY KEY, msg VARCHAR)")
+    run("BEGIN")
+    run("INSERT INTO users VALUES (3, 'Carol', 30)")
+    run("INSERT INTO log VALUES (1, 'carol joined')")
+    run("COMMIT")
+    run("BEGIN")
+    run("DELETE FROM users WHERE id = 1")
+    run("INSERT INTO log VALUES (2, 'alice left')")
+    run("SELECT * FROM log")
+    # Both changes reached the pages and the log, but the transaction never committed
+    crash(storage)
+
+    storage = DiskStorage(str(tmp_path))
+    query_svc = QueryService(CrudService(TableRepository(storage)))
+    run = lambda sql: query_svc.execute(parser.parse(sql))
+    assert [r['id'] for r in run("SELECT * FROM users")] == [1, 2, 3]
+    assert run("SELECT * FROM log") == [{'id': 1, 'msg': 'carol joined'}]
+    storage.close()
@@ -0,0 +1,68 @@
+import pytest
+
+TAGS = ['red', 'blue', None]
+SETUP = [
+    "CREATE TABLE items (id INTEGER PRIMARY KEY, name VARCHAR, price INTEGER, tag VARCHAR)",
+    "INSERT INTO items VALUES " + ", ".join(
+        f"({i}, 'item{i}', {i % 50}, {repr(TAGS[i % 3]) if TAGS[i % 3] else 'NULL'})" for i in range(300)),
+]
+
+
+def ids(rows):
+    return sorted(r['id'] for r in rows)
+
+
+def test_select_with_boolean_expressions(make_db):
+    run = make_db(*SETUP).run
+    assert ids(run("SELECT id FROM items WHERE price BETWEEN 10 AND 11 AND id < 100")) == [10, 11, 60, 61]
+    assert ids(run("SELECT id FROM items WHERE id IN (1, 2, 999) OR name LIKE 'item29_'")) == \
+        [1, 2] + list(range(290, 300))
+    assert ids(run("SELECT id FROM items WHERE tag IS NULL AND price = 2")) == [2, 152]
+    # NULL tags are neither 'red' nor not 'red'
+    assert len(run("SELECT id FROM items WHERE tag = 'red'")) + len(run("SELECT id FROM items WHERE tag != 'red'")) == 200
+    assert len(run("SELECT id FROM items WHERE NOT (tag = 'red' OR tag = 'blue')")) == 0
+    assert run("SELECT id FROM items WHERE tag NOT IN ('red', NULL)") == []
+
+
+@pytest.mark.parametrize('engine', ['ROW', 'COLUMNAR'])
+def test_not_in_with_repeated_values(engine, make_db):
+    run = make_db("CREATE TABLE prices (id INTEGER PRIMARY KEY, amount FLOAT) ENGINE = {engine}", engine=engine).run
+    run("INSERT INTO prices VALUES (1, 4.25), (2, 5.5), (3, NULL)")
+    # A value listed twice is not a NULL in the list
+    assert ids(run("SELECT id FROM prices WHERE amount NOT IN (4.25, 4.25)")) == [2]
+    assert run("SELECT id FROM prices WHERE amount NOT IN (4.25, NULL, 4.25)") == []
+
+
+def test_range_and_in_predicates_use_indexes(make_db):
+    run = make_db(*SETUP).run
+    run("CREATE INDEX idx_price ON items (price) USING BTREE")
+    plan = run("EXPLAIN SELECT * FROM items WHERE price >= 48 AND price < 49")[0]['plan']
+    assert plan.startswith("Index Scan on items using 48 <= price < 49")
+    assert ids(run("SELECT * FROM items WHERE price >= 48 AND price < 49")) == [48, 98, 148, 198, 248, 298]
+    plan = run("EXPLAIN SELECT * FROM items WHERE id IN (3, 4) OR price = 7")[0]['plan']
+    assert plan.startswith("Index Scan on items using id OR price")
+    assert ids(run("SELECT * FROM items WHERE id IN (3, 4) OR price = 7")) == [3, 4, 7, 57, 107, 157, 207, 257]
+
+
+def test_update_and_delete_with_where_expressions(make_db):
+    run = make_db(*SETUP).run
+    run("UPDATE items SET tag = 'sale' WHERE price < 2 AND tag IS NULL")
+    assert ids(run("SELECT * FROM items WHERE tag = 'sale'")) == [50, 101, 200, 251]
+    run("DELETE FROM items WHERE price >= 10")
+    assert len(run("SELECT * FROM items")) == 60
+    with pytest.raises(ValueError, match="Primary key violation"):
+        run("UPDATE items SET id = 1000 WHERE price = 1")
+    assert run("SELECT * FROM items WHERE id = 1000") == []
+
+
+def test_where_expressions_inside_a_transaction(make_db):
+    run = make_db(*SETUP).run
+    run("BEGIN")
+    run("INSERT INTO items VALUES (300, 'new', 5, 'red')")
+    run("DELETE FROM items WHERE price = 5")
+    run("UPDATE items SET price = 0 WHERE tag = 'blue' AND price > 40")
+    assert run("SELECT * FROM items WHERE price = 5") == []
+    run("ROLLBACK")
+    assert len(run("SELECT * FROM items WHERE price = 5")) == 6
+    assert len(run("SELECT * FROM items WHERE price = 0")) == 6
+    assert run("SELECT * FROM items WHERE id = 300") == []
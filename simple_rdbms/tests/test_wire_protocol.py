@@ -0,0 +1,87 @@
+import threading
+import pytest
+from application.services.crud_service import CrudService
+from application.services.query_service import QueryService
+from infrastructure.repositories.table_repository import TableRepository
+from infrastructure.storage.in_memory_storage import InMemoryStorage
+from presentation.wire.client import Connection, ConnectionPool
+from presentation.wire.protocol import decode_batch, decode_rows, encode_batch, encode_rows
+from presentation.wire.server import WireServer
+
+
+@pytest.fixture
+def server():
+    query_svc = QueryService(CrudService(TableRepository(InMemoryStorage())))
+    wire_server = WireServer(('127.0.0.1', 0), query_svc)
+    thread = threading.Thread(target=wire_server.serve_forever, daemon=True)
+    thread.start()
+    yield wire_server
+    wire_server.shutdown()
+    wire_server.server_close()
+
+
+@pytest.fixture
+def pool(server):
+    pool = ConnectionPool('127.0.0.1', server.server_address[1], size=2)
+    pool.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR, score FLOAT, active BOOLEAN)")
+    yield pool
+    pool.close()
+
+
+def test_rows_round_trip():
+    rows = [{'id': 1, 'name': 'Zoë', 'score': 1.5, 'active': True, 'note': None},
+            {'id': None, 'name': '', 'score': 2, 'active': False, 'note': None},
+            {'id': -2 ** 63, 'name': None, 'score': None, 'active': None, 'note': None}]
+    decoded = decode_rows(encode_rows(rows))
+    assert decoded == rows
+    assert isinstance(decoded[1]['score'], float)
+    assert decode_rows(encode_rows([])) == []
+    with pytest.raises(ValueError, match="int, str"):
+        encode_rows([{'a': 1}, {'a': 'x'}])
+    with pytest.raises(ValueError, match="too large"):
+        encode_rows([{'a': 2 ** 64}])
+    assert decode_batch(encode_batch("INSERT", [[1, 'a'], [2, None]])) == ("INSERT", [[1, 'a'], [2, None]])
+    assert decode_batch(encode_batch("INSERT", [{'x': True}])) == ("INSERT", [{'x': True}])
+    assert decode_batch(encode_batch("DELETE", [[], []])) == ("DELETE", [[], []])
+
+
+def test_query_batch_and_pipeline(pool):
+    assert pool.execute_many("INSERT INTO users VALUES (?, ?, ?, ?)",
+                             [[i, f"user{i}", i / 2, i % 2 == 0] for i in range(100)]) == 100
+    assert pool.execute("SELECT * FROM users WHERE id = 3") == [
+        {'id': 3, 'name': 'user3', 'score': 1.5, 'active': False}]
+    assert pool.execute("SELECT COUNT(*) AS n FROM users") == [{'n': 100}]
+    first, second = pool.pipeline(["SELECT name FROM users WHERE id = 1", "SELECT name FROM users WHERE id = 2"])
+    assert (first, second) == ([{'name': 'user1'}], [{'name': 'user2'}])
+    assert pool.execute_many("UPDATE users SET name = :name WHERE id = :id",
+                             [{'name': 'x', 'id': 1}, {'name': 'y', 'id': 2}]) == 2
+    assert pool.execute("SELECT name FROM users WHERE id IN (1, 2) ORDER BY id") == [{'name': 'x'}, {'name': 'y'}]
+
+
+def test_errors_keep_connection_usable(pool):
+    with pool.connection() as conn:
+        with pytest.raises(ValueError, match="Table not found"):
+            conn.execute("SELECT * FROM missing")
+        # Later statements of a pipeline still run when an earlier one fails
+        with pytest.raises(ValueError, match="Table not found"):
+            conn.pipeline(["SELECT * FROM missing", "INSERT INTO users VALUES (1, 'a', 1.0, true)"])
+        assert conn.execute("SELECT id FROM users") == [{'id': 1}]
+        # A failing batch applies none of its sets
+        with pytest.raises(ValueError):
+            conn.execute_many("INSERT INTO users VALUES (?, ?, ?, ?)", [[2, 'b', 1.0, True], [1, 'dup', 1.0, True]])
+        assert conn.execute("SELECT COUNT(*) AS n FROM users") == [{'n': 1}]
+
+
+def test_transactions_span_requests(pool, server):
+    with pool.connection() as conn:
+        conn.execute("BEGIN")
+        conn.execute("INSERT INTO users VALUES (1, 'a', 1.0, true)")
+        assert conn.in_transaction
+        # Given back with the transaction open: the pool rolls it back
+    assert pool.execute("SELECT * FROM users") == []
+    conn = Connection('127.0.0.1', server.server_address[1])
+    conn.execute("BEGIN")
+    conn.execute("INSERT INTO users VALUES (2, 'b', 1.0, true)")
+    conn.close()
+    # The server rolls back the transaction of a connection that went away
+    assert pool.execute("SELECT * FROM users") == []